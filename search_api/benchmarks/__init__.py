@@ -0,0 +1,3 @@
+"""
+オフラインで実行するベンチマーク (python -m benchmarks.run_benchmarks)。
+"""
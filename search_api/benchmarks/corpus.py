@@ -0,0 +1,139 @@
+"""
+ベンチマーク用の合成判例コーパス。
+
+判決文に似た日本語の文(事件番号・条文・主文・理由など)を乱数の種から決定的に作り、
+PDF に書き出す。フォントは埋め込まず、Adobe-Japan1 の標準フォント (HeiseiMin-W3) と
+UniJIS-UCS2-H の CMap を参照するため、外部ライブラリなしで日本語のテキスト層を持つ
+PDF を作れる（pdfium・pdfplumber のどちらでも抽出できる）。
+"""
+
+import random
+from collections.abc import Iterator
+
+_COURTS = [
+    "東京地方裁判所",
+    "大阪地方裁判所",
+    "名古屋高等裁判所",
+    "最高裁判所第三小法廷",
+]
+_LAWS = ["民法", "刑法", "会社法", "民事訴訟法", "労働契約法", "行政事件訴訟法"]
+_SUBJECTS = ["原告", "被告", "被告人", "控訴人", "被控訴人", "上告人"]
+_PHRASES = [
+    "の主張する損害賠償請求権の成否について検討する",
+    "が本件契約を解除したことは当事者間に争いがない",
+    "の行為は社会通念上相当な範囲を逸脱するものとはいえない",
+    "に過失があったと認めるに足りる証拠はない",
+    "の供述は客観的な証拠と整合し、信用することができる",
+    "が負う注意義務の内容は、前記認定の事実関係に照らして判断すべきである",
+    "の請求は理由があるから認容することとする",
+]
+_ORDERS = [
+    "本件控訴を棄却する。",
+    "被告は、原告に対し、金三百万円を支払え。",
+    "被告人を懲役三年に処する。",
+    "訴訟費用は被告の負担とする。",
+]
+_LINE_CHARS = 40
+_LINES_PER_PAGE = 60
+
+
+def _sentence(rng: random.Random) -> str:
+    kind = rng.random()
+    if kind < 0.2:
+        law = rng.choice(_LAWS)
+        return f"{law}第{rng.randint(1, 800)}条{rng.choice(_PHRASES)}。"
+    if kind < 0.3:
+        return (
+            f"{rng.choice(_COURTS)}令和{rng.randint(1, 6)}年(ワ)"
+            f"第{rng.randint(100, 9999)}号事件の判断を参照する。"
+        )
+    return f"{rng.choice(_SUBJECTS)}{rng.choice(_PHRASES)}。"
+
+
+def _wrap(text: str) -> list[str]:
+    return [text[i : i + _LINE_CHARS] for i in range(0, len(text), _LINE_CHARS)]
+
+
+def judgment_pages(seed: int, pages: int) -> list[list[str]]:
+    """
+    1件の判例の各ページの行を返す（seed が同じなら同じ内容）。
+
+    Args:
+        seed: 乱数の種
+        pages: ページ数
+
+    Returns:
+        ページごとの行のリスト
+    """
+    rng = random.Random(seed)  # nosec B311 (ベンチマーク用の決定的な乱数)
+    lines = ["主文", rng.choice(_ORDERS), "理由", f"第1 {rng.choice(_COURTS)}の判断"]
+    section = 2
+    while len(lines) < pages * _LINES_PER_PAGE:
+        if rng.random() < 0.05:
+            lines.append(f"第{section} 当裁判所の判断")
+            section += 1
+        lines.extend(_wrap(_sentence(rng)))
+    return [
+        lines[i : i + _LINES_PER_PAGE]
+        for i in range(0, pages * _LINES_PER_PAGE, _LINES_PER_PAGE)
+    ]
+
+
+def make_japanese_pdf(pages: list[list[str]]) -> bytes:
+    """
+    行のリストを1ページずつ書いた PDF を作る。
+
+    Args:
+        pages: ページごとの行のリスト
+
+    Returns:
+        PDF のバイト列
+    """
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "",
+        "<< /Type /Font /Subtype /Type0 /BaseFont /HeiseiMin-W3"
+        " /Encoding /UniJIS-UCS2-H /DescendantFonts [4 0 R] >>",
+        "<< /Type /Font /Subtype /CIDFontType0 /BaseFont /HeiseiMin-W3"
+        " /CIDSystemInfo << /Registry (Adobe) /Ordering (Japan1) /Supplement 2 >>"
+        " /FontDescriptor 5 0 R /DW 1000 >>",
+        "<< /Type /FontDescriptor /FontName /HeiseiMin-W3 /Flags 6"
+        " /FontBBox [-123 -257 1001 910] /ItalicAngle 0 /Ascent 857 /Descent -143"
+        " /CapHeight 718 /StemV 69 >>",
+    ]
+    kids = []
+    for lines in pages:
+        ops = ["BT /F1 10 Tf 12 TL 40 800 Td"]
+        ops.extend(f"<{line.encode('utf-16-be').hex()}> Tj T*" for line in lines)
+        ops.append("ET")
+        stream = "\n".join(ops)
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842]"
+            f" /Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n"
+    ).encode()
+    return bytes(out)
+
+
+def iter_corpus(documents: int, pages: int, seed: int = 0) -> Iterator[bytes]:
+    """
+    合成判例 PDF を documents 件、順に返す。
+    """
+    for i in range(documents):
+        yield make_japanese_pdf(judgment_pages(seed + i, pages))
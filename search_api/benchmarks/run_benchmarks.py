@@ -0,0 +1,471 @@
+"""
+登録・検索の各ステージのオフラインベンチマーク。
+
+合成判例コーパス (benchmarks.corpus) を使い、ネットワーク・外部サービスなしで計測する。
+- extract: extract_text_from_pdf (PDF_TEXT_BACKEND のバックエンド)
+- chunk:   登録時と同じ文境界・トークン数のチャンク分割 (iter_token_chunks)
+- encode:  埋め込み (既定は決定的なスタブ。--encoder model で実モデル、
+           torch / onnx / onnx-int8 でバックエンドを指定した実モデル。
+           --parity を付けると onnx 系のベクトルと torch 版のコサイン一致度も出力する)
+- upsert:  ベクトルストアへの書き込み (既定は Qdrant のローカル・インメモリモード)
+- search:  ベクトル検索
+
+ステージごとにスループット・1操作の p50/p99 レイテンシ・ピーク RSS を JSON で出力する。
+ピーク RSS は Linux ではステージごとに測り直す (/proc/self/clear_refs でピークを戻す)。
+戻せない環境ではプロセス開始からのピークになり、peak_rss_scope が "process" になる。
+--baseline を渡すと、保存済みの結果と比べて劣化したステージを表示し、終了コード 1 を返す。
+
+使い方:
+    uv run python -m benchmarks.run_benchmarks --documents 50 --output bench.json
+    uv run python -m benchmarks.run_benchmarks --baseline benchmarks/baseline.json
+    uv run python -m benchmarks.run_benchmarks --write-baseline benchmarks/baseline.json
+"""
+
+import argparse
+import hashlib
+import json
+import platform
+import resource
+import sys
+import tempfile
+import time
+import warnings
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+from app.domain.models.text_encoder import TextEncoder
+from app.domain.models.vector_store import VectorPoint, VectorStore
+from app.domain.services.pdf_parser import (
+    count_chars,
+    extract_text_from_pdf,
+    iter_sentences,
+    iter_token_chunks,
+)
+from app.domain.services.point_id import make_point_id
+from app.infrastructure.embedding.encoder_backends import (
+    BACKENDS,
+    EMBEDDING_THREADS,
+    load_encoder,
+    parity_report,
+)
+from app.infrastructure.embedding.model_registry import EMBEDDING_MODEL_NAME
+from app.usecase.judgment_chunking import (
+    CHUNK_MAX_TOKENS,
+    CHUNK_OVERLAP_TOKENS,
+    PDF_TEXT_BACKEND,
+)
+from benchmarks.corpus import iter_corpus, judgment_pages
+
+VECTOR_SIZE = 384
+ENCODE_BATCH_SIZE = 32
+UPSERT_BATCH_SIZE = 256
+
+# 劣化とみなす割合 (スループットの低下・p99 / RSS の増加)
+DEFAULT_TOLERANCE = 0.2
+# --parity で torch 版と比べるチャンク数
+PARITY_SAMPLE = 64
+
+_PROC_STATUS = "/proc/self/status"
+_PROC_CLEAR_REFS = "/proc/self/clear_refs"
+
+
+class StubEncoder:
+    """
+    テキストのハッシュから決まる単位ベクトルを返す決定的なエンコーダ。
+    モデルのダウンロードなしに、パイプライン側のコストだけを計測するために使う。
+    """
+
+    def __init__(self, dim: int = VECTOR_SIZE) -> None:
+        self.dim = dim
+
+    def _vector(self, text: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest())
+        vector = np.random.default_rng(seed).standard_normal(self.dim)
+        return (vector / np.linalg.norm(vector)).astype(np.float32)
+
+    def encode(
+        self, sentences: str | list[str], batch_size: int = 32, **kwargs: Any
+    ) -> np.ndarray:
+        if isinstance(sentences, str):
+            return self._vector(sentences)
+        return np.stack([self._vector(s) for s in sentences])
+
+
+@dataclass
+class StageResult:
+    """
+    1ステージの計測結果。
+
+    Attributes:
+        name: ステージ名
+        unit: スループットの単位 (documents / chunks / queries)
+        items: 処理した件数
+        latencies: 1操作ごとの秒数
+        seconds: ステージ全体の秒数
+        peak_rss_mb: ステージ中のピーク RSS (MB)
+        peak_rss_scope: "stage" (ステージ中のピーク) または "process" (プロセス全体のピーク)
+    """
+
+    name: str
+    unit: str
+    items: int = 0
+    latencies: list[float] = field(default_factory=list)
+    seconds: float = 0.0
+    peak_rss_mb: float = 0.0
+    peak_rss_scope: str = "process"
+
+    def as_dict(self) -> dict:
+        latencies = np.asarray(self.latencies or [0.0])
+        return {
+            "unit": self.unit,
+            "items": self.items,
+            "operations": len(self.latencies),
+            "seconds": round(self.seconds, 4),
+            "throughput_per_sec": round(self.items / max(self.seconds, 1e-9), 2),
+            "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+            "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 3),
+            "peak_rss_mb": round(self.peak_rss_mb, 1),
+            "peak_rss_scope": self.peak_rss_scope,
+        }
+
+
+def reset_peak_rss() -> bool:
+    """
+    ピーク RSS を現在の RSS に戻す (Linux の /proc/self/clear_refs)。戻せなければ False。
+    """
+    try:
+        with open(_PROC_CLEAR_REFS, "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def peak_rss_mb() -> float:
+    """
+    ピーク RSS (MB)。Linux は reset_peak_rss 以降のピーク (/proc の VmHWM)、
+    それ以外はプロセス全体のピーク (getrusage。macOS はバイト、他は KB で返るため揃える)。
+    """
+    try:
+        with open(_PROC_STATUS) as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(
+    name: str, unit: str, operations: Iterable[Callable[[], int]]
+) -> StageResult:
+    """
+    operations の各関数を順に実行し、1回ごとの秒数と返した件数を集計する。
+    """
+    result = StageResult(name, unit)
+    if reset_peak_rss():
+        result.peak_rss_scope = "stage"
+    started = time.perf_counter()
+    for operation in operations:
+        t0 = time.perf_counter()
+        result.items += operation()
+        result.latencies.append(time.perf_counter() - t0)
+    result.seconds = time.perf_counter() - started
+    result.peak_rss_mb = peak_rss_mb()
+    return result
+
+
+def _batches(values: list, size: int) -> Iterator[list]:
+    for i in range(0, len(values), size):
+        yield values[i : i + size]
+
+
+def create_store(kind: str, directory: str) -> VectorStore:
+    """
+    計測対象のベクトルストアを作る（外部サービスには接続しない）。
+
+    Args:
+        kind: "qdrant" (ローカル・インメモリモード) または "numpy"
+        directory: numpy ストアの保存先
+    """
+    if kind == "qdrant":
+        from qdrant_client import QdrantClient
+
+        from app.infrastructure.qdrant.qdrant_vector_store import QdrantVectorStore
+
+        # ローカルモードはインデックス・検索パラメータを使わない旨の警告を出すため抑える
+        warnings.filterwarnings(
+            "ignore", message="(Payload indexes|Local mode)", category=UserWarning
+        )
+        store: VectorStore = QdrantVectorStore(
+            "judgments", client=QdrantClient(":memory:")
+        )
+    elif kind == "numpy":
+        from app.infrastructure.vector_store.numpy_vector_store import (
+            NumpyVectorStore,
+        )
+
+        store = NumpyVectorStore(directory, "judgments")
+    else:
+        raise ValueError(f"Unknown store: {kind}")
+    store.create_collection(VECTOR_SIZE)
+    return store
+
+
+def create_encoder(kind: str) -> TextEncoder:
+    """
+    "stub" なら StubEncoder、"model" なら共有レジストリの実モデル、
+    torch / onnx / onnx-int8 ならそのバックエンドでロードした実モデルを返す。
+    """
+    if kind == "stub":
+        return StubEncoder()
+    if kind == "model":
+        from app.infrastructure.embedding.model_registry import model_registry
+
+        return model_registry.get()
+    if kind in BACKENDS:
+        return load_encoder(EMBEDDING_MODEL_NAME, kind, EMBEDDING_THREADS)
+    raise ValueError(f"Unknown encoder: {kind}")
+
+
+def run(
+    documents: int = 20,
+    pages: int = 5,
+    queries: int = 100,
+    encoder_kind: str = "stub",
+    store_kind: str = "qdrant",
+    seed: int = 0,
+    parity: bool = False,
+) -> dict:
+    """
+    全ステージを計測し、結果を辞書で返す。
+
+    Args:
+        documents: 合成判例の件数
+        pages: 1件あたりのページ数
+        queries: 検索の回数
+        encoder_kind: "stub" / "model" / "torch" / "onnx" / "onnx-int8"
+        store_kind: "qdrant" または "numpy"
+        seed: コーパスの乱数の種
+        parity: onnx 系のとき、チャンクの先頭 PARITY_SAMPLE 件で torch 版との一致度を測るか
+
+    Returns:
+        {"config": {...}, "stages": {ステージ名: 計測結果}}
+    """
+    pdfs = list(iter_corpus(documents, pages, seed))
+    texts: list[str] = []
+    chunks: list[tuple[str, int, str]] = []
+
+    def extract(pdf: bytes) -> Callable[[], int]:
+        def operation() -> int:
+            texts.append(extract_text_from_pdf(pdf, PDF_TEXT_BACKEND))
+            return 1
+
+        return operation
+
+    def chunk(doc_index: int, text: str) -> Callable[[], int]:
+        def operation() -> int:
+            pieces = list(
+                iter_token_chunks(
+                    iter_sentences([text]),
+                    CHUNK_MAX_TOKENS,
+                    CHUNK_OVERLAP_TOKENS,
+                    count_chars,
+                )
+            )
+            chunks.extend((f"bench-{doc_index}", i, p) for i, p in enumerate(pieces))
+            return len(pieces)
+
+        return operation
+
+    stages = [measure("extract", "documents", [extract(p) for p in pdfs])]
+    stages.append(
+        measure("chunk", "chunks", [chunk(i, t) for i, t in enumerate(texts)])
+    )
+
+    encoder = create_encoder(encoder_kind)
+    vectors: list[list[float]] = []
+
+    def encode(batch: list[tuple[str, int, str]]) -> Callable[[], int]:
+        def operation() -> int:
+            encoded = encoder.encode(
+                [text for _, _, text in batch], batch_size=ENCODE_BATCH_SIZE
+            )
+            vectors.extend(encoded.tolist())
+            return len(batch)
+
+        return operation
+
+    stages.append(
+        measure(
+            "encode",
+            "chunks",
+            [encode(b) for b in _batches(chunks, ENCODE_BATCH_SIZE)],
+        )
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = create_store(store_kind, directory)
+        points = [
+            VectorPoint(
+                make_point_id(judgment_id, index, text),
+                vector,
+                {"judgment_id": judgment_id, "chunk_index": index},
+            )
+            for (judgment_id, index, text), vector in zip(chunks, vectors, strict=True)
+        ]
+
+        def upsert(batch: list[VectorPoint]) -> Callable[[], int]:
+            def operation() -> int:
+                store.upsert(batch)
+                return len(batch)
+
+            return operation
+
+        stages.append(
+            measure(
+                "upsert",
+                "chunks",
+                [upsert(b) for b in _batches(points, UPSERT_BATCH_SIZE)],
+            )
+        )
+
+        query_texts = [
+            line
+            for page in judgment_pages(seed + documents, max(1, queries // 60 + 1))
+            for line in page
+        ][:queries]
+        query_vectors = encoder.encode(query_texts).tolist() if query_texts else []
+
+        def search(vector: list[float]) -> Callable[[], int]:
+            def operation() -> int:
+                store.query(vector, 10)
+                return 1
+
+            return operation
+
+        stages.append(measure("search", "queries", [search(v) for v in query_vectors]))
+
+    result: dict[str, Any] = {
+        "config": {
+            "documents": documents,
+            "pages": pages,
+            "queries": queries,
+            "encoder": encoder_kind,
+            "store": store_kind,
+            "text_backend": PDF_TEXT_BACKEND,
+            "max_tokens": CHUNK_MAX_TOKENS,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "stages": {s.name: s.as_dict() for s in stages},
+    }
+    if parity and encoder_kind in ("onnx", "onnx-int8"):
+        reference = load_encoder(EMBEDDING_MODEL_NAME, "torch", EMBEDDING_THREADS)
+        result["parity"] = parity_report(
+            encoder, reference, [text for _, _, text in chunks[:PARITY_SAMPLE]]
+        )
+    return result
+
+
+def compare_to_baseline(
+    current: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE
+) -> list[str]:
+    """
+    ベースラインと比べ、tolerance を超えて劣化した指標を返す。
+
+    Args:
+        current: run の結果
+        baseline: 保存済みの run の結果
+        tolerance: 許容する劣化の割合 (0.2 なら 20%)
+
+    Returns:
+        劣化した指標の説明のリスト（無ければ空）
+    """
+    regressions = []
+    for name, base in baseline.get("stages", {}).items():
+        stage = current["stages"].get(name)
+        if stage is None:
+            continue
+        checks = [
+            # (指標, 現在値, ベースライン, 大きいほど良いか)
+            (
+                "throughput_per_sec",
+                stage["throughput_per_sec"],
+                base["throughput_per_sec"],
+                True,
+            ),
+            ("p99_ms", stage["p99_ms"], base["p99_ms"], False),
+        ]
+        # 測り方の違う RSS (ステージ / プロセス全体のピーク) は比べない
+        if stage.get("peak_rss_scope") == base.get("peak_rss_scope", "process"):
+            checks.append(
+                ("peak_rss_mb", stage["peak_rss_mb"], base["peak_rss_mb"], False)
+            )
+        for metric, value, reference, higher_is_better in checks:
+            if not reference:
+                continue
+            change = (value - reference) / reference
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(
+                    f"{name}.{metric}: {reference} -> {value} ({change:+.0%})"
+                )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument(
+        "--encoder", choices=["stub", "model", *BACKENDS], default="stub"
+    )
+    parser.add_argument("--store", choices=["qdrant", "numpy"], default="qdrant")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--parity", action="store_true", help="onnx 系と torch 版の一致度を出力する"
+    )
+    parser.add_argument("--output", help="結果の JSON の出力先 (省略時は標準出力)")
+    parser.add_argument("--baseline", help="比較するベースラインの JSON")
+    parser.add_argument("--write-baseline", help="結果をベースラインとして保存する")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    result = run(
+        args.documents,
+        args.pages,
+        args.queries,
+        args.encoder,
+        args.store,
+        args.seed,
+        args.parity,
+    )
+    report = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+    if args.write_baseline:
+        with open(args.write_baseline, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("config") != result["config"]:
+        print("警告: ベースラインと計測条件が異なります", file=sys.stderr)
+    regressions = compare_to_baseline(result, baseline, args.tolerance)
+    for line in regressions:
+        print(f"劣化: {line}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,11 @@
 """
 ドメイン層 - 判例検索結果のDTO定義。
 
-本モジュールでは、検索APIのレスポンスとして返却される構造（1件および複数件）を定義します。
+本モジュールでは、検索APIのレスポンスとして返却される構造（1件および複数件）と、
+一括検索のリクエストを定義します。
 """
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class Judgment(BaseModel):
@@ -29,3 +30,68 @@ class JudgmentList(BaseModel):
     """
 
     items: list[Judgment]
+
+
+class JudgmentBatchSearchRequest(BaseModel):
+    """
+    一括検索のリクエスト。
+
+    Attributes:
+        queries: 検索クエリ（自然言語）の一覧
+        limit: クエリごとの取得件数
+        full_text: 本文全文を返すか (既定は抜粋)
+    """
+
+    queries: list[str] = Field(..., min_length=1)
+    limit: int = Field(5, ge=1)
+    full_text: bool = False
+
+
+class JudgmentBatchList(BaseModel):
+    """
+    一括検索の結果。
+
+    Attributes:
+        results: リクエストの queries と同じ順の、クエリごとの検索結果
+    """
+
+    results: list[JudgmentList]
+
+
+class JudgmentGroup(BaseModel):
+    """
+    判例単位にまとめた検索結果。
+
+    Attributes:
+        judgment_id: 判例ID
+        score: 判例内のチャンクスコアを集約したスコア (max / sum / 上位k件平均)
+        hits: 判例内でスコアの高いチャンク (スコア降順)
+    """
+
+    judgment_id: str
+    score: float
+    hits: list[Judgment]
+
+
+class JudgmentGroupList(BaseModel):
+    """
+    判例単位の検索結果全体を表すDTO。
+
+    Attributes:
+        groups: スコア降順の判例グループ
+    """
+
+    groups: list[JudgmentGroup]
+
+
+class UploadSessionRequest(BaseModel):
+    """
+    分割アップロードのセッション作成リクエスト。
+
+    Attributes:
+        total_size: ZIP 全体のバイト数
+        part_size: 1パートのバイト数 (省略時はサーバの既定値)
+    """
+
+    total_size: int = Field(..., ge=1)
+    part_size: int | None = Field(None, ge=1)
@@ -0,0 +1,23 @@
+"""
+ドメイン層 - テキスト埋め込みモデルのインターフェース定義。
+
+SentenceTransformer と同じ encode() の形を満たすものであれば、
+ドメイン・ユースケース層は具体的なモデル実装に依存しない。
+"""
+
+from typing import Any, Protocol
+
+import numpy as np
+
+
+class TextEncoder(Protocol):
+    """
+    テキストをベクトルに変換する埋め込みモデル。
+
+    SentenceTransformer.encode と同じシグネチャで、
+    文字列1件なら1次元、リストなら2次元の ndarray を返す。
+    """
+
+    def encode(
+        self, sentences: str | list[str], batch_size: int = 32, **kwargs: Any
+    ) -> np.ndarray: ...
@@ -0,0 +1,198 @@
+"""
+ドメイン層 - ベクトルストアのインターフェース定義。
+
+判例チャンクのベクトル保存・検索に必要な操作だけを定義する。
+ユースケース層・ゲートウェイはこのインターフェースにだけ依存し、
+Qdrant (外部サーバ) と NumPy (プロセス内・メモリマップ) の実装を差し替えられる。
+
+検索結果は {"id": str, "payload": dict, "score": float} 形式、
+グループ検索結果は {"judgment_id": str, "hits": [...]} 形式の辞書で返す。
+検索は PayloadFilter で書誌情報 (裁判所・判決日・事件番号・事件の種類) を絞り込める。
+絞り込みは検索の中で行い、limit 件は条件に合うチャンクから選ぶ。
+判例のチャンクのページングは (chunk_index, ポイントID) の組をカーソルにする
+(同じ chunk_index のチャンクがページの境目をまたいでも漏れない)。
+"""
+
+from dataclasses import dataclass, field
+from typing import Protocol
+
+
+@dataclass
+class VectorPoint:
+    """
+    ベクトルストアに登録する1チャンク分のポイント。
+
+    Attributes:
+        id: ポイントID（UUID 文字列）
+        vector: 埋め込みベクトル
+        payload: {"judgment_id", "chunk_index", ...}（本文はチャンクストアに置く）
+    """
+
+    id: str
+    vector: list[float]
+    payload: dict = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class PayloadFilter:
+    """
+    検索時に payload の書誌情報で絞り込む条件（空の条件は使わない）。
+
+    Attributes:
+        courts: いずれかの裁判所名に一致 (「最高裁判所」「東京地方裁判所」など)
+        case_types: いずれかの事件の種類に一致 (民事 / 刑事 / 行政 / 家事)
+        case_number: 事件番号に一致
+        decided_from: 判決日がこの日以降 ("YYYY-MM-DD")
+        decided_to: 判決日がこの日以前 ("YYYY-MM-DD")
+    """
+
+    courts: tuple[str, ...] = ()
+    case_types: tuple[str, ...] = ()
+    case_number: str | None = None
+    decided_from: str | None = None
+    decided_to: str | None = None
+
+    @property
+    def is_empty(self) -> bool:
+        return not (
+            self.courts
+            or self.case_types
+            or self.case_number
+            or self.decided_from
+            or self.decided_to
+        )
+
+
+# 判例のチャンクを読み進めるカーソル: 最後に返したチャンクの (chunk_index, ポイントID)
+PageCursor = tuple[int, str]
+
+
+def page_cursor(hit: dict) -> PageCursor:
+    """
+    scroll_judgment_page の結果の1件から、次のページのカーソルを作る。
+    """
+    return (int(hit["payload"]["chunk_index"]), str(hit["id"]))
+
+
+class VectorStore(Protocol):
+    """
+    判例チャンクのベクトルストア。コレクションは1つ(judgments)だけを扱う。
+    """
+
+    def create_collection(self, vector_size: int) -> bool:
+        """
+        コレクションが無ければ作成する（あれば設定を揃える）。作成したら True を返す。
+        """
+        ...
+
+    def query(
+        self,
+        vector: list[float],
+        limit: int,
+        payload_filter: PayloadFilter | None = None,
+    ) -> list[dict]:
+        """
+        コサイン類似度の高い順に limit 件のチャンクを返す（payload_filter に合うものだけ）。
+        """
+        ...
+
+    def query_batch(self, vectors: list[list[float]], limit: int) -> list[list[dict]]:
+        """
+        複数クエリをまとめて検索し、クエリごとに query と同じ結果を返す。
+        """
+        ...
+
+    def query_groups(
+        self,
+        vector: list[float],
+        limit: int,
+        group_size: int,
+        payload_filter: PayloadFilter | None = None,
+    ) -> list[dict]:
+        """
+        judgment_id ごとにまとめ、最良チャンクの順に limit 件の判例を返す。
+        """
+        ...
+
+    def scroll_judgment(self, judgment_id: str) -> list[dict]:
+        """
+        判例に属するチャンクをすべて返す（score は None）。
+        """
+        ...
+
+    def scroll_judgment_page(
+        self, judgment_id: str, after: PageCursor | None, limit: int
+    ) -> list[dict]:
+        """
+        判例のチャンクを (chunk_index, ポイントID) の昇順に並べ、
+        after より後ろを最大 limit 件返す（after が None なら先頭から）。
+        """
+        ...
+
+    def list_point_ids(self, judgment_id: str) -> set[str]:
+        """
+        判例に属するポイントIDを返す。
+        """
+        ...
+
+    def upsert(self, points: list[VectorPoint]) -> None:
+        """
+        ポイントを追加・上書きする。
+        """
+        ...
+
+    def set_judgment_payload(self, judgment_id: str, payload: dict) -> None:
+        """
+        判例に属するすべてのポイントの payload に payload のキーを書き込む（他のキーは残す）。
+        値が None のキーは payload から削除する。
+        """
+        ...
+
+    def delete_judgment(self, judgment_id: str) -> None:
+        """
+        判例に属するポイントをすべて削除する。
+        """
+        ...
+
+    def delete_ids(self, point_ids: list[str]) -> None:
+        """
+        ポイントID指定で削除する。
+        """
+        ...
+
+    async def query_async(
+        self,
+        vector: list[float],
+        limit: int,
+        payload_filter: PayloadFilter | None = None,
+    ) -> list[dict]: ...
+
+    async def query_batch_async(
+        self, vectors: list[list[float]], limit: int
+    ) -> list[list[dict]]: ...
+
+    async def query_groups_async(
+        self,
+        vector: list[float],
+        limit: int,
+        group_size: int,
+        payload_filter: PayloadFilter | None = None,
+    ) -> list[dict]: ...
+
+    async def list_point_ids_async(self, judgment_id: str) -> set[str]: ...
+
+    async def upsert_async(self, points: list[VectorPoint]) -> None: ...
+
+    async def set_judgment_payload_async(
+        self, judgment_id: str, payload: dict
+    ) -> None: ...
+
+    async def delete_judgment_async(self, judgment_id: str) -> None: ...
+
+    async def delete_ids_async(self, point_ids: list[str]) -> None: ...
+
+    async def close(self) -> None:
+        """
+        接続などのリソースを解放する（アプリ終了時に呼ぶ）。
+        """
+        ...
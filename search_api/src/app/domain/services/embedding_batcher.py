@@ -0,0 +1,163 @@
+"""
+ドメイン層 - 文書をまたいだ埋め込みのマイクロバッチ化。
+
+PDFごとに encoder.encode(chunks) を呼ぶと、チャンク数の少ない判例では小さすぎるバッチ、
+長い判例では巨大でパディングだらけのバッチになる。
+EmbeddingBatcher は複数文書のチャンクを溜め、長さ順に並べ替えてから
+固定サイズのバッチでエンコードし、結果を (judgment_id, chunk_index) に対応付けて返す。
+
+EmbeddingCache を渡した場合は、溜める前にキャッシュを引き、
+見つからなかったチャンクだけをモデルに通す（エンコード結果はキャッシュへ保存する）。
+"""
+
+import os
+from collections.abc import Iterable, Sequence
+from typing import Protocol
+
+from app.domain.models.text_encoder import TextEncoder
+
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_SORT_WINDOW = int(os.getenv("EMBEDDING_SORT_WINDOW", "8"))
+
+ChunkKey = tuple[str, int]
+
+
+class EmbeddingCache(Protocol):
+    """
+    チャンク本文 → ベクトルの永続キャッシュ（EmbeddingStore など）。
+    """
+
+    def get_many(self, texts: list[str]) -> list[list[float] | None]: ...
+
+    def put_many(self, texts: list[str], vectors: list[list[float]]) -> None: ...
+
+
+class EmbeddingBatcher:
+    """
+    チャンクを文書横断で溜め込み、固定サイズのバッチでエンコードするクラス。
+
+    batch_size * sort_window 件溜まった時点で長さ順に並べ替え、
+    batch_size 件ずつエンコードする（長さの近いテキスト同士が同じバッチに入るため、
+    パディングが最小になる）。
+
+    Attributes:
+        batch_size: 1回の encode に渡すチャンク数
+        sort_window: 並べ替え対象として溜めるバッチ数
+        encoded_chunks: これまでにエンコードしたチャンク数
+        encoded_batches: これまでに実行した encode 回数
+        cached_chunks: キャッシュから返したチャンク数
+    """
+
+    def __init__(
+        self,
+        encoder: TextEncoder,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        sort_window: int = EMBEDDING_SORT_WINDOW,
+        cache: EmbeddingCache | None = None,
+    ) -> None:
+        self.encoder = encoder
+        self.cache = cache
+        self.batch_size = max(1, batch_size)
+        self.sort_window = max(1, sort_window)
+        self.encoded_chunks = 0
+        self.encoded_batches = 0
+        self.cached_chunks = 0
+        self._pending: list[tuple[ChunkKey, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, key: ChunkKey, text: str) -> list[tuple[ChunkKey, list[float]]]:
+        """
+        チャンクを1件追加する。十分に溜まっていればエンコードして結果を返す。
+
+        Args:
+            key: (judgment_id, chunk_index)
+            text: チャンクのテキスト
+
+        Returns:
+            エンコード済みの (key, vector) のリスト（まだ溜めている間は空）
+        """
+        return self.add_many([(key, text)])
+
+    def add_many(
+        self, items: Iterable[tuple[ChunkKey, str]]
+    ) -> list[tuple[ChunkKey, list[float]]]:
+        """
+        チャンクをまとめて追加する。
+
+        Returns:
+            エンコード済みの (key, vector) のリスト
+        """
+        items = list(items)
+        results: list[tuple[ChunkKey, list[float]]] = []
+        if self.cache is not None and items:
+            cached = self.cache.get_many([text for _, text in items])
+            misses = []
+            for item, vector in zip(items, cached, strict=True):
+                if vector is None:
+                    misses.append(item)
+                else:
+                    results.append((item[0], vector))
+            self.cached_chunks += len(items) - len(misses)
+            items = misses
+
+        for item in items:
+            self._pending.append(item)
+            if len(self._pending) >= self.batch_size * self.sort_window:
+                results.extend(self._drain())
+        return results
+
+    def flush(self) -> list[tuple[ChunkKey, list[float]]]:
+        """
+        溜まっている残りのチャンクをすべてエンコードする。
+
+        Returns:
+            エンコード済みの (key, vector) のリスト
+        """
+        return self._drain()
+
+    def _drain(self) -> list[tuple[ChunkKey, list[float]]]:
+        pending, self._pending = self._pending, []
+        pending.sort(key=lambda item: len(item[1]))
+
+        results: list[tuple[ChunkKey, list[float]]] = []
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start : start + self.batch_size]
+            vectors = self.encoder.encode(
+                [text for _, text in batch], batch_size=len(batch)
+            ).tolist()
+            results.extend(zip((key for key, _ in batch), vectors, strict=True))
+            if self.cache is not None:
+                self.cache.put_many([text for _, text in batch], vectors)
+            self.encoded_chunks += len(batch)
+            self.encoded_batches += 1
+        return results
+
+
+def encode_chunks(
+    encoder: TextEncoder,
+    chunks: Sequence[str],
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+    cache: EmbeddingCache | None = None,
+) -> list[list[float]]:
+    """
+    1文書分のチャンクを長さ順の固定サイズバッチでエンコードし、元の順序で返す。
+
+    Args:
+        encoder: テキストをベクトル化する埋め込みモデル
+        chunks: チャンクのテキスト一覧
+        batch_size: 1回の encode に渡すチャンク数
+        cache: 参照・保存する永続キャッシュ（省略時は使わない）
+
+    Returns:
+        chunks と同じ順序のベクトル一覧
+    """
+    batcher = EmbeddingBatcher(encoder, batch_size=batch_size, cache=cache)
+    results = batcher.add_many((("", i), text) for i, text in enumerate(chunks))
+    results.extend(batcher.flush())
+
+    vectors: list[list[float]] = [[] for _ in chunks]
+    for (_, index), vector in results:
+        vectors[index] = vector
+    return vectors
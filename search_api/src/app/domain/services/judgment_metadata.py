@@ -0,0 +1,221 @@
+"""
+ドメイン層 - 判決文の冒頭から書誌情報を取り出す。
+
+判決文の冒頭 (事件番号・事件名・言渡日・裁判所) を、あらかじめコンパイルした正規表現で読み、
+検索時に絞り込める payload のフィールドにする。
+- court: 裁判所名 (「最高裁判所」「東京高等裁判所」「大阪地方裁判所」など。法廷・支部は除く)
+- decision_date: 判決(決定)日 "YYYY-MM-DD"。元号・漢数字・全角数字も西暦に直す
+- case_number: 事件番号 (「令和2年(受)第1234号」の形にそろえる)
+- case_type: 事件の種類 (民事 / 刑事 / 行政 / 家事)。事件番号の符号から判定し、
+  符号が無ければ本文の語句から推定する
+見つからなかったフィールドは返さない。
+"""
+
+import re
+from collections.abc import Iterable
+from datetime import date
+
+# 書誌情報を探す範囲 (冒頭の文字数)
+METADATA_HEADER_CHARS = 2000
+# 取り出す書誌情報のフィールド (payload のキー)
+METADATA_FIELDS = ("court", "decision_date", "case_number", "case_type")
+
+_ERA_START = {"明治": 1868, "大正": 1912, "昭和": 1926, "平成": 1989, "令和": 2019}
+_KANJI_DIGITS = {c: i for i, c in enumerate("〇一二三四五六七八九")}
+_ZENKAKU = str.maketrans("０１２３４５６７８９（）：　", "0123456789(): ")
+
+_NUM = r"[0-9〇一二三四五六七八九十百千]+"
+_ERA_DATE = re.compile(
+    rf"(明治|大正|昭和|平成|令和)\s*(元|{_NUM})\s*年\s*({_NUM})\s*月\s*({_NUM})\s*日"
+)
+_WESTERN_DATE = re.compile(
+    r"((?:18|19|20)\d{2})\s*年\s*(\d{1,2})\s*月\s*(\d{1,2})\s*日"
+)
+# 日付の直後にあれば、その日付を判決日とみなす語
+_DECISION_WORDS = re.compile(r"[^\n。]{0,20}?(判決|決定|言渡|言い渡|宣告)")
+_CASE_NUMBER = re.compile(
+    rf"(明治|大正|昭和|平成|令和)\s*(元|{_NUM})\s*年\s*\(\s*([^)\s]{{1,4}})\s*\)\s*第?\s*({_NUM})\s*号"
+)
+# 高等・地方・家庭裁判所の本庁所在地 (前の語を裁判所名に取り込まないよう列挙する)
+_COURT_SEATS = (
+    "札幌|函館|旭川|釧路|青森|盛岡|仙台|秋田|山形|福島|水戸|宇都宮|前橋|さいたま|千葉"
+    "|横浜|新潟|甲府|長野|静岡|東京|富山|金沢|福井|岐阜|名古屋|津|大津|京都|大阪|神戸"
+    "|奈良|和歌山|鳥取|松江|岡山|広島|山口|徳島|高松|松山|高知|福岡|佐賀|長崎|熊本|大分"
+    "|宮崎|鹿児島|那覇"
+)
+_COURT = re.compile(
+    rf"(最高裁判所|知的財産高等裁判所|(?:{_COURT_SEATS})(?:高等|地方|家庭)裁判所"
+    r"|(?:^|(?<=[\s、。:]))[^\s、。:()]{1,6}?簡易裁判所)",
+    re.MULTILINE,
+)
+# 最高裁の判決は冒頭に「第三小法廷判決」などとだけ書かれることが多い
+# (理由中で引用された最高裁判例にも現れるため、判決・言渡と同じ行にあるものだけ見る)
+_SUPREME_BENCH = re.compile(r"[大小]法廷")
+# 直前にあれば、判決をした裁判所ではなく下級審として引用された裁判所とみなす語
+_LOWER_COURT_WORDS = re.compile(r"(原審|原判決|第[1一]審|控訴審)[^\n。]{0,4}$")
+_CRIMINAL_WORDS = re.compile(r"被告人|被告事件|公訴|懲役|禁錮|罰金")
+_ADMINISTRATIVE_WORDS = re.compile(r"処分取消|裁決取消|行政処分|国家賠償")
+_FAMILY_WORDS = re.compile(r"家事審判|遺産分割|親権|離婚")
+
+
+def _to_int(number: str) -> int:
+    """
+    算用数字・漢数字 (「二十七」「百二」「三〇」など) を整数にする。
+    """
+    if number.isdigit():
+        return int(number)
+    total, current = 0, 0
+    for char in number:
+        if char in _KANJI_DIGITS:
+            current = current * 10 + _KANJI_DIGITS[char]
+        else:
+            unit = {"十": 10, "百": 100, "千": 1000}[char]
+            total += (current or 1) * unit
+            current = 0
+    return total + current
+
+
+def _era_year(era: str, year: str) -> int:
+    return _ERA_START[era] + (1 if year == "元" else _to_int(year)) - 1
+
+
+def _iso_date(year: int, month: int, day: int) -> str | None:
+    try:
+        return date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+def _find_dates(text: str) -> list[tuple[int, int, str]]:
+    """
+    (開始位置, 終了位置, "YYYY-MM-DD") を出現順に返す。
+    """
+    found = []
+    for m in _ERA_DATE.finditer(text):
+        iso = _iso_date(_era_year(m[1], m[2]), _to_int(m[3]), _to_int(m[4]))
+        if iso:
+            found.append((m.start(), m.end(), iso))
+    for m in _WESTERN_DATE.finditer(text):
+        iso = _iso_date(int(m[1]), int(m[2]), int(m[3]))
+        if iso:
+            found.append((m.start(), m.end(), iso))
+    return sorted(found)
+
+
+def _decision_date(text: str) -> str | None:
+    """
+    「判決」「言渡」などが続く最初の日付、無ければ最初の日付を返す。
+    """
+    dates = _find_dates(text)
+    for _, end, iso in dates:
+        if _DECISION_WORDS.match(text, end):
+            return iso
+    return dates[0][2] if dates else None
+
+
+def _supreme_bench(text: str) -> int | None:
+    """
+    判決・言渡と同じ行にある「小法廷」「大法廷」の位置を返す。
+    """
+    for m in _SUPREME_BENCH.finditer(text):
+        line_start = text.rfind("\n", 0, m.start()) + 1
+        line_end = text.find("\n", m.end())
+        line_end = len(text) if line_end < 0 else line_end
+        if _DECISION_WORDS.search(text, line_start, line_end):
+            return m.start()
+    return None
+
+
+def _court(text: str) -> str | None:
+    """
+    判決をした裁判所を返す。下級審として引用された裁判所は飛ばす。
+    裁判所名より前に法廷の表示 (「第三小法廷判決」) があれば最高裁判所とする。
+    """
+    bench = _supreme_bench(text)
+    for m in _COURT.finditer(text):
+        if bench is not None and bench < m.start():
+            break
+        if not _LOWER_COURT_WORDS.search(text, max(0, m.start() - 12), m.start()):
+            return m[1]
+    return "最高裁判所" if bench is not None else None
+
+
+def _case_type(symbol: str | None, text: str) -> str | None:
+    """
+    事件番号の符号 (刑事はひらがな、行政は「行」で始まる、など) から事件の種類を判定する。
+    """
+    if symbol:
+        if symbol.startswith("行"):
+            return "行政"
+        if symbol.startswith("家"):
+            return "家事"
+        if "ぁ" <= symbol[0] <= "ゟ":
+            return "刑事"
+        return "民事"
+    for pattern, case_type in (
+        (_CRIMINAL_WORDS, "刑事"),
+        (_ADMINISTRATIVE_WORDS, "行政"),
+        (_FAMILY_WORDS, "家事"),
+    ):
+        if pattern.search(text):
+            return case_type
+    return None
+
+
+def _format_case_number(case: re.Match) -> str:
+    year = "元" if case[2] == "元" else _to_int(case[2])
+    return f"{case[1]}{year}年({case[3]})第{_to_int(case[4])}号"
+
+
+def normalize_case_number(case_number: str) -> str:
+    """
+    事件番号を payload と同じ形 (「令和2年(受)第1234号」) にそろえる。
+    事件番号として読めなければ前後の空白だけ除いて返す。
+    """
+    case = _CASE_NUMBER.search(case_number.translate(_ZENKAKU))
+    return _format_case_number(case) if case else case_number.strip()
+
+
+def extract_judgment_metadata(text: str) -> dict[str, str]:
+    """
+    判決文の冒頭から書誌情報を取り出す純粋関数。
+
+    Args:
+        text: 判決文 (冒頭 METADATA_HEADER_CHARS 文字だけを見る)
+
+    Returns:
+        {"court", "decision_date", "case_number", "case_type"} のうち見つかったもの
+    """
+    header = text[:METADATA_HEADER_CHARS].translate(_ZENKAKU)
+    metadata: dict[str, str] = {}
+
+    court = _court(header)
+    if court:
+        metadata["court"] = court
+    decided = _decision_date(header)
+    if decided:
+        metadata["decision_date"] = decided
+
+    symbol = None
+    case = _CASE_NUMBER.search(header)
+    if case:
+        symbol = case[3]
+        metadata["case_number"] = _format_case_number(case)
+    case_type = _case_type(symbol, header)
+    if case_type:
+        metadata["case_type"] = case_type
+    return metadata
+
+
+def metadata_from_chunks(chunks: Iterable[str]) -> dict[str, str]:
+    """
+    チャンク列の先頭 METADATA_HEADER_CHARS 文字分から書誌情報を取り出す。
+    """
+    parts: list[str] = []
+    length = 0
+    for chunk in chunks:
+        if length >= METADATA_HEADER_CHARS:
+            break
+        parts.append(chunk)
+        length += len(chunk) + 1
+    return extract_judgment_metadata("\n".join(parts))
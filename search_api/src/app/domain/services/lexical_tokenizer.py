@@ -0,0 +1,67 @@
+"""
+ドメインサービス - 語彙検索 (BM25) 用の日本語トークナイザ。
+
+janome で形態素に分割し、検索語として意味の薄い記号・助詞・助動詞を除く。
+事件番号 (令和3年(受)第123号) や条文番号 (民法709条) の数字・漢字は残すため、
+埋め込みでは拾いにくい完全一致寄りの検索に使える。
+"""
+
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any
+
+_SKIP_POS = ("記号", "助詞", "助動詞")
+
+_tokenizer: Any = None
+_tokenizer_lock = threading.Lock()
+
+
+def _get_tokenizer() -> Any:
+    """
+    janome の Tokenizer を返す（辞書ロードが重いため初回のみ生成）。
+    """
+    global _tokenizer
+    if _tokenizer is None:
+        with _tokenizer_lock:
+            if _tokenizer is None:
+                from janome.tokenizer import Tokenizer  # type: ignore[import-untyped]
+
+                _tokenizer = Tokenizer()
+    return _tokenizer
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    テキストを検索語の列に分割する。全角英数は NFKC で半角に、英字は小文字に揃える。
+
+    Args:
+        text: 分割するテキスト
+
+    Returns:
+        検索語のリスト（出現順、重複あり）
+    """
+    normalized = unicodedata.normalize("NFKC", text).lower()
+    terms: list[str] = []
+    for token in _get_tokenizer().tokenize(normalized):
+        if token.part_of_speech.startswith(_SKIP_POS):
+            continue
+        surface = token.surface.strip()
+        # NFKC 後の半角括弧などは名詞扱いされるため、文字・数字を含まない語も除く
+        if any(ch.isalnum() for ch in surface):
+            terms.append(surface)
+    return terms
+
+
+def count_terms(texts: list[str]) -> list[dict[str, int]]:
+    """
+    テキストごとの検索語の出現回数を数える。
+    (プロセスプールで実行できるよう、トップレベル関数にしている)
+
+    Args:
+        texts: チャンク本文の一覧
+
+    Returns:
+        texts と同じ順序の {検索語: 出現回数}
+    """
+    return [dict(Counter(tokenize(text))) for text in texts]
@@ -1,23 +1,253 @@
 """
-pdfplumberを利用し、PDF→テキスト抽出→(必要に応じ)チャンク分割
-本番運用ではページ単位抽出も検討できるが、ここではシンプルに全文連結
+PDF→テキスト抽出→チャンク分割
+
+テキスト抽出はバックエンドを選べる (PAGE_EXTRACTORS)。
+- pdfium: pypdfium2 (PDFium) のテキスト抽出。レイアウト解析をしないため pdfplumber より数倍速い
+- pdfplumber: 文字の位置からレイアウトを解析して抽出する。pdfium で開けない・
+  テキストが1文字も取れないPDFは、自動的に pdfplumber で抽出し直す
+どちらもページ単位のジェネレータで、文書ごとの制限時間 (time_budget) を超えると
+PdfParseTimeout を送出する（壊れたPDFでバルク登録が止まり続けないようにする）。
+どちらのバックエンドでも開けないPDFは PdfParseError を送出する。
+
+チャンクは埋め込みモデルのトークン数で大きさを決める。
+all-MiniLM-L6-v2 は 256 トークン(max_seq_length)を超えた部分を切り捨てるため、
+文字数で切ると大半が埋め込まれない。ここでは
+- ページ単位でテキストを読み出し (iter_page_texts)
+- 日本語の文境界 (。・改行) で文に分け (iter_sentences)
+- 文を max_tokens に収まるまで詰めてチャンクにする (iter_token_chunks)。
+  条文・主文・理由などの見出し行の前では、なるべくチャンクを改める
+をジェネレータで繋ぎ、全文を連結した文字列を作らずに処理する。
+隣り合うチャンクは overlap_tokens 分の末尾の文を重ねる。
+timings を渡すと、テキスト抽出 ("extract") と文分割・チャンク化 ("chunk") の秒数を書き込む。
 """
 
 import io
+import re
+import time
+from collections.abc import Callable, Iterable, Iterator
 
 import pdfplumber
+import pypdfium2 as pdfium
+
+TokenCounter = Callable[[str], int]
+PageExtractor = Callable[[bytes], Iterator[str]]
+
+# 文の区切り: 句点・感嘆符・疑問符(直後の閉じ括弧を含む)と改行
+_SENTENCE_END = re.compile(r"[。．！？!?][」』）)]*|\n")
+# 行頭の見出し(第1条・第一・主文・理由 など)。ここではチャンクを改めやすくする
+_HEADING = re.compile(
+    r"\s*(第[0-9０-９一二三四五六七八九十百千]+[条章節款項]?|主\s*文|理\s*由|事実及び理由)"
+)
+# [CLS] / [SEP] の分
+_SPECIAL_TOKENS = 2
 
 
-def extract_text_from_pdf(pdf_bytes: bytes) -> str:
+def count_chars(text: str) -> int:
     """
-    PDFバイト列→文字列(ページ連結)
+    トークナイザが使えないときのトークン数の見積もり（文字数）。
+    BERT 系の WordPiece は漢字・かなを概ね1文字1トークンにするため、日本語では近い値になる。
+    """
+    return len(text)
+
+
+class PdfParseTimeout(TimeoutError):
+    """
+    1文書のテキスト抽出が制限時間を超えた。
     """
-    lines = []
+
+
+class PdfParseError(ValueError):
+    """
+    PDFを読めなかった（フォールバックのバックエンドでも失敗した）。
+    """
+
+
+def _iter_pages_pdfplumber(pdf_bytes: bytes) -> Iterator[str]:
     with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
         for page in pdf.pages:
-            text = page.extract_text() or ""
-            lines.append(text)
-    return "\n".join(lines)
+            yield page.extract_text() or ""
+            # 抽出済みページのレイアウト情報を解放し、巨大なPDFでもメモリを抑える
+            page.close()
+
+
+def _iter_pages_pdfium(pdf_bytes: bytes) -> Iterator[str]:
+    pdf = pdfium.PdfDocument(pdf_bytes)
+    try:
+        for i in range(len(pdf)):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            try:
+                text = textpage.get_text_range()
+            finally:
+                textpage.close()
+                page.close()
+            yield text.replace("\r\n", "\n").replace("\r", "\n")
+    finally:
+        pdf.close()
+
+
+PAGE_EXTRACTORS: dict[str, PageExtractor] = {
+    "pdfium": _iter_pages_pdfium,
+    "pdfplumber": _iter_pages_pdfplumber,
+}
+_FALLBACK_BACKEND = "pdfplumber"
+
+
+def extract_text_from_pdf(pdf_bytes: bytes, backend: str = "pdfium") -> str:
+    """
+    PDFバイト列→文字列(ページ連結)
+    """
+    return "\n".join(iter_page_texts(pdf_bytes, backend))
+
+
+def iter_page_texts(
+    pdf_bytes: bytes, backend: str = "pdfium", time_budget: float | None = None
+) -> Iterator[str]:
+    """
+    PDFバイト列からページごとのテキストを順に返す
+
+    Args:
+        pdf_bytes: PDFのバイナリデータ
+        backend: PAGE_EXTRACTORS のキー ("pdfium" / "pdfplumber")
+        time_budget: 1文書にかけてよい秒数（None なら無制限）。ページの合間で確認する
+
+    Raises:
+        PdfParseTimeout: time_budget を超えた場合
+        PdfParseError: どのバックエンドでもPDFを読めなかった場合
+    """
+    if backend not in PAGE_EXTRACTORS:
+        raise ValueError(f"Unknown PDF text backend: {backend}")
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+
+    def timed(pages: Iterator[str]) -> Iterator[str]:
+        for text in pages:
+            if deadline is not None and time.monotonic() > deadline:
+                raise PdfParseTimeout(f"PDF text extraction exceeded {time_budget}s")
+            yield text
+
+    found_text = False
+    try:
+        for text in timed(PAGE_EXTRACTORS[backend](pdf_bytes)):
+            found_text = found_text or bool(text.strip())
+            yield text
+    except PdfParseTimeout:
+        raise
+    except Exception as e:
+        # 開けないPDFはフォールバックで読み直す(テキストを返した後の失敗はそのまま送出)
+        if found_text:
+            raise
+        if backend == _FALLBACK_BACKEND:
+            raise PdfParseError(f"Could not read PDF: {e}") from e
+    if not found_text and backend != _FALLBACK_BACKEND:
+        # 空のページしか返していないため、続けてフォールバックの結果を返しても重複しない
+        try:
+            yield from timed(PAGE_EXTRACTORS[_FALLBACK_BACKEND](pdf_bytes))
+        except PdfParseTimeout:
+            raise
+        except Exception as e:
+            raise PdfParseError(f"Could not read PDF: {e}") from e
+
+
+def iter_sentences(page_texts: Iterable[str]) -> Iterator[str]:
+    """
+    ページテキストの列を文に分ける。区切り文字は文の末尾に残すため、
+    連結すれば(ページ間に改行を挟んだ)元のテキストに戻る。
+    """
+    for page in page_texts:
+        text = page + "\n"
+        start = 0
+        for match in _SENTENCE_END.finditer(text):
+            yield text[start : match.end()]
+            start = match.end()
+
+
+def _split_long_sentence(
+    sentence: str, budget: int, count_tokens: TokenCounter
+) -> Iterator[str]:
+    """
+    budget トークンを超える1文を、収まる最長の先頭部分ずつに分ける(二分探索)。
+    """
+    rest = sentence
+    while rest:
+        if count_tokens(rest) <= budget:
+            yield rest
+            return
+        lo, hi = 1, len(rest)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if count_tokens(rest[:mid]) <= budget:
+                lo = mid
+            else:
+                hi = mid - 1
+        yield rest[:lo]
+        rest = rest[lo:]
+
+
+def iter_token_chunks(
+    sentences: Iterable[str],
+    max_tokens: int = 256,
+    overlap_tokens: int = 0,
+    count_tokens: TokenCounter = count_chars,
+) -> Iterator[str]:
+    """
+    文を max_tokens(特殊トークン込み)に収まるまで詰めてチャンクにする。
+
+    Args:
+        sentences: iter_sentences の結果
+        max_tokens: 1チャンクの上限トークン数（エンコーダの max_seq_length）
+        overlap_tokens: 次のチャンクの先頭に重ねる末尾の文のトークン数の上限
+        count_tokens: テキストのトークン数を返す関数（特殊トークンを含めない）
+
+    Yields:
+        前後の空白を除いたチャンク（空のチャンクは返さない）
+    """
+    budget = max(1, max_tokens - _SPECIAL_TOKENS)
+    overlap_tokens = min(max(0, overlap_tokens), budget // 2)
+    current: list[tuple[str, int]] = []
+    used = 0
+    fresh = False  # 重ねた文以外の文を含んでいるか
+
+    def flush() -> Iterator[str]:
+        nonlocal current, used, fresh
+        piece = "".join(s for s, _ in current).strip()
+        if piece and fresh:
+            yield piece
+        kept: list[tuple[str, int]] = []
+        kept_tokens = 0
+        for sentence, tokens in reversed(current):
+            if kept_tokens + tokens > overlap_tokens:
+                break
+            kept.insert(0, (sentence, tokens))
+            kept_tokens += tokens
+        current, used, fresh = kept, kept_tokens, False
+
+    for sentence in sentences:
+        if not sentence.strip():
+            if current:
+                current.append((sentence, 0))
+            continue
+        # 見出しの前では、チャンクが半分以上埋まっていれば区切る
+        if _HEADING.match(sentence) and fresh and used >= budget // 2:
+            yield from flush()
+        tokens = count_tokens(sentence)
+        parts = (
+            [(sentence, tokens)]
+            if tokens <= budget
+            else [
+                (p, count_tokens(p))
+                for p in _split_long_sentence(sentence, budget, count_tokens)
+            ]
+        )
+        for part, part_tokens in parts:
+            if used + part_tokens > budget and fresh:
+                yield from flush()
+            while current and used + part_tokens > budget:
+                # 重ねた文だけで収まらない場合は、古い文から捨てる
+                used -= current.pop(0)[1]
+            current.append((part, part_tokens))
+            used += part_tokens
+            fresh = True
+    yield from flush()
 
 
 def chunk_text(text: str, max_chars_per_chunk: int = 2000) -> list[str]:
@@ -35,13 +265,54 @@ def chunk_text(text: str, max_chars_per_chunk: int = 2000) -> list[str]:
     return results
 
 
+def _timed_pages(pages: Iterator[str], timings: dict[str, float]) -> Iterator[str]:
+    """
+    ページの取り出しにかかった秒数を timings["extract"] に足していく。
+    """
+    while True:
+        started = time.perf_counter()
+        try:
+            text = next(pages)
+        except StopIteration:
+            return
+        finally:
+            timings["extract"] = (
+                timings.get("extract", 0.0) + time.perf_counter() - started
+            )
+        yield text
+
+
 def parse_pdf_into_chunks(
-    pdf_bytes: bytes, max_chars_per_chunk: int = 2000
+    pdf_bytes: bytes,
+    max_tokens: int = 256,
+    overlap_tokens: int = 0,
+    count_tokens: TokenCounter = count_chars,
+    backend: str = "pdfium",
+    time_budget: float | None = None,
+    timings: dict[str, float] | None = None,
 ) -> list[str]:
     """
-    PDFバイト列→全文抽出→チャンク分割
+    PDFバイト列→ページごとの抽出→文分割→トークン数でチャンク化
+
+    timings を渡すと {"extract": 抽出秒数, "chunk": チャンク化秒数} を書き込む
+    (抽出とチャンク化はジェネレータで交互に進むため、ページの取り出し時間を抽出とする)。
     """
-    full_text = extract_text_from_pdf(pdf_bytes)
-    if not full_text.strip():
-        return []
-    return chunk_text(full_text, max_chars_per_chunk)
+    pages = iter_page_texts(pdf_bytes, backend, time_budget)
+    if timings is None:
+        return list(
+            iter_token_chunks(
+                iter_sentences(pages), max_tokens, overlap_tokens, count_tokens
+            )
+        )
+    started = time.perf_counter()
+    timings["extract"] = 0.0
+    chunks = list(
+        iter_token_chunks(
+            iter_sentences(_timed_pages(pages, timings)),
+            max_tokens,
+            overlap_tokens,
+            count_tokens,
+        )
+    )
+    timings["chunk"] = time.perf_counter() - started - timings["extract"]
+    return chunks
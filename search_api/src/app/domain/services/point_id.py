@@ -0,0 +1,79 @@
+"""
+ドメイン層 - チャンクの決定的なポイントIDと差分計算。
+
+ポイントIDは (judgment_id, chunk_index, チャンク本文のハッシュ) から uuid5 で導出する。
+同じPDFを再登録しても同じIDになるため重複せず、
+内容の変わったチャンクだけを再エンコード・アップサートできる。
+"""
+
+import hashlib
+import uuid
+from dataclasses import dataclass, field
+
+POINT_ID_NAMESPACE = uuid.UUID("6f1f5c1e-3c2a-5b8e-9d4a-6a7b2c1d0e9f")
+
+
+def chunk_text_hash(text: str) -> str:
+    """
+    チャンク本文の SHA-256 (16進文字列) を返す。
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_point_id(judgment_id: str, chunk_index: int, text: str) -> str:
+    """
+    チャンクの内容から決定的なポイントID(uuid5)を生成する。
+
+    Args:
+        judgment_id: 判例ID
+        chunk_index: 判例内でのチャンク番号
+        text: チャンク本文
+
+    Returns:
+        str: UUID 文字列
+    """
+    name = f"{judgment_id}\x1f{chunk_index}\x1f{chunk_text_hash(text)}"
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, name))
+
+
+@dataclass
+class ChunkDiff:
+    """
+    登録済みポイントと新しいチャンク列の差分。
+
+    Attributes:
+        added: 新たにエンコード・アップサートが必要な (chunk_index, text, point_id)
+        stale: 新しいチャンク列に存在しない（削除すべき）ポイントID
+        unchanged: 内容が変わらず何もしなくてよいチャンク数
+    """
+
+    added: list[tuple[int, str, str]] = field(default_factory=list)
+    stale: list[str] = field(default_factory=list)
+    unchanged: int = 0
+
+
+def diff_chunks(
+    judgment_id: str, chunks: list[str], existing_ids: set[str]
+) -> ChunkDiff:
+    """
+    新しいチャンク列と登録済みポイントIDを比較し、差分を求める純粋関数。
+
+    Args:
+        judgment_id: 判例ID
+        chunks: 新しいチャンク列
+        existing_ids: 登録済みのポイントID
+
+    Returns:
+        ChunkDiff: 追加が必要なチャンクと、削除すべきポイントID
+    """
+    diff = ChunkDiff()
+    current_ids: set[str] = set()
+    for i, text in enumerate(chunks):
+        point_id = make_point_id(judgment_id, i, text)
+        current_ids.add(point_id)
+        if point_id in existing_ids:
+            diff.unchanged += 1
+        else:
+            diff.added.append((i, text, point_id))
+    diff.stale = sorted(existing_ids - current_ids)
+    return diff
@@ -2,11 +2,14 @@
 ドメイン層 - 検索ロジックを提供する純粋関数群。
 """
 
+from typing import Literal
+
 import numpy as np
-from sentence_transformers import SentenceTransformer
+
+from app.domain.models.text_encoder import TextEncoder
 
 
-def encode_text_to_vector(text: str, model: SentenceTransformer) -> list[float]:
+def encode_text_to_vector(text: str, model: TextEncoder) -> list[float]:
     """
     入力テキストをベクトルに変換する純粋関数。
 
@@ -20,6 +23,25 @@ def encode_text_to_vector(text: str, model: SentenceTransformer) -> list[float]:
     return model.encode(text).tolist()
 
 
+def encode_texts_to_vectors(
+    texts: list[str], model: TextEncoder, batch_size: int = 32
+) -> list[list[float]]:
+    """
+    複数のテキストを1回の encode 呼び出しでベクトルに変換する純粋関数。
+
+    Args:
+        texts: クエリや文書のテキスト一覧
+        model: 使用する埋め込みモデル
+        batch_size: モデルに一度に渡す件数
+
+    Returns:
+        texts と同じ順のベクトル表現
+    """
+    if not texts:
+        return []
+    return model.encode(texts, batch_size=batch_size).tolist()
+
+
 def compute_cosine_similarity(vec_a: list[float], vec_b: list[float]) -> float:
     """
     2つのベクトル間のコサイン類似度を計算する。
@@ -33,3 +55,147 @@ def compute_cosine_similarity(vec_a: list[float], vec_b: list[float]) -> float:
     """
     a, b = np.array(vec_a), np.array(vec_b)
     return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    各行を L2 ノルム 1 に正規化する（ゼロベクトルはそのまま）。
+    正規化済みの行同士なら、内積がそのままコサイン類似度になる。
+
+    Args:
+        matrix: (n, dim) の行列、または (dim,) のベクトル
+
+    Returns:
+        float32 の正規化済み配列（入力と同じ形）
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def compute_cosine_similarities(
+    normalized_rows: np.ndarray, queries: np.ndarray
+) -> np.ndarray:
+    """
+    compute_cosine_similarity を行列にまとめて計算する版。
+    保存側の行を正規化しておけば、1回の行列積で全行×全クエリの類似度が求まる。
+
+    Args:
+        normalized_rows: normalize_rows 済みの (n, dim) 行列
+        queries: (q, dim) のクエリ行列（正規化は不要）
+
+    Returns:
+        (q, n) の cosine similarity
+    """
+    return normalize_rows(queries) @ normalized_rows.T
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    スコアの高い順に上位 k 件の添字を返す（全体ソートはしない）。
+
+    Args:
+        scores: 1次元のスコア配列
+        k: 件数
+
+    Returns:
+        スコア降順の添字
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+GroupAggregate = Literal["max", "sum", "mean"]
+
+
+def aggregate_group_score(scores: list[float], method: GroupAggregate) -> float:
+    """
+    1つの判例に属するチャンクのスコアを集約する。
+
+    Args:
+        scores: 判例内の上位チャンクのスコア
+        method: "max"(最大値) / "sum"(合計) / "mean"(上位k件の平均)
+
+    Returns:
+        集約スコア（チャンクが無ければ 0.0）
+    """
+    if not scores:
+        return 0.0
+    if method == "max":
+        return max(scores)
+    if method == "sum":
+        return float(sum(scores))
+    if method == "mean":
+        return float(sum(scores) / len(scores))
+    raise ValueError(f"Unknown aggregate method: {method}")
+
+
+def rank_groups(groups: list[dict], method: GroupAggregate, limit: int) -> list[dict]:
+    """
+    判例グループを集約スコアで並べ替え、上位 limit 件を返す。
+
+    Args:
+        groups: {"judgment_id": str, "hits": [{"payload": dict, "score": float}, ...]}
+        method: 集約方法
+        limit: 返す判例数
+
+    Returns:
+        {"judgment_id", "score", "hits"} のリスト（score 降順）
+    """
+    ranked = []
+    for group in groups:
+        hits = sorted(group["hits"], key=lambda h: h["score"], reverse=True)
+        score = aggregate_group_score([h["score"] for h in hits], method)
+        ranked.append(
+            {"judgment_id": group["judgment_id"], "score": score, "hits": hits}
+        )
+    ranked.sort(key=lambda g: g["score"], reverse=True)
+    return ranked[:limit]
+
+
+def reciprocal_rank_fusion(
+    result_lists: list[list[dict]], limit: int, k: int = 60
+) -> list[dict]:
+    """
+    複数の検索結果を Reciprocal Rank Fusion (score = Σ 1 / (k + 順位)) で統合する。
+    スコアの尺度が異なる BM25 とベクトル類似度を、順位だけで混ぜられる。
+
+    Args:
+        result_lists: {"payload": dict, "score": float} のリスト（それぞれスコア降順）
+        limit: 返す件数
+        k: 上位の順位差をどれだけ緩めるか（大きいほど下位の結果も効く）
+
+    Returns:
+        {"id", "payload", "score"} のリスト（統合スコア降順）。
+        同じチャンクは (judgment_id, chunk_index) で同一視する
+    """
+    fused: dict[tuple, dict] = {}
+    for results in result_lists:
+        for rank, item in enumerate(results, start=1):
+            payload = item["payload"]
+            key = (payload.get("judgment_id"), payload.get("chunk_index"))
+            entry = fused.setdefault(
+                key, {"id": item.get("id"), "payload": payload, "score": 0.0}
+            )
+            entry["score"] += 1.0 / (k + rank)
+    ranked = sorted(fused.values(), key=lambda r: r["score"], reverse=True)
+    return ranked[:limit]
+
+
+def make_snippet(text: str, max_chars: int) -> str:
+    """
+    検索結果に載せる本文の抜粋を作る（先頭 max_chars 文字、途中で切れたら末尾に …）。
+
+    Args:
+        text: チャンク本文
+        max_chars: 抜粋の最大文字数（0 以下なら切り詰めない）
+
+    Returns:
+        抜粋文字列
+    """
+    if max_chars <= 0 or len(text) <= max_chars:
+        return text
+    return text[:max_chars].rstrip() + "…"
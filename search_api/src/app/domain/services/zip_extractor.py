@@ -1,33 +1,139 @@
 """
-巨大ZIPをディスク上に展開し、PDFファイルを1つずつ読み込む関数。
+巨大ZIPを展開せずに、PDFメンバーを1件ずつストリーミングで読み出す関数群。
+
+- ZipFile.extractall は使わない（ディスク使用量が2倍になるため）
+- 全PDFをリストに溜めず、ジェネレータで1件ずつ返す
+  → ピークメモリは「最大の PDF 1件分」で抑えられる
+- 非PDF・サイズ超過・圧縮率が異常なメンバー（ZIP爆弾）はスキップする
+- CRC 不一致などで読めないメンバーも、ZIP 全体を止めずにスキップする
+  (スキップした PDF メンバーは on_skip に (相対パス, 理由) で知らせる)
 """
 
 import os
 import zipfile
+import zlib
+from collections.abc import Callable, Iterator
+
+MAX_PDF_MEMBER_SIZE = int(
+    os.getenv("ZIP_MAX_PDF_MEMBER_SIZE", str(512 * 1024 * 1024))
+)  # 512MB
+MAX_COMPRESSION_RATIO = float(os.getenv("ZIP_MAX_COMPRESSION_RATIO", "200"))
+READ_CHUNK_SIZE = 1024 * 1024
+
+# メンバー単位の読み込み失敗 (CRC 不一致・壊れた圧縮データ・暗号化・未対応の圧縮方式)
+_MEMBER_READ_ERRORS = (
+    zipfile.BadZipFile,
+    zlib.error,
+    RuntimeError,
+    NotImplementedError,
+)
+
+
+def _is_pdf_member(info: zipfile.ZipInfo) -> bool:
+    """
+    ディレクトリ以外で拡張子が .pdf のメンバーかを判定する。
+    """
+    return not info.is_dir() and info.filename.lower().endswith(".pdf")
+
 
+def _is_suspicious_member(
+    info: zipfile.ZipInfo, max_member_size: int, max_ratio: float
+) -> bool:
+    """
+    セントラルディレクトリの申告値から、サイズ超過・ZIP爆弾の疑いを判定する。
+    """
+    if info.file_size > max_member_size:
+        return True
+    if info.compress_size > 0 and info.file_size / info.compress_size > max_ratio:
+        return True
+    return False
 
-def extract_pdfs_from_disk(zip_path: str) -> list[tuple[str, bytes]]:
+
+def list_pdf_members(zip_path: str) -> list[zipfile.ZipInfo]:
     """
-    ZIPをディスク上で展開し、各PDFをバイナリで読み込む。
-    ただしファイルサイズが巨大な場合、さらに細分化やストリーミング処理を検討。
+    セントラルディレクトリのみを読み、処理対象となる PDF メンバー一覧を返す。
+    (メンバー本体は読み込まないため、巨大ZIPでも即座に終わる)
+
+    Args:
+        zip_path (str): ZIPファイルのパス
+
+    Returns:
+        list[ZipInfo]: 処理対象の PDF メンバー
     """
-    extract_dir = zip_path + "_unpacked"
-    os.makedirs(extract_dir, exist_ok=True)
+    with zipfile.ZipFile(zip_path, "r") as z:
+        return [info for info in z.infolist() if _is_pdf_member(info)]
+
+
+def count_pdfs_in_zip(zip_path: str) -> int:
+    """
+    ZIP内の PDF メンバー数をセントラルディレクトリから数える。
+    iter_pdfs_from_zip がスキップするメンバーも含む (on_skip で知らされる)。
+
+    Args:
+        zip_path (str): ZIPファイルのパス
+
+    Returns:
+        int: PDF メンバー数（total_pdf として先に報告する用途）
+    """
+    return len(list_pdf_members(zip_path))
+
+
+def _read_member_bounded(
+    z: zipfile.ZipFile, info: zipfile.ZipInfo, max_member_size: int
+) -> bytes | None:
+    """
+    メンバーを ZipFile.open でストリーム読み込みする。
+    申告サイズを偽装したZIP爆弾対策として、実際の展開量が上限を超えたら打ち切る。
+    """
+    buf = bytearray()
+    with z.open(info, "r") as fp:
+        while True:
+            piece = fp.read(READ_CHUNK_SIZE)
+            if not piece:
+                break
+            buf.extend(piece)
+            if len(buf) > max_member_size:
+                return None
+    return bytes(buf)
+
+
+def iter_pdfs_from_zip(
+    zip_path: str,
+    max_member_size: int = MAX_PDF_MEMBER_SIZE,
+    max_ratio: float = MAX_COMPRESSION_RATIO,
+    on_skip: Callable[[str, str], None] | None = None,
+) -> Iterator[tuple[str, bytes]]:
+    """
+    ZIPを展開せずに、PDFメンバーを1件ずつ (相対パス, バイト列) で返すジェネレータ。
+
+    Args:
+        zip_path (str): ZIPファイルのパス
+        max_member_size (int): 1メンバーあたりの展開後サイズ上限(bytes)
+        max_ratio (float): 許容する圧縮率(展開後/圧縮後)の上限
+        on_skip (Callable): スキップした PDF メンバーの (相対パス, 理由) を受け取る関数
+
+    Yields:
+        tuple[str, bytes]: (ZIP内の相対パス, PDFバイト列)
+    """
+
+    def skip(info: zipfile.ZipInfo, reason: str) -> None:
+        print(f"スキップ({reason}): {info.filename}")
+        if on_skip is not None:
+            on_skip(info.filename, reason)
 
     with zipfile.ZipFile(zip_path, "r") as z:
-        z.extractall(extract_dir)
-
-    # 再帰的に .pdf ファイルを探す
-    pdf_files: list[tuple[str, bytes]] = []
-    for root, _dirs, files in os.walk(extract_dir):
-        for fname in files:
-            if fname.lower().endswith(".pdf"):
-                fpath = os.path.join(root, fname)
-                rel_path = os.path.relpath(fpath, extract_dir)
-                # 読み込む(メモリに載せる): 数十GBの場合はここがネック
-                # → もしさらにストリーミングしたいならpdfplumber側でファイルパス→page単位処理をする方が良い
-                with open(fpath, "rb") as fp:
-                    data = fp.read()
-                pdf_files.append((rel_path, data))
-
-    return pdf_files
+        for info in z.infolist():
+            if not _is_pdf_member(info):
+                continue
+            if _is_suspicious_member(info, max_member_size, max_ratio):
+                skip(info, "サイズ超過/ZIP爆弾の疑い")
+                continue
+            try:
+                data = _read_member_bounded(z, info, max_member_size)
+            except _MEMBER_READ_ERRORS as e:
+                skip(info, f"読み込みに失敗しました: {e}")
+                continue
+            if data is None:
+                skip(info, "展開サイズ超過")
+                continue
+            yield info.filename, data
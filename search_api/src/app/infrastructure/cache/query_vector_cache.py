@@ -0,0 +1,201 @@
+"""
+インフラ層 - 検索クエリの埋め込みベクトルキャッシュ。
+
+同じ法令名・定型句などの検索が繰り返されるため、
+(モデル名・推論バックエンド・量子化の組, 正規化したクエリ) をキーに
+ベクトルをプロセス内でキャッシュする (別のバックエンドのベクトルを返さない)。
+- QUERY_VECTOR_CACHE_SIZE: 保持する最大件数 (超えたら LRU で追い出し)
+- QUERY_VECTOR_CACHE_TTL_SECONDS: 有効期限(秒)
+- QUERY_VECTOR_CACHE_PATH: 指定すると SQLite ファイルを共有ストアとして併用し、
+  複数の uvicorn ワーカー間でキャッシュを共有する
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+
+QUERY_VECTOR_CACHE_SIZE = int(os.getenv("QUERY_VECTOR_CACHE_SIZE", "10000"))
+QUERY_VECTOR_CACHE_TTL_SECONDS = float(
+    os.getenv("QUERY_VECTOR_CACHE_TTL_SECONDS", "86400")
+)
+QUERY_VECTOR_CACHE_PATH = os.getenv("QUERY_VECTOR_CACHE_PATH", "")
+
+_WHITESPACE = re.compile(r"\s+")
+_SHARED_PRUNE_INTERVAL = 1000
+
+
+def normalize_query(text: str) -> str:
+    """
+    キャッシュキー用にクエリを正規化する（NFKC・前後空白除去・連続空白の圧縮）。
+
+    Args:
+        text: 検索クエリ
+
+    Returns:
+        正規化したクエリ
+    """
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class _SharedVectorStore:
+    """
+    複数プロセスで共有する SQLite のベクトル保存先。
+    """
+
+    def __init__(self, path: str, max_entries: int) -> None:
+        self._max_entries = max_entries
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_vectors ("
+            " key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_query_vectors_created_at"
+            " ON query_vectors(created_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str, min_created_at: float) -> tuple[list[float], float] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vector, created_at FROM query_vectors"
+                " WHERE key = ? AND created_at >= ?",
+                (key, min_created_at),
+            ).fetchone()
+        if row is None:
+            return None
+        return array("f", row[0]).tolist(), row[1]
+
+    def put(self, key: str, vector: list[float], created_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_vectors VALUES (?, ?, ?)",
+                (key, array("f", vector).tobytes(), created_at),
+            )
+            self._puts += 1
+            if self._puts % _SHARED_PRUNE_INTERVAL == 0:
+                self._conn.execute(
+                    "DELETE FROM query_vectors WHERE key IN ("
+                    " SELECT key FROM query_vectors ORDER BY created_at DESC"
+                    " LIMIT -1 OFFSET ?)",
+                    (self._max_entries,),
+                )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM query_vectors")
+            self._conn.commit()
+
+
+class QueryVectorCache:
+    """
+    クエリ埋め込みの LRU + TTL キャッシュ（スレッドセーフ）。
+
+    Attributes:
+        hits: キャッシュヒット数（共有ストアからのヒットを含む）
+        misses: キャッシュミス数
+        evictions: 件数上限による追い出し数
+    """
+
+    def __init__(
+        self,
+        max_entries: int = QUERY_VECTOR_CACHE_SIZE,
+        ttl_seconds: float = QUERY_VECTOR_CACHE_TTL_SECONDS,
+        shared_path: str = "",
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[list[float], float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._shared = (
+            _SharedVectorStore(shared_path, max_entries) if shared_path else None
+        )
+
+    @property
+    def is_shared(self) -> bool:
+        """
+        共有ストア (SQLite) を併用しているか。get / put がファイル I/O を伴う。
+        """
+        return self._shared is not None
+
+    @staticmethod
+    def _key(model_name: str, query: str) -> str:
+        return f"{model_name}\x1f{normalize_query(query)}"
+
+    def get(self, model_name: str, query: str) -> list[float] | None:
+        """
+        キャッシュ済みのベクトルを返す。無い・期限切れなら None。
+        """
+        key = self._key(model_name, query)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+
+        shared = self._shared.get(key, now - self.ttl_seconds) if self._shared else None
+        with self._lock:
+            if shared is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store_locked(key, shared[0], shared[1])
+        return shared[0]
+
+    def put(self, model_name: str, query: str, vector: list[float]) -> None:
+        """
+        ベクトルをキャッシュに保存する。
+        """
+        key = self._key(model_name, query)
+        now = time.time()
+        with self._lock:
+            self._store_locked(key, vector, now)
+        if self._shared is not None:
+            self._shared.put(key, vector, now)
+
+    def _store_locked(self, key: str, vector: list[float], created_at: float) -> None:
+        self._entries[key] = (vector, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        キャッシュを空にする（共有ストアも含む）。
+        """
+        with self._lock:
+            self._entries.clear()
+        if self._shared is not None:
+            self._shared.clear()
+
+    def stats(self) -> dict:
+        """
+        ヒット・ミス数などの統計を返す。
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+query_vector_cache = QueryVectorCache(shared_path=QUERY_VECTOR_CACHE_PATH)
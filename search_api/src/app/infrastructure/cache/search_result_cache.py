@@ -0,0 +1,183 @@
+"""
+インフラ層 - ベクトル検索結果のキャッシュ。
+
+コレクションが変わるのは登録・更新・削除・バルク登録の書き込み時だけなので、
+TTL ではなく「書き込み世代(write generation)」で正しさを保証する。
+- qdrant_gateway の書き込み処理は終了時に(失敗しても)必ず世代を1つ進める
+- キャッシュには検索時点の世代を記録し、現在の世代と一致するものだけ返す
+  → 更新後に古い結果を返すことはない
+
+- SEARCH_RESULT_CACHE_SIZE: 保持する最大件数 (LRU。0 ならキャッシュしない)
+- SEARCH_CACHE_GENERATION_PATH: 世代カウンタを共有する SQLite ファイル。
+  既定でファイルを使うため、同じホストの uvicorn ワーカーは互いの書き込みを検知する。
+  空文字にするとプロセス内のカウンタになり、他のワーカーの書き込み後も古い結果を返しうる
+  (ワーカー1つのときだけ使う)。複数ホストで動かす場合は SEARCH_RESULT_CACHE_SIZE=0 にする
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import Hashable
+
+SEARCH_RESULT_CACHE_SIZE = int(os.getenv("SEARCH_RESULT_CACHE_SIZE", "2048"))
+SEARCH_CACHE_GENERATION_PATH = os.getenv(
+    "SEARCH_CACHE_GENERATION_PATH", "data/cache/search_generation.sqlite3"
+)
+
+
+class WriteGeneration:
+    """
+    コレクションへの書き込み世代カウンタ。
+
+    path を指定した場合は SQLite ファイル上のカウンタを複数プロセスで共有する。
+    """
+
+    def __init__(self, path: str = "") -> None:
+        self._value = 0
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS write_generation ("
+                " id INTEGER PRIMARY KEY CHECK (id = 1), value INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "INSERT OR IGNORE INTO write_generation (id, value) VALUES (1, 0)"
+            )
+            self._conn.commit()
+
+    def current(self) -> int:
+        """
+        現在の世代を返す。
+        """
+        with self._lock:
+            if self._conn is None:
+                return self._value
+            row = self._conn.execute(
+                "SELECT value FROM write_generation WHERE id = 1"
+            ).fetchone()
+            return int(row[0])
+
+    def bump(self) -> int:
+        """
+        世代を1つ進める（書き込みの終了時に、失敗した場合も呼ぶ）。
+
+        Returns:
+            新しい世代
+        """
+        with self._lock:
+            if self._conn is None:
+                self._value += 1
+                return self._value
+            self._conn.execute(
+                "UPDATE write_generation SET value = value + 1 WHERE id = 1"
+            )
+            self._conn.commit()
+            row = self._conn.execute(
+                "SELECT value FROM write_generation WHERE id = 1"
+            ).fetchone()
+            return int(row[0])
+
+    async def current_async(self) -> int:
+        """
+        current の非同期版。ファイル上のカウンタはスレッドで読み、イベントループを止めない。
+        """
+        if self._conn is None:
+            return self.current()
+        return await asyncio.to_thread(self.current)
+
+    async def bump_async(self) -> int:
+        """
+        bump の非同期版。ファイル上のカウンタはスレッドで更新し、イベントループを止めない。
+        """
+        if self._conn is None:
+            return self.bump()
+        return await asyncio.to_thread(self.bump)
+
+
+def vector_fingerprint(vector: list[float]) -> str:
+    """
+    クエリベクトルのハッシュ値（キャッシュキー用）を返す。
+    """
+    return hashlib.blake2b(array("f", vector).tobytes(), digest_size=16).hexdigest()
+
+
+class SearchResultCache:
+    """
+    検索結果の LRU キャッシュ。各エントリは格納時の書き込み世代を持つ。
+
+    Attributes:
+        hits: キャッシュヒット数
+        misses: キャッシュミス数（世代が古くて捨てた分を含む）
+    """
+
+    def __init__(self, max_entries: int = SEARCH_RESULT_CACHE_SIZE) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[int, list[dict]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, generation: int) -> list[dict] | None:
+        """
+        指定世代で格納された結果があれば、そのコピーを返す。
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != generation:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return _copy_results(entry[1])
+
+    def put(self, key: Hashable, generation: int, results: list[dict]) -> None:
+        """
+        検索結果を、検索前に取得した世代とともに格納する。
+        """
+        with self._lock:
+            self._entries[key] = (generation, _copy_results(results))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def _copy_results(results: list[dict]) -> list[dict]:
+    """
+    呼び出し側での payload 書き換えがキャッシュに波及しないよう浅いコピーを作る。
+    (判例グループ形式 {"hits": [...]} の場合は hits も同様にコピーする)
+    """
+    copied = []
+    for r in results:
+        if "hits" in r:
+            copied.append({**r, "hits": _copy_results(r["hits"])})
+        else:
+            copied.append({**r, "payload": dict(r["payload"] or {})})
+    return copied
+
+
+write_generation = WriteGeneration(SEARCH_CACHE_GENERATION_PATH)
+search_result_cache = SearchResultCache()
@@ -0,0 +1,176 @@
+"""
+インフラ層 - チャンク本文のローカルストア。
+
+ベクトルストア (Qdrant) の payload にはチャンク本文を持たせず、
+ポイントID・judgment_id・chunk_index など検索・絞り込みに使う項目だけを置く。
+本文はこのストアにポイントIDをキーとして保存し、検索結果を返す直前に必要な分だけ引く。
+これにより Qdrant のメモリと、検索のたびに転送される payload が小さくなる。
+
+- 保存先は SQLite 1ファイル (WAL)。複数ワーカープロセスから同時に読み書きできる
+- ポイントIDは内容から決まる (point_id.make_point_id) ため、同じIDの本文は常に同じ
+
+環境変数:
+- CHUNK_STORE_DIR: 保存先ディレクトリ
+"""
+
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+
+CHUNK_STORE_DIR = os.getenv("CHUNK_STORE_DIR", "data/chunk_store")
+
+_SQLITE_MAX_VARIABLES = 900
+
+
+@dataclass
+class StoredChunk:
+    """
+    ストアに保存する1チャンク分の本文。
+
+    Attributes:
+        point_id: ベクトルストアのポイントID
+        judgment_id: 判例ID
+        chunk_index: 判例内でのチャンク番号
+        text: チャンク本文
+    """
+
+    point_id: str
+    judgment_id: str
+    chunk_index: int
+    text: str
+
+
+def _chunks(values: list[str]) -> list[list[str]]:
+    return [
+        values[i : i + _SQLITE_MAX_VARIABLES]
+        for i in range(0, len(values), _SQLITE_MAX_VARIABLES)
+    ]
+
+
+class ChunkStore:
+    """
+    ポイントID → チャンク本文のストア（スレッド・プロセス間で共有可）。
+
+    Attributes:
+        path: SQLite ファイルのパス
+    """
+
+    def __init__(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "chunks.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path, timeout=30.0, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " point_id TEXT PRIMARY KEY, judgment_id TEXT NOT NULL,"
+            " chunk_index INTEGER NOT NULL, text TEXT NOT NULL) WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_chunks_judgment ON chunks(judgment_id)"
+        )
+
+    def put_many(self, chunks: list[StoredChunk]) -> None:
+        """
+        チャンク本文を保存する（同じポイントIDは上書き）。
+        """
+        if not chunks:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?)",
+                    [
+                        (c.point_id, c.judgment_id, c.chunk_index, c.text)
+                        for c in chunks
+                    ],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get_texts(self, point_ids: list[str]) -> dict[str, str]:
+        """
+        ポイントIDに対応する本文を返す（無いIDは結果に含まれない）。
+        """
+        texts: dict[str, str] = {}
+        with self._lock:
+            for part in _chunks(list(dict.fromkeys(point_ids))):
+                placeholders = ",".join("?" * len(part))
+                texts.update(
+                    self._conn.execute(
+                        f"SELECT point_id, text FROM chunks WHERE point_id IN ({placeholders})",  # nosec B608
+                        part,
+                    ).fetchall()
+                )
+        return texts
+
+    def missing(self, point_ids: list[str]) -> set[str]:
+        """
+        本文が保存されていないポイントIDを返す。
+        """
+        found: set[str] = set()
+        with self._lock:
+            for part in _chunks(list(point_ids)):
+                placeholders = ",".join("?" * len(part))
+                found.update(
+                    point_id
+                    for (point_id,) in self._conn.execute(
+                        f"SELECT point_id FROM chunks WHERE point_id IN ({placeholders})",  # nosec B608
+                        part,
+                    ).fetchall()
+                )
+        return set(point_ids) - found
+
+    def delete_ids(self, point_ids: list[str]) -> None:
+        """
+        ポイントID指定で本文を削除する。
+        """
+        if not point_ids:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM chunks WHERE point_id = ?", [(p,) for p in point_ids]
+            )
+
+    def delete_judgment(self, judgment_id: str) -> None:
+        """
+        判例に属する本文をすべて削除する。
+        """
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM chunks WHERE judgment_id = ?", (judgment_id,)
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+
+_store: ChunkStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_chunk_store() -> ChunkStore:
+    """
+    プロセス内で共有するチャンクストアを返す（初回呼び出し時に生成）。
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ChunkStore(CHUNK_STORE_DIR)
+        return _store
+
+
+def set_chunk_store(store: ChunkStore | None) -> None:
+    """
+    使用するチャンクストアを差し替える（テスト用）。None なら次回 CHUNK_STORE_DIR から作り直す。
+    """
+    global _store
+    with _store_lock:
+        _store = store
@@ -0,0 +1,276 @@
+"""
+インフラ層 - ディスク上の内容アドレス型エンベディングキャッシュ。
+
+Qdrant の再構築・再インデックス・失敗したバルクタスクの再実行などで、
+既にエンコード済みのテキストを再びモデルに通さないためのストア。
+
+- キーは (モデル名, sha256(チャンク本文))。モデルごとにディレクトリを分ける
+- ベクトルは固定長スロットのメモリマップ配列 (float16 / float32) に格納する
+- インデックスは SQLite (キー32バイト → スロット番号・最終利用時刻) で持つ
+- 上限件数に達したら最終利用時刻の古いスロットから再利用する (LRU)
+- 読み出し (スロットの検索〜ベクトルの読み込み) と書き込みはどちらも SQLite の
+  書き込みトランザクション内で行う。他プロセスが読み出し中のスロットを再利用して
+  別のチャンクのベクトルを返すことはない
+
+環境変数:
+- EMBEDDING_STORE_DIR: 保存先ディレクトリ (未指定ならストアは無効)
+- EMBEDDING_STORE_MAX_ENTRIES: 保持する最大ベクトル数
+- EMBEDDING_STORE_DTYPE: float16 または float32
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Literal
+
+import numpy as np
+
+from app.infrastructure.embedding.model_registry import model_registry
+
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", "")
+EMBEDDING_STORE_MAX_ENTRIES = int(os.getenv("EMBEDDING_STORE_MAX_ENTRIES", "1000000"))
+EMBEDDING_STORE_DTYPE = os.getenv("EMBEDDING_STORE_DTYPE", "float16")
+
+_SQLITE_MAX_VARIABLES = 900
+
+
+def _text_key(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingStore:
+    """
+    1モデル分のエンベディングをディスクに保存するストア（スレッド・プロセス間で共有可）。
+
+    Attributes:
+        hits: get_many で見つかった件数
+        misses: get_many で見つからなかった件数
+        evictions: 上限到達により再利用したスロット数
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        model_name: str,
+        max_entries: int = EMBEDDING_STORE_MAX_ENTRIES,
+        dtype: str = EMBEDDING_STORE_DTYPE,
+    ) -> None:
+        if dtype not in ("float16", "float32"):
+            raise ValueError(f"Unsupported EMBEDDING_STORE_DTYPE: {dtype}")
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        self.directory = os.path.join(directory, safe_name)
+        os.makedirs(self.directory, exist_ok=True)
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._vectors: np.memmap | None = None
+
+        self._conn = sqlite3.connect(
+            os.path.join(self.directory, "index.sqlite3"),
+            timeout=30.0,
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS slots ("
+            " key BLOB PRIMARY KEY, slot INTEGER NOT NULL UNIQUE,"
+            " last_used INTEGER NOT NULL) WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_slots_last_used ON slots(last_used)"
+        )
+        # 既存ストアは作成時の dtype・容量を優先する
+        self.dtype = np.dtype(self._meta("dtype") or dtype)
+        dim = self._meta("dim")
+        if dim is not None:
+            self._open_vectors(int(dim))
+
+    def _meta(self, name: str) -> str | None:
+        row = self._conn.execute(
+            "SELECT value FROM meta WHERE name = ?", (name,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _open_vectors(self, dim: int) -> np.memmap:
+        capacity = int(self._meta("capacity") or self.max_entries)
+        path = os.path.join(self.directory, f"vectors.{self.dtype.name}.mmap")
+        mode: Literal["r+", "w+"] = "r+" if os.path.exists(path) else "w+"
+        self._vectors = np.memmap(
+            path, dtype=self.dtype, mode=mode, shape=(capacity, dim)
+        )
+        self.max_entries = capacity
+        return self._vectors
+
+    def get_many(self, texts: list[str]) -> list[list[float] | None]:
+        """
+        テキストに対応する保存済みベクトルを返す（無いものは None）。
+
+        Args:
+            texts: チャンク本文の一覧
+
+        Returns:
+            texts と同じ順序のベクトル（または None）
+        """
+        found: list[list[float] | None] = [None] * len(texts)
+        if self._vectors is None and texts:
+            # 他プロセスが先に書き込んでいれば、その次元で開く
+            with self._lock:
+                dim = self._meta("dim")
+                if dim is not None and self._vectors is None:
+                    self._open_vectors(int(dim))
+        if self._vectors is None or not texts:
+            self.misses += len(texts)
+            return found
+
+        keys = [_text_key(t) for t in texts]
+        with self._lock:
+            # 読み終えるまで他プロセスの put_many (スロットの再利用) を止める
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                slots = self._select_slots(keys)
+                for i, key in enumerate(keys):
+                    slot = slots.get(key)
+                    if slot is not None:
+                        found[i] = self._vectors[slot].astype(np.float32).tolist()
+                self._touch(list(slots))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.hits += len(slots)
+        self.misses += len(texts) - len(slots)
+        return found
+
+    def _touch(self, keys: list[bytes]) -> None:
+        if keys:
+            now = time.time_ns()
+            self._conn.executemany(
+                "UPDATE slots SET last_used = ? WHERE key = ?",
+                [(now, key) for key in keys],
+            )
+
+    def _select_slots(self, keys: list[bytes]) -> dict[bytes, int]:
+        slots: dict[bytes, int] = {}
+        for start in range(0, len(keys), _SQLITE_MAX_VARIABLES):
+            part = keys[start : start + _SQLITE_MAX_VARIABLES]
+            placeholders = ",".join("?" * len(part))
+            slots.update(
+                self._conn.execute(
+                    f"SELECT key, slot FROM slots WHERE key IN ({placeholders})",  # nosec B608
+                    part,
+                ).fetchall()
+            )
+        return slots
+
+    def put_many(self, texts: list[str], vectors: list[list[float]]) -> None:
+        """
+        テキストとベクトルの組を保存する。上限に達していれば LRU でスロットを再利用する。
+        1回で max_entries 件を超える場合は、末尾の max_entries 件だけを保存する。
+
+        Args:
+            texts: チャンク本文の一覧
+            vectors: texts と同じ順序のベクトル
+        """
+        if not texts:
+            return
+        with self._lock:
+            matrix = self._vectors
+            if matrix is None:
+                dim = len(vectors[0])
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO meta VALUES"
+                    " ('dim', ?), ('capacity', ?), ('dtype', ?)",
+                    (str(dim), str(self.max_entries), self.dtype.name),
+                )
+                matrix = self._open_vectors(int(self._meta("dim") or dim))
+
+            entries = {_text_key(t): v for t, v in zip(texts, vectors, strict=True)}
+            if len(entries) > self.max_entries:
+                entries = dict(list(entries.items())[-self.max_entries :])
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                known = self._select_slots(list(entries))
+                # 同じ呼び出しで保存するキーを追い出さないよう、先に最終利用時刻を更新する
+                self._touch(list(known))
+                new_keys = [k for k in entries if k not in known]
+                free = self._allocate_slots(len(new_keys))
+                # ベクトルを書き込んでからインデックスを確定させる(読み手に未書き込みを見せない)
+                for key, slot in zip(new_keys, free, strict=True):
+                    matrix[slot] = np.asarray(entries[key], dtype=self.dtype)
+                matrix.flush()
+                now = time.time_ns()
+                self._conn.executemany(
+                    "INSERT INTO slots (key, slot, last_used) VALUES (?, ?, ?)",
+                    [(k, s, now) for k, s in zip(new_keys, free, strict=True)],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _allocate_slots(self, count: int) -> list[int]:
+        """
+        空きスロットを count 件確保する。足りなければ最終利用時刻の古いものを追い出す。
+        (トランザクション内で呼ぶこと。count は max_entries 以下)
+        """
+        if count == 0:
+            return []
+        # 追い出したスロットはその場で再利用するため、使用中スロットは常に 0..MAX(slot)
+        next_slot = self._conn.execute(
+            "SELECT COALESCE(MAX(slot) + 1, 0) FROM slots"
+        ).fetchone()[0]
+        fresh = list(range(next_slot, min(next_slot + count, self.max_entries)))
+
+        shortage = count - len(fresh)
+        if shortage > 0:
+            victims = self._conn.execute(
+                "SELECT key, slot FROM slots ORDER BY last_used LIMIT ?", (shortage,)
+            ).fetchall()
+            self._conn.executemany(
+                "DELETE FROM slots WHERE key = ?", [(key,) for key, _ in victims]
+            )
+            fresh.extend(slot for _, slot in victims)
+            self.evictions += len(victims)
+        return fresh
+
+    def stats(self) -> dict:
+        """
+        件数・ヒット数などの統計を返す。
+        """
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM slots").fetchone()[0]
+        return {
+            "size": size,
+            "capacity": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+_store: EmbeddingStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_embedding_store() -> EmbeddingStore | None:
+    """
+    共有モデル用のストアを返す。EMBEDDING_STORE_DIR 未指定なら None（無効）。
+    ストアはモデル名・バックエンド・量子化の組ごとに別ディレクトリにする。
+    """
+    global _store
+    if not EMBEDDING_STORE_DIR:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = EmbeddingStore(EMBEDDING_STORE_DIR, model_registry.variant)
+        return _store
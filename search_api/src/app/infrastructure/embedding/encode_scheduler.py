@@ -0,0 +1,153 @@
+"""
+インフラ層 - 同時に届いた検索クエリのエンコードをまとめる (動的マイクロバッチ)。
+
+検索リクエストごとに encoder.encode(text) を呼ぶと、負荷が高いときは
+バッチサイズ 1 の推論が並行して走り、GIL と推論スレッドを奪い合う。
+EncodeScheduler はクエリを待ち行列に入れ、専用スレッドで
+- 最初のクエリが届いてから最大 max_wait_ms 待つか、max_batch_size 件集まるまで溜め
+- 1回の encode (バッチ推論) でまとめてベクトル化し
+- 各リクエストの Future に結果を返す
+推論中に届いたクエリは次のバッチにまとまるため、負荷が高いほどバッチが大きくなる。
+同じバッチ内の同じテキストは1回だけエンコードする。
+submit は呼び出し元のスレッドでエンコードしないため、イベントループから呼んでも止まらない
+(QUERY_ENCODE_MAX_BATCH=1 のときは、まとめずにスレッドプールで1件ずつエンコードする)。
+
+環境変数:
+- QUERY_ENCODE_MAX_BATCH: 1回にまとめる最大件数 (1 ならまとめずにその場でエンコード)
+- QUERY_ENCODE_MAX_WAIT_MS: 最初のクエリが届いてから待つ最大ミリ秒
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from app.domain.models.text_encoder import TextEncoder
+from app.infrastructure.metrics.metrics import STAGE_SECONDS
+
+QUERY_ENCODE_MAX_BATCH = int(os.getenv("QUERY_ENCODE_MAX_BATCH", "32"))
+QUERY_ENCODE_MAX_WAIT_MS = float(os.getenv("QUERY_ENCODE_MAX_WAIT_MS", "3"))
+
+_Request = tuple[str, Future, float]
+
+
+class EncodeScheduler:
+    """
+    1つのモデルに対するクエリのエンコードをまとめて実行するスケジューラ。
+
+    Attributes:
+        encoder: 埋め込みモデル
+        max_batch_size: 1回の encode に渡す最大件数
+        max_wait: 最初のクエリが届いてから待つ最大秒数
+        encoded_batches: これまでに実行した encode 回数
+        encoded_texts: これまでに受け付けたクエリ数
+    """
+
+    def __init__(
+        self,
+        encoder: TextEncoder,
+        max_batch_size: int = QUERY_ENCODE_MAX_BATCH,
+        max_wait_ms: float = QUERY_ENCODE_MAX_WAIT_MS,
+    ) -> None:
+        self.encoder = encoder
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.encoded_batches = 0
+        self.encoded_texts = 0
+        self._queue: queue.SimpleQueue[_Request] = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+        self._executor: ThreadPoolExecutor | None = None
+
+    def submit(self, text: str) -> "Future[list[float]]":
+        """
+        テキストのエンコードを予約し、ベクトルを受け取る Future を返す。
+        呼び出し元のスレッドではエンコードしない。
+        """
+        future: Future[list[float]] = Future()
+        request = (text, future, time.perf_counter())
+        if self.max_batch_size == 1:
+            self._ensure_executor().submit(self._run, [request])
+            return future
+        self._ensure_worker()
+        self._queue.put(request)
+        return future
+
+    def encode(self, text: str) -> list[float]:
+        """
+        テキストをエンコードする（他のリクエストとまとめて実行されるのを待つ）。
+        まとめない設定なら呼び出し元のスレッドでそのままエンコードする。
+        """
+        if self.max_batch_size == 1:
+            future: Future[list[float]] = Future()
+            self._run([(text, future, time.perf_counter())])
+            return future.result()
+        return self.submit(text).result()
+
+    def _ensure_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(thread_name_prefix="query-encode")
+            return self._executor
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._loop, daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> list[_Request]:
+        """
+        最初の1件を待ってから、max_wait 経つか max_batch_size 件になるまで集める。
+        """
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    # 待ち時間を過ぎても、既に届いているものは取り込む
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            self._run(self._collect())
+
+    def _run(self, batch: list[_Request]) -> None:
+        started = time.perf_counter()
+        for _, _, queued_at in batch:
+            STAGE_SECONDS.observe(started - queued_at, stage="encode_queue")
+        texts = list(dict.fromkeys(text for text, _, _ in batch))
+        try:
+            vectors = self.encoder.encode(texts, batch_size=len(texts)).tolist()
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        by_text = dict(zip(texts, vectors, strict=True))
+        self.encoded_batches += 1
+        self.encoded_texts += len(batch)
+        for text, future, _ in batch:
+            future.set_result(by_text[text])
+
+
+_schedulers: dict[int, EncodeScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_encode_scheduler(encoder: TextEncoder) -> EncodeScheduler:
+    """
+    encoder 用のスケジューラを返す（モデルごとに1つ、初回呼び出し時に生成）。
+    """
+    with _schedulers_lock:
+        scheduler = _schedulers.get(id(encoder))
+        if scheduler is None or scheduler.encoder is not encoder:
+            scheduler = EncodeScheduler(encoder)
+            _schedulers[id(encoder)] = scheduler
+        return scheduler
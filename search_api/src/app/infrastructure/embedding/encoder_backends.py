@@ -0,0 +1,159 @@
+"""
+インフラ層 - 埋め込みモデルの推論バックエンド。
+
+同じモデルを次のいずれかで動かす (EMBEDDING_BACKEND)。
+- torch: SentenceTransformer (PyTorch)。基準となる実装
+- onnx: SentenceTransformer の ONNX バックエンド (ONNX Runtime, CPUExecutionProvider)。
+  Hub に ONNX 版が無いモデルは初回ロード時に書き出される
+- onnx-int8: ONNX 版を動的 int8 量子化したもの。量子化済みモデルは
+  EMBEDDING_ONNX_DIR に保存し、2回目以降はそれを読み込む
+いずれも SentenceTransformer の encode をそのまま使うため、プーリング・正規化は変わらない。
+onnx / onnx-int8 には sentence-transformers[onnx] (optimum, onnxruntime) が必要。
+
+バックエンドが違えば同じテキストでもベクトルがわずかに変わるため、ベクトルを保存する
+キャッシュ (エンベディングストア・クエリベクトルキャッシュ) は encoder_variant を
+キーにし、別のバックエンドで計算したベクトルを混ぜない。
+
+parity_report は同じテキストの基準(torch)ベクトルとのコサイン類似度を集計し、
+ONNX / 量子化で検索結果が変わらないかを確かめるのに使う。
+
+環境変数:
+- EMBEDDING_BACKEND: torch / onnx / onnx-int8 (デフォルト torch)
+- EMBEDDING_THREADS: 推論スレッド数 (0 ならランタイムの既定値)
+- EMBEDDING_ONNX_DIR: 量子化済みモデルの保存先
+- EMBEDDING_QUANTIZATION: 量子化の対象命令セット (avx2 / avx512 / avx512_vnni / arm64)
+"""
+
+import os
+from typing import Any
+
+import numpy as np
+
+from app.domain.models.text_encoder import TextEncoder
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", "data/onnx_models")
+EMBEDDING_QUANTIZATION = os.getenv("EMBEDDING_QUANTIZATION", "avx2")
+
+# 一致度の確認に使うテキスト (判決文らしい文・短いクエリ・英数字混じり)
+PARITY_TEXTS = [
+    "原判決を破棄し、本件を東京高等裁判所に差し戻す。",
+    "被告人は、平成二十年四月一日、東京都内において、被害者の財布を窃取した。",
+    "損害賠償請求",
+    "民法第709条に基づく不法行為責任の成否",
+    "本件控訴を棄却する。控訴費用は控訴人の負担とする。",
+    "The appeal is dismissed.",
+]
+
+
+def _onnx_model_kwargs(threads: int) -> dict[str, Any]:
+    kwargs: dict[str, Any] = {"provider": "CPUExecutionProvider"}
+    if threads > 0:
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        kwargs["session_options"] = options
+    return kwargs
+
+
+def _quantized_model_dir(model_name: str) -> str:
+    return os.path.join(EMBEDDING_ONNX_DIR, model_name.replace("/", "__"))
+
+
+def _load_onnx_int8(model_name: str, threads: int) -> TextEncoder:
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.backend import export_dynamic_quantized_onnx_model
+
+    model_dir = _quantized_model_dir(model_name)
+    suffix = f"qint8_{EMBEDDING_QUANTIZATION}"
+    file_name = f"onnx/model_{suffix}.onnx"
+    if not os.path.exists(os.path.join(model_dir, file_name)):
+        # ONNX 版を保存し、同じ場所に量子化したモデルを書き出す（初回のみ）
+        model = SentenceTransformer(model_name, backend="onnx")
+        model.save(model_dir)
+        export_dynamic_quantized_onnx_model(
+            model, EMBEDDING_QUANTIZATION, model_dir, file_suffix=suffix
+        )
+    return SentenceTransformer(
+        model_dir,
+        backend="onnx",
+        model_kwargs={"file_name": file_name, **_onnx_model_kwargs(threads)},
+    )
+
+
+def encoder_variant(model_name: str, backend: str = "torch") -> str:
+    """
+    モデル名・バックエンド・量子化の組を表す名前を返す。
+    torch はモデル名のまま (既存のキャッシュをそのまま使う)、それ以外は
+    "モデル名@onnx" / "モデル名@onnx-int8-avx2" のようにする。
+    """
+    if backend == "torch":
+        return model_name
+    if backend == "onnx-int8":
+        return f"{model_name}@{backend}-{EMBEDDING_QUANTIZATION}"
+    return f"{model_name}@{backend}"
+
+
+def load_encoder(
+    model_name: str, backend: str = "torch", threads: int = 0
+) -> TextEncoder:
+    """
+    指定したバックエンドでモデルをロードする。
+
+    Args:
+        model_name: モデル名
+        backend: BACKENDS のいずれか
+        threads: 推論スレッド数（0 ならランタイムの既定値）
+
+    Returns:
+        TextEncoder: SentenceTransformer と同じ encode を持つモデル
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend}")
+    # torch / sentence_transformers の import は重いため、ここまで遅延させる
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        if threads > 0:
+            import torch
+
+            torch.set_num_threads(threads)
+        return SentenceTransformer(model_name)
+    if backend == "onnx":
+        return SentenceTransformer(
+            model_name, backend="onnx", model_kwargs=_onnx_model_kwargs(threads)
+        )
+    return _load_onnx_int8(model_name, threads)
+
+
+def parity_report(
+    candidate: TextEncoder,
+    reference: TextEncoder,
+    texts: list[str] | None = None,
+) -> dict:
+    """
+    candidate と reference (基準の torch モデル) のベクトルのコサイン類似度を集計する。
+
+    Args:
+        candidate: 確認するモデル
+        reference: 基準のモデル
+        texts: 比較するテキスト（None なら PARITY_TEXTS）
+
+    Returns:
+        dict: {"texts": 件数, "min_cosine": 最小, "mean_cosine": 平均}
+    """
+    texts = PARITY_TEXTS if texts is None else texts
+    a = np.asarray(candidate.encode(texts), dtype=np.float64)
+    b = np.asarray(reference.encode(texts), dtype=np.float64)
+    norms = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    cosines = (a * b).sum(axis=1) / np.maximum(norms, 1e-12)
+    return {
+        "texts": len(texts),
+        "min_cosine": round(float(cosines.min()), 6),
+        "mean_cosine": round(float(cosines.mean()), 6),
+    }
@@ -0,0 +1,183 @@
+"""
+インフラ層 - 埋め込みモデルの共有レジストリ。
+
+モデルはプロセス内で1つだけ保持し、すべてのルーター・ユースケースで共有する。
+- EMBEDDING_MODEL_NAME: 使用するモデル名 (デフォルト all-MiniLM-L6-v2)
+- EMBEDDING_PRELOAD: true なら起動時にバックグラウンドでロード、false なら初回利用時にロード
+- EMBEDDING_BACKEND / EMBEDDING_THREADS: 推論バックエンドとスレッド数 (encoder_backends)
+- EMBEDDING_PARITY_CHECK: true ならロード時に torch 版とのコサイン一致度を測り、parity に残す
+ロード直後にウォームアップ encode を1回実行してから ready とみなす。
+共有するモデルは MeasuredEncoder で包み、encode の所要時間とバッチサイズを記録する。
+"""
+
+import os
+import threading
+import time
+from typing import Any, cast
+
+import numpy as np
+
+from app.domain.models.text_encoder import TextEncoder
+from app.infrastructure.embedding.encoder_backends import (
+    EMBEDDING_BACKEND,
+    EMBEDDING_THREADS,
+    encoder_variant,
+    load_encoder,
+    parity_report,
+)
+from app.infrastructure.metrics.metrics import ENCODE_BATCH_SIZE, STAGE_SECONDS
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBEDDING_PRELOAD = os.getenv("EMBEDDING_PRELOAD", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+EMBEDDING_PARITY_CHECK = os.getenv("EMBEDDING_PARITY_CHECK", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+WARMUP_TEXTS = ["判例検索のウォームアップ", "warmup"]
+
+
+class MeasuredEncoder:
+    """
+    encode の所要時間 (stage="encode") と1回に渡したテキスト数を記録するラッパ。
+    encode 以外の属性はそのままモデルに委ねる。
+    """
+
+    def __init__(self, model: TextEncoder) -> None:
+        self.model = model
+
+    def encode(
+        self, sentences: str | list[str], batch_size: int = 32, **kwargs: Any
+    ) -> np.ndarray:
+        started = time.perf_counter()
+        try:
+            return self.model.encode(sentences, batch_size=batch_size, **kwargs)
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage="encode")
+            ENCODE_BATCH_SIZE.observe(
+                1 if isinstance(sentences, str) else len(sentences)
+            )
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.model, name)
+
+
+class ModelRegistry:
+    """
+    埋め込みモデルを遅延ロードし、プロセス内で共有するレジストリ。
+
+    Attributes:
+        model_name: ロード対象のモデル名
+        backend: 推論バックエンド (torch / onnx / onnx-int8)
+        threads: 推論スレッド数（0 ならランタイムの既定値）
+        is_ready: ロードとウォームアップが完了しているか
+        error: 直近のロード失敗理由（失敗していなければ None）
+        parity: torch 版との一致度（parity_check が無効・torch のときは None）
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        backend: str = "torch",
+        threads: int = 0,
+        parity_check: bool = False,
+    ) -> None:
+        self.model_name = model_name
+        self.backend = backend
+        self.threads = threads
+        self.parity_check = parity_check
+        self.error: str | None = None
+        self.parity: dict | None = None
+        self._model: TextEncoder | None = None
+        self._lock = threading.Lock()
+        self._loader: threading.Thread | None = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self._model is not None
+
+    @property
+    def variant(self) -> str:
+        """
+        ベクトルをキャッシュするときのキー (モデル名・バックエンド・量子化)。
+        """
+        return encoder_variant(self.model_name, self.backend)
+
+    def get(self) -> TextEncoder:
+        """
+        モデルを返す。未ロードならこの場でロードする（並行呼び出しでも1回だけ）。
+
+        Returns:
+            TextEncoder: ロード・ウォームアップ済みのモデル
+        """
+        if self._model is None:
+            self.load()
+        return cast(TextEncoder, self._model)
+
+    def load(self) -> None:
+        """
+        モデルをロードしてウォームアップ encode を実行する。ロード済みなら何もしない。
+        """
+        with self._lock:
+            if self._model is not None:
+                return
+            try:
+                model = load_encoder(self.model_name, self.backend, self.threads)
+                model.encode(WARMUP_TEXTS)
+            except Exception as e:
+                self.error = str(e)
+                raise
+            if self.parity_check and self.backend != "torch":
+                self.parity = self._check_parity(model)
+            self.error = None
+            self._model = MeasuredEncoder(model)
+            print(
+                f"埋め込みモデル '{self.model_name}' ({self.backend}) をロードしました。"
+            )
+
+    def _check_parity(self, model: TextEncoder) -> dict:
+        """
+        torch 版を一時的にロードし、model とのコサイン一致度を返す（失敗しても例外にしない）。
+        """
+        try:
+            reference = load_encoder(self.model_name, "torch", self.threads)
+            report = parity_report(model, reference)
+        except Exception as e:
+            print(f"埋め込みモデルの一致度を確認できませんでした: {e}")
+            return {"error": str(e)}
+        print(f"埋め込みモデル ({self.backend}) の torch 版との一致度: {report}")
+        return report
+
+    def load_in_background(self) -> None:
+        """
+        別スレッドでロードを開始する。既にロード済み・ロード中なら何もしない。
+        """
+        with self._lock:
+            if self._model is not None:
+                return
+            if self._loader is not None and self._loader.is_alive():
+                return
+            self._loader = threading.Thread(target=self._load_quietly, daemon=True)
+            self._loader.start()
+
+    def _load_quietly(self) -> None:
+        try:
+            self.load()
+        except Exception as e:
+            print(f"埋め込みモデルのロードに失敗しました: {e}")
+
+
+model_registry = ModelRegistry(
+    EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, EMBEDDING_THREADS, EMBEDDING_PARITY_CHECK
+)
+
+
+def get_encoder() -> TextEncoder:
+    """
+    FastAPI の Depends 用。共有モデルを返す。
+    """
+    return model_registry.get()
@@ -0,0 +1,56 @@
+"""
+インフラ層 - チャンク分割に使うエンコーダのトークナイザ。
+
+チャンクの大きさを埋め込みモデルと同じトークナイザで測るため、モデル本体(torch)は
+読み込まずにトークナイザだけをロードする。PDF解析はプロセスプールで行うため、
+トークナイザはプロセスごとに1回だけロードする。
+transformers が無い・ダウンロードできない環境では文字数で見積もる (pdf_parser.count_chars)。
+
+環境変数:
+- EMBEDDING_TOKENIZER: トークナイザ名 (デフォルトは EMBEDDING_MODEL_NAME と同じモデル)
+"""
+
+import os
+import threading
+
+from app.domain.services.pdf_parser import TokenCounter, count_chars
+from app.infrastructure.embedding.model_registry import EMBEDDING_MODEL_NAME
+
+
+def _default_tokenizer_name(model_name: str) -> str:
+    # sentence-transformers の短縮名は Hugging Face Hub 上の完全名に直す
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+
+EMBEDDING_TOKENIZER = os.getenv(
+    "EMBEDDING_TOKENIZER", _default_tokenizer_name(EMBEDDING_MODEL_NAME)
+)
+
+_counter: TokenCounter | None = None
+_counter_lock = threading.Lock()
+
+
+def _load_counter(name: str) -> TokenCounter:
+    try:
+        from transformers import AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(name)
+    except Exception as e:
+        print(f"トークナイザ '{name}' を読み込めないため、文字数で見積もります: {e}")
+        return count_chars
+
+    def count_tokens(text: str) -> int:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+    return count_tokens
+
+
+def get_token_counter() -> TokenCounter:
+    """
+    EMBEDDING_TOKENIZER でトークン数を数える関数を返す（プロセス内で初回のみロード）。
+    """
+    global _counter
+    with _counter_lock:
+        if _counter is None:
+            _counter = _load_counter(EMBEDDING_TOKENIZER)
+        return _counter
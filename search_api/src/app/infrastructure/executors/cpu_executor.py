@@ -0,0 +1,199 @@
+"""
+インフラ層 - CPU負荷の高い処理をイベントループ外で実行するためのエグゼキュータ。
+
+- PDF解析(pdfplumber)は純Pythonで GIL を握り続けるため、プロセスプールで実行する
+- 埋め込み(encode)は torch が GIL を解放するため、スレッドで実行すれば十分
+- worker_time_limit (SIGALRM) は Python のコードしか打ち切れない。pypdfium2 などの
+  ネイティブコードの中で止まったワーカーは、RecyclingProcessPool で呼び出し側から
+  プールごと作り直して終了させる (API プロセスの共有プールも RecyclingProcessPool)
+CPU_EXECUTOR_WORKERS: API プロセスが持つ PDF 解析用プロセス数 (デフォルト 2)
+"""
+
+import asyncio
+import multiprocessing
+import os
+import signal
+import threading
+from collections.abc import Callable, Iterator
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Any, TypeVar
+
+CPU_EXECUTOR_WORKERS = int(os.getenv("CPU_EXECUTOR_WORKERS", "2"))
+
+T = TypeVar("T")
+
+
+class RecyclingProcessPool:
+    """
+    止まったワーカーを終了させて作り直せるプロセスプール。
+
+    submit は (世代, Future) を返す。recycle で古いプールのワーカーを強制終了すると、
+    古いプールの未完了の Future は BrokenProcessPool / CancelledError で終わるため、
+    呼び出し側は世代を比べて新しいプールへ投入し直す (run はこれを自動で行う)。
+
+    Attributes:
+        generation: プールを作り直した回数
+    """
+
+    def __init__(self, max_workers: int, mp_context: Any = None) -> None:
+        self._max_workers = max(1, max_workers)
+        self._mp_context = mp_context or multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self.generation = 0
+        self._pool = self._new_pool()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self._max_workers, mp_context=self._mp_context
+        )
+
+    def submit(self, func: Callable[..., T], *args: Any) -> tuple[int, "Future[T]"]:
+        with self._lock:
+            return self.generation, self._pool.submit(func, *args)
+
+    def run(self, func: Callable[..., T], *args: Any) -> T:
+        """
+        関数を実行して結果を返す。実行中にプールが作り直されたら投入し直す。
+        """
+        while True:
+            generation, future = self.submit(func, *args)
+            try:
+                return future.result()
+            except (BrokenProcessPool, CancelledError):
+                if generation == self.generation:
+                    raise
+
+    def is_stale(self, generation: int) -> bool:
+        """
+        generation の Future が、作り直し前の古いプールのものか。
+        """
+        return generation != self.generation
+
+    def recycle(self, generation: int) -> None:
+        """
+        generation のプールのワーカーを強制終了し、新しいプールに切り替える
+        (同じ世代に対する2回目以降の呼び出しは何もしない)。
+        """
+        with self._lock:
+            if generation != self.generation:
+                return
+            old = self._pool
+            self._pool = self._new_pool()
+            self.generation += 1
+        # ネイティブコードで止まったワーカーは shutdown では終わらないため、直接終了させる
+        processes = list((getattr(old, "_processes", None) or {}).values())
+        old.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.kill()
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            self._pool.shutdown(wait=wait, cancel_futures=not wait)
+
+    def __enter__(self) -> "RecyclingProcessPool":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        # 止まったワーカーの終了を待たない（未着手の処理は取り消す）
+        self.shutdown(wait=False)
+
+
+_process_pool: RecyclingProcessPool | None = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> RecyclingProcessPool:
+    """
+    共有プロセスプールを返す（初回呼び出し時に生成）。
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = RecyclingProcessPool(
+                CPU_EXECUTOR_WORKERS, multiprocessing.get_context("spawn")
+            )
+        return _process_pool
+
+
+async def run_in_process(
+    func: Callable[..., T],
+    *args: Any,
+    timeout: float | None = None,
+    exc_type: type[Exception] = TimeoutError,
+) -> T:
+    """
+    関数を共有プロセスプールで実行し、イベントループをブロックせずに結果を待つ。
+    timeout 秒を過ぎても終わらなければ、止まったワーカーごとプールを作り直して
+    exc_type を送出する。作り直しで打ち切られた処理は新しいプールで実行し直す。
+
+    Args:
+        func: 実行する関数 (トップレベル関数)
+        args: func の引数
+        timeout: 結果を待つ秒数 (None なら無制限)
+        exc_type: timeout を過ぎたときに送出する例外の型
+    """
+    pool = get_process_pool()
+    while True:
+        generation, future = pool.submit(func, *args)
+        waiter = asyncio.wrap_future(future)
+        try:
+            done, _ = await asyncio.wait({waiter}, timeout=timeout)
+        except asyncio.CancelledError:
+            waiter.cancel()
+            raise
+        if not done:
+            waiter.cancel()
+            pool.recycle(generation)
+            raise exc_type(f"Process task did not finish within {timeout}s")
+        try:
+            return waiter.result()
+        except (BrokenProcessPool, CancelledError, asyncio.CancelledError):
+            if not pool.is_stale(generation):
+                raise
+
+
+def shutdown_process_pool() -> None:
+    """
+    プロセスプールを停止する（アプリ終了時に呼ぶ）。
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False)
+            _process_pool = None
+
+
+@contextmanager
+def worker_time_limit(
+    seconds: float | None, exc_type: type[Exception] = TimeoutError
+) -> Iterator[None]:
+    """
+    プロセスプールのワーカー内で、ブロックの実行時間を seconds 秒に制限する (SIGALRM)。
+    1ページの解析で止まったままになるような処理も打ち切れる。
+    ワーカープロセスのメインスレッド以外(APIプロセス内など)では何もしない。
+
+    Args:
+        seconds: 制限秒数（None なら制限しない）
+        exc_type: 制限を超えたときに送出する例外の型
+    """
+    if (
+        seconds is None
+        or multiprocessing.parent_process() is None
+        or threading.current_thread() is not threading.main_thread()
+        or not hasattr(signal, "setitimer")
+    ):
+        yield
+        return
+
+    def on_alarm(signum: int, frame: Any) -> None:
+        raise exc_type(f"Worker task exceeded {seconds}s")
+
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
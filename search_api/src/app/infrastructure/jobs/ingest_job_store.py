@@ -0,0 +1,272 @@
+"""
+インフラ層 - バルク登録ジョブの永続ストア。
+
+ジョブの進捗・ZIP内の処理済みメンバー(チェックポイント)を SQLite 1ファイル (WAL) に保存する。
+- 再起動してもジョブの状態は残り、どの uvicorn ワーカーからでも参照・キャンセルできる
+- 処理済みメンバーを記録するため、中断したジョブは続きから再開できる
+- 実行中のワーカーは heartbeat を更新し続ける。heartbeat が lease を過ぎたジョブは
+  持ち主が落ちたとみなし、他のワーカー(または再起動後のプロセス)が引き継ぐ
+- 進捗・チェックポイントの書き込みは持ち主(owner)のときだけ成功する。引き継がれた後も
+  動き続けていた元のワーカーは、書き込みに失敗したことで持ち主でなくなったと分かる
+- エラーで止まったジョブはチェックポイントを残し、claim_failed で再開できる
+
+環境変数:
+- INGEST_JOB_DB: SQLite ファイルのパス
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+INGEST_JOB_DB = os.getenv("INGEST_JOB_DB", "data/jobs/ingest_jobs.sqlite3")
+
+_ACTIVE = "in_progress"
+_ERROR = "error"
+
+
+@dataclass
+class IngestJob:
+    """
+    再開対象として引き継いだジョブ。
+
+    Attributes:
+        task_id: ジョブID
+        zip_path: アップロード済みZIPのパス
+        status: 最後に保存された進捗
+    """
+
+    task_id: str
+    zip_path: str
+    status: dict
+
+
+class IngestJobStore:
+    """
+    バルク登録ジョブのストア（スレッド・プロセス間で共有可）。
+
+    Attributes:
+        path: SQLite ファイルのパス
+    """
+
+    def __init__(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=30.0, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " task_id TEXT PRIMARY KEY, state TEXT NOT NULL, zip_path TEXT NOT NULL,"
+            " status TEXT NOT NULL, cancel_requested INTEGER NOT NULL DEFAULT 0,"
+            " owner TEXT, heartbeat REAL NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS members ("
+            " task_id TEXT NOT NULL, member TEXT NOT NULL, failed INTEGER NOT NULL,"
+            " PRIMARY KEY (task_id, member)) WITHOUT ROWID"
+        )
+
+    def create(self, task_id: str, zip_path: str, status: dict, owner: str) -> None:
+        """
+        ジョブを登録する。
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (task_id, state, zip_path, status, owner,"
+                " heartbeat, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    task_id,
+                    status.get("status", _ACTIVE),
+                    zip_path,
+                    json.dumps(status, ensure_ascii=False),
+                    owner,
+                    now,
+                    now,
+                ),
+            )
+
+    def get(self, task_id: str) -> dict | None:
+        """
+        ジョブの進捗を返す（無ければ None）。
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, cancel_requested FROM jobs WHERE task_id = ?",
+                (task_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        status = json.loads(row[0])
+        status["cancel_requested"] = bool(row[1])
+        return status
+
+    def update(self, task_id: str, status: dict, owner: str) -> bool:
+        """
+        進捗を保存し、heartbeat を更新する。
+        owner がジョブの持ち主でなければ (他のワーカーに引き継がれていれば) 何もせず False を返す。
+        """
+        with self._lock:
+            return (
+                self._conn.execute(
+                    "UPDATE jobs SET state = ?, status = ?, heartbeat = ?"
+                    " WHERE task_id = ? AND owner = ?",
+                    (
+                        status.get("status", _ACTIVE),
+                        json.dumps(status, ensure_ascii=False),
+                        time.time(),
+                        task_id,
+                        owner,
+                    ),
+                ).rowcount
+                > 0
+            )
+
+    def request_cancel(self, task_id: str) -> bool:
+        """
+        実行中のジョブにキャンセルを要求する。要求できたら True を返す。
+        """
+        with self._lock:
+            return (
+                self._conn.execute(
+                    "UPDATE jobs SET cancel_requested = 1"
+                    " WHERE task_id = ? AND state = ?",
+                    (task_id, _ACTIVE),
+                ).rowcount
+                > 0
+            )
+
+    def is_cancel_requested(self, task_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cancel_requested FROM jobs WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        return bool(row and row[0])
+
+    def add_checkpoints(
+        self, task_id: str, members: list[tuple[str, bool]], owner: str
+    ) -> bool:
+        """
+        処理を終えた ZIP メンバーを記録する。
+
+        Args:
+            task_id: ジョブID
+            members: (メンバー名, 解析に失敗したか) のリスト
+            owner: 書き込むワーカー
+
+        Returns:
+            bool: owner がジョブの持ち主でなければ記録せず False
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT 1 FROM jobs WHERE task_id = ? AND owner = ?",
+                    (task_id, owner),
+                ).fetchone()
+                if row is not None:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO members VALUES (?, ?, ?)",
+                        [(task_id, name, int(failed)) for name, failed in members],
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return row is not None
+
+    def completed_members(self, task_id: str) -> dict[str, bool]:
+        """
+        処理済みメンバー → 解析に失敗したか、を返す。
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT member, failed FROM members WHERE task_id = ?", (task_id,)
+            ).fetchall()
+        return {member: bool(failed) for member, failed in rows}
+
+    def claim_stale(self, owner: str, lease_seconds: float) -> list[IngestJob]:
+        """
+        heartbeat が lease_seconds 以上途絶えた実行中ジョブを owner が引き継ぐ。
+        (同じジョブを複数のワーカーが引き継ぐことはない)
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT task_id, zip_path, status FROM jobs"
+                    " WHERE state = ? AND heartbeat < ?",
+                    (_ACTIVE, now - lease_seconds),
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE jobs SET owner = ?, heartbeat = ? WHERE task_id = ?",
+                    [(owner, now, task_id) for task_id, _, _ in rows],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [IngestJob(t, z, json.loads(s)) for t, z, s in rows]
+
+    def claim_failed(self, task_id: str, owner: str) -> IngestJob | None:
+        """
+        エラーで止まったジョブを owner が引き継ぎ、実行中に戻す
+        (同じジョブを複数のワーカーが引き継ぐことはない)。対象が無ければ None。
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT zip_path, status FROM jobs WHERE task_id = ? AND state = ?",
+                    (task_id, _ERROR),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET state = ?, owner = ?, heartbeat = ?,"
+                        " cancel_requested = 0 WHERE task_id = ?",
+                        (_ACTIVE, owner, time.time(), task_id),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return None if row is None else IngestJob(task_id, row[0], json.loads(row[1]))
+
+    def delete_checkpoints(self, task_id: str) -> None:
+        """
+        終了したジョブのチェックポイントを削除する（進捗は残す）。
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM members WHERE task_id = ?", (task_id,))
+
+
+_store: IngestJobStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_ingest_job_store() -> IngestJobStore:
+    """
+    プロセス内で共有するジョブストアを返す（初回呼び出し時に生成）。
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = IngestJobStore(INGEST_JOB_DB)
+        return _store
+
+
+def set_ingest_job_store(store: IngestJobStore | None) -> None:
+    """
+    使用するジョブストアを差し替える（テスト用）。None なら次回 INGEST_JOB_DB から作り直す。
+    """
+    global _store
+    with _store_lock:
+        _store = store
@@ -0,0 +1,287 @@
+"""
+インフラ層 - 分割アップロード(アップロードセッション)の永続ストア。
+
+セッションごとの ZIP の大きさ・パートサイズと、受け取ったパートの番号・SHA-256 を
+SQLite (WAL) に保存する。パートはどの uvicorn ワーカーが受け取ってもよく、
+再起動後も「どのパートが足りないか」を答えられる。
+パートの受信を始めた時点でそのパートの記録を消し、照合に成功してから記録し直す。
+照合に失敗した再送が ZIP を書き換えても、そのパートは足りないままになる。
+
+環境変数:
+- UPLOAD_SESSION_DB: SQLite ファイルのパス (既定はジョブストアと同じファイル)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+from app.infrastructure.jobs.ingest_job_store import INGEST_JOB_DB
+
+UPLOAD_SESSION_DB = os.getenv("UPLOAD_SESSION_DB", INGEST_JOB_DB)
+
+_OPEN = "open"
+_COMMITTED = "committed"
+_COLUMNS = (
+    "session_id, zip_path, total_size, part_size, state, created_at,"
+    " COALESCE(updated_at, created_at)"
+)
+
+
+@dataclass
+class UploadSession:
+    """
+    1つのアップロードセッション。
+
+    Attributes:
+        session_id: セッションID (コミット後はバルク登録のタスクIDになる)
+        zip_path: パートを書き込む ZIP のパス
+        total_size: ZIP 全体のバイト数
+        part_size: 最後のパート以外の1パートのバイト数
+        state: "open" (受付中) / "committed" (登録処理を開始済み)
+        created_at: 作成時刻 (UNIX 秒)
+        updated_at: 最後にパートの受信を始めた・終えた時刻 (UNIX 秒)
+    """
+
+    session_id: str
+    zip_path: str
+    total_size: int
+    part_size: int
+    state: str
+    created_at: float
+    updated_at: float
+
+    @property
+    def part_count(self) -> int:
+        return max(1, -(-self.total_size // self.part_size))
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == _OPEN
+
+    def part_range(self, part_number: int) -> tuple[int, int]:
+        """
+        パート番号 (1 始まり) の (開始オフセット, バイト数) を返す。
+        """
+        offset = (part_number - 1) * self.part_size
+        return offset, min(self.part_size, self.total_size - offset)
+
+
+class UploadSessionStore:
+    """
+    アップロードセッションのストア（スレッド・プロセス間で共有可）。
+
+    Attributes:
+        path: SQLite ファイルのパス
+    """
+
+    def __init__(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=30.0, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS upload_sessions ("
+            " session_id TEXT PRIMARY KEY, zip_path TEXT NOT NULL,"
+            " total_size INTEGER NOT NULL, part_size INTEGER NOT NULL,"
+            " state TEXT NOT NULL, created_at REAL NOT NULL, updated_at REAL)"
+        )
+        columns = {
+            row[1] for row in self._conn.execute("PRAGMA table_info(upload_sessions)")
+        }
+        if "updated_at" not in columns:
+            self._conn.execute("ALTER TABLE upload_sessions ADD COLUMN updated_at REAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS upload_parts ("
+            " session_id TEXT NOT NULL, part_number INTEGER NOT NULL,"
+            " sha256 TEXT NOT NULL, PRIMARY KEY (session_id, part_number)) WITHOUT ROWID"
+        )
+
+    def create(self, session: UploadSession) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO upload_sessions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    session.session_id,
+                    session.zip_path,
+                    session.total_size,
+                    session.part_size,
+                    session.state,
+                    session.created_at,
+                    session.updated_at,
+                ),
+            )
+
+    def get(self, session_id: str) -> UploadSession | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM upload_sessions WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+        return None if row is None else UploadSession(*row)
+
+    def _touch_open(self, session_id: str) -> bool:
+        """
+        受付中のセッションの最終操作時刻を更新する。受付中でなければ False。
+        (呼び出し側のトランザクション内で使う)
+        """
+        return (
+            self._conn.execute(
+                "UPDATE upload_sessions SET updated_at = ?"
+                " WHERE session_id = ? AND state = ?",
+                (time.time(), session_id, _OPEN),
+            ).rowcount
+            > 0
+        )
+
+    def begin_part(self, session_id: str, part_number: int) -> bool:
+        """
+        パートの受信を始める。ZIP に書き込む前に受け取り済みの記録を消し、
+        照合に失敗した再送が受け取り済みのまま残らないようにする。
+        セッションが受付中でなければ何もせず False を返す。
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if not self._touch_open(session_id):
+                    return False
+                self._conn.execute(
+                    "DELETE FROM upload_parts WHERE session_id = ? AND part_number = ?",
+                    (session_id, part_number),
+                )
+                return True
+            finally:
+                self._conn.execute("COMMIT")
+
+    def mark_part(self, session_id: str, part_number: int, sha256: str) -> bool:
+        """
+        照合に成功したパートを受け取り済みにする（同じ番号の再送は上書き）。
+        セッションが受付中でなければ何もせず False を返す。
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if not self._touch_open(session_id):
+                    return False
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO upload_parts VALUES (?, ?, ?)",
+                    (session_id, part_number, sha256),
+                )
+                return True
+            finally:
+                self._conn.execute("COMMIT")
+
+    def received_parts(self, session_id: str) -> dict[int, str]:
+        """
+        受け取り済みのパート番号 → SHA-256 を返す。
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT part_number, sha256 FROM upload_parts WHERE session_id = ?",
+                (session_id,),
+            ).fetchall()
+        return dict(rows)
+
+    def commit(self, session_id: str) -> bool:
+        """
+        全パートが受け取り済みの受付中セッションをコミット済みにする。
+        状態を変えたら True を返す (同時にコミットされても True になるのは1回だけ。
+        受信中のパートがあれば、その記録が消えているためコミットされない)。
+        """
+        with self._lock:
+            return (
+                self._conn.execute(
+                    "UPDATE upload_sessions SET state = ?, updated_at = ?"
+                    " WHERE session_id = ? AND state = ?"
+                    " AND (SELECT COUNT(*) FROM upload_parts p"
+                    "      WHERE p.session_id = upload_sessions.session_id)"
+                    "     >= MAX(1, (total_size + part_size - 1) / part_size)",
+                    (_COMMITTED, time.time(), session_id, _OPEN),
+                ).rowcount
+                > 0
+            )
+
+    def delete(self, session_id: str) -> None:
+        """
+        セッションとパートの記録を削除する。
+        """
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM upload_parts WHERE session_id = ?", (session_id,)
+            )
+            self._conn.execute(
+                "DELETE FROM upload_sessions WHERE session_id = ?", (session_id,)
+            )
+
+    def delete_parts(self, session_id: str) -> None:
+        """
+        パートの記録だけを削除する（コミット後は不要になる）。
+        """
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM upload_parts WHERE session_id = ?", (session_id,)
+            )
+
+    def open_sessions_idle_since(self, updated_before: float) -> list[UploadSession]:
+        """
+        updated_before 以降に操作されておらず、まだコミットされていないセッションを返す。
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM upload_sessions"
+                " WHERE state = ? AND COALESCE(updated_at, created_at) < ?",
+                (_OPEN, updated_before),
+            ).fetchall()
+        return [UploadSession(*row) for row in rows]
+
+    def delete_committed_idle_since(self, updated_before: float) -> int:
+        """
+        updated_before より前にコミットされたセッションの記録を削除する
+        (ZIP はバルク登録ジョブが終了時に削除する)。
+        """
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM upload_sessions"
+                " WHERE state = ? AND COALESCE(updated_at, created_at) < ?",
+                (_COMMITTED, updated_before),
+            ).rowcount
+
+
+_store: UploadSessionStore | None = None
+_store_lock = threading.Lock()
+
+
+def new_upload_session(
+    session_id: str, zip_path: str, total_size: int, part_size: int
+) -> UploadSession:
+    """
+    受付中の新しいセッションを作る（ストアには保存しない）。
+    """
+    now = time.time()
+    return UploadSession(session_id, zip_path, total_size, part_size, _OPEN, now, now)
+
+
+def get_upload_session_store() -> UploadSessionStore:
+    """
+    プロセス内で共有するセッションストアを返す（初回呼び出し時に生成）。
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = UploadSessionStore(UPLOAD_SESSION_DB)
+        return _store
+
+
+def set_upload_session_store(store: UploadSessionStore | None) -> None:
+    """
+    使用するセッションストアを差し替える（テスト用）。
+    """
+    global _store
+    with _store_lock:
+        _store = store
@@ -0,0 +1,603 @@
+"""
+インフラ層 - 日本語チャンクの BM25 転置インデックス。
+
+埋め込みでは拾いにくい事件番号・条文番号・裁判所名などを、語の一致で検索するための索引。
+エンコーダを通さないため、語彙検索だけならミリ秒単位で応答できる。
+
+- ポスティングは語ごとの配列 (文書番号 uint32, 出現回数 uint32) で持つ
+- チャンク本文は持たない。検索結果の本文はチャンクストアから付ける (judgment_chunk_text)
+- 削除は墓標 (alive フラグ) で表し、スナップショットを書き直すときに詰め直す
+- 保存形式はスナップショット (npz 1ファイル。文字列も UTF-8 のバイト列 + オフセット配列) と
+  差分ログ (commit ごとに変更を JSON 1行で追記)。commit は変更分だけを書くため、
+  CRUD の1件ごとの書き込みでも索引全体を書き直さない
+- 書き込みは add_documents / remove_* で溜めて commit で確定する。commit はファイルロックを
+  取り、他ワーカーの追記を読み込んでから適用・追記するため、複数ワーカーでも更新を失わない
+- 差分ログが大きくなったら、バックグラウンドのスレッドがスナップショットを書き直して
+  新しい空のログに切り替える (compact)。スナップショットは一時ファイルに書いてから
+  os.replace で差し替え、ログはスナップショットごとに別ファイルにするため、
+  読み手が壊れた索引や取り込み済みのログを読むことはない
+- 検索時はスナップショットとログの更新を stat で確認し、他ワーカーの更新があれば読み込む
+
+環境変数:
+- LEXICAL_INDEX_DIR: 保存先ディレクトリ (空文字ならメモリ上のみ)
+- BM25_K1 / BM25_B: BM25 のパラメータ
+- LEXICAL_COMPACT_MIN_BYTES / LEXICAL_COMPACT_RATIO: 差分ログが
+  max(MIN_BYTES, スナップショットの大きさ × RATIO) を超えたらスナップショットを書き直す
+"""
+
+import fcntl
+import json
+import os
+import threading
+import uuid
+from array import array
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", "data/lexical_index")
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+LEXICAL_COMPACT_MIN_BYTES = int(
+    os.getenv("LEXICAL_COMPACT_MIN_BYTES", str(8 * 1024 * 1024))
+)
+LEXICAL_COMPACT_RATIO = float(os.getenv("LEXICAL_COMPACT_RATIO", "0.5"))
+
+_INDEX_FILE = "bm25_index.npz"
+_LOG_FILE = "bm25_index.{log_id}.log"
+_LOCK_FILE = "bm25_index.lock"
+_FORMAT_VERSION = 2
+# 1 は本文を持っていた頃の形式 (読み込むときに本文は捨てる)
+_READABLE_FORMATS = (1, _FORMAT_VERSION)
+_INITIAL_LOG_ID = "0"
+_STALE = (-1, -1, -1)
+
+
+@dataclass
+class LexicalDocument:
+    """
+    索引に登録する1チャンク分の情報。
+
+    Attributes:
+        point_id: Qdrant のポイントID（同じIDは二重登録しない）
+        judgment_id: 判例ID
+        chunk_index: 判例内でのチャンク番号
+        terms: {検索語: 出現回数}
+    """
+
+    point_id: str
+    judgment_id: str
+    chunk_index: int
+    terms: dict[str, int]
+
+
+def _pack_strings(values: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded], dtype=np.int64)
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_strings(data: np.ndarray, offsets: np.ndarray) -> list[str]:
+    raw = data.tobytes()
+    bounds = offsets.tolist()
+    return [raw[a:b].decode("utf-8") for a, b in zip(bounds, bounds[1:], strict=False)]
+
+
+def _encode_op(op: str, arg: object) -> list:
+    if op == "add":
+        docs: list[LexicalDocument] = arg  # type: ignore[assignment]
+        return [op, [[d.point_id, d.judgment_id, d.chunk_index, d.terms] for d in docs]]
+    return [op, arg]
+
+
+def _decode_op(record: list) -> tuple[str, object]:
+    op, arg = record
+    if op == "add":
+        return op, [LexicalDocument(*row) for row in arg]
+    return op, arg
+
+
+class Bm25Index:
+    """
+    チャンク単位の BM25 転置インデックス（スレッド・ワーカープロセス間で共有可）。
+
+    Attributes:
+        directory: 保存先ディレクトリ（空文字ならメモリ上のみ）
+        k1: 語の出現回数の飽和度
+        b: 文書長による正規化の強さ
+    """
+
+    def __init__(self, directory: str, k1: float = BM25_K1, b: float = BM25_B) -> None:
+        self.directory = directory
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        # commit と compact を直列にする (ファイルロックより先に取る)
+        self._commit_lock = threading.Lock()
+        self._compactor: threading.Thread | None = None
+        self._pending: list[tuple[str, object]] = []
+        self._pending_points: set[str] = set()
+        self._loaded_stamp: tuple[int, int, int] | None = None
+        self._log_id = _INITIAL_LOG_ID
+        self._log_offset = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._reset()
+
+    # ---- 状態 -------------------------------------------------------------
+
+    def _reset(self) -> None:
+        self._terms: dict[str, int] = {}
+        self._post_docs: list[array] = []
+        self._post_tfs: list[array] = []
+        self._point_ids: list[str] = []
+        self._judgment_ids: list[str] = []
+        self._chunk_index = array("I")
+        self._doc_len = array("I")
+        self._alive = bytearray()
+        self._doc_by_point: dict[str, int] = {}
+        self._docs_by_judgment: dict[str, list[int]] = {}
+        self._live_count = 0
+        self._live_length = 0
+        self._search_arrays: tuple[np.ndarray, np.ndarray] | None = None
+
+    @property
+    def _path(self) -> str:
+        return os.path.join(self.directory, _INDEX_FILE)
+
+    def _log_path(self, log_id: str) -> str:
+        return os.path.join(self.directory, _LOG_FILE.format(log_id=log_id))
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self._live_count
+
+    # ---- 書き込み ---------------------------------------------------------
+
+    def add_documents(self, documents: list[LexicalDocument]) -> None:
+        """
+        文書の追加を予約する（commit で確定）。登録済みのポイントIDは無視される。
+        """
+        if documents:
+            with self._lock:
+                self._pending.append(("add", documents))
+                self._pending_points.update(doc.point_id for doc in documents)
+
+    def remove_points(self, point_ids: list[str]) -> None:
+        """
+        ポイントID指定の削除を予約する（commit で確定）。
+        """
+        if point_ids:
+            with self._lock:
+                self._pending.append(("remove_points", list(point_ids)))
+
+    def remove_judgment(self, judgment_id: str) -> None:
+        """
+        判例に属する全チャンクの削除を予約する（commit で確定）。
+        """
+        with self._lock:
+            self._pending.append(("remove_judgment", judgment_id))
+
+    def missing(self, point_ids: list[str]) -> set[str]:
+        """
+        索引に（生きた状態で）存在しないポイントIDを返す。commit 待ちの追加も考慮する。
+        """
+        with self._lock:
+            self._refresh()
+            result = set()
+            for point_id in point_ids:
+                if point_id in self._pending_points:
+                    continue
+                idx = self._doc_by_point.get(point_id)
+                if idx is None or not self._alive[idx]:
+                    result.add(point_id)
+            return result
+
+    def commit(self) -> None:
+        """
+        予約した変更を適用し、差分ログへ追記する。
+        ログが大きくなっていれば、バックグラウンドでスナップショットを書き直す。
+        """
+        with self._lock:
+            if not self._pending:
+                return
+        with self._commit_lock, self._file_lock(), self._lock:
+            if not self._pending:
+                return
+            # 他ワーカーの追記を取り込んでから適用する(追加・削除はどちらも冪等)
+            self._refresh()
+            try:
+                for op, arg in self._pending:
+                    self._apply(op, arg)
+                self._append_log(self._pending)
+            except Exception:
+                # 途中まで適用したメモリ上の状態は捨て、次回ディスクから読み直す
+                self._loaded_stamp = _STALE
+                raise
+            self._pending.clear()
+            self._pending_points.clear()
+            self._search_arrays = None
+            if not self.directory:
+                if self._dead_count() > self._live_count:
+                    self._compact()
+                return
+            needs_compaction = self._needs_compaction()
+        if needs_compaction:
+            self._compact_in_background()
+
+    def compact(self) -> None:
+        """
+        差分ログまでを取り込んだスナップショットを書き出し、新しい空のログに切り替える。
+        墓標になった文書もここで詰め直す。通常は commit がバックグラウンドで呼ぶ。
+        """
+        if not self.directory:
+            with self._lock:
+                self._compact()
+            return
+        with self._commit_lock, self._file_lock():
+            with self._lock:
+                self._refresh()
+                if self._dead_count():
+                    self._compact()
+                arrays = self._snapshot_arrays()
+                old_log_id = self._log_id
+            # 書き出しの間も検索は止めない (書き込みは commit_lock とファイルロックで止まっている)
+            log_id = uuid.uuid4().hex
+            open(self._log_path(log_id), "wb").close()
+            tmp_path = f"{self._path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, log_id=np.array(log_id), **arrays)
+            os.replace(tmp_path, self._path)
+            with self._lock:
+                self._log_id, self._log_offset = log_id, 0
+                self._loaded_stamp = self._disk_stamp()
+            try:
+                os.remove(self._log_path(old_log_id))
+            except FileNotFoundError:
+                pass
+
+    def _compact_in_background(self) -> None:
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(
+                target=self._compact_quietly, daemon=True
+            )
+            self._compactor.start()
+
+    def _compact_quietly(self) -> None:
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"語彙索引の圧縮に失敗しました: {e}")
+
+    def _dead_count(self) -> int:
+        return len(self._point_ids) - self._live_count
+
+    def _needs_compaction(self) -> bool:
+        if self._dead_count() > self._live_count:
+            return True
+        snapshot_bytes = self._loaded_stamp[2] if self._loaded_stamp else 0
+        return self._log_offset >= max(
+            LEXICAL_COMPACT_MIN_BYTES, LEXICAL_COMPACT_RATIO * snapshot_bytes
+        )
+
+    def _apply(self, op: str, arg: object) -> None:
+        if op == "add":
+            for doc in arg:  # type: ignore[attr-defined]
+                self._add(doc)
+        elif op == "remove_points":
+            for point_id in arg:  # type: ignore[attr-defined]
+                idx = self._doc_by_point.get(point_id)
+                if idx is not None:
+                    self._kill(idx)
+        elif op == "remove_judgment":
+            for idx in self._docs_by_judgment.pop(str(arg), []):
+                self._kill(idx)
+
+    def _add(self, doc: LexicalDocument) -> None:
+        idx = self._doc_by_point.get(doc.point_id)
+        if idx is not None and self._alive[idx]:
+            return
+        idx = len(self._point_ids)
+        length = sum(doc.terms.values())
+        self._point_ids.append(doc.point_id)
+        self._judgment_ids.append(doc.judgment_id)
+        self._chunk_index.append(doc.chunk_index)
+        self._doc_len.append(length)
+        self._alive.append(1)
+        self._doc_by_point[doc.point_id] = idx
+        self._docs_by_judgment.setdefault(doc.judgment_id, []).append(idx)
+        self._live_count += 1
+        self._live_length += length
+        for term, tf in doc.terms.items():
+            tid = self._terms.get(term)
+            if tid is None:
+                tid = self._terms[term] = len(self._post_docs)
+                self._post_docs.append(array("I"))
+                self._post_tfs.append(array("I"))
+            self._post_docs[tid].append(idx)
+            self._post_tfs[tid].append(tf)
+
+    def _kill(self, idx: int) -> None:
+        if self._alive[idx]:
+            self._alive[idx] = 0
+            self._live_count -= 1
+            self._live_length -= self._doc_len[idx]
+
+    def _compact(self) -> None:
+        """
+        墓標になった文書をポスティングから取り除き、文書番号を詰め直す。
+        """
+        alive = np.frombuffer(bytes(self._alive), dtype=np.uint8).astype(bool)
+        remap = np.cumsum(alive, dtype=np.int64) - 1
+        keep = np.flatnonzero(alive).tolist()
+
+        terms: dict[str, int] = {}
+        post_docs: list[array] = []
+        post_tfs: list[array] = []
+        for term, tid in self._terms.items():
+            docs = np.array(self._post_docs[tid], dtype=np.uint32)
+            live = alive[docs]
+            if not live.any():
+                continue
+            terms[term] = len(post_docs)
+            post_docs.append(array("I", remap[docs[live]].astype(np.uint32).tobytes()))
+            post_tfs.append(array("I", np.array(self._post_tfs[tid])[live].tobytes()))
+
+        point_ids = [self._point_ids[i] for i in keep]
+        judgment_ids = [self._judgment_ids[i] for i in keep]
+        chunk_index = array("I", [self._chunk_index[i] for i in keep])
+        doc_len = array("I", [self._doc_len[i] for i in keep])
+        self._load_state(terms, post_docs, post_tfs, point_ids, judgment_ids)
+        self._chunk_index, self._doc_len = chunk_index, doc_len
+        self._alive = bytearray(b"\x01" * len(keep))
+        self._live_count = len(keep)
+        self._live_length = int(sum(doc_len))
+        self._search_arrays = None
+
+    def _load_state(
+        self,
+        terms: dict[str, int],
+        post_docs: list[array],
+        post_tfs: list[array],
+        point_ids: list[str],
+        judgment_ids: list[str],
+    ) -> None:
+        self._terms, self._post_docs, self._post_tfs = terms, post_docs, post_tfs
+        self._point_ids, self._judgment_ids = point_ids, judgment_ids
+        self._doc_by_point = {pid: i for i, pid in enumerate(point_ids)}
+        self._docs_by_judgment = {}
+        for i, judgment_id in enumerate(judgment_ids):
+            self._docs_by_judgment.setdefault(judgment_id, []).append(i)
+
+    # ---- 永続化 -----------------------------------------------------------
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        if not self.directory:
+            yield
+            return
+        with open(os.path.join(self.directory, _LOCK_FILE), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _disk_stamp(self) -> tuple[int, int, int] | None:
+        try:
+            st = os.stat(self._path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _refresh(self) -> None:
+        """
+        他ワーカーがスナップショットを書き直していれば読み直し、差分ログの続きを取り込む。
+        """
+        if not self.directory:
+            return
+        while True:
+            stamp = self._disk_stamp()
+            if stamp != self._loaded_stamp:
+                if stamp is None:
+                    self._reset()
+                    self._log_id = _INITIAL_LOG_ID
+                else:
+                    self._load()
+                self._log_offset = 0
+                self._search_arrays = None
+                self._loaded_stamp = stamp
+            try:
+                self._replay_log()
+                return
+            except FileNotFoundError:
+                # ログが無い: まだ誰も書いていないか、読む間に圧縮されて消えた
+                if self._disk_stamp() == self._loaded_stamp:
+                    return
+
+    def _replay_log(self) -> None:
+        """
+        差分ログのうち、まだ取り込んでいない行を適用する（書きかけの最後の行は読まない）。
+        """
+        path = self._log_path(self._log_id)
+        if os.path.getsize(path) <= self._log_offset:
+            return
+        with open(path, "rb") as f:
+            f.seek(self._log_offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return
+        for line in data[:end].splitlines():
+            for record in json.loads(line)["ops"]:
+                self._apply(*_decode_op(record))
+        self._log_offset += end
+        self._search_arrays = None
+
+    def _append_log(self, ops: list[tuple[str, object]]) -> None:
+        if not self.directory:
+            return
+        line = json.dumps(
+            {"ops": [_encode_op(op, arg) for op, arg in ops]},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        record = line.encode("utf-8") + b"\n"
+        with open(self._log_path(self._log_id), "ab") as f:
+            if f.tell() != self._log_offset:
+                # 書き込み途中で落ちたワーカーの残骸を捨てる
+                f.truncate(self._log_offset)
+            f.write(record)
+        self._log_offset += len(record)
+
+    def _load(self) -> None:
+        with np.load(self._path) as data:
+            if int(data["format"]) not in _READABLE_FORMATS:
+                raise ValueError(f"Unsupported lexical index format: {data['format']}")
+            log_id = str(data["log_id"]) if "log_id" in data.files else _INITIAL_LOG_ID
+            term_list = _unpack_strings(data["terms"], data["term_offsets"])
+            post_offsets = data["post_offsets"].tolist()
+            docs_raw = data["post_docs"].astype(np.uint32).tobytes()
+            tfs_raw = data["post_tfs"].astype(np.uint32).tobytes()
+            point_ids = _unpack_strings(data["point_ids"], data["point_offsets"])
+            judgment_ids = _unpack_strings(
+                data["judgment_ids"], data["judgment_offsets"]
+            )
+            chunk_index = array("I", data["chunk_index"].astype(np.uint32).tobytes())
+            doc_len = array("I", data["doc_len"].astype(np.uint32).tobytes())
+            alive = bytearray(data["alive"].astype(np.uint8).tobytes())
+
+        post_docs, post_tfs = [], []
+        for a, b in zip(post_offsets, post_offsets[1:], strict=False):
+            post_docs.append(array("I", docs_raw[a * 4 : b * 4]))
+            post_tfs.append(array("I", tfs_raw[a * 4 : b * 4]))
+        terms = {term: i for i, term in enumerate(term_list)}
+        self._load_state(terms, post_docs, post_tfs, point_ids, judgment_ids)
+        self._chunk_index, self._doc_len = chunk_index, doc_len
+        self._alive = alive
+        self._log_id = log_id
+        # 墓標の文書は判例→文書の対応からも外す
+        self._docs_by_judgment = {
+            jid: [i for i in idxs if alive[i]]
+            for jid, idxs in self._docs_by_judgment.items()
+        }
+        lengths = np.array(doc_len, dtype=np.int64)
+        live = np.frombuffer(bytes(alive), dtype=np.uint8).astype(bool)
+        self._live_count = int(live.sum())
+        self._live_length = int(lengths[live].sum())
+
+    def _snapshot_arrays(self) -> dict[str, Any]:
+        """
+        スナップショットとして保存する配列を作る（呼び出し側で self._lock を取る）。
+        """
+        term_list = [""] * len(self._terms)
+        for term, tid in self._terms.items():
+            term_list[tid] = term
+        lengths = [len(p) for p in self._post_docs]
+        post_offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        post_offsets[1:] = np.cumsum(lengths, dtype=np.int64)
+        terms, term_offsets = _pack_strings(term_list)
+        point_ids, point_offsets = _pack_strings(self._point_ids)
+        judgment_ids, judgment_offsets = _pack_strings(self._judgment_ids)
+        return {
+            "format": np.array(_FORMAT_VERSION),
+            "terms": terms,
+            "term_offsets": term_offsets,
+            "post_offsets": post_offsets,
+            "post_docs": np.frombuffer(
+                b"".join(p.tobytes() for p in self._post_docs), dtype=np.uint32
+            ),
+            "post_tfs": np.frombuffer(
+                b"".join(p.tobytes() for p in self._post_tfs), dtype=np.uint32
+            ),
+            "point_ids": point_ids,
+            "point_offsets": point_offsets,
+            "judgment_ids": judgment_ids,
+            "judgment_offsets": judgment_offsets,
+            "chunk_index": np.array(self._chunk_index, dtype=np.uint32),
+            "doc_len": np.array(self._doc_len, dtype=np.uint32),
+            "alive": np.frombuffer(bytes(self._alive), dtype=np.uint8),
+        }
+
+    # ---- 検索 -------------------------------------------------------------
+
+    def search(self, terms: list[str], limit: int = 5) -> list[dict]:
+        """
+        検索語で BM25 スコアを計算し、上位 limit 件のチャンクを返す。
+
+        Args:
+            terms: 検索語（lexical_tokenizer.tokenize の結果）
+            limit: 取得する件数
+
+        Returns:
+            List[Dict]: {"id": str, "payload": dict, "score": float} のスコア降順
+            (payload は judgment_id と chunk_index。本文は attach_chunk_texts で付ける)
+        """
+        with self._lock:
+            self._refresh()
+            if self._live_count == 0 or limit <= 0:
+                return []
+            n_docs = len(self._point_ids)
+            avg_len = self._live_length / self._live_count
+            if self._search_arrays is None:
+                # 書き込み・読み直しまでの間、検索ごとに作り直さない
+                self._search_arrays = (
+                    np.frombuffer(bytes(self._alive), dtype=np.uint8).astype(
+                        np.float32
+                    ),
+                    np.array(self._doc_len, dtype=np.float32),
+                )
+            alive, doc_len = self._search_arrays
+            scores = np.zeros(n_docs, dtype=np.float32)
+            for term in set(terms):
+                tid = self._terms.get(term)
+                if tid is None:
+                    continue
+                docs = np.array(self._post_docs[tid], dtype=np.int64)
+                tfs = np.array(self._post_tfs[tid], dtype=np.float32)
+                live = alive[docs]
+                df = float(live.sum())
+                if df == 0:
+                    continue
+                idf = np.log1p((self._live_count - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * doc_len[docs] / avg_len)
+                scores[docs] += live * idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+            candidates = np.flatnonzero(scores > 0)
+            if len(candidates) > limit:
+                top = np.argpartition(-scores[candidates], limit - 1)[:limit]
+                candidates = candidates[top]
+            ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+            return [
+                {
+                    "id": self._point_ids[i],
+                    "payload": {
+                        "judgment_id": self._judgment_ids[i],
+                        "chunk_index": self._chunk_index[i],
+                    },
+                    "score": float(scores[i]),
+                }
+                for i in ranked.tolist()
+            ]
+
+
+_index: Bm25Index | None = None
+_index_lock = threading.Lock()
+
+
+def get_lexical_index() -> Bm25Index:
+    """
+    プロセス内で共有する BM25 索引を返す（初回呼び出し時に生成）。
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = Bm25Index(LEXICAL_INDEX_DIR)
+        return _index
@@ -0,0 +1,277 @@
+"""
+インフラ層 - 処理ステージごとのメトリクス (Prometheus テキスト形式)。
+
+ヒストグラム・カウンタ・ゲージをプロセス内に保持し、/metrics で
+Prometheus のテキスト形式 (text/plain; version=0.0.4) として返す。
+- 記録はロック1回と bisect だけで済ませ、検索・登録の処理時間にほぼ影響しない
+- キャッシュのヒット数など、既に他で数えている値は add_collector で
+  スクレイプ時にだけ読み出す（記録側に処理を足さない）
+- 値はプロセスごとに持つ。uvicorn を複数ワーカーで動かす場合は、
+  ワーカーごとにスクレイプするか Prometheus 側で合算する
+
+主なメトリクス:
+- judgment_stage_duration_seconds{stage}: PDF抽出・チャンク化・エンコード・
+  ベクトルストアの各操作の所要時間
+- judgment_encode_batch_size: 1回の encode に渡したテキスト数
+- judgment_bulk_pdfs_total{result} / judgment_bulk_chunks_total: バルク登録の処理件数
+- judgment_bulk_throughput_per_second{unit}: 実行中のバルク登録の PDF/秒・チャンク/秒
+"""
+
+import bisect
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values, strict=True))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    """
+    ラベル値ごとに値を持つメトリクスの共通部分。
+    """
+
+    kind = "untyped"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    @abstractmethod
+    def sample_lines(self) -> list[str]:
+        """
+        サンプル行 (HELP / TYPE 行を除く) を返す。
+        """
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {_escape(self.documentation)}",
+            f"# TYPE {self.name} {self.kind}",
+            *self.sample_lines(),
+        ]
+        return "\n".join(lines) + "\n"
+
+
+class Counter(_Metric):
+    """
+    単調増加するカウンタ。
+    """
+
+    kind = "counter"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def sample_lines(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}"
+            for k, v in items
+        ]
+
+
+class Gauge(Counter):
+    """
+    任意に上下する値（直近の値を保持する）。
+    """
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """
+    値の分布（バケットごとの件数・合計・件数）。
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # ラベル値 → [バケットごとの件数(累積ではない)..., +Inf の件数, 合計]
+        self._values: dict[LabelValues, list[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """
+        with ブロックの所要秒数を記録する（例外で抜けても記録する）。
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            counts = self._values.get(self._key(labels))
+        return 0 if counts is None else int(sum(counts[:-1]))
+
+    def sample_lines(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        names = (*self.labelnames, "le")
+        lines: list[str] = []
+        for key, counts in items:
+            cumulative = 0.0
+            bounds = [*self.buckets, math.inf]
+            for bound, count in zip(bounds, counts[:-1], strict=True):
+                cumulative += count
+                labels = _format_labels(names, (*key, _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+
+Collector = Callable[[], Iterable[_Metric]]
+
+
+class MetricsRegistry:
+    """
+    メトリクスの登録先。render で全メトリクスをテキスト形式にする。
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Collector] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Duplicate metric: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def add_collector(self, collector: Collector) -> None:
+        """
+        スクレイプ時に呼ばれ、その時点の値を持つメトリクスを返す関数を登録する。
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for collector in collectors:
+            try:
+                metrics.extend(collector())
+            except Exception as e:
+                print(f"メトリクスの収集に失敗しました: {e}")
+        return "".join(m.render() for m in metrics)
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = Histogram(
+    "judgment_stage_duration_seconds",
+    "Time spent in each ingest/search stage",
+    ["stage"],
+)
+ENCODE_BATCH_SIZE = Histogram(
+    "judgment_encode_batch_size",
+    "Number of texts passed to one encode call",
+    buckets=BATCH_SIZE_BUCKETS,
+)
+BULK_PDFS = Counter(
+    "judgment_bulk_pdfs_total", "PDFs finished by bulk ingest", ["result"]
+)
+BULK_CHUNKS = Counter(
+    "judgment_bulk_chunks_total", "Chunks written by bulk ingest (vector upserts)"
+)
+BULK_THROUGHPUT = Gauge(
+    "judgment_bulk_throughput_per_second",
+    "Throughput of the most recently reporting bulk ingest task",
+    ["unit"],
+)
+for _metric in (
+    STAGE_SECONDS,
+    ENCODE_BATCH_SIZE,
+    BULK_PDFS,
+    BULK_CHUNKS,
+    BULK_THROUGHPUT,
+):
+    registry.register(_metric)
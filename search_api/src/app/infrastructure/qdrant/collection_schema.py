@@ -0,0 +1,333 @@
+"""
+インフラ層 - Qdrant コレクションの宣言的なスキーマ定義とマイグレーション。
+
+コレクションのあるべき設定を CollectionSpec で宣言し、起動時に実際の設定と比較して
+安全に変更できる差分だけを適用する（データを作り直す変更は行わない）。
+
+- ペイロードインデックス: judgment_id などを keyword インデックスにし、
+  ID指定の取得・削除をフルスキャンではなくインデックスで引く。
+  chunk_index は integer インデックスにし、判例のチャンクを順に読む (order_by) のに使う。
+  登録時に取り出した書誌情報 (court / case_type / case_number は keyword、
+  decision_date は datetime) もインデックスにし、検索時の絞り込みに使う
+- スカラー量子化 (int8): 量子化ベクトルだけを RAM に置き、検索後に
+  ディスク上の元ベクトルで再スコア (rescore) する
+- HNSW の m / ef_construct
+- ベクトル・ペイロードのディスク保存 (on_disk)
+
+ベクトル次元・距離関数の不一致は安全に移行できないため、エラーとして報告する。
+
+環境変数:
+- QDRANT_HNSW_M / QDRANT_HNSW_EF_CONSTRUCT / QDRANT_HNSW_EF (検索時, 未指定なら Qdrant 既定)
+- QDRANT_QUANTIZATION: int8 または none
+- QDRANT_QUANTIZATION_QUANTILE / QDRANT_QUANTIZATION_ALWAYS_RAM
+- QDRANT_RESCORE / QDRANT_OVERSAMPLING: 量子化検索時の再スコアと候補の多め取得倍率
+- QDRANT_ON_DISK_VECTORS / QDRANT_ON_DISK_PAYLOAD
+- QDRANT_PAYLOAD_INDEXES: 追加のインデックス "field:type,field:type" (type は keyword 等)
+"""
+
+import os
+from dataclasses import dataclass, field
+from typing import Any
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    CollectionParamsDiff,
+    Disabled,
+    Distance,
+    HnswConfigDiff,
+    PayloadSchemaType,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParams,
+    VectorParamsDiff,
+)
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def _parse_payload_indexes(spec: str) -> dict[str, str]:
+    """
+    "court:keyword,year:integer" 形式の文字列を {フィールド: 型} に変換する。
+    """
+    indexes: dict[str, str] = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, _, schema = item.partition(":")
+        indexes[name.strip()] = (schema.strip() or "keyword").lower()
+    return indexes
+
+
+@dataclass(frozen=True)
+class CollectionSpec:
+    """
+    コレクションのあるべき設定。
+
+    Attributes:
+        vector_size: ベクトル次元
+        distance: 距離関数
+        payload_indexes: {フィールド名: インデックス型 (keyword / integer / ...)}
+        hnsw_m: HNSW グラフの各ノードの辺数
+        hnsw_ef_construct: HNSW 構築時の探索幅
+        hnsw_ef: 検索時の探索幅 (None なら Qdrant 既定)
+        quantization: "int8" ならスカラー量子化、"none" なら量子化しない
+        quantile: 量子化の範囲決定に使う分位点
+        quantization_always_ram: 量子化ベクトルを常に RAM に置くか
+        rescore: 量子化検索の結果を元ベクトルで再スコアするか
+        oversampling: 再スコア前に limit の何倍の候補を取るか
+        on_disk_vectors: 元ベクトルをディスクに置くか
+        on_disk_payload: ペイロードをディスクに置くか
+    """
+
+    vector_size: int = 384
+    distance: Distance = Distance.COSINE
+    payload_indexes: dict[str, str] = field(
+        default_factory=lambda: {"judgment_id": "keyword"}
+    )
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    hnsw_ef: int | None = None
+    quantization: str = "int8"
+    quantile: float = 0.99
+    quantization_always_ram: bool = True
+    rescore: bool = True
+    oversampling: float = 2.0
+    on_disk_vectors: bool = True
+    on_disk_payload: bool = True
+
+    def search_params(self) -> SearchParams | None:
+        """
+        検索時に渡す SearchParams（既定値のままなら None）。
+        """
+        quantization = None
+        if self.quantization == "int8":
+            quantization = QuantizationSearchParams(
+                rescore=self.rescore, oversampling=self.oversampling
+            )
+        if quantization is None and self.hnsw_ef is None:
+            return None
+        return SearchParams(hnsw_ef=self.hnsw_ef, quantization=quantization)
+
+    def quantization_config(self) -> ScalarQuantization | None:
+        if self.quantization != "int8":
+            return None
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8,
+                quantile=self.quantile,
+                always_ram=self.quantization_always_ram,
+            )
+        )
+
+
+def judgment_collection_spec(vector_size: int = 384) -> CollectionSpec:
+    """
+    環境変数から judgments コレクションの設定を組み立てる。
+    """
+    hnsw_ef = os.getenv("QDRANT_HNSW_EF", "")
+    quantization = os.getenv("QDRANT_QUANTIZATION", "int8").lower()
+    if quantization not in ("int8", "none"):
+        raise ValueError(f"Unsupported QDRANT_QUANTIZATION: {quantization}")
+    return CollectionSpec(
+        vector_size=vector_size,
+        payload_indexes={
+            "judgment_id": "keyword",
+            "chunk_index": "integer",
+            "court": "keyword",
+            "case_type": "keyword",
+            "case_number": "keyword",
+            "decision_date": "datetime",
+            **_parse_payload_indexes(os.getenv("QDRANT_PAYLOAD_INDEXES", "")),
+        },
+        hnsw_m=int(os.getenv("QDRANT_HNSW_M", "16")),
+        hnsw_ef_construct=int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "100")),
+        hnsw_ef=int(hnsw_ef) if hnsw_ef else None,
+        quantization=quantization,
+        quantile=float(os.getenv("QDRANT_QUANTIZATION_QUANTILE", "0.99")),
+        quantization_always_ram=_env_flag("QDRANT_QUANTIZATION_ALWAYS_RAM", "true"),
+        rescore=_env_flag("QDRANT_RESCORE", "true"),
+        oversampling=float(os.getenv("QDRANT_OVERSAMPLING", "2.0")),
+        on_disk_vectors=_env_flag("QDRANT_ON_DISK_VECTORS", "true"),
+        on_disk_payload=_env_flag("QDRANT_ON_DISK_PAYLOAD", "true"),
+    )
+
+
+@dataclass
+class SchemaChange:
+    """
+    既存コレクションに適用する1つの変更。
+
+    Attributes:
+        action: 変更の種類 (create_payload_index / update_hnsw / ...)
+        detail: 変更内容（ログ表示と適用に使う）
+    """
+
+    action: str
+    detail: dict[str, Any]
+
+
+def _data_type(index_info: Any) -> str:
+    data_type = getattr(index_info, "data_type", index_info)
+    return str(getattr(data_type, "value", data_type)).lower()
+
+
+def plan_schema_changes(info: Any, spec: CollectionSpec) -> list[SchemaChange]:
+    """
+    既存コレクションの情報 (get_collection の結果) と spec を比較し、
+    適用すべき変更を求める純粋関数。
+
+    Args:
+        info: qdrant_client の CollectionInfo
+        spec: あるべき設定
+
+    Returns:
+        適用する変更の一覧（無ければ空）
+
+    Raises:
+        ValueError: ベクトル次元・距離関数が異なり、安全に移行できない場合
+    """
+    params = info.config.params
+    vectors = params.vectors
+    if vectors.size != spec.vector_size or vectors.distance != spec.distance:
+        raise ValueError(
+            f"Collection vectors are size={vectors.size}/{vectors.distance}, "
+            f"spec requires size={spec.vector_size}/{spec.distance}; "
+            "re-create the collection and re-index to migrate"
+        )
+
+    changes: list[SchemaChange] = []
+    existing = {name: _data_type(i) for name, i in (info.payload_schema or {}).items()}
+    for name, schema in spec.payload_indexes.items():
+        if name not in existing:
+            changes.append(SchemaChange("create_payload_index", {name: schema}))
+        elif existing[name] != schema:
+            changes.append(SchemaChange("replace_payload_index", {name: schema}))
+
+    hnsw = info.config.hnsw_config
+    if (hnsw.m, hnsw.ef_construct) != (spec.hnsw_m, spec.hnsw_ef_construct):
+        changes.append(
+            SchemaChange(
+                "update_hnsw",
+                {"m": spec.hnsw_m, "ef_construct": spec.hnsw_ef_construct},
+            )
+        )
+
+    current = info.config.quantization_config or vectors.quantization_config
+    scalar = getattr(current, "scalar", None)
+    actual_quant = (
+        ("int8", scalar.quantile, bool(scalar.always_ram))
+        if scalar is not None
+        else ("none",)
+    )
+    wanted_quant = (
+        ("int8", spec.quantile, spec.quantization_always_ram)
+        if spec.quantization == "int8"
+        else ("none",)
+    )
+    if actual_quant != wanted_quant:
+        changes.append(SchemaChange("update_quantization", {"to": spec.quantization}))
+
+    if bool(vectors.on_disk) != spec.on_disk_vectors:
+        changes.append(
+            SchemaChange("update_vectors_on_disk", {"on_disk": spec.on_disk_vectors})
+        )
+    if bool(params.on_disk_payload) != spec.on_disk_payload:
+        changes.append(
+            SchemaChange("update_payload_on_disk", {"on_disk": spec.on_disk_payload})
+        )
+    return changes
+
+
+def _create_indexes(client: QdrantClient, name: str, indexes: dict[str, str]) -> None:
+    for field_name, schema in indexes.items():
+        client.create_payload_index(
+            collection_name=name,
+            field_name=field_name,
+            field_schema=PayloadSchemaType(schema),
+        )
+
+
+def apply_schema_change(
+    client: QdrantClient, name: str, change: SchemaChange, spec: CollectionSpec
+) -> None:
+    """
+    1つの変更を Qdrant に適用する。
+    インデックス再構築・量子化などは Qdrant 側でバックグラウンドに進む。
+    """
+    if change.action == "create_payload_index":
+        _create_indexes(client, name, change.detail)
+    elif change.action == "replace_payload_index":
+        for field_name in change.detail:
+            client.delete_payload_index(collection_name=name, field_name=field_name)
+        _create_indexes(client, name, change.detail)
+    elif change.action == "update_hnsw":
+        client.update_collection(
+            collection_name=name,
+            hnsw_config=HnswConfigDiff(
+                m=spec.hnsw_m, ef_construct=spec.hnsw_ef_construct
+            ),
+        )
+    elif change.action == "update_quantization":
+        client.update_collection(
+            collection_name=name,
+            quantization_config=spec.quantization_config() or Disabled.DISABLED,
+        )
+    elif change.action == "update_vectors_on_disk":
+        client.update_collection(
+            collection_name=name,
+            vectors_config={"": VectorParamsDiff(on_disk=spec.on_disk_vectors)},
+        )
+    elif change.action == "update_payload_on_disk":
+        client.update_collection(
+            collection_name=name,
+            collection_params=CollectionParamsDiff(
+                on_disk_payload=spec.on_disk_payload
+            ),
+        )
+    else:
+        raise ValueError(f"Unknown schema change: {change.action}")
+
+
+def ensure_collection(client: QdrantClient, name: str, spec: CollectionSpec) -> bool:
+    """
+    コレクションが無ければ spec どおりに作成し、あれば差分を適用して spec に揃える。
+
+    Args:
+        client: Qdrant クライアント
+        name: コレクション名
+        spec: あるべき設定
+
+    Returns:
+        bool: 新規作成した場合 True
+
+    Raises:
+        ValueError: 既存コレクションのベクトル次元・距離関数が spec と異なる場合
+    """
+    if not client.collection_exists(collection_name=name):
+        client.create_collection(
+            collection_name=name,
+            vectors_config=VectorParams(
+                size=spec.vector_size,
+                distance=spec.distance,
+                on_disk=spec.on_disk_vectors,
+            ),
+            hnsw_config=HnswConfigDiff(
+                m=spec.hnsw_m, ef_construct=spec.hnsw_ef_construct
+            ),
+            quantization_config=spec.quantization_config(),
+            on_disk_payload=spec.on_disk_payload,
+        )
+        _create_indexes(client, name, spec.payload_indexes)
+        return True
+
+    for change in plan_schema_changes(client.get_collection(name), spec):
+        print(
+            f"コレクション '{name}' のスキーマを更新します: {change.action} {change.detail}"
+        )
+        apply_schema_change(client, name, change, spec)
+    return False
@@ -1,29 +1,93 @@
 """
-インフラ層 - Qdrant ベクトルDBへのアクセスを担うモジュール。
+インフラ層 - ベクトルストアへのアクセスを担うモジュール。
 
-.env から環境変数 QDRANT_HOST, QDRANT_PORT を読み込み。
+実際の保存先は VECTOR_STORE_BACKEND で切り替える（VectorStore インターフェース）。
+- qdrant (デフォルト): Qdrant サーバ (qdrant_vector_store.QdrantVectorStore)
+- numpy: プロセス内のメモリマップ行列 (numpy_vector_store.NumpyVectorStore)。
+  Qdrant 無しで起動でき、小規模コーパス・エッジ環境・テストで使う
+バックエンドは初回利用時に生成するため、import 時にはどこにも接続しない。
 Qdrant ではコレクション自動作成されないため、create_judgement_collection() で初期化を行う。
+
+書き込み(アップサート・削除)を行う関数は、終了時に必ず write_generation を進める
+(失敗しても途中まで書き込まれている可能性があるため、例外時も進める)。
+ストアへの各操作の所要時間は judgment_stage_duration_seconds{stage="vector_*"} に記録する。
+ベクトル検索の結果キャッシュはこの世代で無効化される（キャッシュキーには絞り込み条件も含める）。
+
+API リクエストからは *_async 版を使う。
 """
 
 import os
-
-from dotenv import load_dotenv
-from qdrant_client import QdrantClient
-from qdrant_client.models import (
-    Distance,
-    FieldCondition,
-    Filter,
-    MatchValue,
-    PointStruct,
-    VectorParams,
+import threading
+from collections.abc import Iterator
+
+from app.domain.models.vector_store import (
+    PageCursor,
+    PayloadFilter,
+    VectorPoint,
+    VectorStore,
+    page_cursor,
 )
+from app.domain.services.judgment_metadata import METADATA_FIELDS
+from app.domain.services.search_service import GroupAggregate, rank_groups
+from app.infrastructure.cache.search_result_cache import (
+    search_result_cache,
+    vector_fingerprint,
+    write_generation,
+)
+from app.infrastructure.metrics.metrics import STAGE_SECONDS
+
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "qdrant").lower()
+JUDGMENT_VECTOR_SIZE = 384
+# sum / mean 集約では最良チャンク順と集約スコア順が異なるため、多めに判例を取得して並べ替える
+GROUP_SEARCH_OVERFETCH = int(os.getenv("GROUP_SEARCH_OVERFETCH", "3"))
 
-load_dotenv()
+_store: VectorStore | None = None
+_store_lock = threading.Lock()
+
+
+def _create_store(backend: str) -> VectorStore:
+    if backend == "qdrant":
+        from app.infrastructure.qdrant.qdrant_vector_store import QdrantVectorStore
+
+        return QdrantVectorStore("judgments")
+    if backend == "numpy":
+        from app.infrastructure.vector_store.numpy_vector_store import (
+            NUMPY_STORE_DIR,
+            NumpyVectorStore,
+        )
+
+        return NumpyVectorStore(NUMPY_STORE_DIR, "judgments")
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {backend}")
+
+
+def get_vector_store() -> VectorStore:
+    """
+    VECTOR_STORE_BACKEND で選んだベクトルストアを返す（初回呼び出し時に生成）。
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = _create_store(VECTOR_STORE_BACKEND)
+        return _store
+
+
+def set_vector_store(store: VectorStore | None) -> None:
+    """
+    使用するベクトルストアを差し替える（テストや組み込み用途向け）。
+    None を渡すと、次回の get_vector_store で VECTOR_STORE_BACKEND から作り直す。
+    """
+    global _store
+    with _store_lock:
+        _store = store
+    write_generation.bump()
 
-QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
-QDRANT_PORT = int(os.getenv("QDRANT_PORT", "6333"))
 
-client = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
+async def close_vector_store() -> None:
+    """
+    ベクトルストアの接続を閉じる（アプリ終了時に呼ぶ）。
+    """
+    if _store is not None:
+        await _store.close()
 
 
 def create_judgement_collection() -> None:
@@ -32,43 +96,151 @@ def create_judgement_collection() -> None:
     Qdrant は Elasticsearchのように自動作成されないため、最初に呼び出すこと。
 
     Args:
-        なし（.envの QDRANT_HOST, QDRANT_PORT を参照）
+        なし（.envの VECTOR_STORE_BACKEND, QDRANT_HOST などを参照）
 
     Returns:
         None: 特に返り値はなく、成功時はコンソールにメッセージを表示する
     """
-    if not client.collection_exists(collection_name="judgments"):
-        client.create_collection(
-            collection_name="judgments",
-            vectors_config=VectorParams(size=384, distance=Distance.COSINE),
-        )
+    if get_vector_store().create_collection(JUDGMENT_VECTOR_SIZE):
+        write_generation.bump()
         print("コレクション 'judgments' を作成しました。")
 
 
-def query_judgments_by_vector(vector: list[float], limit: int = 5) -> list[dict]:
+def query_judgments_by_vector(
+    vector: list[float], limit: int = 5, payload_filter: PayloadFilter | None = None
+) -> list[dict]:
     """
-    ベクトルに基づいて Qdrant から類似判例を検索する。
+    ベクトルに基づいてベクトルストアから類似判例を検索する。
 
     **ベクトル検索**のため、クエリベクトルと近いもの順に上位が返る。
     → 「検索クエリを埋め込みしたベクトル」を与えると、
        コレクション内のチャンクとの類似度が高い順に取得できる。
+    同じベクトル・件数の検索は、書き込み世代が変わるまでキャッシュから返す。
 
     Args:
         vector (List[float]): 検索クエリとして使うベクトル
         limit (int): 取得する件数 (デフォルト 5)
+        payload_filter (PayloadFilter): 書誌情報の絞り込み条件 (検索の中で適用する)
 
     Returns:
         List[Dict]:
             - 要素は {"payload": dict, "score": float} 形式
             - "score" はベクトル類似度を示す指標
     """
-    hits = client.query_points(
-        collection_name="judgments",
-        query=vector,
-        limit=limit,
-    ).points
+    # 検索前の世代で格納する(検索中に書き込みがあれば、その結果は次回から使われない)
+    generation = write_generation.current()
+    cache_key = ("vector", vector_fingerprint(vector), limit, payload_filter)
+    cached = search_result_cache.get(cache_key, generation)
+    if cached is not None:
+        return cached
+
+    with STAGE_SECONDS.time(stage="vector_query"):
+        results = get_vector_store().query(vector, limit, payload_filter)
+    search_result_cache.put(cache_key, generation, results)
+    return results
+
+
+def _cached_batch(
+    vectors: list[list[float]], limit: int, generation: int
+) -> tuple[list[list[dict] | None], list[int]]:
+    """
+    クエリごとにキャッシュを引き、(結果の一覧, キャッシュに無かった位置) を返す。
+    """
+    results: list[list[dict] | None] = [
+        search_result_cache.get(
+            ("vector", vector_fingerprint(v), limit, None), generation
+        )
+        for v in vectors
+    ]
+    return results, [i for i, r in enumerate(results) if r is None]
+
+
+def _fill_batch(
+    vectors: list[list[float]],
+    limit: int,
+    generation: int,
+    results: list[list[dict] | None],
+    misses: list[int],
+    fetched: list[list[dict]],
+) -> list[list[dict]]:
+    for i, hits in zip(misses, fetched, strict=True):
+        key = ("vector", vector_fingerprint(vectors[i]), limit, None)
+        search_result_cache.put(key, generation, hits)
+        results[i] = hits
+    return [r or [] for r in results]
+
+
+def query_judgments_by_vectors(
+    vectors: list[list[float]], limit: int = 5
+) -> list[list[dict]]:
+    """
+    複数のクエリベクトルをまとめて検索する（Qdrant なら query_batch_points の1往復）。
+    キャッシュに無いクエリだけをストアに問い合わせる。
 
-    return [{"payload": hit.payload, "score": hit.score} for hit in hits]
+    Args:
+        vectors (List[List[float]]): 検索クエリのベクトル一覧
+        limit (int): クエリごとの件数
+
+    Returns:
+        List[List[Dict]]: vectors と同じ順の、query_judgments_by_vector と同じ形式の結果
+    """
+    generation = write_generation.current()
+    results, misses = _cached_batch(vectors, limit, generation)
+    fetched: list[list[dict]] = []
+    if misses:
+        with STAGE_SECONDS.time(stage="vector_query_batch"):
+            fetched = get_vector_store().query_batch(
+                [vectors[i] for i in misses], limit
+            )
+    return _fill_batch(vectors, limit, generation, results, misses, fetched)
+
+
+def _group_fetch_limit(limit: int, aggregate: GroupAggregate) -> int:
+    return limit if aggregate == "max" else limit * max(1, GROUP_SEARCH_OVERFETCH)
+
+
+def query_judgment_groups_by_vector(
+    vector: list[float],
+    limit: int = 5,
+    group_size: int = 3,
+    aggregate: GroupAggregate = "max",
+    payload_filter: PayloadFilter | None = None,
+) -> list[dict]:
+    """
+    ベクトル検索の結果を判例(judgment_id)単位にまとめ、上位 limit 件の判例を返す。
+    ストア側でグルーピングする (Qdrant なら query_points_groups) ため、
+    1つの長い判例が上位をすべて占めることはない。
+
+    Args:
+        vector (List[float]): 検索クエリとして使うベクトル
+        limit (int): 取得する判例数
+        group_size (int): 判例ごとに返すチャンク数（集約対象の上位k件）
+        aggregate (str): 集約方法 "max" / "sum" / "mean"
+        payload_filter (PayloadFilter): 書誌情報の絞り込み条件
+
+    Returns:
+        List[Dict]: {"judgment_id": str, "score": float, "hits": [...]} の score 降順
+    """
+    generation = write_generation.current()
+    cache_key = (
+        "groups",
+        vector_fingerprint(vector),
+        limit,
+        group_size,
+        aggregate,
+        payload_filter,
+    )
+    cached = search_result_cache.get(cache_key, generation)
+    if cached is not None:
+        return cached
+
+    with STAGE_SECONDS.time(stage="vector_query_groups"):
+        groups = get_vector_store().query_groups(
+            vector, _group_fetch_limit(limit, aggregate), group_size, payload_filter
+        )
+    results = rank_groups(groups, aggregate, limit)
+    search_result_cache.put(cache_key, generation, results)
+    return results
 
 
 def query_judgements_by_id(judgement_id: str) -> list[dict]:
@@ -86,53 +258,107 @@ def query_judgements_by_id(judgement_id: str) -> list[dict]:
             - 要素は {"payload": dict, "score": None}
             - score は使わないため None
     """
-    # 初回 scroll
-    points, next_page = client.scroll(
-        collection_name="judgments",
-        scroll_filter=Filter(
-            must=[
-                FieldCondition(key="judgment_id", match=MatchValue(value=judgement_id))
-            ]
-        ),
-        limit=1000,
-        offset=None,
-    )
+    with STAGE_SECONDS.time(stage="vector_scroll"):
+        return get_vector_store().scroll_judgment(judgement_id)
 
-    all_results = []
-    all_results.extend(points)
-
-    # 次ページがあれば続ける
-    while next_page is not None:
-        points, next_page = client.scroll(
-            collection_name="judgments",
-            scroll_filter=Filter(
-                must=[
-                    FieldCondition(
-                        key="judgment_id", match=MatchValue(value=judgement_id)
-                    )
-                ]
-            ),
-            limit=1000,
-            offset=next_page,
-        )
-        all_results.extend(points)
 
-    # payload + score(=None) という形で返す
-    return [{"payload": hit.payload, "score": None} for hit in all_results]
+def query_judgment_page(
+    judgment_id: str, after: PageCursor | None = None, limit: int = 500
+) -> list[dict]:
+    """
+    判例のチャンクを chunk_index 順に1ページ分取得する（カーソル方式のページング）。
 
+    Args:
+        judgment_id (str): 対象の判例 ID
+        after (PageCursor | None): 前のページの最後のチャンクの page_cursor（None なら先頭から）
+        limit (int): 1ページの件数
+
+    Returns:
+        List[Dict]: {"id": str, "payload": dict, "score": None} の (chunk_index, id) 昇順
+    """
+    with STAGE_SECONDS.time(stage="vector_scroll"):
+        return get_vector_store().scroll_judgment_page(judgment_id, after, limit)
+
+
+def iter_judgment_pages(judgment_id: str, page_size: int = 500) -> Iterator[list[dict]]:
+    """
+    判例のチャンクを chunk_index 順にページ単位で返すジェネレータ。
+    全件をリストに集めないため、巨大な判例でも保持するのは1ページ分だけ。
+
+    Args:
+        judgment_id (str): 対象の判例 ID
+        page_size (int): 1ページの件数
 
-def upsert_judgment_points(points: list[PointStruct]) -> None:
+    Yields:
+        List[Dict]: 空でないページ
+    """
+    after: PageCursor | None = None
+    while True:
+        page = query_judgment_page(judgment_id, after, page_size)
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        after = page_cursor(page[-1])
+
+
+def list_judgment_point_ids(judgment_id: str) -> set[str]:
+    """
+    judgment_id に紐づくポイントIDだけを取得する（payload・ベクトルは取得しない）。
+    差分更新で「既に登録済みのチャンク」を判定するために使う。
+
+    Args:
+        judgment_id (str): 対象の判例 ID
+
+    Returns:
+        set[str]: ポイントIDの集合
+    """
+    with STAGE_SECONDS.time(stage="vector_scroll"):
+        return get_vector_store().list_point_ids(judgment_id)
+
+
+def upsert_judgment_points(points: list[VectorPoint]) -> None:
     """
     ポイント(ベクトル+payload)をまとめてアップサートする。
     コレクション名「judgments」固定。
 
     Args:
-        points (List[PointStruct]): Qdrant に登録するポイントの一覧
+        points (List[VectorPoint]): 登録するポイントの一覧
 
     Returns:
-        None: 特に返り値はなく、成功時に Qdrant へデータが書き込まれる
+        None: 特に返り値はなく、成功時にベクトルストアへデータが書き込まれる
+    """
+    try:
+        with STAGE_SECONDS.time(stage="vector_upsert"):
+            get_vector_store().upsert(points)
+    finally:
+        write_generation.bump()
+
+
+def _metadata_payload(metadata: dict) -> dict:
+    """
+    書誌情報の全フィールドを持つ payload にする (見つからなかったフィールドは None = 削除)。
+    """
+    return {field: metadata.get(field) for field in METADATA_FIELDS}
+
+
+def set_judgment_metadata(judgment_id: str, metadata: dict) -> None:
     """
-    client.upsert(collection_name="judgments", points=points)
+    判例の全ポイントの payload に書誌情報を書き込む（内容の変わらないチャンクにも反映する）。
+    metadata に無いフィールドは payload から削除し、前回の値で絞り込みに一致し続けないようにする。
+
+    Args:
+        judgment_id (str): 対象の判例 ID
+        metadata (dict): 書き込む書誌情報 (court / decision_date / ...)
+    """
+    try:
+        with STAGE_SECONDS.time(stage="vector_set_payload"):
+            get_vector_store().set_judgment_payload(
+                judgment_id, _metadata_payload(metadata)
+            )
+    finally:
+        write_generation.bump()
 
 
 def delete_judgment_points(judgment_id: str) -> None:
@@ -143,13 +369,193 @@ def delete_judgment_points(judgment_id: str) -> None:
         judgment_id (str): 削除対象の判例 ID
 
     Returns:
-        None: 返り値はなく、成功時に Qdrant からデータが削除される
-    """
-    client.delete(
-        collection_name="judgments",
-        points_selector=Filter(
-            must=[
-                FieldCondition(key="judgment_id", match=MatchValue(value=judgment_id))
-            ]
-        ),
+        None: 返り値はなく、成功時にベクトルストアからデータが削除される
+    """
+    try:
+        with STAGE_SECONDS.time(stage="vector_delete"):
+            get_vector_store().delete_judgment(judgment_id)
+    finally:
+        write_generation.bump()
+
+
+def delete_points_by_ids(point_ids: list[str]) -> None:
+    """
+    ポイントIDを指定して削除する（差分更新で古くなったチャンクの削除用）。
+
+    Args:
+        point_ids (List[str]): 削除するポイントIDの一覧
+    """
+    if not point_ids:
+        return
+    try:
+        with STAGE_SECONDS.time(stage="vector_delete"):
+            get_vector_store().delete_ids(point_ids)
+    finally:
+        write_generation.bump()
+
+
+async def query_judgments_by_vector_async(
+    vector: list[float], limit: int = 5, payload_filter: PayloadFilter | None = None
+) -> list[dict]:
+    """
+    query_judgments_by_vector の非同期版。
+
+    Args:
+        vector (List[float]): 検索クエリとして使うベクトル
+        limit (int): 取得する件数 (デフォルト 5)
+        payload_filter (PayloadFilter): 書誌情報の絞り込み条件
+
+    Returns:
+        List[Dict]: 要素は {"payload": dict, "score": float} 形式
+    """
+    generation = await write_generation.current_async()
+    cache_key = ("vector", vector_fingerprint(vector), limit, payload_filter)
+    cached = search_result_cache.get(cache_key, generation)
+    if cached is not None:
+        return cached
+
+    with STAGE_SECONDS.time(stage="vector_query"):
+        results = await get_vector_store().query_async(vector, limit, payload_filter)
+    search_result_cache.put(cache_key, generation, results)
+    return results
+
+
+async def query_judgments_by_vectors_async(
+    vectors: list[list[float]], limit: int = 5
+) -> list[list[dict]]:
+    """
+    query_judgments_by_vectors の非同期版。
+
+    Args:
+        vectors (List[List[float]]): 検索クエリのベクトル一覧
+        limit (int): クエリごとの件数
+
+    Returns:
+        List[List[Dict]]: vectors と同じ順の検索結果
+    """
+    generation = await write_generation.current_async()
+    results, misses = _cached_batch(vectors, limit, generation)
+    fetched: list[list[dict]] = []
+    if misses:
+        with STAGE_SECONDS.time(stage="vector_query_batch"):
+            fetched = await get_vector_store().query_batch_async(
+                [vectors[i] for i in misses], limit
+            )
+    return _fill_batch(vectors, limit, generation, results, misses, fetched)
+
+
+async def upsert_judgment_points_async(points: list[VectorPoint]) -> None:
+    """
+    upsert_judgment_points の非同期版。
+
+    Args:
+        points (List[VectorPoint]): 登録するポイントの一覧
+    """
+    try:
+        with STAGE_SECONDS.time(stage="vector_upsert"):
+            await get_vector_store().upsert_async(points)
+    finally:
+        await write_generation.bump_async()
+
+
+async def set_judgment_metadata_async(judgment_id: str, metadata: dict) -> None:
+    """
+    set_judgment_metadata の非同期版。
+
+    Args:
+        judgment_id (str): 対象の判例 ID
+        metadata (dict): 書き込む書誌情報
+    """
+    try:
+        with STAGE_SECONDS.time(stage="vector_set_payload"):
+            await get_vector_store().set_judgment_payload_async(
+                judgment_id, _metadata_payload(metadata)
+            )
+    finally:
+        await write_generation.bump_async()
+
+
+async def delete_judgment_points_async(judgment_id: str) -> None:
+    """
+    delete_judgment_points の非同期版。
+
+    Args:
+        judgment_id (str): 削除対象の判例 ID
+    """
+    try:
+        with STAGE_SECONDS.time(stage="vector_delete"):
+            await get_vector_store().delete_judgment_async(judgment_id)
+    finally:
+        await write_generation.bump_async()
+
+
+async def list_judgment_point_ids_async(judgment_id: str) -> set[str]:
+    """
+    list_judgment_point_ids の非同期版。
+
+    Args:
+        judgment_id (str): 対象の判例 ID
+
+    Returns:
+        set[str]: ポイントIDの集合
+    """
+    with STAGE_SECONDS.time(stage="vector_scroll"):
+        return await get_vector_store().list_point_ids_async(judgment_id)
+
+
+async def delete_points_by_ids_async(point_ids: list[str]) -> None:
+    """
+    delete_points_by_ids の非同期版。
+
+    Args:
+        point_ids (List[str]): 削除するポイントIDの一覧
+    """
+    if not point_ids:
+        return
+    try:
+        with STAGE_SECONDS.time(stage="vector_delete"):
+            await get_vector_store().delete_ids_async(point_ids)
+    finally:
+        await write_generation.bump_async()
+
+
+async def query_judgment_groups_by_vector_async(
+    vector: list[float],
+    limit: int = 5,
+    group_size: int = 3,
+    aggregate: GroupAggregate = "max",
+    payload_filter: PayloadFilter | None = None,
+) -> list[dict]:
+    """
+    query_judgment_groups_by_vector の非同期版。
+
+    Args:
+        vector (List[float]): 検索クエリとして使うベクトル
+        limit (int): 取得する判例数
+        group_size (int): 判例ごとに返すチャンク数
+        aggregate (str): 集約方法 "max" / "sum" / "mean"
+        payload_filter (PayloadFilter): 書誌情報の絞り込み条件
+
+    Returns:
+        List[Dict]: {"judgment_id": str, "score": float, "hits": [...]} の score 降順
+    """
+    generation = await write_generation.current_async()
+    cache_key = (
+        "groups",
+        vector_fingerprint(vector),
+        limit,
+        group_size,
+        aggregate,
+        payload_filter,
     )
+    cached = search_result_cache.get(cache_key, generation)
+    if cached is not None:
+        return cached
+
+    with STAGE_SECONDS.time(stage="vector_query_groups"):
+        groups = await get_vector_store().query_groups_async(
+            vector, _group_fetch_limit(limit, aggregate), group_size, payload_filter
+        )
+    results = rank_groups(groups, aggregate, limit)
+    search_result_cache.put(cache_key, generation, results)
+    return results
@@ -0,0 +1,472 @@
+"""
+インフラ層 - Qdrant ベクトルDBによる VectorStore 実装。
+
+.env から環境変数 QDRANT_HOST, QDRANT_PORT を読み込み。
+クライアントは初回利用時に生成するため、Qdrant が起動していなくても import はできる。
+コレクション設定(インデックス・量子化・HNSW・on_disk)は collection_schema で宣言し、
+create_collection で作成・既存コレクションの差分適用を行う。
+
+API リクエストからは *_async 版を使う。AsyncQdrantClient はイベントループを
+ブロックせず、接続はプール(QDRANT_POOL_SIZE)で使い回す。
+QDRANT_PREFER_GRPC=true なら gRPC (QDRANT_GRPC_PORT, デフォルト 6334) で通信する。
+PayloadFilter は query_filter として渡し、Qdrant が payload インデックスを使って
+HNSW の探索中に絞り込む（検索後に捨てるのではないため、limit 件は条件に合うものから選ばれる）。
+"""
+
+import os
+import threading
+from dataclasses import replace
+
+import httpx
+from dotenv import load_dotenv
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import (
+    Condition,
+    DatetimeRange,
+    Direction,
+    FieldCondition,
+    Filter,
+    MatchAny,
+    MatchValue,
+    OrderBy,
+    PointIdsList,
+    PointStruct,
+    QueryRequest,
+    Range,
+)
+
+from app.domain.models.vector_store import (
+    PageCursor,
+    PayloadFilter,
+    VectorPoint,
+    page_cursor,
+)
+from app.infrastructure.qdrant.collection_schema import (
+    CollectionSpec,
+    ensure_collection,
+    judgment_collection_spec,
+)
+
+load_dotenv()
+
+QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
+QDRANT_PORT = int(os.getenv("QDRANT_PORT", "6333"))
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+QDRANT_POOL_SIZE = int(os.getenv("QDRANT_POOL_SIZE", "32"))
+
+_SCROLL_PAGE_SIZE = 1000
+
+
+def _connection_options() -> dict:
+    return {
+        "host": QDRANT_HOST,
+        "port": QDRANT_PORT,
+        "grpc_port": QDRANT_GRPC_PORT,
+        "prefer_grpc": QDRANT_PREFER_GRPC,
+        "limits": httpx.Limits(
+            max_connections=QDRANT_POOL_SIZE,
+            max_keepalive_connections=QDRANT_POOL_SIZE,
+        ),
+    }
+
+
+def _judgment_filter(judgment_id: str) -> Filter:
+    return Filter(
+        must=[FieldCondition(key="judgment_id", match=MatchValue(value=judgment_id))]
+    )
+
+
+def _judgment_index_filter(judgment_id: str, chunk_range: Range | None) -> Filter:
+    must: list[Condition] = [
+        FieldCondition(key="judgment_id", match=MatchValue(value=judgment_id))
+    ]
+    if chunk_range is not None:
+        must.append(FieldCondition(key="chunk_index", range=chunk_range))
+    return Filter(must=must)
+
+
+def _split_payload(payload: dict) -> tuple[dict, list[str]]:
+    """
+    payload を (書き込むキーと値, 削除するキー (値が None)) に分ける。
+    """
+    values = {k: v for k, v in payload.items() if v is not None}
+    return values, [k for k, v in payload.items() if v is None]
+
+
+def _payload_filter(payload_filter: PayloadFilter | None) -> Filter | None:
+    """
+    PayloadFilter を Qdrant の Filter に変換する（条件が無ければ None）。
+    """
+    if payload_filter is None or payload_filter.is_empty:
+        return None
+    must: list[Condition] = []
+    if payload_filter.courts:
+        must.append(
+            FieldCondition(key="court", match=MatchAny(any=list(payload_filter.courts)))
+        )
+    if payload_filter.case_types:
+        must.append(
+            FieldCondition(
+                key="case_type", match=MatchAny(any=list(payload_filter.case_types))
+            )
+        )
+    if payload_filter.case_number:
+        must.append(
+            FieldCondition(
+                key="case_number", match=MatchValue(value=payload_filter.case_number)
+            )
+        )
+    if payload_filter.decided_from or payload_filter.decided_to:
+        must.append(
+            FieldCondition(
+                key="decision_date",
+                range=DatetimeRange(
+                    gte=payload_filter.decided_from, lte=payload_filter.decided_to
+                ),
+            )
+        )
+    return Filter(must=must)
+
+
+def _to_structs(points: list[VectorPoint]) -> list[PointStruct]:
+    return [PointStruct(id=p.id, vector=p.vector, payload=p.payload) for p in points]
+
+
+def _to_hit_dicts(points: list) -> list[dict]:
+    return [
+        {"id": str(hit.id), "payload": hit.payload, "score": hit.score}
+        for hit in points
+    ]
+
+
+def _to_batch_dicts(responses: list) -> list[list[dict]]:
+    return [_to_hit_dicts(response.points) for response in responses]
+
+
+def _to_group_dicts(groups: list) -> list[dict]:
+    return [
+        {
+            "judgment_id": str(group.id),
+            "hits": [
+                {"id": str(hit.id), "payload": hit.payload, "score": hit.score}
+                for hit in group.hits
+            ],
+        }
+        for group in groups
+    ]
+
+
+class QdrantVectorStore:
+    """
+    Qdrant のコレクションを VectorStore として扱う実装。
+
+    Attributes:
+        collection_name: 対象コレクション名
+        spec: コレクションのあるべき設定
+    """
+
+    def __init__(
+        self,
+        collection_name: str = "judgments",
+        spec: CollectionSpec | None = None,
+        client: QdrantClient | None = None,
+    ) -> None:
+        self.collection_name = collection_name
+        self.spec = spec or judgment_collection_spec()
+        # client を渡すと同期クライアントとして使う (QdrantClient(":memory:") のローカルモードなど)
+        self._client: QdrantClient | None = client
+        self._async_client: AsyncQdrantClient | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> QdrantClient:
+        """
+        同期クライアントを返す（初回呼び出し時に生成）。
+        """
+        with self._lock:
+            if self._client is None:
+                self._client = QdrantClient(**_connection_options())
+            return self._client
+
+    @property
+    def async_client(self) -> AsyncQdrantClient:
+        """
+        非同期クライアントを返す（初回呼び出し時に生成し、以降は使い回す）。
+        """
+        with self._lock:
+            if self._async_client is None:
+                self._async_client = AsyncQdrantClient(**_connection_options())
+            return self._async_client
+
+    def create_collection(self, vector_size: int) -> bool:
+        """
+        コレクションが無ければ作成し、あれば spec との差分(インデックス追加など)を適用する。
+        """
+        if vector_size != self.spec.vector_size:
+            self.spec = replace(self.spec, vector_size=vector_size)
+        return ensure_collection(self.client, self.collection_name, self.spec)
+
+    def query(
+        self,
+        vector: list[float],
+        limit: int,
+        payload_filter: PayloadFilter | None = None,
+    ) -> list[dict]:
+        response = self.client.query_points(
+            collection_name=self.collection_name,
+            query=vector,
+            query_filter=_payload_filter(payload_filter),
+            limit=limit,
+            search_params=self.spec.search_params(),
+        )
+        return _to_hit_dicts(response.points)
+
+    def _batch_requests(
+        self, vectors: list[list[float]], limit: int
+    ) -> list[QueryRequest]:
+        params = self.spec.search_params()
+        return [
+            QueryRequest(query=vector, limit=limit, params=params, with_payload=True)
+            for vector in vectors
+        ]
+
+    def query_batch(self, vectors: list[list[float]], limit: int) -> list[list[dict]]:
+        """
+        query_batch_points で複数クエリを1往復で検索する。
+        """
+        if not vectors:
+            return []
+        responses = self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=self._batch_requests(vectors, limit),
+        )
+        return _to_batch_dicts(responses)
+
+    def query_groups(
+        self,
+        vector: list[float],
+        limit: int,
+        group_size: int,
+        payload_filter: PayloadFilter | None = None,
+    ) -> list[dict]:
+        response = self.client.query_points_groups(
+            collection_name=self.collection_name,
+            group_by="judgment_id",
+            query=vector,
+            query_filter=_payload_filter(payload_filter),
+            limit=limit,
+            group_size=group_size,
+            search_params=self.spec.search_params(),
+        )
+        return _to_group_dicts(response.groups)
+
+    def scroll_judgment(self, judgment_id: str) -> list[dict]:
+        return self._scroll_all(_judgment_filter(judgment_id))
+
+    def _scroll_all(self, scroll_filter: Filter) -> list[dict]:
+        results: list[dict] = []
+        next_page = None
+        while True:
+            points, next_page = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=scroll_filter,
+                limit=_SCROLL_PAGE_SIZE,
+                offset=next_page,
+            )
+            results.extend(
+                {"id": str(p.id), "payload": p.payload, "score": None} for p in points
+            )
+            if next_page is None:
+                return results
+
+    def scroll_judgment_page(
+        self, judgment_id: str, after: PageCursor | None, limit: int
+    ) -> list[dict]:
+        """
+        chunk_index のインデックスで order_by し、after より後ろを limit 件読む。
+        (order_by 指定時は次ページのオフセットが返らないため、範囲条件をカーソルにする)
+        order_by は同じ chunk_index どうしの順序を決めないため、カーソルと同じ・
+        ページ末尾と同じ chunk_index のチャンクはまとめて読み、ポイントID順に並べてから切る。
+        """
+        hits: list[dict] = []
+        lower: Range | None = None
+        if after is not None:
+            index, point_id = after
+            same = self._scroll_all(
+                _judgment_index_filter(judgment_id, Range(gte=index, lte=index))
+            )
+            hits = [h for h in same if h["id"] > point_id]
+            lower = Range(gt=index)
+        if len(hits) < limit:
+            points, _ = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=_judgment_index_filter(judgment_id, lower),
+                limit=limit - len(hits),
+                order_by=OrderBy(key="chunk_index", direction=Direction.ASC),
+            )
+            rest: list[dict] = [
+                {"id": str(p.id), "payload": p.payload, "score": None} for p in points
+            ]
+            if rest and len(rest) == limit - len(hits):
+                last = rest[-1]["payload"]["chunk_index"]
+                rest = [h for h in rest if h["payload"]["chunk_index"] != last]
+                rest += self._scroll_all(
+                    _judgment_index_filter(judgment_id, Range(gte=last, lte=last))
+                )
+            hits += rest
+        hits.sort(key=page_cursor)
+        return hits[:limit]
+
+    def list_point_ids(self, judgment_id: str) -> set[str]:
+        ids: set[str] = set()
+        next_page = None
+        while True:
+            points, next_page = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=_judgment_filter(judgment_id),
+                limit=_SCROLL_PAGE_SIZE,
+                offset=next_page,
+                with_payload=False,
+                with_vectors=False,
+            )
+            ids.update(str(p.id) for p in points)
+            if next_page is None:
+                return ids
+
+    def upsert(self, points: list[VectorPoint]) -> None:
+        self.client.upsert(
+            collection_name=self.collection_name, points=_to_structs(points)
+        )
+
+    def set_judgment_payload(self, judgment_id: str, payload: dict) -> None:
+        values, removed = _split_payload(payload)
+        if values:
+            self.client.set_payload(
+                collection_name=self.collection_name,
+                payload=values,
+                points=_judgment_filter(judgment_id),
+            )
+        if removed:
+            self.client.delete_payload(
+                collection_name=self.collection_name,
+                keys=removed,
+                points=_judgment_filter(judgment_id),
+            )
+
+    def delete_judgment(self, judgment_id: str) -> None:
+        self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=_judgment_filter(judgment_id),
+        )
+
+    def delete_ids(self, point_ids: list[str]) -> None:
+        self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=PointIdsList(points=list(point_ids)),
+        )
+
+    async def query_async(
+        self,
+        vector: list[float],
+        limit: int,
+        payload_filter: PayloadFilter | None = None,
+    ) -> list[dict]:
+        response = await self.async_client.query_points(
+            collection_name=self.collection_name,
+            query=vector,
+            query_filter=_payload_filter(payload_filter),
+            limit=limit,
+            search_params=self.spec.search_params(),
+        )
+        return _to_hit_dicts(response.points)
+
+    async def query_batch_async(
+        self, vectors: list[list[float]], limit: int
+    ) -> list[list[dict]]:
+        if not vectors:
+            return []
+        responses = await self.async_client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=self._batch_requests(vectors, limit),
+        )
+        return _to_batch_dicts(responses)
+
+    async def query_groups_async(
+        self,
+        vector: list[float],
+        limit: int,
+        group_size: int,
+        payload_filter: PayloadFilter | None = None,
+    ) -> list[dict]:
+        response = await self.async_client.query_points_groups(
+            collection_name=self.collection_name,
+            group_by="judgment_id",
+            query=vector,
+            query_filter=_payload_filter(payload_filter),
+            limit=limit,
+            group_size=group_size,
+            search_params=self.spec.search_params(),
+        )
+        return _to_group_dicts(response.groups)
+
+    async def list_point_ids_async(self, judgment_id: str) -> set[str]:
+        ids: set[str] = set()
+        next_page = None
+        while True:
+            points, next_page = await self.async_client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=_judgment_filter(judgment_id),
+                limit=_SCROLL_PAGE_SIZE,
+                offset=next_page,
+                with_payload=False,
+                with_vectors=False,
+            )
+            ids.update(str(p.id) for p in points)
+            if next_page is None:
+                return ids
+
+    async def upsert_async(self, points: list[VectorPoint]) -> None:
+        await self.async_client.upsert(
+            collection_name=self.collection_name, points=_to_structs(points)
+        )
+
+    async def set_judgment_payload_async(self, judgment_id: str, payload: dict) -> None:
+        values, removed = _split_payload(payload)
+        if values:
+            await self.async_client.set_payload(
+                collection_name=self.collection_name,
+                payload=values,
+                points=_judgment_filter(judgment_id),
+            )
+        if removed:
+            await self.async_client.delete_payload(
+                collection_name=self.collection_name,
+                keys=removed,
+                points=_judgment_filter(judgment_id),
+            )
+
+    async def delete_judgment_async(self, judgment_id: str) -> None:
+        await self.async_client.delete(
+            collection_name=self.collection_name,
+            points_selector=_judgment_filter(judgment_id),
+        )
+
+    async def delete_ids_async(self, point_ids: list[str]) -> None:
+        await self.async_client.delete(
+            collection_name=self.collection_name,
+            points_selector=PointIdsList(points=list(point_ids)),
+        )
+
+    async def close(self) -> None:
+        """
+        非同期クライアントの接続プールを閉じる。
+        """
+        with self._lock:
+            async_client, self._async_client = self._async_client, None
+        if async_client is not None:
+            await async_client.close()
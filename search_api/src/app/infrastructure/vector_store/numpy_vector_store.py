@@ -0,0 +1,569 @@
+"""
+インフラ層 - プロセス内で完結する NumPy / メモリマップの VectorStore 実装。
+
+Qdrant を起動せずに動かすためのバックエンド（小規模コーパス・エッジ環境・テスト向け）。
+
+- ベクトルは正規化して float32 のメモリマップ行列に格納する（内積 = コサイン類似度）
+- 検索は NUMPY_STORE_BLOCK_ROWS 行ずつ行列積で類似度を求め、ブロックごとの上位を併合する
+  (複数クエリも1回の行列積でまとめて計算する)
+- ポイントID・payload・空きスロットは SQLite で管理する。ベクトルを書いてから
+  SQLite をコミットするため、読み手が書きかけのベクトルを返すことはない
+- 他プロセスの書き込みは PRAGMA data_version で検知し、有効スロットの一覧を読み直す
+- PayloadFilter は SQLite で条件に合うスロットを求め、類似度の計算時に他のスロットを除く
+  (書誌情報の式インデックスを張る)
+
+環境変数:
+- NUMPY_STORE_DIR: 保存先ディレクトリ
+- NUMPY_STORE_BLOCK_ROWS: 類似度を一度に計算する行数（メモリ使用量の上限）
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import Iterator
+from typing import Literal
+
+import numpy as np
+
+from app.domain.models.vector_store import PageCursor, PayloadFilter, VectorPoint
+from app.domain.services.search_service import (
+    compute_cosine_similarities,
+    normalize_rows,
+    top_k_indices,
+)
+
+NUMPY_STORE_DIR = os.getenv("NUMPY_STORE_DIR", "data/vector_store")
+NUMPY_STORE_BLOCK_ROWS = int(os.getenv("NUMPY_STORE_BLOCK_ROWS", "65536"))
+
+_INITIAL_CAPACITY = 1024
+_SQLITE_MAX_VARIABLES = 900
+
+
+def _chunks(values: list, size: int = _SQLITE_MAX_VARIABLES) -> list[list]:
+    return [values[i : i + size] for i in range(0, len(values), size)]
+
+
+class NumpyVectorStore:
+    """
+    メモリマップ行列 + SQLite による VectorStore 実装（スレッド・プロセス間で共有可）。
+
+    Attributes:
+        directory: コレクションの保存先ディレクトリ
+        block_rows: 類似度を一度に計算する行数
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        collection_name: str = "judgments",
+        block_rows: int = NUMPY_STORE_BLOCK_ROWS,
+    ) -> None:
+        self.directory = os.path.join(directory, collection_name)
+        os.makedirs(self.directory, exist_ok=True)
+        self.block_rows = max(1, block_rows)
+        self._lock = threading.RLock()
+        self._vectors: np.memmap | None = None
+        self._valid = np.zeros(0, dtype=bool)
+        self._judgment_codes = np.zeros(0, dtype=np.int64)
+        self._data_version: int | None = None
+        self._dirty = True
+
+        self._conn = sqlite3.connect(
+            os.path.join(self.directory, "points.sqlite3"),
+            timeout=30.0,
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS points ("
+            " slot INTEGER PRIMARY KEY, point_id TEXT NOT NULL UNIQUE,"
+            " judgment_id TEXT NOT NULL, payload TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_points_judgment ON points(judgment_id)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_points_chunk_index ON points("
+            " judgment_id, json_extract(payload, '$.chunk_index'))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_points_metadata ON points("
+            " json_extract(payload, '$.court'), json_extract(payload, '$.decision_date'))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS free_slots (slot INTEGER PRIMARY KEY)"
+        )
+
+    # ---- メタデータ・行列 ---------------------------------------------------
+
+    def _meta(self, name: str) -> int | None:
+        row = self._conn.execute(
+            "SELECT value FROM meta WHERE name = ?", (name,)
+        ).fetchone()
+        return None if row is None else int(row[0])
+
+    def _set_meta(self, name: str, value: int) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (name, value))
+
+    @property
+    def _path(self) -> str:
+        return os.path.join(self.directory, "vectors.f32.mmap")
+
+    def _open_vectors(self, capacity: int, dim: int) -> np.memmap:
+        if self._vectors is not None and self._vectors.shape == (capacity, dim):
+            return self._vectors
+        size = capacity * dim * np.dtype(np.float32).itemsize
+        mode: Literal["r+", "w+"] = "r+" if os.path.exists(self._path) else "w+"
+        if mode == "r+" and os.path.getsize(self._path) < size:
+            with open(self._path, "r+b") as f:
+                f.truncate(size)
+        self._vectors = np.memmap(
+            self._path, dtype=np.float32, mode=mode, shape=(capacity, dim)
+        )
+        return self._vectors
+
+    def _refresh(self) -> None:
+        """
+        他プロセス・自プロセスの書き込みがあれば、有効スロットの一覧を読み直す。
+        メタデータとスロット一覧は1つの読み取りトランザクションで読み、
+        途中に入った他プロセスの書き込みで next_slot と points が食い違わないようにする。
+        """
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version and not self._dirty:
+            return
+        self._data_version, self._dirty = version, False
+        self._conn.execute("BEGIN")
+        try:
+            dim, capacity = self._meta("dim"), self._meta("capacity")
+            next_slot = self._meta("next_slot") or 0
+            rows = self._conn.execute("SELECT slot, judgment_id FROM points").fetchall()
+        finally:
+            self._conn.execute("COMMIT")
+        if dim is None or capacity is None:
+            self._valid = np.zeros(0, dtype=bool)
+            return
+        self._open_vectors(capacity, dim)
+        valid = np.zeros(next_slot, dtype=bool)
+        codes = np.full(next_slot, -1, dtype=np.int64)
+        judgment_codes: dict[str, int] = {}
+        for slot, judgment_id in rows:
+            valid[slot] = True
+            codes[slot] = judgment_codes.setdefault(judgment_id, len(judgment_codes))
+        self._valid, self._judgment_codes = valid, codes
+
+    def _payloads(self, slots: list[int]) -> dict[int, tuple[str, dict]]:
+        """
+        スロット → (ポイントID, payload) を返す（削除済みのスロットは含まれない）。
+        """
+        payloads: dict[int, tuple[str, dict]] = {}
+        for part in _chunks(slots):
+            placeholders = ",".join("?" * len(part))
+            rows = self._conn.execute(
+                f"SELECT slot, point_id, payload FROM points WHERE slot IN ({placeholders})",  # nosec B608
+                part,
+            ).fetchall()
+            payloads.update(
+                (slot, (point_id, json.loads(payload)))
+                for slot, point_id, payload in rows
+            )
+        return payloads
+
+    # ---- 検索 -------------------------------------------------------------
+
+    def _filter_mask(self, payload_filter: PayloadFilter | None) -> np.ndarray | None:
+        """
+        payload_filter に合うスロットを True にした配列（条件が無ければ None）。
+        """
+        if payload_filter is None or payload_filter.is_empty:
+            return None
+        clauses: list[str] = []
+        params: list[str] = []
+        for key, values in (
+            ("court", payload_filter.courts),
+            ("case_type", payload_filter.case_types),
+        ):
+            if values:
+                placeholders = ",".join("?" * len(values))
+                clauses.append(f"json_extract(payload, '$.{key}') IN ({placeholders})")
+                params.extend(values)
+        if payload_filter.case_number:
+            clauses.append("json_extract(payload, '$.case_number') = ?")
+            params.append(payload_filter.case_number)
+        # 判決日は "YYYY-MM-DD" のため、文字列の大小がそのまま日付の前後になる
+        if payload_filter.decided_from:
+            clauses.append("json_extract(payload, '$.decision_date') >= ?")
+            params.append(payload_filter.decided_from)
+        if payload_filter.decided_to:
+            clauses.append("json_extract(payload, '$.decision_date') <= ?")
+            params.append(payload_filter.decided_to)
+        rows = self._conn.execute(
+            f"SELECT slot FROM points WHERE {' AND '.join(clauses)}",  # nosec B608
+            params,
+        ).fetchall()
+        mask = np.zeros(len(self._valid), dtype=bool)
+        slots = [slot for (slot,) in rows if slot < len(mask)]
+        mask[slots] = True
+        return mask
+
+    def _block_scores(
+        self, queries: np.ndarray, mask: np.ndarray | None = None
+    ) -> Iterator[tuple[int, np.ndarray]]:
+        """
+        block_rows 行ごとに (先頭スロット, (q, 行数) の類似度) を返す。
+        無効スロットと mask が False のスロットは -inf。
+        """
+        matrix = self._vectors
+        n_rows = len(self._valid)
+        if matrix is None:
+            return
+        for start in range(0, n_rows, self.block_rows):
+            end = min(start + self.block_rows, n_rows)
+            scores = compute_cosine_similarities(matrix[start:end], queries)
+            scores[:, ~self._valid[start:end]] = -np.inf
+            if mask is not None:
+                scores[:, ~mask[start:end]] = -np.inf
+            yield start, scores
+
+    def query_batch(
+        self,
+        vectors: list[list[float]],
+        limit: int,
+        payload_filter: PayloadFilter | None = None,
+    ) -> list[list[dict]]:
+        """
+        複数クエリの類似度上位 limit 件をまとめて求める。
+
+        Args:
+            vectors: クエリベクトルの一覧
+            limit: クエリごとの件数
+            payload_filter: 書誌情報の絞り込み条件
+
+        Returns:
+            クエリごとの {"payload": dict, "score": float} のリスト
+        """
+        if not vectors:
+            return []
+        with self._lock:
+            self._refresh()
+            mask = self._filter_mask(payload_filter)
+            queries = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+            candidates: list[list[tuple[np.ndarray, np.ndarray]]] = [
+                [] for _ in vectors
+            ]
+            for start, scores in self._block_scores(queries, mask):
+                for q, row in enumerate(scores):
+                    top = top_k_indices(row, limit)
+                    candidates[q].append((top + start, row[top]))
+
+            ranked: list[list[tuple[int, float]]] = []
+            for parts in candidates:
+                if not parts:
+                    ranked.append([])
+                    continue
+                slots = np.concatenate([s for s, _ in parts])
+                scores = np.concatenate([v for _, v in parts])
+                top = top_k_indices(scores, limit)
+                ranked.append(
+                    [
+                        (int(slots[i]), float(scores[i]))
+                        for i in top
+                        if np.isfinite(scores[i])
+                    ]
+                )
+            payloads = self._payloads(sorted({s for hits in ranked for s, _ in hits}))
+        return [
+            [
+                {"id": payloads[slot][0], "payload": payloads[slot][1], "score": score}
+                for slot, score in hits
+                if slot in payloads
+            ]
+            for hits in ranked
+        ]
+
+    def query(
+        self,
+        vector: list[float],
+        limit: int,
+        payload_filter: PayloadFilter | None = None,
+    ) -> list[dict]:
+        return self.query_batch([vector], limit, payload_filter)[0]
+
+    def query_groups(
+        self,
+        vector: list[float],
+        limit: int,
+        group_size: int,
+        payload_filter: PayloadFilter | None = None,
+    ) -> list[dict]:
+        with self._lock:
+            self._refresh()
+            queries = np.asarray([vector], dtype=np.float32)
+            mask = self._filter_mask(payload_filter)
+            blocks = list(self._block_scores(queries, mask))
+            if not blocks:
+                return []
+            scores = np.concatenate([s[0] for _, s in blocks])
+            order = np.argsort(-scores, kind="stable")
+            # 最良チャンクの順に判例を並べ、limit 件の判例それぞれに group_size 件まで集める
+            groups: dict[int, list[int]] = {}
+            for slot in order[: int(np.isfinite(scores).sum())].tolist():
+                code = int(self._judgment_codes[slot])
+                if code not in groups:
+                    if len(groups) >= limit:
+                        continue
+                    groups[code] = []
+                if len(groups[code]) < group_size:
+                    groups[code].append(slot)
+                    if len(groups) >= limit and all(
+                        len(g) >= group_size for g in groups.values()
+                    ):
+                        break
+            payloads = self._payloads([s for g in groups.values() for s in g])
+        results = []
+        for slots in groups.values():
+            # 検索中に他プロセスが削除したスロットは除く
+            alive = [s for s in slots if s in payloads]
+            if alive:
+                results.append(
+                    {
+                        "judgment_id": str(payloads[alive[0]][1].get("judgment_id")),
+                        "hits": [
+                            {
+                                "id": payloads[s][0],
+                                "payload": payloads[s][1],
+                                "score": float(scores[s]),
+                            }
+                            for s in alive
+                        ],
+                    }
+                )
+        return results
+
+    def scroll_judgment(self, judgment_id: str) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT point_id, payload FROM points WHERE judgment_id = ? ORDER BY slot",
+                (judgment_id,),
+            ).fetchall()
+        return [
+            {"id": point_id, "payload": json.loads(payload), "score": None}
+            for point_id, payload in rows
+        ]
+
+    def scroll_judgment_page(
+        self, judgment_id: str, after: PageCursor | None, limit: int
+    ) -> list[dict]:
+        index, point_id = after if after is not None else (-1, "")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT point_id, payload FROM points"
+                " WHERE judgment_id = ? AND (json_extract(payload, '$.chunk_index') > ?"
+                "  OR (json_extract(payload, '$.chunk_index') = ? AND point_id > ?))"
+                " ORDER BY json_extract(payload, '$.chunk_index'), point_id LIMIT ?",
+                (judgment_id, index, index, point_id, limit),
+            ).fetchall()
+        return [
+            {"id": point_id, "payload": json.loads(payload), "score": None}
+            for point_id, payload in rows
+        ]
+
+    def list_point_ids(self, judgment_id: str) -> set[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT point_id FROM points WHERE judgment_id = ?", (judgment_id,)
+            ).fetchall()
+        return {point_id for (point_id,) in rows}
+
+    # ---- 書き込み ---------------------------------------------------------
+
+    def create_collection(self, vector_size: int) -> bool:
+        with self._lock:
+            dim = self._meta("dim")
+            if dim is not None:
+                if dim != vector_size:
+                    raise ValueError(
+                        f"Collection dimension is {dim}, requested {vector_size}"
+                    )
+                return False
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                created = self._conn.execute(
+                    "INSERT OR IGNORE INTO meta VALUES"
+                    " ('dim', ?), ('capacity', ?), ('next_slot', 0)",
+                    (vector_size, _INITIAL_CAPACITY),
+                ).rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._dirty = True
+            return created > 0
+
+    def _allocate_slots(self, count: int) -> list[int]:
+        """
+        削除済みスロットを優先して count 件確保する（トランザクション内で呼ぶ）。
+        """
+        reused = [
+            slot
+            for (slot,) in self._conn.execute(
+                "SELECT slot FROM free_slots ORDER BY slot LIMIT ?", (count,)
+            ).fetchall()
+        ]
+        self._conn.executemany(
+            "DELETE FROM free_slots WHERE slot = ?", [(s,) for s in reused]
+        )
+        next_slot = self._meta("next_slot") or 0
+        fresh = list(range(next_slot, next_slot + count - len(reused)))
+        self._set_meta("next_slot", next_slot + len(fresh))
+        return reused + fresh
+
+    def upsert(self, points: list[VectorPoint]) -> None:
+        if not points:
+            return
+        with self._lock:
+            if self._meta("dim") is None:
+                self.create_collection(len(points[0].vector))
+            by_id = {p.id: p for p in points}
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                dim = self._meta("dim") or 0
+                known: dict[str, int] = {}
+                for part in _chunks(list(by_id)):
+                    placeholders = ",".join("?" * len(part))
+                    known.update(
+                        self._conn.execute(
+                            f"SELECT point_id, slot FROM points WHERE point_id IN ({placeholders})",  # nosec B608
+                            part,
+                        ).fetchall()
+                    )
+                new_ids = [pid for pid in by_id if pid not in known]
+                slots = dict(known)
+                slots.update(
+                    zip(new_ids, self._allocate_slots(len(new_ids)), strict=True)
+                )
+
+                capacity = self._meta("capacity") or _INITIAL_CAPACITY
+                needed = self._meta("next_slot") or 0
+                while capacity < needed:
+                    capacity *= 2
+                self._set_meta("capacity", capacity)
+                matrix = self._open_vectors(capacity, dim)
+
+                ordered = list(by_id.values())
+                rows = normalize_rows(np.asarray([p.vector for p in ordered]))
+                if rows.shape[1] != dim:
+                    raise ValueError(
+                        f"Vector dimension is {rows.shape[1]}, collection is {dim}"
+                    )
+                matrix[[slots[p.id] for p in ordered]] = rows
+                matrix.flush()
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO points (slot, point_id, judgment_id, payload)"
+                    " VALUES (?, ?, ?, ?)",
+                    [
+                        (
+                            slots[p.id],
+                            p.id,
+                            str(p.payload.get("judgment_id", "")),
+                            json.dumps(p.payload, ensure_ascii=False),
+                        )
+                        for p in ordered
+                    ],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            finally:
+                self._dirty = True
+
+    def set_judgment_payload(self, judgment_id: str, payload: dict) -> None:
+        # json_patch (RFC 7396) は値が null のキーを削除する
+        with self._lock:
+            self._conn.execute(
+                "UPDATE points SET payload = json_patch(payload, ?) WHERE judgment_id = ?",
+                (json.dumps(payload, ensure_ascii=False), judgment_id),
+            )
+
+    def _delete_slots(self, query: str, params: list) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                slots = [s for (s,) in self._conn.execute(query, params).fetchall()]
+                self._conn.executemany(
+                    "DELETE FROM points WHERE slot = ?", [(s,) for s in slots]
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO free_slots VALUES (?)", [(s,) for s in slots]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._dirty = True
+
+    def delete_judgment(self, judgment_id: str) -> None:
+        self._delete_slots(
+            "SELECT slot FROM points WHERE judgment_id = ?", [judgment_id]
+        )
+
+    def delete_ids(self, point_ids: list[str]) -> None:
+        for part in _chunks(list(point_ids)):
+            placeholders = ",".join("?" * len(part))
+            self._delete_slots(
+                f"SELECT slot FROM points WHERE point_id IN ({placeholders})",  # nosec B608
+                part,
+            )
+
+    # ---- 非同期版 (スレッドで実行) -------------------------------------------
+
+    async def query_async(
+        self,
+        vector: list[float],
+        limit: int,
+        payload_filter: PayloadFilter | None = None,
+    ) -> list[dict]:
+        return await asyncio.to_thread(self.query, vector, limit, payload_filter)
+
+    async def query_batch_async(
+        self, vectors: list[list[float]], limit: int
+    ) -> list[list[dict]]:
+        return await asyncio.to_thread(self.query_batch, vectors, limit)
+
+    async def query_groups_async(
+        self,
+        vector: list[float],
+        limit: int,
+        group_size: int,
+        payload_filter: PayloadFilter | None = None,
+    ) -> list[dict]:
+        return await asyncio.to_thread(
+            self.query_groups, vector, limit, group_size, payload_filter
+        )
+
+    async def list_point_ids_async(self, judgment_id: str) -> set[str]:
+        return await asyncio.to_thread(self.list_point_ids, judgment_id)
+
+    async def upsert_async(self, points: list[VectorPoint]) -> None:
+        await asyncio.to_thread(self.upsert, points)
+
+    async def set_judgment_payload_async(self, judgment_id: str, payload: dict) -> None:
+        await asyncio.to_thread(self.set_judgment_payload, judgment_id, payload)
+
+    async def delete_judgment_async(self, judgment_id: str) -> None:
+        await asyncio.to_thread(self.delete_judgment, judgment_id)
+
+    async def delete_ids_async(self, point_ids: list[str]) -> None:
+        await asyncio.to_thread(self.delete_ids, point_ids)
+
+    async def close(self) -> None:
+        """
+        書き込みはコミット時に反映済みのため、解放するものは無い。
+        """
+        return None
@@ -0,0 +1,46 @@
+"""
+インターフェース層 - ヘルスチェックAPIルーター
+
+GET /health/live  -> プロセスが応答できるか (Liveness)
+GET /health/ready -> 埋め込みモデルのロードが完了しているか (Readiness)
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.infrastructure.embedding.model_registry import model_registry
+
+router = APIRouter()
+
+
+@router.get("/health/live", summary="Liveness probe")
+def live() -> dict:
+    """
+    Liveness: プロセスが起動していれば常に ok を返す。
+
+    Returns:
+        dict: {"status": "ok"}
+    """
+    return {"status": "ok"}
+
+
+@router.get("/health/ready", summary="Readiness probe")
+def ready() -> JSONResponse:
+    """
+    Readiness: 埋め込みモデルのロードとウォームアップが完了していれば 200 を返す。
+    未ロードの場合はバックグラウンドでロードを開始し、完了するまで 503 を返す。
+
+    Returns:
+        JSONResponse: {"ready": bool, "model": str, "backend": str,
+                       "error": str | None, "parity": dict | None}
+    """
+    if not model_registry.is_ready:
+        model_registry.load_in_background()
+    body = {
+        "ready": model_registry.is_ready,
+        "model": model_registry.model_name,
+        "backend": model_registry.backend,
+        "error": model_registry.error,
+        "parity": model_registry.parity,
+    }
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
@@ -2,30 +2,62 @@
 大量かつ巨大な ZIP をアップロードし、バックグラウンドでPDFをベクトル登録するルータ
 
 - POST /judgments/upload-bulk-chunked: ZIPファイルをアップロード (multipart)
-  1) ファイルを即ディスクに保存 (stream)
-  2) バックグラウンドタスクで解凍・PDF抽出→チャンク化→ベクトルDB(Qdrant)登録
-  3) 処理ステータスはグローバル変数upload_tasksで管理
+  1) ファイルを即ディスク(BULK_UPLOAD_DIR)に保存 (stream)
+  2) バックグラウンドタスクでPDFを1件ずつストリーム抽出→チャンク化→ベクトルDB(Qdrant)登録
+     (解析はプロセスプール、エンコード・アップサートは別ステージで並行実行)
+  3) 処理ステータスはジョブストア(SQLite)で管理。再起動後も残り、どのワーカーからも参照できる
 - GET /judgments/upload-bulk-chunked/status/{task_id}: タスクの進捗を確認
+- POST /judgments/upload-bulk-chunked/{task_id}/cancel: タスクのキャンセルを要求
+  (エラーで止まったタスクは ZIP ごと破棄する)
+- POST /judgments/upload-bulk-chunked/{task_id}/resume: エラーで止まったタスクを続きから再開
+
+分割アップロード (再送・並列送信できる。大きなZIPはこちらを使う):
+- POST /judgments/upload-sessions: セッションを作成 (ZIP の大きさとパートサイズを指定)
+- PUT /judgments/upload-sessions/{session_id}/parts/{part_number}: パートを送信
+  (本文はパートのバイト列そのもの、X-Part-SHA256 ヘッダにパートの SHA-256)
+- GET /judgments/upload-sessions/{session_id}: 足りないパートを確認
+- POST /judgments/upload-sessions/{session_id}/commit: 全パートが揃ったらバルク登録を開始
+  (返す task_id で上の status / cancel を使う)
+- DELETE /judgments/upload-sessions/{session_id}: セッションを破棄
 """
 
-import os
-import shutil
-import tempfile
 import uuid
 
-from fastapi import APIRouter, BackgroundTasks, File, HTTPException, Request, UploadFile
-from qdrant_client.models import PointStruct
-from sentence_transformers import SentenceTransformer
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    File,
+    Header,
+    HTTPException,
+    Request,
+    UploadFile,
+)
 
-from app.domain.services.pdf_parser import parse_pdf_into_chunks
-from app.domain.services.zip_extractor import extract_pdfs_from_disk
-from app.infrastructure.qdrant.qdrant_gateway import upsert_judgment_points
+from app.domain.models.judgment_dto import UploadSessionRequest
+from app.domain.models.text_encoder import TextEncoder
+from app.infrastructure.embedding.model_registry import get_encoder
+from app.usecase.judgment_bulk_jobs import (
+    cancel_bulk_job,
+    create_bulk_job,
+    get_bulk_job_status,
+    new_job_zip_path,
+    resume_bulk_job,
+    run_bulk_job,
+)
+from app.usecase.judgment_bulk_upload import (
+    MAX_ZIP_SIZE,
+    InvalidUploadPart,
+    UploadSessionConflict,
+    UploadSessionNotFound,
+    abort_upload_session,
+    commit_upload_session,
+    create_upload_session,
+    get_upload_session_status,
+    write_upload_part,
+)
 
 router = APIRouter()
-encoder = SentenceTransformer("all-MiniLM-L6-v2")
-
-upload_tasks = {}
-MAX_ZIP_SIZE = 50 * 1024 * 1024 * 1024  # 50GB
 
 
 @router.post(
@@ -36,18 +68,20 @@ async def upload_bulk_chunked(
     background_tasks: BackgroundTasks,
     request: Request,
     file: UploadFile = File(...),
+    encoder: TextEncoder = Depends(get_encoder),
 ) -> dict:
     """
     Upload a large ZIP file and process it in the background.
 
-    1) 受け取ったZIPを一時ディレクトリへストリーミング保存
+    1) 受け取ったZIPを BULK_UPLOAD_DIR へストリーミング保存
     2) バックグラウンドタスクで解凍→PDF抽出→ベクトル化→Qdrant登録
-    3) 進捗はグローバル変数 `upload_tasks[task_id]` に保存
+    3) 進捗はジョブストアに保存 (中断しても処理済みのPDFの続きから再開する)
 
     Args:
         background_tasks (BackgroundTasks): FastAPI のバックグラウンドタスク管理
         request (Request): HTTPリクエスト、ヘッダから content-length を参照
         file (UploadFile): ZIPファイル (multipart/form-data)
+        encoder (TextEncoder): 共有の埋め込みモデル (Depends で注入)
 
     Returns:
         dict: { "task_id": str, "message": "Upload accepted. Processing in background." }
@@ -61,8 +95,7 @@ async def upload_bulk_chunked(
         raise HTTPException(status_code=413, detail="File too large (>50GB)")
 
     task_id = str(uuid.uuid4())
-    temp_dir = tempfile.mkdtemp(prefix=f"zip_{task_id}_")
-    zip_path = os.path.join(temp_dir, "uploaded.zip")
+    zip_path = new_job_zip_path(task_id)
 
     # ストリーミング書き込み
     with open(zip_path, "wb") as out_file:
@@ -73,13 +106,8 @@ async def upload_bulk_chunked(
                 break
             out_file.write(chunk)
 
-    upload_tasks[task_id] = {
-        "status": "in_progress",
-        "detail": "Initializing",
-        "processed_pdf": 0,
-        "total_pdf": 0,
-    }
-    background_tasks.add_task(_process_zip_in_background, zip_path, task_id)
+    create_bulk_job(task_id, zip_path)
+    background_tasks.add_task(run_bulk_job, task_id, zip_path, encoder)
 
     return {"task_id": task_id, "message": "Upload accepted. Processing in background."}
 
@@ -98,85 +126,237 @@ def get_upload_status(task_id: str) -> dict:
     Returns:
         dict: タスクのステータス情報。例:
             {
-              "status": "in_progress"|"done"|"error",
+              "status": "in_progress"|"done"|"error"|"cancelled",
               "detail": "...",
               "processed_pdf": int,
-              "total_pdf": int
+              "total_pdf": int,
+              "failed_pdf": int,
+              "stages": {"parse"|"encode"|"upsert": {"items_per_sec": float, ...}},
+              "cancel_requested": bool
             }
 
     Raises:
         HTTPException(404): 指定した task_id が見つからない場合
     """
-    if task_id not in upload_tasks:
+    status = get_bulk_job_status(task_id)
+    if status is None:
         raise HTTPException(status_code=404, detail="Task not found")
-    return upload_tasks[task_id]
+    return status
+
+
+@router.post(
+    "/judgments/upload-bulk-chunked/{task_id}/cancel",
+    summary="バックグラウンド処理のキャンセルを要求",
+)
+def cancel_upload(task_id: str) -> dict:
+    """
+    Request cancellation of a running bulk upload task.
+    処理中のワーカーが数秒以内に中断し、status が "cancelled" になる。
+    それまでに登録したPDFは残る。エラーで止まったタスクは、その場で ZIP ごと破棄する。
+
+    Args:
+        task_id (str): タスクID
+
+    Returns:
+        dict: {"task_id": str, "message": "Cancellation requested."}
+
+    Raises:
+        HTTPException(404): 指定した task_id が見つからない場合
+        HTTPException(409): タスクが既に終了している場合
+    """
+    if cancel_bulk_job(task_id):
+        return {"task_id": task_id, "message": "Cancellation requested."}
+    if get_bulk_job_status(task_id) is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    raise HTTPException(status_code=409, detail="Task is not running")
+
+
+@router.post(
+    "/judgments/upload-bulk-chunked/{task_id}/resume",
+    summary="エラーで止まったバックグラウンド処理を再開",
+)
+def resume_upload(
+    task_id: str,
+    background_tasks: BackgroundTasks,
+    encoder: TextEncoder = Depends(get_encoder),
+) -> dict:
+    """
+    Resume a bulk upload task that stopped with an error.
+    チェックポイント以降の PDF だけを処理し直す。
+
+    Args:
+        task_id (str): タスクID
+        background_tasks (BackgroundTasks): FastAPI のバックグラウンドタスク
+        encoder (TextEncoder): 共有の埋め込みモデル (Depends で注入)
+
+    Returns:
+        dict: {"task_id": str, "message": "Resumed. Processing in background."}
+
+    Raises:
+        HTTPException(404): 指定した task_id が見つからない場合
+        HTTPException(409): タスクがエラーで止まっていない場合
+        HTTPException(410): アップロードした ZIP が残っていない場合
+    """
+    try:
+        zip_path = resume_bulk_job(task_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=410, detail="Uploaded ZIP is missing") from e
+    if zip_path is None:
+        if get_bulk_job_status(task_id) is None:
+            raise HTTPException(status_code=404, detail="Task not found")
+        raise HTTPException(status_code=409, detail="Task has not failed")
+    background_tasks.add_task(run_bulk_job, task_id, zip_path, encoder)
+    return {"task_id": task_id, "message": "Resumed. Processing in background."}
+
+
+@router.post(
+    "/judgments/upload-sessions",
+    summary="分割アップロードのセッションを作成",
+)
+def create_upload(body: UploadSessionRequest) -> dict:
+    """
+    Create a multi-part upload session for a large ZIP.
+    ZIP の保存先を total_size の大きさで確保し、パートの一覧 (missing_parts) を返す。
+
+    Args:
+        body (UploadSessionRequest): total_size と part_size (省略可)
+
+    Returns:
+        dict: {"session_id", "state", "total_size", "part_size", "part_count",
+               "received_parts", "missing_parts"}
+
+    Raises:
+        HTTPException(413): total_size が 50GB を超える場合
+        HTTPException(400): part_size が上限を超える場合
+    """
+    if body.total_size > MAX_ZIP_SIZE:
+        raise HTTPException(status_code=413, detail="File too large (>50GB)")
+    try:
+        return create_upload_session(body.total_size, body.part_size)
+    except InvalidUploadPart as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+@router.put(
+    "/judgments/upload-sessions/{session_id}/parts/{part_number}",
+    summary="分割アップロードのパートを送信",
+)
+async def upload_part(
+    session_id: str,
+    part_number: int,
+    request: Request,
+    part_sha256: str = Header(..., alias="X-Part-SHA256"),
+) -> dict:
+    """
+    Upload one part of a session. パートは並列に送ってよく、同じパートの再送は上書きになる。
+    本文を受け取りながら ZIP の該当位置に書き込み、SHA-256 が一致したら受け取り済みにする。
+
+    Args:
+        session_id (str): セッションID
+        part_number (int): パート番号 (1 始まり)
+        request (Request): 本文がパートのバイト列
+        part_sha256 (str): パートの SHA-256 (16進, X-Part-SHA256 ヘッダ)
+
+    Returns:
+        dict: {"part_number": int, "size": int, "sha256": str}
+
+    Raises:
+        HTTPException(404): セッションが見つからない場合
+        HTTPException(409): セッションがコミット済みの場合
+        HTTPException(400): パート番号・サイズ・SHA-256 が合わない場合 (送り直せばよい)
+    """
+    try:
+        return await write_upload_part(
+            session_id, part_number, request.stream(), part_sha256
+        )
+    except UploadSessionNotFound as e:
+        raise HTTPException(status_code=404, detail="Upload session not found") from e
+    except UploadSessionConflict as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
+    except InvalidUploadPart as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+@router.get(
+    "/judgments/upload-sessions/{session_id}",
+    summary="分割アップロードの状態と足りないパートを取得",
+)
+def get_upload_session(session_id: str) -> dict:
+    """
+    Return the session state and the part numbers that have not been received yet.
+
+    Args:
+        session_id (str): セッションID
+
+    Returns:
+        dict: {"session_id", "state", "total_size", "part_size", "part_count",
+               "received_parts", "missing_parts"}
+
+    Raises:
+        HTTPException(404): セッションが見つからない場合
+    """
+    status = get_upload_session_status(session_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return status
 
 
-def _process_zip_in_background(zip_path: str, task_id: str) -> None:
+@router.post(
+    "/judgments/upload-sessions/{session_id}/commit",
+    summary="分割アップロードを確定し、バックグラウンドでベクトル登録を開始",
+)
+def commit_upload(
+    session_id: str,
+    background_tasks: BackgroundTasks,
+    encoder: TextEncoder = Depends(get_encoder),
+) -> dict:
     """
-    バックグラウンドでZIPを解凍→PDF抽出→チャンク化→ベクトル化→Qdrant登録。
-    実行後はupload_tasks[task_id]に進捗・完了状況を格納。
+    Commit a session whose parts have all been received and start the bulk ingest.
+    コミット済みのセッションに再度コミットしても、同じ task_id を返すだけで処理は1回だけ行う。
 
     Args:
-        zip_path (str): 一時保存したZIPファイルのパス
-        task_id (str): バックグラウンドタスクを一意に識別するID
+        session_id (str): セッションID
+        background_tasks (BackgroundTasks): FastAPI のバックグラウンドタスク管理
+        encoder (TextEncoder): 共有の埋め込みモデル (Depends で注入)
 
     Returns:
-        None: (結果はグローバル変数upload_tasksで管理)
+        dict: { "task_id": str, "message": "Upload committed. Processing in background." }
 
     Raises:
-        Exception: 何かしらの処理中にエラーが起きた場合、status="error"をセット
+        HTTPException(404): セッションが見つからない場合
+        HTTPException(409): 足りないパートがある場合
     """
     try:
-        upload_tasks[task_id]["status"] = "in_progress"
-        upload_tasks[task_id]["detail"] = "Unpacking ZIP"
-
-        # zipをディスクで解凍し、PDF取り出し
-        pdf_files = extract_pdfs_from_disk(zip_path)
-
-        total_pdfs = len(pdf_files)
-        upload_tasks[task_id]["total_pdf"] = total_pdfs
-
-        count_chunks = 0
-        processed = 0
-        for rel_path, pdf_data in pdf_files:
-            processed += 1
-            upload_tasks[task_id]["detail"] = f"Processing {processed}/{total_pdfs}"
-            upload_tasks[task_id]["processed_pdf"] = processed
-
-            # PDFをチャンクに分割→埋め込みベクトル化
-            chunks = parse_pdf_into_chunks(pdf_data, 2000)
-            if not chunks:
-                continue
-
-            vectors = encoder.encode(chunks).tolist()
-            points = []
-            # サブディレクトリ含むパスを judgment_id として使う
-            judgment_id = rel_path.replace("/", "__").replace("\\", "__")
-
-            for i, text_chunk in enumerate(chunks):
-                pid = str(uuid.uuid4())
-                points.append(
-                    PointStruct(
-                        id=pid,
-                        vector=vectors[i],
-                        payload={
-                            "judgment_id": judgment_id,
-                            "chunk_index": i,
-                            "text": text_chunk,
-                        },
-                    )
-                )
-            upsert_judgment_points(points)
-            count_chunks += len(chunks)
-
-        upload_tasks[task_id]["status"] = "done"
-        upload_tasks[task_id]["detail"] = f"Completed. total_chunks={count_chunks}"
-
-    except Exception as e:
-        # エラーが起きたら status="error" に設定
-        upload_tasks[task_id]["status"] = "error"
-        upload_tasks[task_id]["detail"] = str(e)
-    finally:
-        # zipファイル + 解凍ディレクトリを削除
-        shutil.rmtree(os.path.dirname(zip_path), ignore_errors=True)
+        task_id, zip_path, created = commit_upload_session(session_id)
+    except UploadSessionNotFound as e:
+        raise HTTPException(status_code=404, detail="Upload session not found") from e
+    except UploadSessionConflict as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
+    if created:
+        background_tasks.add_task(run_bulk_job, task_id, zip_path, encoder)
+    return {
+        "task_id": task_id,
+        "message": "Upload committed. Processing in background.",
+    }
+
+
+@router.delete(
+    "/judgments/upload-sessions/{session_id}",
+    summary="分割アップロードのセッションを破棄",
+)
+def abort_upload(session_id: str) -> dict:
+    """
+    Abort an open session and delete the parts written so far.
+
+    Args:
+        session_id (str): セッションID
+
+    Returns:
+        dict: {"session_id": str, "message": "Upload session aborted."}
+
+    Raises:
+        HTTPException(404): 受付中のセッションが見つからない場合
+    """
+    if not abort_upload_session(session_id):
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return {"session_id": session_id, "message": "Upload session aborted."}
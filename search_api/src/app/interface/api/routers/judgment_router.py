@@ -4,80 +4,279 @@
 POST /judgments      -> 新規登録 (Create)
 PUT /judgments/{id}  -> 更新       (Update)
 DELETE /judgments/{id} -> 削除    (Delete)
+GET /judgments/{id}/chunks -> chunk_index 順のページング取得 (cursor)
+GET /judgments/{id}/stream -> chunk_index 順の NDJSON ストリーミング
+
+アップロード系・検索は非同期で処理し、PDF解析やエンコード中も
+同じワーカー上の他のリクエストを待たせない。
 """
 
-from fastapi import APIRouter, File, HTTPException, Query, UploadFile
-from sentence_transformers import SentenceTransformer
+import itertools
+import json
+from collections.abc import Iterator
+from datetime import date
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 
-from app.infrastructure.qdrant.qdrant_gateway import query_judgements_by_id
+from app.domain.models.judgment_dto import (
+    JudgmentBatchList,
+    JudgmentBatchSearchRequest,
+    JudgmentGroupList,
+    JudgmentList,
+)
+from app.domain.models.text_encoder import TextEncoder
+from app.domain.models.vector_store import PayloadFilter
+from app.domain.services.judgment_metadata import normalize_case_number
+from app.domain.services.pdf_parser import PdfParseError, PdfParseTimeout
+from app.domain.services.search_service import GroupAggregate
+from app.infrastructure.embedding.model_registry import get_encoder
 from app.usecase.judgment_crud import (
-    delete_judgment,
-    register_judgment,
-    update_judgment,
+    JUDGMENT_READ_PAGE_SIZE,
+    delete_judgment_async,
+    iter_judgment_chunks,
+    read_judgment,
+    read_judgment_page,
+    register_judgment_async,
+    update_judgment_async,
+)
+from app.usecase.judgment_query import (
+    SEARCH_BATCH_MAX_QUERIES,
+    SEARCH_MAX_GROUP_SIZE,
+    SEARCH_MAX_LIMIT,
+    handle_judgment_batch_search_async,
+    handle_judgment_group_search_async,
+    handle_judgment_hybrid_search_async,
+    handle_judgment_lexical_search,
+    handle_judgment_search_async,
 )
-from app.usecase.judgment_query import handle_judgment_search
 
 router = APIRouter()
-encoder = SentenceTransformer("all-MiniLM-L6-v2")
 
 
 @router.post("/judgments", summary="1件の判例PDFをアップロードして新規登録")
 async def create_judgment(
-    file: UploadFile = File(...), judgment_id: str = "default-id"
+    file: UploadFile = File(...),
+    judgment_id: str = "default-id",
+    encoder: TextEncoder = Depends(get_encoder),
 ) -> dict:
     """
     Create: PDFを1件アップロードし、Qdrantの "judgments" コレクションに登録する。
+    judgment_id が登録済みなら、その判例の内容をこのPDFに差し替える (PUT と同じ)。
 
     Args:
         file (UploadFile): 判例PDFファイル (multipart/form-data で送信)
         judgment_id (str): 登録したい判例の一意ID (デフォルト "default-id")
+        encoder (TextEncoder): 共有の埋め込みモデル (Depends で注入)
 
     Returns:
         dict: 例 {"message": "Created 10 chunks for judgment_id=1111"}
 
     Raises:
         HTTPException(400): PDFが空 or テキスト抽出できなかった場合
+        HTTPException(422): PDFとして読めない or 解析が制限時間を超えた場合
     """
-    pdf_bytes = file.file.read()
+    pdf_bytes = await file.read()
     if not pdf_bytes:
         raise HTTPException(400, "No file data")
 
-    num_chunks = register_judgment(pdf_bytes, judgment_id, encoder)
+    try:
+        num_chunks = await register_judgment_async(pdf_bytes, judgment_id, encoder)
+    except (PdfParseError, PdfParseTimeout) as e:
+        raise HTTPException(422, str(e)) from e
     if num_chunks == 0:
         raise HTTPException(400, "No text extracted from PDF")
     return {"message": f"Created {num_chunks} chunks for judgment_id={judgment_id}"}
 
 
 @router.get("/judgments/search-by-vector", summary="ベクトル検索による判例取得")
-def search_judgments(
-    q: str = Query(..., description="検索クエリ (自然言語)"), limit: int = 5
-) -> dict:
+async def search_judgments(
+    q: str = Query(..., description="検索クエリ (自然言語)"),
+    limit: int = Query(5, ge=1, le=SEARCH_MAX_LIMIT),
+    group_by_judgment: bool = Query(False, description="判例単位にまとめて返す"),
+    group_size: int = Query(
+        3, ge=1, le=SEARCH_MAX_GROUP_SIZE, description="判例ごとに返すチャンク数"
+    ),
+    aggregate: GroupAggregate = Query("max", description="判例スコアの集約方法"),
+    full_text: bool = Query(False, description="本文全文を返す (既定は抜粋)"),
+    court: list[str] | None = Query(None, description="裁判所名 (複数指定可)"),
+    case_type: list[str] | None = Query(
+        None, description="事件の種類 民事 / 刑事 / 行政 / 家事 (複数指定可)"
+    ),
+    case_number: str | None = Query(None, description="事件番号"),
+    decided_from: date | None = Query(None, description="判決日の下限 (YYYY-MM-DD)"),
+    decided_to: date | None = Query(None, description="判決日の上限 (YYYY-MM-DD)"),
+    encoder: TextEncoder = Depends(get_encoder),
+) -> JudgmentList | JudgmentGroupList:
     """
     Read by vector: クエリ文字列を埋め込みベクトルに変換し、Qdrantで類似チャンクを検索。
+    group_by_judgment=true なら、limit 件の「判例」を集約スコア順に返す。
+    court / case_type / case_number / decided_from / decided_to を指定すると、
+    登録時に取り出した書誌情報で絞り込む (検索の後ではなく、近傍探索の中で適用する)。
 
     Args:
         q (str): 検索クエリ文字列 (自然言語)
-        limit (int): 取得する件数 (デフォルト 5)
+        limit (int): 取得する件数 (デフォルト 5。グループ化時は判例数)
+        group_by_judgment (bool): 判例(judgment_id)単位にまとめるか
+        group_size (int): グループ化時、判例ごとに返すチャンク数
+        aggregate (str): グループ化時の集約方法 "max" / "sum" / "mean"
+        full_text (bool): 本文全文を返すか (既定は先頭の抜粋)
+        court (list[str]): いずれかの裁判所の判例に絞る
+        case_type (list[str]): いずれかの事件の種類に絞る
+        case_number (str): 事件番号に絞る (全角・漢数字も可)
+        decided_from (date): 判決日がこの日以降の判例に絞る
+        decided_to (date): 判決日がこの日以前の判例に絞る
+        encoder (TextEncoder): 共有の埋め込みモデル (Depends で注入)
 
     Returns:
         dict: 例 { "items": [ { "payload": {...}, "score": 0.75 }, ... ] }
+              グループ化時は { "groups": [ { "judgment_id": ..., "score": ..., "hits": [...] } ] }
 
     Raises:
+        HTTPException(400): decided_from が decided_to より後の場合
         HTTPException(404): 類似する結果が存在しない場合
     """
-    results = handle_judgment_search(query=q, encoder=encoder, limit=limit)
+    if decided_from and decided_to and decided_from > decided_to:
+        raise HTTPException(400, "decided_from must not be after decided_to")
+    filters = PayloadFilter(
+        courts=tuple(court or ()),
+        case_types=tuple(case_type or ()),
+        case_number=normalize_case_number(case_number) if case_number else None,
+        decided_from=decided_from.isoformat() if decided_from else None,
+        decided_to=decided_to.isoformat() if decided_to else None,
+    )
+    payload_filter = None if filters.is_empty else filters
+    results: JudgmentList | JudgmentGroupList
+    if group_by_judgment:
+        results = await handle_judgment_group_search_async(
+            query=q,
+            encoder=encoder,
+            limit=limit,
+            group_size=group_size,
+            aggregate=aggregate,
+            full_text=full_text,
+            payload_filter=payload_filter,
+        )
+        empty = not results.groups
+    else:
+        results = await handle_judgment_search_async(
+            query=q,
+            encoder=encoder,
+            limit=limit,
+            full_text=full_text,
+            payload_filter=payload_filter,
+        )
+        empty = not results.items
+    if empty:
+        raise HTTPException(404, detail="No similar judgments found.")
+    return results
+
+
+@router.post(
+    "/judgments/search-batch", summary="複数クエリのベクトル検索をまとめて実行"
+)
+async def search_judgments_batch(
+    request: JudgmentBatchSearchRequest,
+    encoder: TextEncoder = Depends(get_encoder),
+) -> JudgmentBatchList:
+    """
+    Read by vector (batch): 複数のクエリを1回のエンコードと1回のベクトル検索でまとめて処理する。
+    1ページで多数の検索を行う呼び出し元向けに、HTTP・モデル・Qdrant の往復を1回にまとめる。
+
+    Args:
+        request (JudgmentBatchSearchRequest): {"queries": [...], "limit": 5, "full_text": false}
+        encoder (TextEncoder): 共有の埋め込みモデル (Depends で注入)
+
+    Returns:
+        dict: 例 { "results": [ { "items": [...] }, ... ] }
+              results は queries と同じ順。結果の無いクエリは items が空になる
+
+    Raises:
+        HTTPException(400): クエリ数が SEARCH_BATCH_MAX_QUERIES を超える場合
+    """
+    if len(request.queries) > SEARCH_BATCH_MAX_QUERIES:
+        raise HTTPException(
+            400, f"Too many queries (max {SEARCH_BATCH_MAX_QUERIES} per request)"
+        )
+    results = await handle_judgment_batch_search_async(
+        queries=request.queries,
+        encoder=encoder,
+        limit=request.limit,
+        full_text=request.full_text,
+    )
+    return JudgmentBatchList(results=results)
+
+
+@router.get("/judgments/search-by-keyword", summary="BM25 語彙検索による判例取得")
+def search_judgments_by_keyword(
+    q: str = Query(..., description="検索語 (事件番号・条文・裁判所名など)"),
+    limit: int = Query(5, ge=1, le=SEARCH_MAX_LIMIT),
+    full_text: bool = Query(False, description="本文全文を返す (既定は抜粋)"),
+) -> JudgmentList:
+    """
+    Read by keyword: 日本語トークナイズした検索語で BM25 語彙索引を検索。
+    埋め込みモデルを使わないため、完全一致寄りの検索を高速に返す。
+
+    Args:
+        q (str): 検索語
+        limit (int): 取得する件数 (デフォルト 5)
+        full_text (bool): 本文全文を返すか (既定は先頭の抜粋)
+
+    Returns:
+        dict: 例 { "items": [ { "payload": {...}, "score": 7.2 }, ... ] }
+
+    Raises:
+        HTTPException(404): 一致する結果が存在しない場合
+    """
+    results = handle_judgment_lexical_search(query=q, limit=limit, full_text=full_text)
+    if not results.items:
+        raise HTTPException(404, detail="No matching judgments found.")
+    return results
+
+
+@router.get("/judgments/search-hybrid", summary="語彙検索 + ベクトル検索の統合")
+async def search_judgments_hybrid(
+    q: str = Query(..., description="検索クエリ"),
+    limit: int = Query(5, ge=1, le=SEARCH_MAX_LIMIT),
+    full_text: bool = Query(False, description="本文全文を返す (既定は抜粋)"),
+    encoder: TextEncoder = Depends(get_encoder),
+) -> JudgmentList:
+    """
+    Read by hybrid: BM25 語彙検索とベクトル検索の結果を Reciprocal Rank Fusion で統合。
+
+    Args:
+        q (str): 検索クエリ
+        limit (int): 取得する件数 (デフォルト 5)
+        full_text (bool): 本文全文を返すか (既定は先頭の抜粋)
+        encoder (TextEncoder): 共有の埋め込みモデル (Depends で注入)
+
+    Returns:
+        dict: 例 { "items": [ { "payload": {...}, "score": 0.032 }, ... ] }
+              score は RRF の統合スコア
+
+    Raises:
+        HTTPException(404): 類似する結果が存在しない場合
+    """
+    results = await handle_judgment_hybrid_search_async(
+        query=q, encoder=encoder, limit=limit, full_text=full_text
+    )
     if not results.items:
         raise HTTPException(404, detail="No similar judgments found.")
     return results
 
 
 @router.get("/judgments/{judgment_id}", summary="指定の判例IDのチャンクを取得")
-def get_judgment_by_id(judgment_id: str) -> list[dict]:
+def get_judgment_by_id(
+    judgment_id: str,
+    full_text: bool = Query(True, description="本文全文を返す (false なら抜粋)"),
+) -> list[dict]:
     """
     Read by ID: 指定の判例IDに紐づくチャンクをすべて取得。
 
     Args:
         judgment_id (str): 取得したい判例のID
+        full_text (bool): 本文全文を返すか (false なら先頭の抜粋)
 
     Returns:
         List[dict]: 例 [{"payload": {...}, "score": None}, ...]
@@ -85,32 +284,118 @@ def get_judgment_by_id(judgment_id: str) -> list[dict]:
     Raises:
         HTTPException(404): 該当IDが登録されていない場合
     """
-    results = query_judgements_by_id(judgment_id)
+    results = read_judgment(judgment_id, full_text=full_text)
     if not results:
         raise HTTPException(404, f"No data found for judgment_id={judgment_id}")
     return results
 
 
+@router.get(
+    "/judgments/{judgment_id}/chunks", summary="判例のチャンクをページ単位で取得"
+)
+def get_judgment_chunks_page(
+    judgment_id: str,
+    cursor: str | None = Query(None, description="前のページの next_cursor"),
+    limit: int = Query(100, ge=1, le=JUDGMENT_READ_PAGE_SIZE),
+    with_text: bool = Query(True, description="false なら本文を付けない"),
+    full_text: bool = Query(True, description="本文全文を返す (false なら抜粋)"),
+) -> dict:
+    """
+    Read by ID (paged): チャンクを chunk_index 順に limit 件ずつ返す。
+    次のページは next_cursor を cursor に渡して取得する。
+
+    Args:
+        judgment_id (str): 取得したい判例のID
+        cursor (str | None): 前のページの next_cursor（省略時は先頭から）
+        limit (int): 1ページの件数
+        with_text (bool): 本文を付けるか
+        full_text (bool): 本文全文を返すか (false なら先頭の抜粋)
+
+    Returns:
+        dict: 例 {"items": [{"payload": {...}, "score": None}, ...],
+                  "next_cursor": "99:0f8e..."}
+              next_cursor が null なら最後のページ
+
+    Raises:
+        HTTPException(400): cursor の形式が正しくない場合
+        HTTPException(404): 該当IDが登録されていない場合（先頭ページが空）
+    """
+    try:
+        page = read_judgment_page(judgment_id, cursor, limit, with_text, full_text)
+    except ValueError as e:
+        raise HTTPException(400, str(e)) from e
+    if cursor is None and not page["items"]:
+        raise HTTPException(404, f"No data found for judgment_id={judgment_id}")
+    return page
+
+
+@router.get(
+    "/judgments/{judgment_id}/stream", summary="判例のチャンクを NDJSON で逐次返す"
+)
+async def stream_judgment_chunks(
+    judgment_id: str,
+    with_text: bool = Query(True, description="false なら本文を付けない"),
+    full_text: bool = Query(True, description="本文全文を返す (false なら抜粋)"),
+) -> StreamingResponse:
+    """
+    Read by ID (stream): チャンクを chunk_index 順に1行1件の NDJSON で返す。
+    ベクトルストアをページ単位で読みながら送るため、巨大な判例でもメモリ使用量は一定で、
+    最初のチャンクはすぐに届く。
+
+    Args:
+        judgment_id (str): 取得したい判例のID
+        with_text (bool): 本文を付けるか
+        full_text (bool): 本文全文を返すか (false なら先頭の抜粋)
+
+    Returns:
+        application/x-ndjson: 1行ごとに {"id": ..., "payload": {...}, "score": null}
+
+    Raises:
+        HTTPException(404): 該当IDが登録されていない場合
+    """
+    pages = iter_judgment_chunks(judgment_id, with_text, full_text)
+    # 先頭ページだけ先に読み、存在しない判例は 404 を返す
+    first = await run_in_threadpool(next, pages, None)
+    if first is None:
+        raise HTTPException(404, f"No data found for judgment_id={judgment_id}")
+
+    def lines() -> Iterator[str]:
+        for page in itertools.chain([first], pages):
+            for hit in page:
+                yield json.dumps(hit, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.put("/judgments/{judgment_id}", summary="既存判例を更新(差し替え)")
-async def modify_judgment(judgment_id: str, file: UploadFile = File(...)) -> dict:
+async def modify_judgment(
+    judgment_id: str,
+    file: UploadFile = File(...),
+    encoder: TextEncoder = Depends(get_encoder),
+) -> dict:
     """
     Update: 既存の判例データを削除し、新たにPDFをアップロードして再登録する。
 
     Args:
         judgment_id (str): 更新対象の判例ID
         file (UploadFile): 新しいPDFファイル (multipart/form-data)
+        encoder (TextEncoder): 共有の埋め込みモデル (Depends で注入)
 
     Returns:
         dict: 例 {"message": "Updated judgment_id=xxx with 10 chunks"}
 
     Raises:
         HTTPException(400): PDFが空だった場合
+        HTTPException(422): PDFとして読めない or 解析が制限時間を超えた場合
     """
-    pdf_bytes = file.file.read()
+    pdf_bytes = await file.read()
     if not pdf_bytes:
         raise HTTPException(400, "No file data")
 
-    num_chunks = update_judgment(pdf_bytes, judgment_id, encoder)
+    try:
+        num_chunks = await update_judgment_async(pdf_bytes, judgment_id, encoder)
+    except (PdfParseError, PdfParseTimeout) as e:
+        raise HTTPException(422, str(e)) from e
     return {"message": f"Updated judgment_id={judgment_id} with {num_chunks} chunks"}
 
 
@@ -125,5 +410,5 @@ async def remove_judgment(judgment_id: str) -> dict:
     Returns:
         dict: 例 {"message": "Deleted judgment_id=xxx"}
     """
-    delete_judgment(judgment_id)
+    await delete_judgment_async(judgment_id)
     return {"message": f"Deleted judgment_id={judgment_id}"}
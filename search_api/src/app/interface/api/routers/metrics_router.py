@@ -0,0 +1,50 @@
+"""
+インターフェース層 - メトリクスAPIルーター
+
+GET /metrics -> 処理ステージごとの所要時間・件数・キャッシュ統計 (Prometheus テキスト形式)
+"""
+
+from collections.abc import Iterable
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.infrastructure.cache.query_vector_cache import query_vector_cache
+from app.infrastructure.cache.search_result_cache import search_result_cache
+from app.infrastructure.metrics.metrics import Counter, Gauge, registry
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _cache_metrics() -> Iterable[Counter]:
+    """
+    キャッシュが数えているヒット・ミス数をスクレイプ時に読み出す。
+    """
+    requests = Counter(
+        "judgment_cache_requests_total", "Cache lookups by result", ["cache", "result"]
+    )
+    entries = Gauge("judgment_cache_entries", "Entries held by each cache", ["cache"])
+    for name, stats in (
+        ("query_vector", query_vector_cache.stats()),
+        ("search_result", search_result_cache.stats()),
+    ):
+        requests.inc(stats["hits"], cache=name, result="hit")
+        requests.inc(stats["misses"], cache=name, result="miss")
+        entries.set(stats["size"], cache=name)
+    return [requests, entries]
+
+
+registry.add_collector(_cache_metrics)
+
+
+@router.get("/metrics", summary="Prometheus メトリクス", include_in_schema=False)
+def metrics() -> PlainTextResponse:
+    """
+    このプロセスのメトリクスを Prometheus のテキスト形式で返す。
+
+    Returns:
+        PlainTextResponse: "# HELP ..." / "# TYPE ..." / サンプル行
+    """
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -2,10 +2,28 @@
 FastAPI アプリの起動エントリーポイント。
 """
 
+import threading
+
 from fastapi import FastAPI
 
-from .infrastructure.qdrant.qdrant_gateway import create_judgement_collection
-from .interface.api.routers import judgment_bulk_router, judgment_router
+from .infrastructure.embedding.model_registry import (
+    EMBEDDING_PRELOAD,
+    get_encoder,
+    model_registry,
+)
+from .infrastructure.executors.cpu_executor import shutdown_process_pool
+from .infrastructure.qdrant.qdrant_gateway import (
+    close_vector_store,
+    create_judgement_collection,
+)
+from .interface.api.routers import (
+    health_router,
+    judgment_bulk_router,
+    judgment_router,
+    metrics_router,
+)
+from .usecase.judgment_bulk_jobs import watch_stale_jobs
+from .usecase.judgment_query import warm_up_lexical_search
 
 
 def create_app() -> FastAPI:
@@ -20,11 +38,31 @@ def create_app() -> FastAPI:
     app.include_router(judgment_router.router, prefix="/api")
     # 大量PDF処理
     app.include_router(judgment_bulk_router.router, prefix="/api")
+    # ヘルスチェック (Liveness / Readiness)
+    app.include_router(health_router.router)
+    # Prometheus メトリクス
+    app.include_router(metrics_router.router)
+    stop_job_watch = threading.Event()
 
     # start_appイベントでコレクション作成など初期処理
     @app.on_event("startup")
     def on_startup() -> None:
         create_judgement_collection()
+        # EMBEDDING_PRELOAD=true なら起動直後からモデルをロード (完了まで /health/ready は 503)
+        if EMBEDDING_PRELOAD:
+            model_registry.load_in_background()
+        # 語彙検索用の janome 辞書・BM25 索引を先に読み込む
+        threading.Thread(target=warm_up_lexical_search, daemon=True).start()
+        # 中断したバルク登録ジョブ(他ワーカー・前回起動分)を引き継いで再開する
+        threading.Thread(
+            target=watch_stale_jobs, args=(get_encoder, stop_job_watch), daemon=True
+        ).start()
+
+    @app.on_event("shutdown")
+    async def on_shutdown() -> None:
+        stop_job_watch.set()
+        await close_vector_store()
+        shutdown_process_pool()
 
     return app
 
@@ -0,0 +1,593 @@
+"""
+ユースケース層 - 大量PDFのバルク登録パイプライン
+
+ZIP内のPDFを以下のステージに分けて並行処理する。
+
+  [reader] ZIPからPDFを1件ずつ読み出し、プロセスプールへ投入
+           (並行して、その判例の登録済みポイントIDを Qdrant から取得)
+     ↓ (有界キュー)
+  [parse]  プロセスプールで parse_judgment_pdf_with_timings を全コアで並列実行
+           (文境界で、エンコーダのトークン数に収まるチャンクに分ける)
+     ↓ (有界キュー)
+  [encode] 単一スレッドで埋め込みベクトル化 (モデルは1つだけ保持)
+           EmbeddingBatcher で文書をまたいだ固定サイズのバッチにまとめる
+           (ディスク上のエンベディングキャッシュにあるチャンクはモデルに通さない)
+     ↓ (有界キュー)
+  [upsert] 複数スレッドで Qdrant へ並行アップサート
+           (チャンク本文はアップサート前にチャンクストアへ保存し、payload には載せない)
+           (語彙索引に無いチャンクはプロセスプールでトークナイズし、BM25 索引へ追加)
+
+判決文の冒頭から取り出した書誌情報 (裁判所・判決日・事件番号・事件の種類) は
+追加するチャンクの payload に載せ、内容が変わらず残るチャンクには set_metadata で書き込む
+(取り出せなくなったフィールドは残るチャンクの payload から消す)。
+再投入した PDF からチャンクが取れなかった場合は、登録済みのチャンクをすべて削除する。
+ZIP から読めなかった PDF メンバー (CRC 不一致・サイズ超過・ZIP爆弾の疑い) は、
+解析に失敗した PDF と同じく failed_pdf に数え、チェックポイントに記録する。
+
+ポイントIDは内容から決定的に導出するため、登録済みと同じチャンクはエンコードも
+アップサートも行わない。内容が変わらないコーパスの再投入はほぼ解析コストだけで済む。
+
+語彙索引(BM25)は BULK_LEXICAL_COMMIT_SECONDS ごとと、処理の最後に保存する。
+保存のたびに、それまでに書き込みを終えたZIPメンバーを on_checkpoint に渡す
+(ジョブストアに記録し、中断したジョブは completed を渡して続きから再開する)。
+
+ステージ間のキューは有界なので、遅いステージがあれば上流が自動的に待つ(バックプレッシャー)。
+
+ワーカー内の制限時間 (SIGALRM) はネイティブコード (pypdfium2) の中では効かないため、
+解析結果は PDF_PARSE_HARD_LIMIT_SECONDS + BULK_PARSE_WAIT_SLACK_SECONDS までしか待たない。
+過ぎたら その PDF を失敗として扱い、止まったワーカーごとプロセスプールを作り直す
+(巻き添えで打ち切られた他の PDF は新しいプールで解析し直す)。
+
+処理件数・スループットは status["stages"] のほか、/metrics のメトリクスにも記録する。
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import CancelledError, Future
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.domain.models.text_encoder import TextEncoder
+from app.domain.models.vector_store import VectorPoint
+from app.domain.services.embedding_batcher import ChunkKey, EmbeddingBatcher
+from app.domain.services.judgment_metadata import metadata_from_chunks
+from app.domain.services.lexical_tokenizer import count_terms
+from app.domain.services.pdf_parser import PdfParseTimeout
+from app.domain.services.point_id import diff_chunks
+from app.domain.services.zip_extractor import count_pdfs_in_zip, iter_pdfs_from_zip
+from app.infrastructure.chunk_store.chunk_store import (
+    ChunkStore,
+    StoredChunk,
+    get_chunk_store,
+)
+from app.infrastructure.embedding.embedding_store import get_embedding_store
+from app.infrastructure.executors.cpu_executor import RecyclingProcessPool
+from app.infrastructure.lexical.bm25_index import Bm25Index, get_lexical_index
+from app.infrastructure.metrics.metrics import BULK_CHUNKS, BULK_PDFS, BULK_THROUGHPUT
+from app.infrastructure.qdrant.qdrant_gateway import (
+    delete_points_by_ids,
+    list_judgment_point_ids,
+    set_judgment_metadata,
+    upsert_judgment_points,
+)
+from app.usecase.judgment_chunk_text import find_unstored_chunks
+from app.usecase.judgment_chunking import (
+    CHUNKING_PARAMS,
+    PDF_PARSE_HARD_LIMIT_SECONDS,
+    parse_judgment_pdf_with_timings,
+    record_parse_timings,
+)
+from app.usecase.judgment_lexical_index import (
+    find_unindexed_chunks,
+    stage_lexical_update,
+)
+
+BULK_PARSE_WORKERS = int(os.getenv("BULK_PARSE_WORKERS", str(os.cpu_count() or 1)))
+BULK_UPSERT_WORKERS = int(os.getenv("BULK_UPSERT_WORKERS", "2"))
+BULK_QUEUE_SIZE = int(os.getenv("BULK_QUEUE_SIZE", "16"))
+BULK_LEXICAL_COMMIT_SECONDS = float(os.getenv("BULK_LEXICAL_COMMIT_SECONDS", "30"))
+BULK_PARSE_WAIT_SLACK_SECONDS = float(os.getenv("BULK_PARSE_WAIT_SLACK_SECONDS", "30"))
+
+_QUEUE_POLL_SECONDS = 0.5
+_END = object()
+
+
+@dataclass
+class StageStats:
+    """
+    パイプライン1ステージ分の処理実績。
+
+    Attributes:
+        items: 処理したPDF件数 (upsert ステージはバッチ件数)
+        chunks: 処理したチャンク数
+        busy_seconds: ステージ内で実処理に費やした合計秒数 (並列ワーカー分を合算)
+    """
+
+    items: int = 0
+    chunks: int = 0
+    busy_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, items: int, chunks: int, seconds: float) -> None:
+        with self._lock:
+            self.items += items
+            self.chunks += chunks
+            self.busy_seconds += seconds
+
+    def as_dict(self, elapsed: float) -> dict:
+        elapsed = max(elapsed, 1e-9)
+        return {
+            "items": self.items,
+            "chunks": self.chunks,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "items_per_sec": round(self.items / elapsed, 2),
+            "chunks_per_sec": round(self.chunks / elapsed, 2),
+        }
+
+
+class BulkIngestCancelled(Exception):
+    """
+    バルク登録がキャンセルされた。
+    """
+
+
+@dataclass
+class _ParsedPdf:
+    rel_path: str
+    judgment_id: str
+    pdf_data: bytes
+    generation: int
+    future: Future
+    existing_ids: set[str]
+
+
+@dataclass
+class _UnreadablePdf:
+    """
+    ZIP から読み出せなかった PDF メンバー。解析に失敗した PDF として数える。
+    """
+
+    rel_path: str
+    reason: str
+
+
+@dataclass
+class _PendingDocument:
+    """
+    エンコード待ちのチャンクを抱えている文書。追加分のベクトルが揃ったら登録する。
+    """
+
+    added: list[tuple[int, str, str]]
+    stale: list[str]
+    lexical: list[tuple[int, str, str]]
+    texts: list[StoredChunk]
+    member: str
+    metadata: dict[str, str]
+    refresh_metadata: bool
+    vectors: dict[int, list[float]] = field(default_factory=dict)
+
+
+@dataclass
+class _WriteBatch:
+    """
+    1文書分の書き込み内容（追加・更新するポイント、削除するポイントID、
+    語彙索引に追加するチャンク、チャンクストアに保存する本文、元のZIPメンバー名、
+    残るチャンクの payload に書き込む書誌情報）。
+    """
+
+    judgment_id: str
+    points: list[VectorPoint]
+    stale: list[str]
+    lexical: list[tuple[int, str, str]] = field(default_factory=list)
+    texts: list[StoredChunk] = field(default_factory=list)
+    member: str = ""
+    metadata: dict[str, str] | None = None
+
+
+def _parse_member(pdf_bytes: bytes) -> tuple[list[str], float, dict[str, float]]:
+    """
+    プロセスプール内で実行されるPDF解析処理。処理時間と抽出・チャンク化の内訳も返す。
+    """
+    started = time.perf_counter()
+    chunks, timings = parse_judgment_pdf_with_timings(pdf_bytes)
+    return chunks, time.perf_counter() - started, timings
+
+
+def _wait_parsed(
+    pool: RecyclingProcessPool, item: _ParsedPdf, timeout: float | None
+) -> tuple[list[str], float, dict[str, float]]:
+    """
+    解析結果を待つ。timeout 秒を過ぎても終わらなければ、止まったワーカーごと
+    プールを作り直して PdfParseTimeout を送出する。作り直しで打ち切られた PDF は
+    新しいプールで解析し直す。
+    """
+    while True:
+        try:
+            return item.future.result(timeout=timeout)
+        except TimeoutError:
+            if item.future.done():
+                raise  # ワーカー内で制限時間を超えた
+            pool.recycle(item.generation)
+            raise PdfParseTimeout(
+                f"PDF parse did not finish within {timeout}s"
+            ) from None
+        except (BrokenProcessPool, CancelledError):
+            if not pool.is_stale(item.generation):
+                raise
+            item.generation, item.future = pool.submit(_parse_member, item.pdf_data)
+
+
+def _to_judgment_id(rel_path: str) -> str:
+    """
+    サブディレクトリ含むパスを judgment_id として使う。
+    """
+    return rel_path.replace("/", "__").replace("\\", "__")
+
+
+def _build_batch(judgment_id: str, doc: _PendingDocument) -> _WriteBatch:
+    points = [
+        VectorPoint(
+            id=point_id,
+            vector=doc.vectors[i],
+            payload={
+                "judgment_id": judgment_id,
+                "chunk_index": i,
+                "chunking": CHUNKING_PARAMS,
+                **doc.metadata,
+            },
+        )
+        for i, _, point_id in doc.added
+    ]
+    return _WriteBatch(
+        judgment_id,
+        points,
+        doc.stale,
+        doc.lexical,
+        doc.texts,
+        doc.member,
+        doc.metadata if doc.refresh_metadata else None,
+    )
+
+
+def _put(q: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """
+    停止要求を確認しながら有界キューへ投入する。停止済みなら False を返す。
+    """
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_QUEUE_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def run_bulk_ingest(
+    zip_path: str,
+    encoder: TextEncoder,
+    status: dict,
+    parse_workers: int = BULK_PARSE_WORKERS,
+    upsert_workers: int = BULK_UPSERT_WORKERS,
+    queue_size: int = BULK_QUEUE_SIZE,
+    upsert: Callable[[list[VectorPoint]], None] = upsert_judgment_points,
+    delete: Callable[[list[str]], None] = delete_points_by_ids,
+    list_ids: Callable[[str], set[str]] = list_judgment_point_ids,
+    set_metadata: Callable[[str, dict[str, str]], None] = set_judgment_metadata,
+    lexical_index: Bm25Index | None = None,
+    chunk_store: ChunkStore | None = None,
+    completed: dict[str, bool] | None = None,
+    on_checkpoint: Callable[[list[tuple[str, bool]]], None] | None = None,
+    cancel: threading.Event | None = None,
+) -> int:
+    """
+    ZIP内の全PDFをパイプライン処理でベクトル登録する。
+
+    Args:
+        zip_path (str): 処理対象のZIPファイルパス
+        encoder (TextEncoder): テキストをベクトル化する埋め込みモデル
+        status (dict): 進捗を書き込むステータス辞書 (upload_tasks[task_id])
+        parse_workers (int): PDF解析に使うプロセス数
+        upsert_workers (int): Qdrant へアップサートするスレッド数
+        queue_size (int): 各ステージ間キューの上限 (バックプレッシャー)
+        upsert (Callable): アップサート関数 (テスト時に差し替え可能)
+        delete (Callable): ポイントID指定の削除関数
+        list_ids (Callable): 判例の登録済みポイントIDを返す関数
+        set_metadata (Callable): 判例の全ポイントの payload に書誌情報を書き込む関数
+        lexical_index (Bm25Index): 語彙索引 (省略時は共有の索引)
+        chunk_store (ChunkStore): チャンク本文のストア (省略時は共有のストア)
+        completed (dict): 前回までに処理済みのメンバー → 解析に失敗したか (スキップする)
+        on_checkpoint (Callable): 語彙索引の保存後、書き込みを終えた
+            (メンバー名, 解析に失敗したか) のリストを受け取る関数
+        cancel (threading.Event): セットされたら処理を中断する
+
+    Returns:
+        int: 処理したチャンク総数 (内容が変わらずスキップしたチャンクを含む)
+
+    Raises:
+        BulkIngestCancelled: cancel がセットされた場合
+        Exception: いずれかのステージで致命的なエラーが起きた場合
+    """
+    index = get_lexical_index() if lexical_index is None else lexical_index
+    texts_store = get_chunk_store() if chunk_store is None else chunk_store
+    last_lexical_commit = [time.monotonic()]
+    completed = completed or {}
+    finished: list[tuple[str, bool]] = []
+    finished_lock = threading.Lock()
+    commit_lock = threading.Lock()
+    total_pdfs = count_pdfs_in_zip(zip_path)
+    status["total_pdf"] = total_pdfs
+
+    stats = {"parse": StageStats(), "encode": StageStats(), "upsert": StageStats()}
+    parsed_q: queue.Queue = queue.Queue(maxsize=queue_size)
+    upsert_q: queue.Queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors: list[Exception] = []
+    started = time.perf_counter()
+
+    def publish_stats() -> None:
+        elapsed = time.perf_counter() - started
+        status["stages"] = {name: s.as_dict(elapsed) for name, s in stats.items()}
+        elapsed = max(elapsed, 1e-9)
+        BULK_THROUGHPUT.set(stats["parse"].items / elapsed, unit="pdfs")
+        BULK_THROUGHPUT.set(stats["upsert"].chunks / elapsed, unit="chunks")
+
+    def fail(exc: Exception) -> None:
+        errors.append(exc)
+        stop.set()
+
+    def finish_member(member: str, failed: bool = False) -> None:
+        with finished_lock:
+            finished.append((member, failed))
+
+    def commit_lexical() -> None:
+        """
+        語彙索引を保存し、それまでに書き込みを終えたメンバーをチェックポイントにする。
+        """
+        with commit_lock:
+            with finished_lock:
+                members = finished[:]
+                finished.clear()
+            last_lexical_commit[0] = time.monotonic()
+            index.commit()
+            if on_checkpoint is not None:
+                on_checkpoint(members)
+
+    def report_unreadable(rel_path: str, reason: str) -> None:
+        if rel_path not in completed:
+            _put(parsed_q, _UnreadablePdf(rel_path, reason), stop)
+
+    def read_and_submit(pool: RecyclingProcessPool) -> None:
+        try:
+            for rel_path, pdf_data in iter_pdfs_from_zip(
+                zip_path, on_skip=report_unreadable
+            ):
+                if rel_path in completed:
+                    continue
+                generation, future = pool.submit(_parse_member, pdf_data)
+                judgment_id = _to_judgment_id(rel_path)
+                item = _ParsedPdf(
+                    rel_path,
+                    judgment_id,
+                    pdf_data,
+                    generation,
+                    future,
+                    list_ids(judgment_id),
+                )
+                if not _put(parsed_q, item, stop):
+                    return
+        except Exception as e:  # 呼び出し元で再送出する
+            fail(e)
+        finally:
+            _put(parsed_q, _END, stop)
+
+    def upsert_worker(pool: RecyclingProcessPool) -> None:
+        while True:
+            try:
+                item = upsert_q.get(timeout=_QUEUE_POLL_SECONDS)
+            except queue.Empty:
+                if stop.is_set():
+                    return
+                continue
+            if item is _END:
+                return
+            try:
+                t0 = time.perf_counter()
+                texts_store.put_many(item.texts)
+                if item.points:
+                    upsert(item.points)
+                    BULK_CHUNKS.inc(len(item.points))
+                if item.stale:
+                    delete(item.stale)
+                    texts_store.delete_ids(item.stale)
+                if item.metadata is not None:
+                    set_metadata(item.judgment_id, item.metadata)
+                term_counts = []
+                if item.lexical:
+                    texts = [text for _, text, _ in item.lexical]
+                    term_counts = pool.run(count_terms, texts)
+                stage_lexical_update(
+                    index, item.judgment_id, item.lexical, term_counts, item.stale
+                )
+                if item.member:
+                    finish_member(item.member)
+                if (
+                    time.monotonic() - last_lexical_commit[0]
+                    >= BULK_LEXICAL_COMMIT_SECONDS
+                ):
+                    commit_lexical()
+                stats["upsert"].record(1, len(item.points), time.perf_counter() - t0)
+            except Exception as e:
+                fail(e)
+                return
+
+    parse_wait = (
+        None
+        if PDF_PARSE_HARD_LIMIT_SECONDS is None
+        else PDF_PARSE_HARD_LIMIT_SECONDS + BULK_PARSE_WAIT_SLACK_SECONDS
+    )
+    mp_context = multiprocessing.get_context("spawn")
+    with RecyclingProcessPool(parse_workers, mp_context) as pool:
+        reader = threading.Thread(target=read_and_submit, args=(pool,), daemon=True)
+        uploaders = [
+            threading.Thread(target=upsert_worker, args=(pool,), daemon=True)
+            for _ in range(max(1, upsert_workers))
+        ]
+        reader.start()
+        for t in uploaders:
+            t.start()
+
+        processed = len(completed)
+        failed = sum(completed.values())
+        count_chunks = 0
+        unchanged_chunks = 0
+        batcher = EmbeddingBatcher(encoder, cache=get_embedding_store())
+        pending_docs: dict[str, _PendingDocument] = {}
+
+        def dispatch(encoded: list[tuple[ChunkKey, list[float]]]) -> bool:
+            """
+            エンコード結果を文書に振り分け、揃った文書をアップサートキューへ流す。
+            """
+            for (judgment_id, index), vector in encoded:
+                doc = pending_docs[judgment_id]
+                doc.vectors[index] = vector
+                if len(doc.vectors) < len(doc.added):
+                    continue
+                del pending_docs[judgment_id]
+                stats["encode"].record(1, 0, 0.0)
+                if not _put(upsert_q, _build_batch(judgment_id, doc), stop):
+                    return False
+            return True
+
+        def encode(items: list[tuple[ChunkKey, str]] | None) -> bool:
+            t0 = time.perf_counter()
+            before = batcher.encoded_chunks
+            encoded = batcher.add_many(items) if items is not None else batcher.flush()
+            stats["encode"].record(
+                0, batcher.encoded_chunks - before, time.perf_counter() - t0
+            )
+            status["cached_chunks"] = batcher.cached_chunks
+            return dispatch(encoded)
+
+        try:
+            while not stop.is_set():
+                if cancel is not None and cancel.is_set():
+                    raise BulkIngestCancelled("Bulk ingest was cancelled")
+                try:
+                    item = parsed_q.get(timeout=_QUEUE_POLL_SECONDS)
+                except queue.Empty:
+                    continue
+                if item is _END:
+                    encode(None)
+                    break
+
+                processed += 1
+                status["processed_pdf"] = processed
+                status["detail"] = f"Processing {processed}/{total_pdfs}"
+                if isinstance(item, _UnreadablePdf):
+                    failed += 1
+                    BULK_PDFS.inc(result="failed")
+                    status["failed_pdf"] = failed
+                    finish_member(item.rel_path, failed=True)
+                    continue
+                try:
+                    chunks, parse_seconds, parse_timings = _wait_parsed(
+                        pool, item, parse_wait
+                    )
+                except Exception as e:  # 壊れたPDFはスキップして続行
+                    failed += 1
+                    BULK_PDFS.inc(result="failed")
+                    status["failed_pdf"] = failed
+                    print(f"PDF解析に失敗しました: {item.rel_path}: {e}")
+                    finish_member(item.rel_path, failed=True)
+                    continue
+                stats["parse"].record(1, len(chunks), parse_seconds)
+                record_parse_timings(parse_timings)
+                BULK_PDFS.inc(result="parsed")
+                if not chunks:
+                    if not item.existing_ids:
+                        finish_member(item.rel_path)
+                        continue
+                    # 本文が取れなくなった文書は、登録済みのチャンクを残さない
+                    batch = _WriteBatch(
+                        item.judgment_id,
+                        [],
+                        sorted(item.existing_ids),
+                        member=item.rel_path,
+                    )
+                    if not _put(upsert_q, batch, stop):
+                        break
+                    continue
+
+                judgment_id = item.judgment_id
+                diff = diff_chunks(judgment_id, chunks, item.existing_ids)
+                count_chunks += len(chunks)
+                unchanged_chunks += diff.unchanged
+                status["unchanged_chunks"] = unchanged_chunks
+                lexical = find_unindexed_chunks(index, judgment_id, chunks)
+                texts = find_unstored_chunks(texts_store, judgment_id, chunks)
+                # 残るチャンクの payload は上書きされないため、書誌情報を書き込み直す
+                # (取り出せなかったフィールドも消すため、metadata が空でも書き込む)
+                metadata = metadata_from_chunks(chunks)
+                refresh_metadata = bool(diff.unchanged)
+                if not diff.added:
+                    # 内容が変わっていない(または削除のみ)の文書はエンコード不要
+                    if not (diff.stale or lexical or texts or refresh_metadata):
+                        finish_member(item.rel_path)
+                        continue
+                    batch = _WriteBatch(
+                        judgment_id,
+                        [],
+                        diff.stale,
+                        lexical,
+                        texts,
+                        item.rel_path,
+                        metadata if refresh_metadata else None,
+                    )
+                    if not _put(upsert_q, batch, stop):
+                        break
+                    continue
+
+                if judgment_id in pending_docs and not encode(None):
+                    break  # 同じIDが再登場したら、先に前の文書を確定させる
+                pending_docs[judgment_id] = _PendingDocument(
+                    added=diff.added,
+                    stale=diff.stale,
+                    lexical=lexical,
+                    texts=texts,
+                    member=item.rel_path,
+                    metadata=metadata,
+                    refresh_metadata=refresh_metadata,
+                )
+                if not encode([((judgment_id, i), t) for i, t, _ in diff.added]):
+                    break
+                publish_stats()
+        except Exception as e:
+            fail(e)
+        finally:
+            for _ in uploaders:
+                _put(upsert_q, _END, stop)
+            for t in uploaders:
+                t.join()
+            stop.set()
+            reader.join()
+            # エラー停止時は未処理の解析ジョブを取り消す
+            while not parsed_q.empty():
+                pending = parsed_q.get_nowait()
+                if isinstance(pending, _ParsedPdf):
+                    pending.future.cancel()
+            publish_stats()
+
+    status["failed_pdf"] = failed
+    try:
+        # エラー停止時も、Qdrant へ書き込めた分は語彙索引にも残し、チェックポイントにする
+        commit_lexical()
+    except Exception as e:
+        errors.append(e)
+    if errors:
+        raise errors[0]
+    return count_chunks
@@ -0,0 +1,243 @@
+"""
+ユースケース層 - 永続化されたバルク登録ジョブの実行・再開・キャンセル
+
+ジョブの進捗とチェックポイントはジョブストア (ingest_job_store) に保存するため、
+- どの uvicorn ワーカーからでも進捗を参照・キャンセルできる
+- プロセスが落ちても、アップロード済みZIPと処理済みメンバーから続きを再開できる
+
+実行中は JOB_HEARTBEAT_SECONDS ごとに進捗を保存し(heartbeat)、キャンセル要求を確認する。
+各ワーカーの見張りスレッドは、heartbeat が JOB_LEASE_SECONDS 途絶えたジョブを引き継いで再開する。
+進捗・チェックポイントの書き込みは持ち主のワーカーだけが行える。引き継がれた後も動いていた
+元のワーカーは書き込みに失敗した時点で処理をやめ、ZIP やチェックポイントには触れない。
+
+ZIP とチェックポイントを消すのは完了・キャンセル時だけ。エラーで止まったジョブは
+そのまま残し、resume_bulk_job で続きから再開できる (cancel_bulk_job で破棄する)。
+
+環境変数:
+- BULK_UPLOAD_DIR: アップロードしたZIPの保存先 (再開に使うため一時ディレクトリには置かない)
+- JOB_HEARTBEAT_SECONDS / JOB_LEASE_SECONDS
+"""
+
+import os
+import shutil
+import socket
+import threading
+import uuid
+from collections.abc import Callable
+
+from app.domain.models.text_encoder import TextEncoder
+from app.infrastructure.jobs.ingest_job_store import get_ingest_job_store
+from app.usecase.judgment_bulk_ingest import BulkIngestCancelled, run_bulk_ingest
+
+BULK_UPLOAD_DIR = os.getenv("BULK_UPLOAD_DIR", "data/bulk_uploads")
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "5"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_FINISHED = ("done", "cancelled")
+
+
+class JobLeaseLost(Exception):
+    """
+    ジョブが他のワーカーに引き継がれ、このワーカーは持ち主でなくなった。
+    """
+
+
+def new_job_zip_path(task_id: str) -> str:
+    """
+    ジョブのZIPの保存先を作って返す。
+    """
+    job_dir = os.path.join(BULK_UPLOAD_DIR, task_id)
+    os.makedirs(job_dir, exist_ok=True)
+    return os.path.join(job_dir, "uploaded.zip")
+
+
+def create_bulk_job(task_id: str, zip_path: str) -> dict:
+    """
+    アップロード済みZIPのジョブを登録する。
+
+    Returns:
+        dict: 初期の進捗
+    """
+    status = {
+        "status": "in_progress",
+        "detail": "Initializing",
+        "processed_pdf": 0,
+        "total_pdf": 0,
+        "failed_pdf": 0,
+        "stages": {},
+    }
+    get_ingest_job_store().create(task_id, zip_path, status, WORKER_ID)
+    return status
+
+
+def get_bulk_job_status(task_id: str) -> dict | None:
+    """
+    ジョブの進捗を返す（無ければ None）。
+    """
+    return get_ingest_job_store().get(task_id)
+
+
+def _discard_job_files(task_id: str, zip_path: str) -> None:
+    get_ingest_job_store().delete_checkpoints(task_id)
+    shutil.rmtree(os.path.dirname(zip_path), ignore_errors=True)
+
+
+def cancel_bulk_job(task_id: str) -> bool:
+    """
+    実行中のジョブにキャンセルを要求する (実行しているワーカーが次の heartbeat で中断する)。
+    エラーで止まったジョブは、その場でキャンセル済みにして ZIP とチェックポイントを削除する。
+    どちらでもなければ False を返す。
+    """
+    store = get_ingest_job_store()
+    if store.request_cancel(task_id):
+        return True
+    job = store.claim_failed(task_id, WORKER_ID)
+    if job is None:
+        return False
+    job.status.update(status="cancelled", detail="Cancelled")
+    store.update(task_id, job.status, WORKER_ID)
+    _discard_job_files(task_id, job.zip_path)
+    return True
+
+
+def resume_bulk_job(task_id: str) -> str | None:
+    """
+    エラーで止まったジョブを引き継ぎ、実行中に戻す。
+    呼び出し側が返した ZIP のパスで run_bulk_job を呼び、チェックポイントの続きから処理する。
+
+    Returns:
+        str | None: ZIP のパス (エラーで止まったジョブが無ければ None)
+
+    Raises:
+        FileNotFoundError: ZIP が残っていない場合 (ジョブはエラーのまま)
+    """
+    store = get_ingest_job_store()
+    job = store.claim_failed(task_id, WORKER_ID)
+    if job is None:
+        return None
+    if not os.path.exists(job.zip_path):
+        job.status.update(status="error", detail="Uploaded ZIP is missing")
+        store.update(task_id, job.status, WORKER_ID)
+        raise FileNotFoundError(job.zip_path)
+    job.status.update(status="in_progress", detail="Resuming")
+    store.update(task_id, job.status, WORKER_ID)
+    return job.zip_path
+
+
+def run_bulk_job(task_id: str, zip_path: str, encoder: TextEncoder) -> None:
+    """
+    ジョブを実行する。処理済みメンバーがあれば、その続きから再開する。
+    完了・キャンセル時はZIPとチェックポイントを削除する。エラー時は再開できるよう残す。
+    他のワーカーに引き継がれたと分かった時点で中断し、ジョブには何も書き込まない。
+
+    Args:
+        task_id: ジョブID
+        zip_path: アップロード済みZIPのパス
+        encoder: 共有の埋め込みモデル
+    """
+    store = get_ingest_job_store()
+    status = store.get(task_id) or {}
+    status.pop("cancel_requested", None)
+    completed = store.completed_members(task_id)
+    status.update(
+        status="in_progress",
+        detail="Resuming" if completed else "Reading ZIP central directory",
+    )
+    if not store.update(task_id, dict(status), WORKER_ID):
+        print(f"バルク登録ジョブは他のワーカーが実行しています: {task_id}")
+        return
+
+    cancel = threading.Event()
+    finished = threading.Event()
+    lost = threading.Event()
+
+    def heartbeat() -> None:
+        # ジョブストアが一時的に使えなくても (ロック待ちなど)、次の周期で送り直す
+        while not finished.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                if not store.update(task_id, dict(status), WORKER_ID):
+                    lost.set()
+                    cancel.set()
+                    return
+                if store.is_cancel_requested(task_id):
+                    cancel.set()
+            except Exception as e:
+                print(f"バルク登録ジョブのハートビートに失敗しました: {task_id}: {e}")
+
+    def checkpoint(members: list[tuple[str, bool]]) -> None:
+        if not store.add_checkpoints(task_id, members, WORKER_ID):
+            lost.set()
+            raise JobLeaseLost(task_id)
+        store.update(task_id, dict(status), WORKER_ID)
+
+    if store.is_cancel_requested(task_id):
+        cancel.set()
+    beat = threading.Thread(target=heartbeat, daemon=True)
+    beat.start()
+    try:
+        count_chunks = run_bulk_ingest(
+            zip_path,
+            encoder,
+            status,
+            completed=completed,
+            on_checkpoint=checkpoint,
+            cancel=cancel,
+        )
+        status["status"] = "done"
+        status["detail"] = f"Completed. total_chunks={count_chunks}"
+    except BulkIngestCancelled:
+        status["status"] = "cancelled"
+        status["detail"] = "Cancelled"
+    except Exception as e:
+        status["status"] = "error"
+        status["detail"] = str(e)
+    finally:
+        finished.set()
+        beat.join()
+        if lost.is_set() or not store.update(task_id, dict(status), WORKER_ID):
+            print(f"バルク登録ジョブが他のワーカーに引き継がれました: {task_id}")
+        elif status["status"] in _FINISHED:
+            _discard_job_files(task_id, zip_path)
+
+
+def resume_stale_jobs(encoder_provider: Callable[[], TextEncoder]) -> int:
+    """
+    heartbeat の途絶えたジョブを引き継ぎ、別スレッドで再開する。
+
+    Args:
+        encoder_provider: 埋め込みモデルを返す関数（再開するジョブがあるときだけ呼ぶ）
+
+    Returns:
+        int: 再開したジョブ数
+    """
+    store = get_ingest_job_store()
+    jobs = store.claim_stale(WORKER_ID, JOB_LEASE_SECONDS)
+    for job in jobs:
+        if not os.path.exists(job.zip_path):
+            job.status.update(status="error", detail="Uploaded ZIP is missing")
+            store.update(job.task_id, job.status, WORKER_ID)
+            continue
+        print(f"中断したバルク登録ジョブを再開します: {job.task_id}")
+        threading.Thread(
+            target=run_bulk_job,
+            args=(job.task_id, job.zip_path, encoder_provider()),
+            daemon=True,
+        ).start()
+    return len(jobs)
+
+
+def watch_stale_jobs(
+    encoder_provider: Callable[[], TextEncoder], stop: threading.Event
+) -> None:
+    """
+    JOB_LEASE_SECONDS / 2 ごとに resume_stale_jobs を呼び続ける（見張りスレッド用）。
+    """
+    while True:
+        try:
+            resume_stale_jobs(encoder_provider)
+        except Exception as e:
+            print(f"バルク登録ジョブの再開に失敗しました: {e}")
+        if stop.wait(JOB_LEASE_SECONDS / 2):
+            return
@@ -0,0 +1,261 @@
+"""
+ユースケース層 - 分割アップロード(アップロードセッション)
+
+大きなZIPを1リクエストで送ると、途中で切れたときに最初から送り直しになる。
+セッションでは ZIP を番号付きのパートに分けて受け取る。
+- 作成時に ZIP の大きさで保存先ファイルを確保し (疎ファイル)、各パートは受け取りながら
+  自分のオフセットに直接書き込む。パートを一時ファイルに置いて後から連結しないため、
+  ZIP 全体のコピーは発生しない
+- パートごとに SHA-256 を照合し、一致したものだけを受け取り済みにする。
+  受信を始めた時点でそのパートは未受信に戻るため、照合に失敗した再送は
+  コミットまでに送り直す必要がある (同じパートの再送は上書き)。
+  パートは並列に送ってよいが、同じ番号のパートを同時に送ってはならない
+- 足りないパートを問い合わせられ、揃ったらコミットでバルク登録ジョブを開始する
+  (タスクID = セッションID。ZIP は judgment_bulk_jobs のジョブと同じ場所に置く)
+
+環境変数:
+- UPLOAD_PART_SIZE: 既定のパートサイズ (バイト)
+- UPLOAD_MAX_PART_SIZE: 指定できるパートサイズの上限 (バイト)
+- UPLOAD_SESSION_TTL_SECONDS: パートが届かなくなってから、コミットされないセッションを
+  破棄するまでの秒数 (作成からではなく最後のパートの受信からの秒数)
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import time
+import uuid
+from collections.abc import AsyncIterator
+
+from app.infrastructure.jobs.upload_session_store import (
+    UploadSession,
+    get_upload_session_store,
+    new_upload_session,
+)
+from app.usecase.judgment_bulk_jobs import create_bulk_job, new_job_zip_path
+
+MAX_ZIP_SIZE = 50 * 1024 * 1024 * 1024  # 50GB
+UPLOAD_PART_SIZE = int(os.getenv("UPLOAD_PART_SIZE", str(64 * 1024 * 1024)))
+UPLOAD_MAX_PART_SIZE = int(os.getenv("UPLOAD_MAX_PART_SIZE", str(1024 * 1024 * 1024)))
+UPLOAD_SESSION_TTL_SECONDS = float(os.getenv("UPLOAD_SESSION_TTL_SECONDS", "86400"))
+
+# 受け取ったデータをこの大きさまで溜めてから書き込む
+_WRITE_BUFFER_SIZE = 4 * 1024 * 1024
+
+
+class UploadSessionNotFound(LookupError):
+    """
+    セッションが存在しない（期限切れで破棄された場合を含む）。
+    """
+
+
+class UploadSessionConflict(Exception):
+    """
+    セッションの状態と合わない操作（コミット済みのセッションへの書き込み、パート不足でのコミット）。
+    """
+
+
+class InvalidUploadPart(ValueError):
+    """
+    パート番号・サイズ・チェックサムが不正。
+    """
+
+
+def _session_status(session: UploadSession) -> dict:
+    received = get_upload_session_store().received_parts(session.session_id)
+    return {
+        "session_id": session.session_id,
+        "state": session.state,
+        "total_size": session.total_size,
+        "part_size": session.part_size,
+        "part_count": session.part_count,
+        "received_parts": len(received),
+        "missing_parts": [
+            n for n in range(1, session.part_count + 1) if n not in received
+        ],
+    }
+
+
+def _open_session(session_id: str) -> UploadSession:
+    session = get_upload_session_store().get(session_id)
+    if session is None:
+        raise UploadSessionNotFound(session_id)
+    if not session.is_open:
+        raise UploadSessionConflict("Upload session is already committed")
+    return session
+
+
+def expire_upload_sessions(now: float | None = None) -> int:
+    """
+    最後の操作から UPLOAD_SESSION_TTL_SECONDS を過ぎてもコミットされないセッションを
+    ZIP ごと破棄する。同じく古いコミット済みセッションの記録も消す。
+
+    Returns:
+        int: 破棄したセッション数
+    """
+    store = get_upload_session_store()
+    now = time.time() if now is None else now
+    updated_before = now - UPLOAD_SESSION_TTL_SECONDS
+    store.delete_committed_idle_since(updated_before)
+    sessions = store.open_sessions_idle_since(updated_before)
+    for session in sessions:
+        store.delete(session.session_id)
+        shutil.rmtree(os.path.dirname(session.zip_path), ignore_errors=True)
+    return len(sessions)
+
+
+def create_upload_session(total_size: int, part_size: int | None = None) -> dict:
+    """
+    セッションを作り、ZIP の保存先を total_size の大きさで確保する。
+
+    Args:
+        total_size: ZIP 全体のバイト数
+        part_size: 1パートのバイト数（None なら UPLOAD_PART_SIZE）
+
+    Returns:
+        dict: セッションの状態 (missing_parts は全パート)
+
+    Raises:
+        InvalidUploadPart: 大きさが範囲外の場合
+    """
+    part_size = UPLOAD_PART_SIZE if part_size is None else part_size
+    if not 0 < total_size <= MAX_ZIP_SIZE:
+        raise InvalidUploadPart(f"total_size must be between 1 and {MAX_ZIP_SIZE}")
+    if not 0 < part_size <= UPLOAD_MAX_PART_SIZE:
+        raise InvalidUploadPart(
+            f"part_size must be between 1 and {UPLOAD_MAX_PART_SIZE}"
+        )
+    expire_upload_sessions()
+
+    session_id = str(uuid.uuid4())
+    zip_path = new_job_zip_path(session_id)
+    # 中身は書かずに大きさだけ確保する（疎ファイル）。各パートは自分の位置に書き込まれる
+    with open(zip_path, "wb") as f:
+        f.truncate(total_size)
+    session = new_upload_session(session_id, zip_path, total_size, part_size)
+    get_upload_session_store().create(session)
+    return _session_status(session)
+
+
+def get_upload_session_status(session_id: str) -> dict | None:
+    """
+    セッションの状態と足りないパートを返す（無ければ None）。
+    """
+    session = get_upload_session_store().get(session_id)
+    return None if session is None else _session_status(session)
+
+
+async def write_upload_part(
+    session_id: str,
+    part_number: int,
+    chunks: AsyncIterator[bytes],
+    sha256: str,
+) -> dict:
+    """
+    パートを受け取りながら ZIP の該当位置に書き込み、SHA-256 が一致すれば受け取り済みにする。
+    書き込む前にそのパートを未受信に戻すため、大きさや SHA-256 が合わなかった場合は
+    (以前に受け取り済みでも) 足りないパートとして扱われ、コミットできない。
+    ファイルへの書き込みはスレッドで行い、他のパートの受信を止めない。
+
+    Args:
+        session_id: セッションID
+        part_number: パート番号（1 始まり）
+        chunks: パートの本文
+        sha256: クライアントが計算したパートの SHA-256（16進）
+
+    Returns:
+        dict: {"part_number", "size", "sha256"}
+
+    Raises:
+        UploadSessionNotFound / UploadSessionConflict / InvalidUploadPart
+    """
+    session = _open_session(session_id)
+    if not 1 <= part_number <= session.part_count:
+        raise InvalidUploadPart(
+            f"part_number must be between 1 and {session.part_count}"
+        )
+    offset, expected_size = session.part_range(part_number)
+    store = get_upload_session_store()
+    if not store.begin_part(session_id, part_number):
+        raise UploadSessionConflict("Upload session is already committed")
+
+    digest = hashlib.sha256()
+    written = 0
+    buffer = bytearray()
+    fd = os.open(session.zip_path, os.O_WRONLY)
+    try:
+
+        async def flush() -> None:
+            nonlocal written, buffer
+            if buffer:
+                data = bytes(buffer)
+                buffer = bytearray()
+                await asyncio.to_thread(os.pwrite, fd, data, offset + written)
+                written += len(data)
+
+        async for chunk in chunks:
+            if written + len(buffer) + len(chunk) > expected_size:
+                raise InvalidUploadPart(
+                    f"Part {part_number} must be {expected_size} bytes"
+                )
+            digest.update(chunk)
+            buffer += chunk
+            if len(buffer) >= _WRITE_BUFFER_SIZE:
+                await flush()
+        await flush()
+    finally:
+        os.close(fd)
+
+    if written != expected_size:
+        raise InvalidUploadPart(f"Part {part_number} must be {expected_size} bytes")
+    actual = digest.hexdigest()
+    if actual != sha256.strip().lower():
+        raise InvalidUploadPart(f"SHA-256 mismatch for part {part_number}")
+    # 書き込み中に破棄されていないか確認してから記録する
+    if not store.mark_part(session_id, part_number, actual):
+        raise UploadSessionNotFound(session_id)
+    return {"part_number": part_number, "size": written, "sha256": actual}
+
+
+def commit_upload_session(session_id: str) -> tuple[str, str, bool]:
+    """
+    全パートが揃ったセッションをコミットし、バルク登録ジョブを登録する。
+    コミット済みのセッションにもう一度コミットしても、ジョブは1つだけ作られる。
+
+    Returns:
+        tuple: (タスクID, ZIP のパス, このコミットでジョブを作ったか)
+        ジョブを作った場合は、呼び出し側が run_bulk_job で処理を開始する
+
+    Raises:
+        UploadSessionNotFound: セッションが無い場合
+        UploadSessionConflict: 足りないパートがある場合
+    """
+    store = get_upload_session_store()
+    session = store.get(session_id)
+    if session is None:
+        raise UploadSessionNotFound(session_id)
+    if not store.commit(session_id):
+        session = store.get(session_id)
+        if session is None:
+            raise UploadSessionNotFound(session_id)
+        if session.is_open:
+            missing = _session_status(session)["missing_parts"]
+            raise UploadSessionConflict(f"Missing parts: {missing}")
+        return session_id, session.zip_path, False
+    store.delete_parts(session_id)
+    create_bulk_job(session_id, session.zip_path)
+    return session_id, session.zip_path, True
+
+
+def abort_upload_session(session_id: str) -> bool:
+    """
+    受付中のセッションを破棄し、書き込んだ ZIP を削除する。受付中のセッションが無ければ False を返す。
+    """
+    store = get_upload_session_store()
+    session = store.get(session_id)
+    if session is None or not session.is_open:
+        return False
+    store.delete(session_id)
+    shutil.rmtree(os.path.dirname(session.zip_path), ignore_errors=True)
+    return True
@@ -0,0 +1,155 @@
+"""
+ユースケース層 - チャンク本文の保存と検索結果への付与
+
+ベクトルストアの payload には本文を持たせず、本文はチャンクストアにポイントIDで保存する。
+- 書き込み: ベクトルをアップサートする前に本文を保存する（検索に出たチャンクの本文は必ず引ける）。
+  ストアに無いチャンクだけを保存するため、本文を payload に持っていた頃に登録済みの判例も
+  再登録すれば(再エンコードせずに)ストアへ載る
+- 読み出し: 検索結果は既定で先頭 SEARCH_SNIPPET_CHARS 文字の抜粋、full_text=True なら全文を付ける。
+  ストアに無いチャンクは payload の text (旧形式) をそのまま使う
+"""
+
+import asyncio
+import os
+
+from app.domain.services.point_id import make_point_id
+from app.domain.services.search_service import make_snippet
+from app.infrastructure.chunk_store.chunk_store import (
+    ChunkStore,
+    StoredChunk,
+    get_chunk_store,
+)
+
+SEARCH_SNIPPET_CHARS = int(os.getenv("SEARCH_SNIPPET_CHARS", "200"))
+
+
+def find_unstored_chunks(
+    store: ChunkStore, judgment_id: str, chunks: list[str]
+) -> list[StoredChunk]:
+    """
+    チャンクストアにまだ本文が無いチャンクを返す。
+
+    Args:
+        store: チャンクストア
+        judgment_id: 判例ID
+        chunks: 判例のチャンク列
+
+    Returns:
+        保存すべきチャンク
+    """
+    targets = [
+        StoredChunk(make_point_id(judgment_id, i, text), judgment_id, i, text)
+        for i, text in enumerate(chunks)
+    ]
+    missing = store.missing([t.point_id for t in targets])
+    return [t for t in targets if t.point_id in missing]
+
+
+def store_chunk_texts(judgment_id: str, chunks: list[str]) -> None:
+    """
+    判例のチャンク本文のうち、未保存のものをチャンクストアへ保存する。
+
+    Args:
+        judgment_id: 判例ID
+        chunks: 判例のチャンク列
+    """
+    store = get_chunk_store()
+    store.put_many(find_unstored_chunks(store, judgment_id, chunks))
+
+
+def remove_chunk_texts(point_ids: list[str]) -> None:
+    """
+    ポイントID指定で本文を削除する（差分更新で古くなったチャンク用）。
+    """
+    get_chunk_store().delete_ids(point_ids)
+
+
+def remove_judgment_texts(judgment_id: str) -> None:
+    """
+    判例の本文をすべて削除する。
+    """
+    get_chunk_store().delete_judgment(judgment_id)
+
+
+def attach_chunk_texts(results: list[dict], full_text: bool = False) -> list[dict]:
+    """
+    検索結果の payload に本文（または抜粋）を付ける。
+    結果キャッシュの辞書を書き換えないよう、新しい辞書を返す。
+
+    Args:
+        results: {"id": str, "payload": dict, "score": float} のリスト
+        full_text: True なら全文、False なら SEARCH_SNIPPET_CHARS 文字の抜粋
+
+    Returns:
+        payload に "text" を付けた {"id", "payload", "score"} のリスト
+    """
+    texts = get_chunk_store().get_texts([r["id"] for r in results if r.get("id")])
+    attached = []
+    for r in results:
+        payload = dict(r["payload"])
+        text = texts.get(r.get("id") or "", payload.get("text"))
+        if text is not None:
+            payload["text"] = (
+                text if full_text else make_snippet(text, SEARCH_SNIPPET_CHARS)
+            )
+        attached.append({**r, "payload": payload})
+    return attached
+
+
+def attach_group_texts(groups: list[dict], full_text: bool = False) -> list[dict]:
+    """
+    判例単位の検索結果の各チャンクに本文（または抜粋）を付ける。
+
+    Args:
+        groups: {"judgment_id", "score", "hits"} のリスト
+        full_text: True なら全文、False なら抜粋
+
+    Returns:
+        hits の payload に "text" を付けたグループのリスト
+    """
+    hits = attach_chunk_texts([h for g in groups for h in g["hits"]], full_text)
+    attached, start = [], 0
+    for g in groups:
+        end = start + len(g["hits"])
+        attached.append({**g, "hits": hits[start:end]})
+        start = end
+    return attached
+
+
+async def store_chunk_texts_async(judgment_id: str, chunks: list[str]) -> None:
+    """
+    store_chunk_texts の非同期版（SQLite への書き込みはスレッドで実行する）。
+    """
+    await asyncio.to_thread(store_chunk_texts, judgment_id, chunks)
+
+
+async def remove_chunk_texts_async(point_ids: list[str]) -> None:
+    """
+    remove_chunk_texts の非同期版。
+    """
+    await asyncio.to_thread(remove_chunk_texts, point_ids)
+
+
+async def remove_judgment_texts_async(judgment_id: str) -> None:
+    """
+    remove_judgment_texts の非同期版。
+    """
+    await asyncio.to_thread(remove_judgment_texts, judgment_id)
+
+
+async def attach_chunk_texts_async(
+    results: list[dict], full_text: bool = False
+) -> list[dict]:
+    """
+    attach_chunk_texts の非同期版。
+    """
+    return await asyncio.to_thread(attach_chunk_texts, results, full_text)
+
+
+async def attach_group_texts_async(
+    groups: list[dict], full_text: bool = False
+) -> list[dict]:
+    """
+    attach_group_texts の非同期版。
+    """
+    return await asyncio.to_thread(attach_group_texts, groups, full_text)
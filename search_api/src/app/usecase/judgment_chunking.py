@@ -0,0 +1,135 @@
+"""
+ユースケース層 - 判例PDFのチャンク分割設定
+
+単体登録・バルク登録の両方で、同じ設定・同じトークナイザでPDFをチャンクに分ける。
+parse_judgment_pdf_with_timings はプロセスプールで実行されるため、トップレベル関数にしている
+(トークナイザはワーカープロセスごとに1回だけロードされる)。
+チャンクの分け方は CHUNKING_PARAMS として各ポイントの payload に記録する。
+プロセスプールで解析した場合、ワーカーのメトリクスは API プロセスから見えないため、
+parse_judgment_pdf_with_timings で抽出・チャンク化の秒数を持ち帰り、
+呼び出し側で record_parse_timings する。
+
+テキスト抽出は PDF_TEXT_BACKEND (pdfium が高速、pdfplumber はレイアウト解析あり) で選ぶ。
+1文書の解析は PDF_PARSE_TIMEOUT_SECONDS で打ち切り、ページの合間で確認するほか、
+ワーカープロセス内ではページ解析の途中でも打ち切る (壊れたPDFで止まり続けない)。
+ネイティブコードの中で止まった場合に備え、API からの解析 (parse_judgment_pdf_async) は
+PDF_PARSE_HARD_LIMIT_SECONDS + PDF_PARSE_WAIT_SLACK_SECONDS までしか待たず、
+過ぎたら止まったワーカーごとプロセスプールを作り直す。
+
+環境変数:
+- CHUNK_MAX_TOKENS: 1チャンクのトークン数の上限 (デフォルト 256 = all-MiniLM-L6-v2 の max_seq_length)
+- CHUNK_OVERLAP_TOKENS: 隣り合うチャンクで重ねるトークン数の上限
+- PDF_TEXT_BACKEND: pdfium (デフォルト) または pdfplumber
+- PDF_PARSE_TIMEOUT_SECONDS: 1文書の解析の制限秒数 (0 なら無制限)
+- PDF_PARSE_WAIT_SLACK_SECONDS: API からの解析で、ワーカー内の制限時間に加えて待つ秒数
+"""
+
+import os
+
+from app.domain.services.pdf_parser import PdfParseTimeout, parse_pdf_into_chunks
+from app.infrastructure.embedding.tokenizer import (
+    EMBEDDING_TOKENIZER,
+    get_token_counter,
+)
+from app.infrastructure.executors.cpu_executor import run_in_process, worker_time_limit
+from app.infrastructure.metrics.metrics import STAGE_SECONDS
+
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "256"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+PDF_TEXT_BACKEND = os.getenv("PDF_TEXT_BACKEND", "pdfium").lower()
+PDF_PARSE_TIMEOUT_SECONDS = float(os.getenv("PDF_PARSE_TIMEOUT_SECONDS", "120"))
+# ページ間の確認で間に合わない場合に備え、少し遅れてページの途中でも打ち切る
+PDF_PARSE_HARD_LIMIT_SECONDS = (
+    PDF_PARSE_TIMEOUT_SECONDS * 1.5 if PDF_PARSE_TIMEOUT_SECONDS else None
+)
+PDF_PARSE_WAIT_SLACK_SECONDS = float(os.getenv("PDF_PARSE_WAIT_SLACK_SECONDS", "30"))
+
+CHUNKING_PARAMS = {
+    "method": "sentence_tokens",
+    "max_tokens": CHUNK_MAX_TOKENS,
+    "overlap_tokens": CHUNK_OVERLAP_TOKENS,
+    "tokenizer": EMBEDDING_TOKENIZER,
+    "text_backend": PDF_TEXT_BACKEND,
+}
+
+
+def parse_judgment_pdf_with_timings(
+    pdf_bytes: bytes,
+) -> tuple[list[str], dict[str, float]]:
+    """
+    PDFを CHUNK_MAX_TOKENS / CHUNK_OVERLAP_TOKENS の設定でチャンクに分け、
+    抽出・チャンク化の秒数と合わせて返す（プロセスプールから呼ぶ）。
+
+    Args:
+        pdf_bytes: 判例PDFのバイナリデータ
+
+    Returns:
+        (チャンク本文のリスト, {"extract": 秒, "chunk": 秒})
+
+    Raises:
+        PdfParseTimeout: PDF_PARSE_TIMEOUT_SECONDS を超えた場合
+    """
+    time_budget = PDF_PARSE_TIMEOUT_SECONDS or None
+    count_tokens = get_token_counter()
+    timings: dict[str, float] = {}
+    with worker_time_limit(PDF_PARSE_HARD_LIMIT_SECONDS, PdfParseTimeout):
+        chunks = parse_pdf_into_chunks(
+            pdf_bytes,
+            CHUNK_MAX_TOKENS,
+            CHUNK_OVERLAP_TOKENS,
+            count_tokens,
+            backend=PDF_TEXT_BACKEND,
+            time_budget=time_budget,
+            timings=timings,
+        )
+    return chunks, timings
+
+
+def record_parse_timings(timings: dict[str, float]) -> None:
+    """
+    解析の秒数をメトリクス (pdf_extract / chunking ステージ) に記録する。
+    """
+    if "extract" in timings:
+        STAGE_SECONDS.observe(timings["extract"], stage="pdf_extract")
+    if "chunk" in timings:
+        STAGE_SECONDS.observe(timings["chunk"], stage="chunking")
+
+
+def parse_judgment_pdf(pdf_bytes: bytes) -> list[str]:
+    """
+    PDFをチャンクに分け、解析の秒数をこのプロセスのメトリクスに記録する。
+
+    Args:
+        pdf_bytes: 判例PDFのバイナリデータ
+
+    Returns:
+        チャンク本文のリスト（テキストが無ければ空）
+
+    Raises:
+        PdfParseTimeout: PDF_PARSE_TIMEOUT_SECONDS を超えた場合
+    """
+    chunks, timings = parse_judgment_pdf_with_timings(pdf_bytes)
+    record_parse_timings(timings)
+    return chunks
+
+
+async def parse_judgment_pdf_async(pdf_bytes: bytes) -> list[str]:
+    """
+    parse_judgment_pdf をプロセスプールで実行する非同期版（秒数はこのプロセスに記録する）。
+
+    Raises:
+        PdfParseTimeout: 制限時間を超えた場合 (止まったワーカーはプールごと作り直す)
+    """
+    wait = (
+        None
+        if PDF_PARSE_HARD_LIMIT_SECONDS is None
+        else PDF_PARSE_HARD_LIMIT_SECONDS + PDF_PARSE_WAIT_SLACK_SECONDS
+    )
+    chunks, timings = await run_in_process(
+        parse_judgment_pdf_with_timings,
+        pdf_bytes,
+        timeout=wait,
+        exc_type=PdfParseTimeout,
+    )
+    record_parse_timings(timings)
+    return chunks
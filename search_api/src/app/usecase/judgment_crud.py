@@ -1,78 +1,314 @@
 """
 ユースケース層 - 判例PDFのCRUD
-"""
 
-import uuid
+*_async 版は API リクエストから呼ぶ。PDF解析はプロセスプール、エンコードはスレッドで
+実行し、Qdrant へは非同期クライアントで書き込むため、イベントループを塞がない。
+
+PDFは文境界で、エンコーダの max_seq_length に収まるトークン数ごとにチャンク化する。
+ポイントIDは内容から決定的に導出する(point_id.make_point_id)。
+登録・更新時は登録済みIDと突き合わせ、変わったチャンクだけをエンコード・アップサートし、
+新しいチャンク列に無いポイントは削除する (登録済みの judgment_id への登録は内容の差し替えになる)。
+エンコード前にはディスク上のエンベディングキャッシュ(EMBEDDING_STORE_DIR)も参照する。
+チャンク本文は payload に載せず、アップサート前にチャンクストアへ保存する。
+判決文の冒頭から書誌情報 (裁判所・判決日・事件番号・事件の種類) を取り出し、
+全チャンクの payload に載せる（検索時の絞り込みに使う。内容の変わらないチャンクにも書き込む）。
+Qdrant への書き込み後、同じチャンクを BM25 語彙索引にも反映する。
+読み出しは chunk_index 順のページ単位でも行え(JUDGMENT_READ_PAGE_SIZE)、
+巨大な判例も全件をメモリに載せずに返せる。ページのカーソルは "chunk_index:ポイントID" の文字列。
+"""
 
-from qdrant_client.models import PointStruct
-from sentence_transformers import SentenceTransformer
+import asyncio
+import os
+from collections.abc import Iterator
 
-from app.domain.services.pdf_parser import parse_pdf_into_chunks
+from app.domain.models.text_encoder import TextEncoder
+from app.domain.models.vector_store import PageCursor, VectorPoint, page_cursor
+from app.domain.services.embedding_batcher import encode_chunks
+from app.domain.services.judgment_metadata import metadata_from_chunks
+from app.domain.services.point_id import ChunkDiff, diff_chunks
+from app.infrastructure.embedding.embedding_store import get_embedding_store
 from app.infrastructure.qdrant.qdrant_gateway import (
     delete_judgment_points,
+    delete_judgment_points_async,
+    delete_points_by_ids,
+    delete_points_by_ids_async,
+    iter_judgment_pages,
+    list_judgment_point_ids,
+    list_judgment_point_ids_async,
     query_judgements_by_id,
+    query_judgment_page,
+    set_judgment_metadata,
+    set_judgment_metadata_async,
     upsert_judgment_points,
+    upsert_judgment_points_async,
+)
+from app.usecase.judgment_chunk_text import (
+    attach_chunk_texts,
+    remove_chunk_texts,
+    remove_chunk_texts_async,
+    remove_judgment_texts,
+    remove_judgment_texts_async,
+    store_chunk_texts,
+    store_chunk_texts_async,
+)
+from app.usecase.judgment_chunking import (
+    CHUNKING_PARAMS,
+    parse_judgment_pdf,
+    parse_judgment_pdf_async,
+)
+from app.usecase.judgment_lexical_index import (
+    remove_from_lexical_index,
+    remove_from_lexical_index_async,
+    update_lexical_index,
+    update_lexical_index_async,
 )
 
+JUDGMENT_READ_PAGE_SIZE = int(os.getenv("JUDGMENT_READ_PAGE_SIZE", "500"))
 
-def register_judgment(
-    pdf_bytes: bytes, judgment_id: str, encoder: SentenceTransformer
-) -> int:
+
+def _build_points(
+    judgment_id: str,
+    added: list[tuple[int, str, str]],
+    vectors: list[list[float]],
+    metadata: dict[str, str],
+) -> list[VectorPoint]:
+    """
+    差分で追加となったチャンクとベクトルから、ベクトルストアに登録するポイントを組み立てる。
+    (本文はチャンクストアに保存済みのため payload には含めない)
+    """
+    points: list[VectorPoint] = []
+    for (i, _, point_id), vector in zip(added, vectors, strict=True):
+        payload = {
+            "judgment_id": judgment_id,
+            "chunk_index": i,
+            "chunking": CHUNKING_PARAMS,
+            **metadata,
+        }
+        points.append(VectorPoint(id=point_id, vector=vector, payload=payload))
+    return points
+
+
+def _index_chunks(
+    chunks: list[str], judgment_id: str, encoder: TextEncoder
+) -> ChunkDiff:
+    """
+    登録済みポイントとの差分を取り、変わったチャンクだけをエンコード・アップサートし、
+    新しいチャンク列に無いポイントを削除する。
+    (追加→削除の順で書き込むため、更新中に判例が一時的に消えることはない)
+    """
+    diff = diff_chunks(judgment_id, chunks, list_judgment_point_ids(judgment_id))
+    metadata = metadata_from_chunks(chunks)
+    store_chunk_texts(judgment_id, chunks)
+    if diff.added:
+        texts = [text for _, text, _ in diff.added]
+        vectors = encode_chunks(encoder, texts, cache=get_embedding_store())
+        upsert_judgment_points(
+            _build_points(judgment_id, diff.added, vectors, metadata)
+        )
+    if diff.unchanged:
+        set_judgment_metadata(judgment_id, metadata)
+    delete_points_by_ids(diff.stale)
+    remove_chunk_texts(diff.stale)
+    update_lexical_index(judgment_id, chunks, diff.stale)
+    return diff
+
+
+async def _index_chunks_async(
+    chunks: list[str], judgment_id: str, encoder: TextEncoder
+) -> ChunkDiff:
+    """
+    _index_chunks の非同期版。
+    """
+    existing = await list_judgment_point_ids_async(judgment_id)
+    diff = diff_chunks(judgment_id, chunks, existing)
+    metadata = metadata_from_chunks(chunks)
+    await store_chunk_texts_async(judgment_id, chunks)
+    if diff.added:
+        texts = [text for _, text, _ in diff.added]
+        vectors = await asyncio.to_thread(
+            encode_chunks, encoder, texts, cache=get_embedding_store()
+        )
+        await upsert_judgment_points_async(
+            _build_points(judgment_id, diff.added, vectors, metadata)
+        )
+    if diff.unchanged:
+        await set_judgment_metadata_async(judgment_id, metadata)
+    await delete_points_by_ids_async(diff.stale)
+    await remove_chunk_texts_async(diff.stale)
+    await update_lexical_index_async(judgment_id, chunks, diff.stale)
+    return diff
+
+
+def register_judgment(pdf_bytes: bytes, judgment_id: str, encoder: TextEncoder) -> int:
     """
     Create (C in CRUD): 判例PDFをチャンクに分割してベクトル化し、Qdrantに保存する。
+    同じ内容のチャンクが登録済みなら再エンコードせず、重複も作らない。
+    judgment_id が登録済みなら、内容をこのPDFに差し替える (古いチャンクは削除する)。
 
     Args:
         pdf_bytes (bytes): アップロードされたPDFファイルのバイナリデータ
         judgment_id (str): この判例に紐づく一意のID
-        encoder (SentenceTransformer): テキストをベクトル化する埋め込みモデル
+        encoder (TextEncoder): テキストをベクトル化する埋め込みモデル
 
     Returns:
         int: 登録されたチャンク数（ベクトル化したテキスト断片の個数）
     """
-    chunks = parse_pdf_into_chunks(pdf_bytes, max_chars_per_chunk=2000)
+    chunks = parse_judgment_pdf(pdf_bytes)
     if not chunks:
         return 0
 
-    vectors = encoder.encode(chunks).tolist()
-    points: list[PointStruct] = []
-    for i, chunk_text in enumerate(chunks):
-        doc_id = str(uuid.uuid4())
-        payload = {"judgment_id": judgment_id, "chunk_index": i, "text": chunk_text}
-        points.append(PointStruct(id=doc_id, vector=vectors[i], payload=payload))
+    _index_chunks(chunks, judgment_id, encoder)
+    return len(chunks)
+
+
+async def register_judgment_async(
+    pdf_bytes: bytes, judgment_id: str, encoder: TextEncoder
+) -> int:
+    """
+    register_judgment の非同期版。CPU処理はイベントループの外で実行する。
 
-    upsert_judgment_points(points)
+    Args:
+        pdf_bytes (bytes): アップロードされたPDFファイルのバイナリデータ
+        judgment_id (str): この判例に紐づく一意のID
+        encoder (TextEncoder): テキストをベクトル化する埋め込みモデル
+
+    Returns:
+        int: 登録されたチャンク数
+    """
+    chunks = await parse_judgment_pdf_async(pdf_bytes)
+    if not chunks:
+        return 0
+
+    await _index_chunks_async(chunks, judgment_id, encoder)
     return len(chunks)
 
 
-def read_judgment(judgment_id: str) -> list[dict]:
+def read_judgment(judgment_id: str, full_text: bool = True) -> list[dict]:
     """
     Read (R in CRUD): judgment_id に紐づくチャンクを全て取得する。
 
     Args:
         judgment_id (str): 取得対象となる判例ID
+        full_text (bool): True なら本文全文、False なら抜粋を付ける
+
+    Returns:
+        List[Dict]: それぞれの要素が {"id": str, "payload": dict, "score": None} のリスト
+    """
+    return attach_chunk_texts(query_judgements_by_id(judgment_id), full_text)
+
+
+def _prepare_page(page: list[dict], with_text: bool, full_text: bool) -> list[dict]:
+    if with_text:
+        return attach_chunk_texts(page, full_text)
+    # 本文なし: 旧形式の payload に残る text も返さない
+    return [
+        {**hit, "payload": {k: v for k, v in hit["payload"].items() if k != "text"}}
+        for hit in page
+    ]
+
+
+def _format_cursor(cursor: PageCursor) -> str:
+    return f"{cursor[0]}:{cursor[1]}"
+
+
+def _parse_cursor(cursor: str) -> PageCursor:
+    index, sep, point_id = cursor.partition(":")
+    if not sep or not index.isdigit() or not point_id:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return int(index), point_id
+
+
+def read_judgment_page(
+    judgment_id: str,
+    cursor: str | None = None,
+    limit: int = JUDGMENT_READ_PAGE_SIZE,
+    with_text: bool = True,
+    full_text: bool = True,
+) -> dict:
+    """
+    Read (ページング): judgment_id のチャンクを chunk_index 順に1ページ分取得する。
+
+    Args:
+        judgment_id (str): 取得対象となる判例ID
+        cursor (str | None): 前のページの next_cursor（None なら先頭から）
+        limit (int): 1ページの件数
+        with_text (bool): False なら本文を付けない（メタデータだけを返す）
+        full_text (bool): True なら本文全文、False なら抜粋を付ける
 
     Returns:
-        List[Dict]: それぞれの要素が {"payload": dict, "score": None} のリスト
+        Dict: {"items": [...], "next_cursor": str | None}
+              next_cursor が None なら最後のページ
+
+    Raises:
+        ValueError: cursor の形式が正しくない場合
+    """
+    after = _parse_cursor(cursor) if cursor is not None else None
+    page = query_judgment_page(judgment_id, after, limit)
+    next_cursor = _format_cursor(page_cursor(page[-1])) if len(page) == limit else None
+    return {
+        "items": _prepare_page(page, with_text, full_text),
+        "next_cursor": next_cursor,
+    }
+
+
+def iter_judgment_chunks(
+    judgment_id: str,
+    with_text: bool = True,
+    full_text: bool = True,
+    page_size: int = JUDGMENT_READ_PAGE_SIZE,
+) -> Iterator[list[dict]]:
+    """
+    Read (ストリーミング): judgment_id のチャンクを chunk_index 順にページ単位で返す。
+    本文もページごとに付けるため、判例の大きさによらず保持するのは1ページ分だけ。
+
+    Args:
+        judgment_id (str): 取得対象となる判例ID
+        with_text (bool): False なら本文を付けない
+        full_text (bool): True なら本文全文、False なら抜粋を付ける
+        page_size (int): 1ページの件数
+
+    Yields:
+        List[Dict]: {"id": str, "payload": dict, "score": None} のページ
     """
-    return query_judgements_by_id(judgment_id)
+    for page in iter_judgment_pages(judgment_id, page_size):
+        yield _prepare_page(page, with_text, full_text)
 
 
-def update_judgment(
-    pdf_bytes: bytes, judgment_id: str, encoder: SentenceTransformer
+def update_judgment(pdf_bytes: bytes, judgment_id: str, encoder: TextEncoder) -> int:
+    """
+    Update (U in CRUD): 既存の判例データを新しいPDFの内容に差し替える。
+    変わったチャンクだけを再エンコード・アップサートし、不要になったチャンクだけを削除する。
+
+    Args:
+        pdf_bytes (bytes): アップロードされたPDFのバイナリデータ
+        judgment_id (str): 更新対象となる判例ID
+        encoder (TextEncoder): テキストをベクトル化する埋め込みモデル
+
+    Returns:
+        int: 更新後のチャンク数
+    """
+    chunks = parse_judgment_pdf(pdf_bytes)
+    _index_chunks(chunks, judgment_id, encoder)
+    return len(chunks)
+
+
+async def update_judgment_async(
+    pdf_bytes: bytes, judgment_id: str, encoder: TextEncoder
 ) -> int:
     """
-    Update (U in CRUD): 既存の判例データを削除したうえで再登録する。
+    update_judgment の非同期版。
 
     Args:
         pdf_bytes (bytes): アップロードされたPDFのバイナリデータ
         judgment_id (str): 更新対象となる判例ID
-        encoder (SentenceTransformer): テキストをベクトル化する埋め込みモデル
+        encoder (TextEncoder): テキストをベクトル化する埋め込みモデル
 
     Returns:
-        int: 登録されたチャンク数（新たに作成されたテキスト断片の個数）
+        int: 更新後のチャンク数
     """
-    delete_judgment_points(judgment_id)
-    return register_judgment(pdf_bytes, judgment_id, encoder)
+    chunks = await parse_judgment_pdf_async(pdf_bytes)
+    await _index_chunks_async(chunks, judgment_id, encoder)
+    return len(chunks)
 
 
 def delete_judgment(judgment_id: str) -> None:
@@ -86,3 +322,17 @@ def delete_judgment(judgment_id: str) -> None:
         None: 返り値は無い
     """
     delete_judgment_points(judgment_id)
+    remove_judgment_texts(judgment_id)
+    remove_from_lexical_index(judgment_id)
+
+
+async def delete_judgment_async(judgment_id: str) -> None:
+    """
+    delete_judgment の非同期版。
+
+    Args:
+        judgment_id (str): 削除対象となる判例ID
+    """
+    await delete_judgment_points_async(judgment_id)
+    await remove_judgment_texts_async(judgment_id)
+    await remove_from_lexical_index_async(judgment_id)
@@ -0,0 +1,111 @@
+"""
+ユースケース層 - BM25 語彙索引の更新
+
+CRUD・バルク登録の書き込み経路から呼び、Qdrant と同じチャンクを語彙索引にも反映する。
+索引に無いチャンクだけをトークナイズするため、索引導入前に登録済みの判例も
+再登録すれば(ベクトルは再エンコードせずに)語彙索引へ載る。
+トークナイズ(janome)は純Pythonで重いため、非同期版はプロセスプールで実行する。
+"""
+
+import asyncio
+
+from app.domain.services.lexical_tokenizer import count_terms
+from app.domain.services.point_id import make_point_id
+from app.infrastructure.executors.cpu_executor import run_in_process
+from app.infrastructure.lexical.bm25_index import (
+    Bm25Index,
+    LexicalDocument,
+    get_lexical_index,
+)
+
+
+def find_unindexed_chunks(
+    index: Bm25Index, judgment_id: str, chunks: list[str]
+) -> list[tuple[int, str, str]]:
+    """
+    語彙索引にまだ無いチャンクを返す。
+
+    Args:
+        index: 語彙索引
+        judgment_id: 判例ID
+        chunks: 判例のチャンク列
+
+    Returns:
+        (chunk_index, text, point_id) のリスト
+    """
+    targets = [
+        (i, text, make_point_id(judgment_id, i, text)) for i, text in enumerate(chunks)
+    ]
+    missing = index.missing([point_id for _, _, point_id in targets])
+    return [t for t in targets if t[2] in missing]
+
+
+def stage_lexical_update(
+    index: Bm25Index,
+    judgment_id: str,
+    targets: list[tuple[int, str, str]],
+    term_counts: list[dict[str, int]],
+    stale: list[str],
+) -> None:
+    """
+    チャンクの追加と古いポイントの削除を索引に予約する（確定は index.commit）。
+
+    Args:
+        index: 語彙索引
+        judgment_id: 判例ID
+        targets: find_unindexed_chunks の結果
+        term_counts: targets と同じ順序の {検索語: 出現回数}
+        stale: 削除するポイントID
+    """
+    index.add_documents(
+        [
+            LexicalDocument(point_id, judgment_id, i, terms)
+            for (i, _, point_id), terms in zip(targets, term_counts, strict=True)
+        ]
+    )
+    index.remove_points(stale)
+
+
+def update_lexical_index(judgment_id: str, chunks: list[str], stale: list[str]) -> None:
+    """
+    判例のチャンクを語彙索引へ反映し、保存する。
+
+    Args:
+        judgment_id: 判例ID
+        chunks: 判例のチャンク列
+        stale: 削除するポイントID
+    """
+    index = get_lexical_index()
+    targets = find_unindexed_chunks(index, judgment_id, chunks)
+    term_counts = count_terms([text for _, text, _ in targets])
+    stage_lexical_update(index, judgment_id, targets, term_counts, stale)
+    index.commit()
+
+
+async def update_lexical_index_async(
+    judgment_id: str, chunks: list[str], stale: list[str]
+) -> None:
+    """
+    update_lexical_index の非同期版。トークナイズはプロセスプール、保存はスレッドで実行する。
+    """
+    index = get_lexical_index()
+    targets = await asyncio.to_thread(find_unindexed_chunks, index, judgment_id, chunks)
+    term_counts = await run_in_process(count_terms, [text for _, text, _ in targets])
+    stage_lexical_update(index, judgment_id, targets, term_counts, stale)
+    await asyncio.to_thread(index.commit)
+
+
+def remove_from_lexical_index(judgment_id: str) -> None:
+    """
+    判例の全チャンクを語彙索引から削除し、保存する。
+    """
+    index = get_lexical_index()
+    index.remove_judgment(judgment_id)
+    index.commit()
+
+
+async def remove_from_lexical_index_async(judgment_id: str) -> None:
+    """
+    remove_from_lexical_index の非同期版。
+    """
+    await asyncio.to_thread(remove_from_lexical_index, judgment_id)
@@ -1,16 +1,137 @@
 """
 ユースケース層 - 判例検索のアプリケーションロジック。
+
+- ベクトル検索: クエリを埋め込みベクトルに変換し、Qdrant で類似チャンクを検索
+- 語彙検索: クエリを janome で分割し、BM25 語彙索引で検索（エンコーダを使わない）
+- ハイブリッド検索: 両方の上位 HYBRID_CANDIDATES 件を Reciprocal Rank Fusion で統合
+- 一括検索: 複数クエリを1回の encode でベクトル化し、ストアにも1往復でまとめて問い合わせる
+
+単一クエリのエンコードは EncodeScheduler に渡し、同時に届いた他のリクエストの
+クエリと1回のバッチ推論にまとめる。
+
+検索結果の本文はチャンクストアから付ける（既定は抜粋、full_text=True なら全文）。
+ベクトル検索の書誌情報による絞り込み (PayloadFilter) はストアの検索の中で適用する。
 """
 
-from sentence_transformers import SentenceTransformer
+import asyncio
+import os
+
+from app.domain.models.judgment_dto import (
+    Judgment,
+    JudgmentGroup,
+    JudgmentGroupList,
+    JudgmentList,
+)
+from app.domain.models.text_encoder import TextEncoder
+from app.domain.models.vector_store import PayloadFilter
+from app.domain.services.lexical_tokenizer import tokenize
+from app.domain.services.search_service import (
+    GroupAggregate,
+    encode_texts_to_vectors,
+    reciprocal_rank_fusion,
+)
+from app.infrastructure.cache.query_vector_cache import (
+    normalize_query,
+    query_vector_cache,
+)
+from app.infrastructure.embedding.encode_scheduler import get_encode_scheduler
+from app.infrastructure.embedding.model_registry import model_registry
+from app.infrastructure.lexical.bm25_index import get_lexical_index
+from app.infrastructure.qdrant.qdrant_gateway import (
+    query_judgment_groups_by_vector_async,
+    query_judgments_by_vector,
+    query_judgments_by_vector_async,
+    query_judgments_by_vectors_async,
+)
+from app.usecase.judgment_chunk_text import (
+    attach_chunk_texts,
+    attach_chunk_texts_async,
+    attach_group_texts_async,
+)
+
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+SEARCH_BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "64"))
+# 1回の検索で返す件数・判例ごとのチャンク数の上限 (API の入力検証に使う)
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", "100"))
+SEARCH_MAX_GROUP_SIZE = int(os.getenv("SEARCH_MAX_GROUP_SIZE", "20"))
+
+
+def encode_query(query: str, encoder: TextEncoder) -> list[float]:
+    """
+    検索クエリをベクトル化する。同じクエリはキャッシュから返し、モデルを呼ばない。
+    キャッシュに無ければ、同時に届いた他のクエリとまとめてエンコードする。
+
+    Args:
+        query: 検索したい自然言語文
+        encoder: テキストをエンコードする埋め込みモデル
+
+    Returns:
+        クエリのベクトル表現
+    """
+    variant = model_registry.variant
+    vector = query_vector_cache.get(variant, query)
+    if vector is None:
+        vector = get_encode_scheduler(encoder).encode(normalize_query(query))
+        query_vector_cache.put(variant, query, vector)
+    return vector
+
+
+async def encode_query_async(query: str, encoder: TextEncoder) -> list[float]:
+    """
+    encode_query の非同期版。エンコードの完了をスレッドを占有せずに待つ。
+    共有キャッシュ (SQLite) の読み書きはスレッドで行い、イベントループを止めない。
+    """
+    variant = model_registry.variant
+    shared = query_vector_cache.is_shared
+    if shared:
+        vector = await asyncio.to_thread(query_vector_cache.get, variant, query)
+    else:
+        vector = query_vector_cache.get(variant, query)
+    if vector is None:
+        future = get_encode_scheduler(encoder).submit(normalize_query(query))
+        vector = await asyncio.wrap_future(future)
+        if shared:
+            await asyncio.to_thread(query_vector_cache.put, variant, query, vector)
+        else:
+            query_vector_cache.put(variant, query, vector)
+    return vector
+
 
-from app.domain.models.judgment_dto import Judgment, JudgmentList
-from app.domain.services.search_service import encode_text_to_vector
-from app.infrastructure.qdrant.qdrant_gateway import query_judgments_by_vector
+def encode_queries(queries: list[str], encoder: TextEncoder) -> list[list[float]]:
+    """
+    複数の検索クエリをベクトル化する。キャッシュに無いクエリだけを
+    (重複を除いて) 1回の encode 呼び出しでまとめてエンコードする。
+
+    Args:
+        queries: 検索したい自然言語文の一覧
+        encoder: テキストをエンコードする埋め込みモデル
+
+    Returns:
+        queries と同じ順のベクトル表現
+    """
+    variant = model_registry.variant
+    vectors: dict[str, list[float]] = {}
+    pending: list[str] = []
+    for query in dict.fromkeys(queries):
+        vector = query_vector_cache.get(variant, query)
+        if vector is None:
+            pending.append(query)
+        else:
+            vectors[query] = vector
+    encoded = encode_texts_to_vectors([normalize_query(q) for q in pending], encoder)
+    for query, vector in zip(pending, encoded, strict=True):
+        query_vector_cache.put(variant, query, vector)
+        vectors[query] = vector
+    return [vectors[q] for q in queries]
 
 
 def handle_judgment_search(
-    query: str, encoder: SentenceTransformer, limit: int = 5
+    query: str,
+    encoder: TextEncoder,
+    limit: int = 5,
+    full_text: bool = False,
+    payload_filter: PayloadFilter | None = None,
 ) -> JudgmentList:
     """
     検索クエリに基づいて類似する判例を取得するユースケース。
@@ -18,10 +139,191 @@ def handle_judgment_search(
     Args:
         query: 検索したい自然言語文
         encoder: テキストをエンコードする埋め込みモデル
+        full_text: True なら本文全文、False なら抜粋を返す
+        payload_filter: 裁判所・判決日などの絞り込み条件
 
     Returns:
         類似判例のリスト
     """
-    vector = encode_text_to_vector(query, encoder)
-    results = query_judgments_by_vector(vector, limit=limit)
+    vector = encode_query(query, encoder)
+    results = attach_chunk_texts(
+        query_judgments_by_vector(vector, limit=limit, payload_filter=payload_filter),
+        full_text,
+    )
     return JudgmentList(items=[Judgment(**r) for r in results])
+
+
+async def handle_judgment_search_async(
+    query: str,
+    encoder: TextEncoder,
+    limit: int = 5,
+    full_text: bool = False,
+    payload_filter: PayloadFilter | None = None,
+) -> JudgmentList:
+    """
+    handle_judgment_search の非同期版。
+    → エンコードは EncodeScheduler で他のリクエストとまとめ、Qdrant へは非同期クライアントで問い合わせる。
+
+    Args:
+        query: 検索したい自然言語文
+        encoder: テキストをエンコードする埋め込みモデル
+        limit: 取得する件数
+        full_text: True なら本文全文、False なら抜粋を返す
+        payload_filter: 裁判所・判決日などの絞り込み条件
+
+    Returns:
+        類似判例のリスト
+    """
+    vector = await encode_query_async(query, encoder)
+    hits = await query_judgments_by_vector_async(
+        vector, limit=limit, payload_filter=payload_filter
+    )
+    results = await attach_chunk_texts_async(hits, full_text)
+    return JudgmentList(items=[Judgment(**r) for r in results])
+
+
+async def handle_judgment_batch_search_async(
+    queries: list[str], encoder: TextEncoder, limit: int = 5, full_text: bool = False
+) -> list[JudgmentList]:
+    """
+    複数の検索クエリをまとめて処理するユースケース。
+    → エンコードは1回の encode 呼び出し、ベクトル検索は1往復にまとめ、
+      モデル・ネットワークのオーバーヘッドをクエリ間で分け合う。
+
+    Args:
+        queries: 検索したい自然言語文の一覧
+        encoder: テキストをエンコードする埋め込みモデル
+        limit: クエリごとの件数
+        full_text: True なら本文全文、False なら抜粋を返す
+
+    Returns:
+        queries と同じ順の、クエリごとの類似判例のリスト
+    """
+    vectors = await asyncio.to_thread(encode_queries, queries, encoder)
+    batches = await query_judgments_by_vectors_async(vectors, limit=limit)
+    # 本文の付与もチャンクストアへの1回の問い合わせにまとめる
+    hits = await attach_chunk_texts_async([r for b in batches for r in b], full_text)
+    results, start = [], 0
+    for batch in batches:
+        end = start + len(batch)
+        results.append(JudgmentList(items=[Judgment(**r) for r in hits[start:end]]))
+        start = end
+    return results
+
+
+async def handle_judgment_group_search_async(
+    query: str,
+    encoder: TextEncoder,
+    limit: int = 5,
+    group_size: int = 3,
+    aggregate: GroupAggregate = "max",
+    full_text: bool = False,
+    payload_filter: PayloadFilter | None = None,
+) -> JudgmentGroupList:
+    """
+    検索クエリに類似する判例を、判例単位にまとめて上位 limit 件返すユースケース。
+
+    Args:
+        query: 検索したい自然言語文
+        encoder: テキストをエンコードする埋め込みモデル
+        limit: 取得する判例数
+        group_size: 判例ごとに返すチャンク数
+        aggregate: チャンクスコアの集約方法 "max" / "sum" / "mean"
+        full_text: True なら本文全文、False なら抜粋を返す
+        payload_filter: 裁判所・判決日などの絞り込み条件
+
+    Returns:
+        判例単位の検索結果
+    """
+    vector = await encode_query_async(query, encoder)
+    groups = await query_judgment_groups_by_vector_async(
+        vector,
+        limit=limit,
+        group_size=group_size,
+        aggregate=aggregate,
+        payload_filter=payload_filter,
+    )
+    groups = await attach_group_texts_async(groups, full_text)
+    return JudgmentGroupList(
+        groups=[
+            JudgmentGroup(
+                judgment_id=g["judgment_id"],
+                score=g["score"],
+                hits=[Judgment(**h) for h in g["hits"]],
+            )
+            for g in groups
+        ]
+    )
+
+
+def search_lexical(query: str, limit: int = 5) -> list[dict]:
+    """
+    BM25 語彙索引でチャンクを検索する。
+
+    Args:
+        query: 検索語を含む文字列（事件番号・条文・裁判所名など）
+        limit: 取得する件数
+
+    Returns:
+        {"payload": dict, "score": float} のリスト（BM25 スコア降順）
+    """
+    return get_lexical_index().search(tokenize(query), limit=limit)
+
+
+def handle_judgment_lexical_search(
+    query: str, limit: int = 5, full_text: bool = False
+) -> JudgmentList:
+    """
+    語彙検索のユースケース。埋め込みモデルを使わないため、モデル未ロードでも応答できる。
+
+    Args:
+        query: 検索語を含む文字列
+        limit: 取得する件数
+        full_text: True なら本文全文、False なら抜粋を返す
+
+    Returns:
+        一致した判例チャンクのリスト
+    """
+    results = attach_chunk_texts(search_lexical(query, limit=limit), full_text)
+    return JudgmentList(items=[Judgment(**r) for r in results])
+
+
+async def handle_judgment_hybrid_search_async(
+    query: str, encoder: TextEncoder, limit: int = 5, full_text: bool = False
+) -> JudgmentList:
+    """
+    語彙検索とベクトル検索を並行に実行し、Reciprocal Rank Fusion で統合するユースケース。
+
+    Args:
+        query: 検索したい文字列
+        encoder: テキストをエンコードする埋め込みモデル
+        limit: 取得する件数
+        full_text: True なら本文全文、False なら抜粋を返す
+
+    Returns:
+        統合スコア順の判例チャンクのリスト
+    """
+    candidates = max(limit, HYBRID_CANDIDATES)
+
+    async def vector_search() -> list[dict]:
+        vector = await encode_query_async(query, encoder)
+        return await query_judgments_by_vector_async(vector, limit=candidates)
+
+    vector_results, lexical_results = await asyncio.gather(
+        vector_search(), asyncio.to_thread(search_lexical, query, candidates)
+    )
+    fused = reciprocal_rank_fusion(
+        [vector_results, lexical_results], limit=limit, k=RRF_K
+    )
+    fused = await attach_chunk_texts_async(fused, full_text)
+    return JudgmentList(items=[Judgment(**r) for r in fused])
+
+
+def warm_up_lexical_search() -> None:
+    """
+    janome の辞書と語彙索引を読み込んでおく（初回検索の待ち時間をなくす）。
+    """
+    try:
+        search_lexical("判例", limit=1)
+    except Exception as e:
+        print(f"語彙索引の読み込みに失敗しました: {e}")
@@ -0,0 +1,8 @@
+"""
+テスト共通の設定
+"""
+
+import os
+
+# 検索結果キャッシュの世代カウンタはプロセス内で持つ (作業ディレクトリにファイルを作らない)
+os.environ.setdefault("SEARCH_CACHE_GENERATION_PATH", "")
@@ -0,0 +1,63 @@
+"""
+benchmarks (オフラインベンチマーク) のテスト
+"""
+
+import pytest
+
+from app.domain.services.pdf_parser import extract_text_from_pdf
+from benchmarks.corpus import iter_corpus
+from benchmarks.run_benchmarks import (
+    StubEncoder,
+    compare_to_baseline,
+    measure,
+    reset_peak_rss,
+    run,
+)
+
+
+def test_corpus_is_deterministic_japanese_text():
+    first, again = next(iter_corpus(1, 2, seed=3)), next(iter_corpus(1, 2, seed=3))
+
+    assert first == again
+    assert extract_text_from_pdf(first).startswith("主文")
+
+
+def test_run_reports_every_stage_and_flags_regressions():
+    result = run(documents=2, pages=1, queries=5, store_kind="numpy")
+
+    stages = result["stages"]
+    assert list(stages) == ["extract", "chunk", "encode", "upsert", "search"]
+    assert stages["extract"]["items"] == 2
+    assert stages["search"]["items"] == 5
+    assert compare_to_baseline(result, result) == []
+
+    slower = {"stages": {"search": {**stages["search"]}}}
+    slower["stages"]["search"]["throughput_per_sec"] *= 2
+    assert [r.split(":")[0] for r in compare_to_baseline(result, slower)] == [
+        "search.throughput_per_sec"
+    ]
+
+
+def test_peak_rss_is_measured_per_stage():
+    if not reset_peak_rss():
+        pytest.skip("ピーク RSS を戻せない環境")
+
+    def allocate() -> int:
+        block = bytearray(200 * 1024 * 1024)
+        block[::4096] = b"\x01" * len(block[::4096])
+        return 1
+
+    large = measure("large", "operations", [allocate]).as_dict()
+    small = measure("small", "operations", [lambda: 1]).as_dict()
+
+    assert large["peak_rss_scope"] == small["peak_rss_scope"] == "stage"
+    assert small["peak_rss_mb"] < large["peak_rss_mb"] - 150
+
+
+def test_stub_encoder_is_deterministic_and_normalized():
+    encoder = StubEncoder(dim=8)
+    vectors = encoder.encode(["民法", "刑法", "民法"])
+
+    assert vectors.shape == (3, 8)
+    assert (vectors[0] == vectors[2]).all()
+    assert abs(float((vectors[1] ** 2).sum()) - 1.0) < 1e-5
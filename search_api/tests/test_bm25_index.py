@@ -0,0 +1,116 @@
+"""
+bm25_index / 語彙検索のテスト
+"""
+
+from app.domain.services.lexical_tokenizer import count_terms, tokenize
+from app.domain.services.search_service import reciprocal_rank_fusion
+from app.infrastructure.lexical import bm25_index
+from app.infrastructure.lexical.bm25_index import Bm25Index, LexicalDocument
+
+TEXTS = [
+    "民法709条に基づく損害賠償請求事件",
+    "令和3年(受)第123号 東京地方裁判所",
+    "特許権侵害差止請求事件 知的財産高等裁判所",
+]
+
+
+def _documents(texts: list[str]) -> list[LexicalDocument]:
+    return [
+        LexicalDocument(f"p{i}", f"j{i}", i, terms)
+        for i, terms in enumerate(count_terms(texts))
+    ]
+
+
+def _doc(point_id: str, judgment_id: str, terms: list[str]) -> LexicalDocument:
+    return LexicalDocument(point_id, judgment_id, 0, dict.fromkeys(terms, 1))
+
+
+def _judgment_ids(results: list[dict]) -> list[str]:
+    return [r["payload"]["judgment_id"] for r in results]
+
+
+def test_tokenize_keeps_numbers_and_drops_symbols():
+    assert tokenize("令和３年(受)第１２３号") == [
+        "令和",
+        "3",
+        "年",
+        "受",
+        "第",
+        "123",
+        "号",
+    ]
+
+
+def test_search_ranks_exact_terms_and_persists(tmp_path):
+    index = Bm25Index(str(tmp_path))
+    index.add_documents(_documents(TEXTS))
+    assert index.search(tokenize("民法709条"), limit=5) == []  # commit 前は見えない
+    index.commit()
+
+    results = index.search(tokenize("民法709条"), limit=5)
+    assert _judgment_ids(results) == ["j0"]
+    assert results[0]["payload"] == {"judgment_id": "j0", "chunk_index": 0}
+
+    reopened = Bm25Index(str(tmp_path))
+    assert len(reopened) == 3
+    assert _judgment_ids(reopened.search(tokenize("請求事件"), limit=5)) == ["j0", "j2"]
+
+
+def test_removals_are_seen_by_other_instances(tmp_path):
+    writer = Bm25Index(str(tmp_path))
+    reader = Bm25Index(str(tmp_path))
+    writer.add_documents(_documents(TEXTS))
+    writer.commit()
+    assert _judgment_ids(reader.search(tokenize("東京地方裁判所"), limit=5)) == ["j1"]
+
+    writer.remove_judgment("j1")
+    writer.remove_points(["p0"])  # 半数超が墓標になり、詰め直される
+    writer.commit()
+
+    assert reader.search(tokenize("東京地方裁判所"), limit=5) == []
+    assert _judgment_ids(reader.search(tokenize("請求"), limit=5)) == ["j2"]
+    assert writer.missing(["p0", "p1", "p2"]) == {"p0", "p1"}
+
+
+def test_commits_append_to_the_log_until_compaction(tmp_path, monkeypatch):
+    writer = Bm25Index(str(tmp_path))
+    reader = Bm25Index(str(tmp_path))
+    writer.add_documents([_doc("p0", "j0", ["民法"]), _doc("p1", "j1", ["特許"])])
+    writer.commit()
+    writer.add_documents([_doc("p2", "j2", ["民法", "特許"])])
+    writer.remove_points(["p0"])
+    writer.commit()
+
+    assert not (tmp_path / "bm25_index.npz").exists()  # 索引全体は書き直さない
+    assert _judgment_ids(reader.search(["民法"], limit=5)) == ["j2"]
+
+    writer.compact()
+    logs = list(tmp_path.glob("*.log"))
+    assert len(logs) == 1 and logs[0].stat().st_size == 0
+    assert _judgment_ids(reader.search(["特許"], limit=5)) == ["j1", "j2"]
+
+    with open(logs[0], "ab") as f:
+        f.write(b'{"ops":[["add"')  # 書き込み途中で落ちたワーカーの残骸
+    assert len(reader) == 2
+    monkeypatch.setattr(bm25_index, "LEXICAL_COMPACT_MIN_BYTES", 1)
+    monkeypatch.setattr(bm25_index, "LEXICAL_COMPACT_RATIO", 0.0)
+    writer.add_documents([_doc("p3", "j3", ["民法"])])
+    writer.commit()  # ログが閾値を超えたので、バックグラウンドで書き直す
+    writer._compactor.join(5)
+
+    assert list(tmp_path.glob("*.log")) != logs
+    assert sorted(_judgment_ids(reader.search(["民法"], limit=5))) == ["j2", "j3"]
+    assert Bm25Index(str(tmp_path)).missing(["p0", "p1", "p3"]) == {"p0"}
+
+
+def test_reciprocal_rank_fusion_merges_by_chunk():
+    def hit(judgment_id, chunk_index):
+        return {"payload": {"judgment_id": judgment_id, "chunk_index": chunk_index}}
+
+    vector = [hit("a", 0), hit("b", 0)]
+    lexical = [hit("b", 0), hit("c", 1)]
+
+    fused = reciprocal_rank_fusion([vector, lexical], limit=2, k=60)
+
+    assert _judgment_ids(fused) == ["b", "a"]
+    assert fused[0]["score"] == 1 / 62 + 1 / 61
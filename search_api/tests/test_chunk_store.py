@@ -0,0 +1,72 @@
+"""
+chunk_store (ベクトルストア外のチャンク本文) のテスト
+"""
+
+from app.domain.services.point_id import make_point_id
+from app.domain.services.search_service import make_snippet
+from app.infrastructure.chunk_store.chunk_store import (
+    ChunkStore,
+    StoredChunk,
+    set_chunk_store,
+)
+from app.usecase.judgment_chunk_text import (
+    attach_chunk_texts,
+    attach_group_texts,
+    find_unstored_chunks,
+)
+
+
+def test_store_persists_and_deletes(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    store.put_many(
+        [
+            StoredChunk("p0", "a", 0, "本文0"),
+            StoredChunk("p1", "a", 1, "本文1"),
+            StoredChunk("p2", "b", 0, "本文2"),
+        ]
+    )
+
+    reopened = ChunkStore(str(tmp_path))
+    assert reopened.get_texts(["p2", "p9", "p0"]) == {"p2": "本文2", "p0": "本文0"}
+    assert reopened.missing(["p1", "p9"]) == {"p9"}
+
+    store.delete_ids(["p1"])
+    store.delete_judgment("b")
+    assert len(reopened) == 1
+
+
+def test_find_unstored_chunks_skips_saved_text(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    store.put_many(find_unstored_chunks(store, "a", ["x", "y"]))
+
+    missing = find_unstored_chunks(store, "a", ["x", "z"])
+
+    assert [(c.chunk_index, c.text) for c in missing] == [(1, "z")]
+    assert missing[0].point_id == make_point_id("a", 1, "z")
+
+
+def test_attach_texts_returns_snippets_or_full_text(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    store.put_many([StoredChunk("p0", "a", 0, "あ" * 500)])
+    set_chunk_store(store)
+    try:
+        hit = {"id": "p0", "payload": {"judgment_id": "a"}, "score": 0.9}
+        legacy = {"id": "old", "payload": {"judgment_id": "b", "text": "旧"}}
+
+        snippets = attach_chunk_texts([hit, legacy])
+        full = attach_group_texts(
+            [{"judgment_id": "a", "score": 0.9, "hits": [hit]}], True
+        )
+
+        assert snippets[0]["payload"]["text"] == make_snippet("あ" * 500, 200)
+        assert snippets[1]["payload"]["text"] == "旧"
+        assert full[0]["hits"][0]["payload"]["text"] == "あ" * 500
+        assert "text" not in hit["payload"]  # キャッシュされた結果は書き換えない
+    finally:
+        set_chunk_store(None)
+
+
+def test_make_snippet():
+    assert make_snippet("短い本文", 10) == "短い本文"
+    assert make_snippet("abcdef", 3) == "abc…"
+    assert make_snippet("abcdef", 0) == "abcdef"
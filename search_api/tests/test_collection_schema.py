@@ -0,0 +1,109 @@
+"""
+collection_schema (Qdrant コレクション設定の差分計算) のテスト
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from qdrant_client.models import (
+    Distance,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+)
+
+from app.infrastructure.qdrant.collection_schema import (
+    CollectionSpec,
+    _parse_payload_indexes,
+    plan_schema_changes,
+)
+
+
+def _info(
+    size=384,
+    distance=Distance.COSINE,
+    payload_schema=None,
+    m=16,
+    ef_construct=100,
+    quantization=None,
+    on_disk=True,
+    on_disk_payload=True,
+):
+    vectors = SimpleNamespace(
+        size=size, distance=distance, on_disk=on_disk, quantization_config=None
+    )
+    params = SimpleNamespace(vectors=vectors, on_disk_payload=on_disk_payload)
+    return SimpleNamespace(
+        config=SimpleNamespace(
+            params=params,
+            hnsw_config=SimpleNamespace(m=m, ef_construct=ef_construct),
+            quantization_config=quantization,
+        ),
+        payload_schema=payload_schema or {},
+    )
+
+
+def _int8(quantile=0.99, always_ram=True):
+    return ScalarQuantization(
+        scalar=ScalarQuantizationConfig(
+            type=ScalarType.INT8, quantile=quantile, always_ram=always_ram
+        )
+    )
+
+
+def _indexed(**fields):
+    return {name: SimpleNamespace(data_type=t) for name, t in fields.items()}
+
+
+def test_matching_collection_needs_no_changes():
+    info = _info(payload_schema=_indexed(judgment_id="keyword"), quantization=_int8())
+    assert plan_schema_changes(info, CollectionSpec()) == []
+
+
+def test_legacy_collection_gets_index_quantization_and_on_disk():
+    info = _info(on_disk=None, on_disk_payload=None)
+    actions = [c.action for c in plan_schema_changes(info, CollectionSpec())]
+    assert actions == [
+        "create_payload_index",
+        "update_quantization",
+        "update_vectors_on_disk",
+        "update_payload_on_disk",
+    ]
+
+
+def test_changed_index_type_and_hnsw_are_planned():
+    info = _info(
+        payload_schema=_indexed(judgment_id="text"), m=32, quantization=_int8()
+    )
+    changes = plan_schema_changes(info, CollectionSpec())
+    assert [(c.action, c.detail) for c in changes] == [
+        ("replace_payload_index", {"judgment_id": "keyword"}),
+        ("update_hnsw", {"m": 16, "ef_construct": 100}),
+    ]
+
+
+def test_disabling_quantization_is_planned():
+    info = _info(payload_schema=_indexed(judgment_id="keyword"), quantization=_int8())
+    changes = plan_schema_changes(info, CollectionSpec(quantization="none"))
+    assert [(c.action, c.detail) for c in changes] == [
+        ("update_quantization", {"to": "none"})
+    ]
+
+
+def test_vector_size_mismatch_is_not_migrated():
+    with pytest.raises(ValueError):
+        plan_schema_changes(_info(size=768), CollectionSpec())
+
+
+def test_parse_payload_indexes_and_search_params():
+    assert _parse_payload_indexes("court:keyword, year:INTEGER,,tag") == {
+        "court": "keyword",
+        "year": "integer",
+        "tag": "keyword",
+    }
+    params = CollectionSpec(hnsw_ef=128, oversampling=3.0).search_params()
+    assert params is not None
+    assert params.hnsw_ef == 128
+    assert params.quantization is not None
+    assert params.quantization.oversampling == 3.0
+    assert CollectionSpec(quantization="none").search_params() is None
@@ -0,0 +1,56 @@
+"""
+cpu_executor (止まったワーカーを作り直すプロセスプール) のテスト
+"""
+
+import asyncio
+import math
+import time
+from concurrent.futures import CancelledError
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.domain.services.pdf_parser import PdfParseTimeout
+from app.infrastructure.executors import cpu_executor
+from app.infrastructure.executors.cpu_executor import (
+    RecyclingProcessPool,
+    get_process_pool,
+    run_in_process,
+    shutdown_process_pool,
+)
+from app.usecase.judgment_bulk_ingest import _ParsedPdf, _wait_parsed
+
+
+def test_hung_parse_is_abandoned_and_the_pool_recycled():
+    with RecyclingProcessPool(1) as pool:
+        generation, hung = pool.submit(time.sleep, 60)
+        _, queued = pool.submit(abs, -3)
+        item = _ParsedPdf("a.pdf", "a", b"", generation, hung, set())
+
+        started = time.monotonic()
+        with pytest.raises(PdfParseTimeout):
+            _wait_parsed(pool, item, 0.5)
+        assert time.monotonic() - started < 10
+
+        # 古いプールに残っていた処理は打ち切られ、呼び出し側が投入し直す
+        assert pool.is_stale(generation)
+        with pytest.raises((BrokenProcessPool, CancelledError)):
+            queued.result(10)
+        assert pool.run(math.factorial, 5) == 120
+
+
+def test_run_in_process_abandons_a_hung_task(monkeypatch):
+    async def scenario():
+        with pytest.raises(PdfParseTimeout):
+            await run_in_process(time.sleep, 60, timeout=0.5, exc_type=PdfParseTimeout)
+        generation = get_process_pool().generation
+        assert await run_in_process(math.factorial, 5, timeout=30) == 120
+        return generation
+
+    monkeypatch.setattr(cpu_executor, "_process_pool", None)
+    try:
+        started = time.monotonic()
+        assert asyncio.run(scenario()) == 1
+        assert time.monotonic() - started < 20
+    finally:
+        shutdown_process_pool()
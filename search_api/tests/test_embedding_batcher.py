@@ -0,0 +1,43 @@
+"""
+embedding_batcher のテスト
+"""
+
+import numpy as np
+
+from app.domain.services.embedding_batcher import EmbeddingBatcher, encode_chunks
+
+
+class _LengthEncoder:
+    """テキスト長をそのままベクトルにするスタブ"""
+
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+
+    def encode(self, texts: list[str], batch_size: int = 32) -> np.ndarray:
+        self.batches.append(list(texts))
+        return np.array([[float(len(t))] for t in texts])
+
+
+def test_batcher_encodes_fixed_size_batches_sorted_by_length():
+    encoder = _LengthEncoder()
+    batcher = EmbeddingBatcher(encoder, batch_size=2, sort_window=2)
+
+    assert batcher.add(("a", 0), "xxxx") == []
+    assert batcher.add(("a", 1), "x") == []
+    assert batcher.add(("b", 0), "xxx") == []
+    results = batcher.add(("b", 1), "xx")
+
+    assert encoder.batches == [["x", "xx"], ["xxx", "xxxx"]]
+    assert dict(results) == {
+        ("a", 0): [4.0],
+        ("a", 1): [1.0],
+        ("b", 0): [3.0],
+        ("b", 1): [2.0],
+    }
+    assert batcher.flush() == []
+
+
+def test_encode_chunks_keeps_original_order():
+    chunks = ["x" * n for n in (5, 1, 3, 2, 4)]
+    vectors = encode_chunks(_LengthEncoder(), chunks, batch_size=2)
+    assert vectors == [[5.0], [1.0], [3.0], [2.0], [4.0]]
@@ -0,0 +1,58 @@
+"""
+embedding_store のテスト
+"""
+
+import numpy as np
+
+from app.domain.services.embedding_batcher import encode_chunks
+from app.infrastructure.embedding.embedding_store import EmbeddingStore
+
+
+class _CountingEncoder:
+    def __init__(self) -> None:
+        self.encoded: list[str] = []
+
+    def encode(self, texts: list[str], batch_size: int = 32) -> np.ndarray:
+        self.encoded.extend(texts)
+        return np.array([[float(len(t)), 0.5] for t in texts])
+
+
+def test_store_persists_vectors_across_instances(tmp_path):
+    store = EmbeddingStore(str(tmp_path), "model/a", max_entries=4, dtype="float32")
+    store.put_many(["甲", "乙"], [[1.0, 2.0], [3.0, 4.0]])
+
+    reopened = EmbeddingStore(str(tmp_path), "model/a", max_entries=4)
+    assert reopened.get_many(["乙", "丙", "甲"]) == [[3.0, 4.0], None, [1.0, 2.0]]
+    assert EmbeddingStore(str(tmp_path), "model/b").get_many(["甲"]) == [None]
+
+
+def test_store_evicts_least_recently_used(tmp_path):
+    store = EmbeddingStore(str(tmp_path), "m", max_entries=2, dtype="float16")
+    store.put_many(["a"], [[1.0]])
+    store.put_many(["b"], [[2.0]])
+    store.put_many(["c"], [[3.0]])
+
+    assert store.get_many(["a", "b", "c"]) == [None, [2.0], [3.0]]
+    assert store.stats()["size"] == 2
+    assert store.evictions == 1
+
+
+def test_encode_chunks_skips_model_for_cached_text(tmp_path):
+    store = EmbeddingStore(str(tmp_path), "m", max_entries=8, dtype="float32")
+    encoder = _CountingEncoder()
+
+    first = encode_chunks(encoder, ["aa", "b"], cache=store)
+    second = encode_chunks(encoder, ["b", "aa", "ccc"], cache=store)
+
+    assert encoder.encoded == ["b", "aa", "ccc"]
+    assert second == [first[1], first[0], [3.0, 0.5]]
+
+
+def test_batch_larger_than_capacity_keeps_the_last_entries(tmp_path):
+    store = EmbeddingStore(str(tmp_path), "m", max_entries=2, dtype="float32")
+    store.put_many(["a"], [[1.0]])
+    store.put_many(["a", "b", "c"], [[1.0], [2.0], [3.0]])
+
+    assert store.get_many(["a", "b", "c"]) == [None, [2.0], [3.0]]
+    store.put_many(["b", "d"], [[2.0], [4.0]])  # b は同じ呼び出しで保存するので残す
+    assert store.get_many(["b", "c", "d"]) == [[2.0], None, [4.0]]
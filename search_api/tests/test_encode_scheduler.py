@@ -0,0 +1,77 @@
+"""
+encode_scheduler (クエリエンコードの動的マイクロバッチ) のテスト
+"""
+
+import threading
+
+import numpy as np
+import pytest
+
+from app.infrastructure.embedding.encode_scheduler import EncodeScheduler
+
+
+class RecordingEncoder:
+    """
+    テキストの長さをベクトルにし、呼び出しごとのバッチを記録する。
+    gate を渡すと、最初の呼び出しを gate が set されるまで止める。
+    """
+
+    def __init__(self, gate: threading.Event | None = None) -> None:
+        self.gate = gate
+        self.started = threading.Event()
+        self.batches: list[list[str]] = []
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        self.started.set()
+        if self.gate is not None and not self.batches:
+            self.gate.wait(5)
+        self.batches.append(list(sentences))
+        if "fail" in sentences:
+            raise RuntimeError("encode failed")
+        return np.array([[float(len(s)), 1.0] for s in sentences])
+
+
+def test_requests_during_a_forward_pass_share_the_next_batch():
+    gate = threading.Event()
+    encoder = RecordingEncoder(gate)
+    scheduler = EncodeScheduler(encoder, max_batch_size=8, max_wait_ms=0)
+
+    first = scheduler.submit("a")
+    assert encoder.started.wait(5)
+    waiting = [scheduler.submit(t) for t in ["bb", "ccc", "bb", "dddd"]]
+    gate.set()
+
+    assert first.result(5) == [1.0, 1.0]
+    assert [f.result(5)[0] for f in waiting] == [2.0, 3.0, 2.0, 4.0]
+    assert encoder.batches == [["a"], ["bb", "ccc", "dddd"]]
+    assert scheduler.encoded_batches == 2
+
+
+def test_batches_are_capped_and_errors_reach_every_request():
+    gate = threading.Event()
+    encoder = RecordingEncoder(gate)
+    scheduler = EncodeScheduler(encoder, max_batch_size=2, max_wait_ms=0)
+
+    scheduler.submit("x")
+    assert encoder.started.wait(5)
+    futures = [scheduler.submit(t) for t in ["fail", "y", "zz"]]
+    gate.set()
+
+    for future in futures[:2]:
+        with pytest.raises(RuntimeError):
+            future.result(5)
+    assert futures[2].result(5) == [2.0, 1.0]
+    assert [len(b) for b in encoder.batches] == [1, 2, 1]
+
+
+def test_batch_size_one_never_encodes_on_the_submitting_thread():
+    gate = threading.Event()
+    encoder = RecordingEncoder(gate)
+    scheduler = EncodeScheduler(encoder, max_batch_size=1)
+
+    future = scheduler.submit("abc")  # gate が閉じていても呼び出し元は止まらない
+    assert not future.done()
+    gate.set()
+    assert future.result(5) == [3.0, 1.0]
+    assert scheduler.encode("de") == [2.0, 1.0]
+    assert scheduler._worker is None
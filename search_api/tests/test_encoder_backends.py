@@ -0,0 +1,43 @@
+"""
+encoder_backends (推論バックエンドの選択と一致度の確認) のテスト
+"""
+
+import numpy as np
+import pytest
+
+from app.infrastructure.embedding.encoder_backends import (
+    BACKENDS,
+    encoder_variant,
+    load_encoder,
+    parity_report,
+)
+
+
+class FixedEncoder:
+    def __init__(self, vectors: list[list[float]]) -> None:
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        return self.vectors[: len(sentences)]
+
+
+def test_parity_report_aggregates_cosine_per_text():
+    reference = FixedEncoder([[1.0, 0.0], [0.0, 2.0], [3.0, 4.0]])
+    candidate = FixedEncoder([[2.0, 0.0], [1.0, 1.0], [3.0, 4.0]])
+
+    report = parity_report(candidate, reference, ["a", "b", "c"])
+
+    assert report["texts"] == 3
+    assert report["min_cosine"] == pytest.approx(np.sqrt(0.5), abs=1e-6)
+    assert report["mean_cosine"] == pytest.approx((2 + np.sqrt(0.5)) / 3, abs=1e-6)
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        load_encoder("all-MiniLM-L6-v2", "tensorrt")
+
+
+def test_each_backend_has_its_own_cache_variant():
+    variants = {encoder_variant("m", backend) for backend in BACKENDS}
+    assert len(variants) == len(BACKENDS)
+    assert encoder_variant("m", "torch") == "m"
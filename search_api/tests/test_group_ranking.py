@@ -0,0 +1,33 @@
+"""
+search_service の判例単位の集約・ランキングのテスト
+"""
+
+import pytest
+
+from app.domain.services.search_service import aggregate_group_score, rank_groups
+
+
+def _group(judgment_id, scores):
+    return {
+        "judgment_id": judgment_id,
+        "hits": [{"payload": {"judgment_id": judgment_id}, "score": s} for s in scores],
+    }
+
+
+def test_aggregate_group_score():
+    scores = [0.9, 0.5, 0.4]
+    assert aggregate_group_score(scores, "max") == 0.9
+    assert aggregate_group_score(scores, "sum") == pytest.approx(1.8)
+    assert aggregate_group_score(scores, "mean") == pytest.approx(0.6)
+    assert aggregate_group_score([], "mean") == 0.0
+
+
+def test_rank_groups_orders_by_aggregate():
+    groups = [_group("long", [0.9, 0.1, 0.1]), _group("dense", [0.8, 0.8, 0.7])]
+
+    by_max = rank_groups(groups, "max", limit=2)
+    by_sum = rank_groups(groups, "sum", limit=1)
+
+    assert [g["judgment_id"] for g in by_max] == ["long", "dense"]
+    assert [g["judgment_id"] for g in by_sum] == ["dense"]
+    assert [h["score"] for h in by_max[0]["hits"]] == [0.9, 0.1, 0.1]
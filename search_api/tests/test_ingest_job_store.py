@@ -0,0 +1,130 @@
+"""
+ingest_job_store (バルク登録ジョブの永続化) のテスト
+"""
+
+import os
+import sqlite3
+
+from app.infrastructure.jobs import ingest_job_store
+from app.infrastructure.jobs.ingest_job_store import IngestJobStore
+from app.usecase import judgment_bulk_jobs
+from app.usecase.judgment_bulk_ingest import BulkIngestCancelled
+
+
+def test_status_and_checkpoints_survive_reopen(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = IngestJobStore(path)
+    store.create("t1", "/zips/t1.zip", {"status": "in_progress"}, owner="w1")
+    store.add_checkpoints("t1", [("a.pdf", False), ("bad.pdf", True)], "w1")
+    store.update("t1", {"status": "in_progress", "processed_pdf": 2}, "w1")
+
+    reopened = IngestJobStore(path)
+    assert reopened.get("t1") == {
+        "status": "in_progress",
+        "processed_pdf": 2,
+        "cancel_requested": False,
+    }
+    assert reopened.completed_members("t1") == {"a.pdf": False, "bad.pdf": True}
+    assert reopened.get("missing") is None
+
+
+def test_cancel_only_running_jobs(tmp_path):
+    store = IngestJobStore(str(tmp_path / "jobs.sqlite3"))
+    store.create("run", "r.zip", {"status": "in_progress"}, owner="w1")
+    store.create("done", "d.zip", {"status": "done"}, owner="w1")
+
+    assert store.request_cancel("run") is True
+    assert store.request_cancel("done") is False
+    assert store.is_cancel_requested("run") is True
+    assert store.get("run")["cancel_requested"] is True
+
+
+def test_stale_jobs_are_claimed_once(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    IngestJobStore(path).create("t1", "t1.zip", {"status": "in_progress"}, "w1")
+    worker_a, worker_b = IngestJobStore(path), IngestJobStore(path)
+
+    assert worker_a.claim_stale("a", lease_seconds=60) == []  # heartbeat が新しい
+    claimed = worker_a.claim_stale("a", lease_seconds=-1)
+
+    assert [(j.task_id, j.zip_path) for j in claimed] == [("t1", "t1.zip")]
+    assert worker_b.claim_stale("b", lease_seconds=10) == []
+
+
+def test_writes_are_fenced_to_the_current_owner(tmp_path):
+    store = IngestJobStore(str(tmp_path / "jobs.sqlite3"))
+    store.create("t1", "t1.zip", {"status": "in_progress"}, "w1")
+    store.claim_stale("w2", lease_seconds=-1)
+
+    assert store.update("t1", {"status": "error"}, "w1") is False
+    assert store.add_checkpoints("t1", [("a.pdf", False)], "w1") is False
+    assert store.get("t1")["status"] == "in_progress"
+    assert store.completed_members("t1") == {}
+    assert store.update("t1", {"status": "in_progress", "n": 1}, "w2") is True
+
+
+def test_failed_job_keeps_its_zip_and_resumes(tmp_path, monkeypatch):
+    ingest_job_store.set_ingest_job_store(IngestJobStore(str(tmp_path / "j.db")))
+    monkeypatch.setattr(judgment_bulk_jobs, "BULK_UPLOAD_DIR", str(tmp_path))
+    zip_path = judgment_bulk_jobs.new_job_zip_path("t1")
+    open(zip_path, "wb").close()
+    judgment_bulk_jobs.create_bulk_job("t1", zip_path)
+
+    def flaky_ingest(zip_path, encoder, status, completed, on_checkpoint, cancel):
+        on_checkpoint([("a.pdf", False)])
+        raise ConnectionError("qdrant is down")
+
+    monkeypatch.setattr(judgment_bulk_jobs, "run_bulk_ingest", flaky_ingest)
+    try:
+        judgment_bulk_jobs.run_bulk_job("t1", zip_path, encoder=None)
+        assert judgment_bulk_jobs.get_bulk_job_status("t1")["status"] == "error"
+        assert os.path.exists(zip_path)
+
+        assert judgment_bulk_jobs.resume_bulk_job("t1") == zip_path
+        assert judgment_bulk_jobs.resume_bulk_job("t1") is None  # 再開済み
+        resumed_from = []
+
+        def resumed_ingest(*args, completed, **kwargs):
+            resumed_from.append(completed)
+            return 0
+
+        monkeypatch.setattr(judgment_bulk_jobs, "run_bulk_ingest", resumed_ingest)
+        judgment_bulk_jobs.run_bulk_job("t1", zip_path, encoder=None)
+        assert resumed_from == [{"a.pdf": False}]
+        assert judgment_bulk_jobs.get_bulk_job_status("t1")["status"] == "done"
+        assert not os.path.exists(zip_path)
+    finally:
+        ingest_job_store.set_ingest_job_store(None)
+
+
+def test_heartbeat_survives_job_store_errors(tmp_path, monkeypatch):
+    class FlakyStore(IngestJobStore):
+        failures = 0
+
+        def is_cancel_requested(self, task_id):
+            if self.failures:
+                self.failures -= 1
+                raise sqlite3.OperationalError("database is locked")
+            return super().is_cancel_requested(task_id)
+
+    store = FlakyStore(str(tmp_path / "j.db"))
+    ingest_job_store.set_ingest_job_store(store)
+    monkeypatch.setattr(judgment_bulk_jobs, "BULK_UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(judgment_bulk_jobs, "JOB_HEARTBEAT_SECONDS", 0.01)
+    zip_path = judgment_bulk_jobs.new_job_zip_path("t1")
+    open(zip_path, "wb").close()
+    judgment_bulk_jobs.create_bulk_job("t1", zip_path)
+
+    def cancellable_ingest(zip_path, encoder, status, completed, on_checkpoint, cancel):
+        store.failures = 3
+        store.request_cancel("t1")
+        assert cancel.wait(10), "heartbeat stopped after a job store error"
+        raise BulkIngestCancelled("cancelled")
+
+    monkeypatch.setattr(judgment_bulk_jobs, "run_bulk_ingest", cancellable_ingest)
+    try:
+        judgment_bulk_jobs.run_bulk_job("t1", zip_path, encoder=None)
+        assert store.failures == 0
+        assert judgment_bulk_jobs.get_bulk_job_status("t1")["status"] == "cancelled"
+    finally:
+        ingest_job_store.set_ingest_job_store(None)
@@ -0,0 +1,194 @@
+"""
+judgment_bulk_ingest (ZIP のバルク登録パイプライン) のテスト
+
+ベクトルストア・語彙索引は書き込みを記録するだけの代替を渡し、PDF 解析は実際のプロセスプールで行う。
+"""
+
+import threading
+import zipfile
+
+import pytest
+
+from app.infrastructure.chunk_store.chunk_store import ChunkStore
+from app.usecase import judgment_bulk_ingest
+from app.usecase.judgment_bulk_ingest import BulkIngestCancelled, run_bulk_ingest
+from benchmarks.corpus import judgment_pages, make_japanese_pdf
+from benchmarks.run_benchmarks import StubEncoder
+
+
+class RecordingLexicalIndex:
+    """
+    すべてのチャンクを索引済みとして扱い、commit の順序だけを記録する語彙索引。
+    """
+
+    def __init__(self, events: list) -> None:
+        self.events = events
+
+    def missing(self, point_ids):
+        return set()
+
+    def add_documents(self, documents):
+        pass
+
+    def remove_points(self, point_ids):
+        pass
+
+    def commit(self):
+        self.events.append(("commit",))
+
+
+class FakeCollection:
+    """
+    ポイントID → 判例ID を持つだけのベクトルストア。書き込みを events に記録する。
+    """
+
+    def __init__(self) -> None:
+        self.points: dict[str, str] = {}
+        self.metadata: dict[str, dict] = {}
+        self.events: list = []
+        self._lock = threading.Lock()
+
+    def upsert(self, points):
+        with self._lock:
+            self.points.update((p.id, p.payload["judgment_id"]) for p in points)
+            self.events.append(("upsert", {p.payload["judgment_id"] for p in points}))
+
+    def delete(self, point_ids):
+        with self._lock:
+            judgments = {self.points.pop(point_id) for point_id in point_ids}
+            self.events.append(("delete", judgments))
+
+    def list_ids(self, judgment_id):
+        with self._lock:
+            return {p for p, j in self.points.items() if j == judgment_id}
+
+    def set_metadata(self, judgment_id, metadata):
+        with self._lock:
+            self.metadata[judgment_id] = metadata
+            self.events.append(("metadata", {judgment_id}))
+
+    def ingest(self, zip_path, tmp_path, **kwargs):
+        status: dict = {}
+        checkpoints: list = []
+
+        def on_checkpoint(members):
+            checkpoints.extend(members)
+            self.events.append(("checkpoint", members))
+
+        kwargs.setdefault("parse_workers", 1)
+        kwargs.setdefault("upsert_workers", 1)
+        chunks = run_bulk_ingest(
+            zip_path,
+            StubEncoder(dim=8),
+            status,
+            upsert=self.upsert,
+            delete=self.delete,
+            list_ids=self.list_ids,
+            set_metadata=self.set_metadata,
+            lexical_index=RecordingLexicalIndex(self.events),
+            chunk_store=ChunkStore(str(tmp_path / "chunks")),
+            on_checkpoint=on_checkpoint,
+            **kwargs,
+        )
+        return chunks, status, dict(checkpoints)
+
+
+def _pdf(seed: int) -> bytes:
+    return make_japanese_pdf(judgment_pages(seed, 1))
+
+
+def _make_zip(path, members: dict[str, bytes]) -> str:
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as z:
+        for name, data in members.items():
+            z.writestr(name, data)
+    return str(path)
+
+
+def test_reingest_writes_only_the_changed_document(tmp_path):
+    collection = FakeCollection()
+    first = _make_zip(tmp_path / "1.zip", {"a.pdf": _pdf(1), "b.pdf": _pdf(2)})
+    collection.ingest(first, tmp_path)
+    old_a, old_b = collection.list_ids("a.pdf"), collection.list_ids("b.pdf")
+    collection.events.clear()
+
+    second = _make_zip(tmp_path / "2.zip", {"a.pdf": _pdf(3), "b.pdf": _pdf(2)})
+    chunks, status, checkpoints = collection.ingest(second, tmp_path)
+
+    writes = [e for e in collection.events if e[0] in ("upsert", "delete")]
+    assert writes == [("upsert", {"a.pdf"}), ("delete", {"a.pdf"})]
+    assert collection.list_ids("b.pdf") == old_b
+    assert not collection.list_ids("a.pdf") & old_a
+    assert status["unchanged_chunks"] == len(old_b)
+    assert chunks == len(old_b) + len(collection.list_ids("a.pdf"))
+    assert checkpoints == {"a.pdf": False, "b.pdf": False}
+
+
+def test_parse_failures_and_unreadable_members_are_counted_as_failed(tmp_path):
+    path = _make_zip(
+        tmp_path / "c.zip",
+        {"bad.pdf": b"not a pdf", "broken.pdf": b"%PDF-broken", "a.pdf": _pdf(1)},
+    )
+    raw = (tmp_path / "c.zip").read_bytes()
+    (tmp_path / "c.zip").write_bytes(raw.replace(b"%PDF-broken", b"%PDF-BROKEN", 1))
+    collection = FakeCollection()
+
+    _, status, checkpoints = collection.ingest(path, tmp_path)
+
+    assert status["total_pdf"] == status["processed_pdf"] == 3
+    assert status["failed_pdf"] == 2
+    assert checkpoints == {"bad.pdf": True, "broken.pdf": True, "a.pdf": False}
+    assert collection.list_ids("a.pdf")
+
+
+def test_document_that_lost_its_text_is_removed(tmp_path):
+    collection = FakeCollection()
+    collection.ingest(_make_zip(tmp_path / "1.zip", {"a.pdf": _pdf(1)}), tmp_path)
+    assert collection.list_ids("a.pdf")
+
+    empty = _make_zip(tmp_path / "2.zip", {"a.pdf": make_japanese_pdf([[]])})
+    _, _, checkpoints = collection.ingest(empty, tmp_path)
+
+    assert collection.list_ids("a.pdf") == set()
+    assert checkpoints == {"a.pdf": False}
+
+
+def test_cancel_stops_without_checkpointing_unwritten_members(tmp_path):
+    collection = FakeCollection()
+    path = _make_zip(tmp_path / "c.zip", {"a.pdf": _pdf(1), "b.pdf": _pdf(2)})
+    cancel = threading.Event()
+    cancel.set()
+
+    with pytest.raises(BulkIngestCancelled):
+        collection.ingest(path, tmp_path, cancel=cancel)
+
+    assert collection.points == {}
+    assert [e for e in collection.events if e[0] == "checkpoint"] == [
+        ("checkpoint", [])
+    ]
+
+
+def test_checkpoints_are_emitted_after_writes_and_commit(tmp_path, monkeypatch):
+    monkeypatch.setattr(judgment_bulk_ingest, "BULK_LEXICAL_COMMIT_SECONDS", 0.0)
+    collection = FakeCollection()
+    path = _make_zip(
+        tmp_path / "c.zip", {f"{name}.pdf": _pdf(i) for i, name in enumerate("abc")}
+    )
+
+    collection.ingest(path, tmp_path, upsert_workers=2, completed={"c.pdf": False})
+
+    written: set[str] = set()
+    committed: set[str] | None = None
+    checkpointed: set[str] = set()
+    for event in collection.events:
+        if event[0] in ("upsert", "metadata"):
+            written |= event[1]
+        elif event[0] == "commit":
+            committed = set(written)
+        elif event[0] == "checkpoint":
+            assert committed is not None  # 語彙索引の保存後にだけ記録する
+            members = {member for member, _ in event[1]}
+            assert members <= committed
+            checkpointed |= members
+            committed = None
+    assert checkpointed == {"a.pdf", "b.pdf"}
+    assert collection.list_ids("c.pdf") == set()
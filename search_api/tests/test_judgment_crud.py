@@ -0,0 +1,166 @@
+"""
+judgment_crud (判例の登録・更新・読み出し) のテスト
+"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.domain.models.vector_store import VectorPoint
+from app.infrastructure.chunk_store.chunk_store import ChunkStore, set_chunk_store
+from app.infrastructure.embedding.model_registry import get_encoder
+from app.infrastructure.executors.cpu_executor import shutdown_process_pool
+from app.infrastructure.qdrant import qdrant_gateway
+from app.infrastructure.vector_store.numpy_vector_store import NumpyVectorStore
+from app.main import create_app
+from app.usecase import judgment_crud
+from benchmarks.run_benchmarks import StubEncoder
+
+
+@pytest.fixture
+def encoder(tmp_path, monkeypatch):
+    """
+    NumPy のベクトルストアとチャンクストアに書き込む。PDF は "|" 区切りのチャンク列として扱い、
+    語彙索引の更新 (test_bm25_index で確認する) は行わない。
+    """
+    qdrant_gateway.set_vector_store(NumpyVectorStore(str(tmp_path / "vectors")))
+    qdrant_gateway.create_judgement_collection()
+    set_chunk_store(ChunkStore(str(tmp_path / "chunks")))
+
+    async def parse_async(pdf_bytes):
+        return pdf_bytes.decode().split("|")
+
+    monkeypatch.setattr(
+        judgment_crud, "parse_judgment_pdf", lambda b: b.decode().split("|")
+    )
+    monkeypatch.setattr(judgment_crud, "parse_judgment_pdf_async", parse_async)
+    monkeypatch.setattr(judgment_crud, "update_lexical_index", lambda *args: None)
+
+    async def no_lexical_update(*args):
+        return None
+
+    monkeypatch.setattr(judgment_crud, "update_lexical_index_async", no_lexical_update)
+    yield StubEncoder(dim=qdrant_gateway.JUDGMENT_VECTOR_SIZE)
+    qdrant_gateway.set_vector_store(None)
+    set_chunk_store(None)
+
+
+def _chunks(judgment_id):
+    hits = judgment_crud.read_judgment(judgment_id)
+    return sorted((h["payload"]["chunk_index"], h["payload"]["text"]) for h in hits)
+
+
+def test_register_with_an_existing_id_replaces_the_judgment(encoder):
+    judgment_crud.register_judgment(b"A|B|C", "j1", encoder)
+
+    assert judgment_crud.register_judgment(b"A|X", "j1", encoder) == 2
+    assert _chunks("j1") == [(0, "A"), (1, "X")]
+
+    asyncio.run(judgment_crud.register_judgment_async(b"Y", "j1", encoder))
+    assert _chunks("j1") == [(0, "Y")]
+    found = qdrant_gateway.query_judgments_by_vector(
+        encoder.encode("X").tolist(), limit=5
+    )
+    assert [h["payload"]["chunk_index"] for h in found] == [0]
+
+
+def test_update_keeps_unchanged_chunks(encoder):
+    judgment_crud.register_judgment(b"A|B", "j1", encoder)
+    before = {
+        h["payload"]["chunk_index"]: h["id"] for h in judgment_crud.read_judgment("j1")
+    }
+
+    assert judgment_crud.update_judgment(b"A|C|D", "j1", encoder) == 3
+
+    after = {
+        h["payload"]["chunk_index"]: h["id"] for h in judgment_crud.read_judgment("j1")
+    }
+    assert after[0] == before[0] and after[1] != before[1]
+    assert _chunks("j1") == [(0, "A"), (1, "C"), (2, "D")]
+
+
+def _upsert_ties(encoder):
+    """chunk_index 0, 1 にそれぞれ3点ずつ、同じ chunk_index の点を登録する"""
+    vector = encoder.encode("x").tolist()
+    qdrant_gateway.upsert_judgment_points(
+        [
+            VectorPoint(
+                id=f"p{i}{n}",
+                vector=vector,
+                payload={"judgment_id": "j1", "chunk_index": i},
+            )
+            for i in (1, 0)
+            for n in "cba"
+        ]
+    )
+
+
+def test_chunks_endpoint_pages_across_shared_chunk_index(encoder):
+    _upsert_ties(encoder)
+    client = TestClient(create_app())
+
+    ids, cursor = [], None
+    while True:
+        params = {"limit": 2, "with_text": "false"}
+        if cursor is not None:
+            params["cursor"] = cursor
+        res = client.get("/api/judgments/j1/chunks", params=params)
+        assert res.status_code == 200
+        ids += [item["id"] for item in res.json()["items"]]
+        cursor = res.json()["next_cursor"]
+        if cursor is None:
+            break
+
+    assert ids == ["p0a", "p0b", "p0c", "p1a", "p1b", "p1c"]
+    assert client.get("/api/judgments/j1/chunks?cursor=oops").status_code == 400
+    assert client.get("/api/judgments/missing/chunks").status_code == 404
+
+
+def test_stream_endpoint_returns_every_chunk_as_ndjson(encoder):
+    _upsert_ties(encoder)
+    client = TestClient(create_app())
+
+    res = client.get("/api/judgments/j1/stream?with_text=false")
+
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in res.text.splitlines()]
+    assert [hit["id"] for hit in lines] == ["p0a", "p0b", "p0c", "p1a", "p1b", "p1c"]
+    assert client.get("/api/judgments/missing/stream").status_code == 404
+
+
+def test_upload_that_is_not_a_pdf_is_rejected(tmp_path):
+    qdrant_gateway.set_vector_store(NumpyVectorStore(str(tmp_path / "vectors")))
+    app = create_app()
+    app.dependency_overrides[get_encoder] = lambda: StubEncoder(
+        dim=qdrant_gateway.JUDGMENT_VECTOR_SIZE
+    )
+    client = TestClient(app)
+    try:
+        files = {"file": ("a.pdf", b"not a pdf", "application/pdf")}
+        res = client.post("/api/judgments?judgment_id=j1", files=files)
+        assert res.status_code == 422
+        assert "Could not read PDF" in res.json()["detail"]
+        assert client.put("/api/judgments/j1", files=files).status_code == 422
+    finally:
+        qdrant_gateway.set_vector_store(None)
+        shutdown_process_pool()
+
+
+def test_search_limits_are_bounded():
+    app = create_app()
+    app.dependency_overrides[get_encoder] = lambda: StubEncoder(dim=4)
+    client = TestClient(app)
+
+    for params in (
+        {"limit": 1000},
+        {"limit": 0},
+        {"group_by_judgment": "true", "group_size": 1000},
+    ):
+        res = client.get("/api/judgments/search-by-vector", params={"q": "x", **params})
+        assert res.status_code == 422
+    for path in ("search-by-keyword", "search-hybrid"):
+        res = client.get(f"/api/judgments/{path}", params={"q": "x", "limit": 1000})
+        assert res.status_code == 422
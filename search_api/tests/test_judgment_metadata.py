@@ -0,0 +1,67 @@
+"""
+judgment_metadata (判決文冒頭の書誌情報の抽出) のテスト
+"""
+
+from app.domain.services.judgment_metadata import (
+    extract_judgment_metadata,
+    metadata_from_chunks,
+    normalize_case_number,
+)
+
+
+def test_supreme_court_civil_judgment():
+    text = (
+        "平成２７年（受）第１２３４号 損害賠償請求事件\n"
+        "平成28年3月1日 第三小法廷判決\n"
+        "原審 東京高等裁判所 平成26年(ネ)第55号"
+    )
+    assert extract_judgment_metadata(text) == {
+        "court": "最高裁判所",
+        "decision_date": "2016-03-01",
+        "case_number": "平成27年(受)第1234号",
+        "case_type": "民事",
+    }
+
+
+def test_cited_supreme_court_precedent_is_not_the_deciding_court():
+    text = (
+        "令和3年(ネ)第100号 損害賠償請求控訴事件\n"
+        "令和4年2月10日 東京高等裁判所第5民事部判決\n"
+        "理由\n"
+        "最高裁判所昭和50年第三小法廷判決の趣旨に照らし、控訴を棄却する。"
+    )
+    assert extract_judgment_metadata(text)["court"] == "東京高等裁判所"
+
+
+def test_lower_court_criminal_judgment_with_kanji_numerals():
+    text = (
+        "令和元年(わ)第五六号 窃盗被告事件\n"
+        "令和二年十月一日 大阪地方裁判所第十二刑事部判決\n"
+        "被告人を懲役1年に処する。"
+    )
+    assert extract_judgment_metadata(text) == {
+        "court": "大阪地方裁判所",
+        "decision_date": "2020-10-01",
+        "case_number": "令和元年(わ)第56号",
+        "case_type": "刑事",
+    }
+
+
+def test_cited_dates_and_missing_fields():
+    text = "処分取消請求事件について、2021年4月5日付けの処分を争う。\n2022年1月20日判決言渡"
+    assert extract_judgment_metadata(text) == {
+        "decision_date": "2022-01-20",
+        "case_type": "行政",
+    }
+    assert extract_judgment_metadata("本文のみ") == {}
+
+
+def test_metadata_from_chunks_and_case_number_normalization():
+    chunks = ["東京家庭裁判所", "令和3年(家)第10号", "遺産分割申立事件"]
+    assert metadata_from_chunks(chunks) == {
+        "court": "東京家庭裁判所",
+        "case_number": "令和3年(家)第10号",
+        "case_type": "家事",
+    }
+    assert normalize_case_number("令和３年（家）第１０号") == "令和3年(家)第10号"
+    assert normalize_case_number(" abc ") == "abc"
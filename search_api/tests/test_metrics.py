@@ -0,0 +1,57 @@
+"""
+metrics (Prometheus テキスト形式のメトリクス) のテスト
+"""
+
+import pytest
+
+from app.infrastructure.metrics.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+)
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("stage_seconds", "Stage time", ["stage"], buckets=(0.1, 1))
+    histogram.observe(0.05, stage="encode")
+    histogram.observe(0.5, stage="encode")
+    histogram.observe(5, stage="encode")
+    with histogram.time(stage="query"):
+        pass
+
+    lines = histogram.render().splitlines()
+
+    assert lines[:2] == [
+        "# HELP stage_seconds Stage time",
+        "# TYPE stage_seconds histogram",
+    ]
+    assert 'stage_seconds_bucket{stage="encode",le="0.1"} 1.0' in lines
+    assert 'stage_seconds_bucket{stage="encode",le="1.0"} 2.0' in lines
+    assert 'stage_seconds_bucket{stage="encode",le="+Inf"} 3.0' in lines
+    assert 'stage_seconds_sum{stage="encode"} 5.55' in lines
+    assert 'stage_seconds_count{stage="encode"} 3.0' in lines
+    assert histogram.count(stage="query") == 1
+
+
+def test_registry_renders_metrics_and_collectors():
+    registry = MetricsRegistry()
+    pdfs = Counter("pdfs_total", "PDFs", ["result"])
+    registry.register(pdfs)
+    pdfs.inc(result="parsed")
+    pdfs.inc(2, result="parsed")
+
+    def collect():
+        gauge = Gauge("entries", "Entries", ["cache"])
+        gauge.set(3, cache='a"b')
+        return [gauge]
+
+    registry.add_collector(collect)
+    text = registry.render()
+
+    assert 'pdfs_total{result="parsed"} 3.0' in text
+    assert 'entries{cache="a\\"b"} 3.0' in text
+    with pytest.raises(ValueError):
+        registry.register(Counter("pdfs_total", "dup"))
+    with pytest.raises(ValueError):
+        pdfs.inc()  # ラベル不足
@@ -0,0 +1,98 @@
+"""
+model_registry (埋め込みモデルの共有レジストリ) と /health/ready のテスト
+"""
+
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.infrastructure.embedding import model_registry as registry_module
+from app.infrastructure.embedding.model_registry import MeasuredEncoder, ModelRegistry
+from app.interface.api.routers import health_router
+from app.main import create_app
+from benchmarks.run_benchmarks import StubEncoder
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """
+    load_encoder を StubEncoder を返す関数に差し替え、呼び出し回数を記録する。
+    gate をクリアするまでロードを止めておける。
+    """
+    calls: list[str] = []
+    gate = threading.Event()
+    gate.set()
+
+    def load_encoder(model_name, backend, threads):
+        gate.wait(timeout=5)
+        calls.append(model_name)
+        if model_name == "broken":
+            raise RuntimeError("model not found")
+        return StubEncoder(dim=4)
+
+    monkeypatch.setattr(registry_module, "load_encoder", load_encoder)
+    return calls, gate
+
+
+def test_model_is_loaded_once_and_shared(loads):
+    calls, gate = loads
+    gate.clear()
+    registry = ModelRegistry("stub")
+    results: list = []
+    threads = [
+        threading.Thread(target=lambda: results.append(registry.get()))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    assert not registry.is_ready
+    gate.set()
+    for t in threads:
+        t.join()
+
+    assert calls == ["stub"]
+    assert registry.is_ready and registry.error is None
+    assert all(model is results[0] for model in results)
+    assert isinstance(results[0], MeasuredEncoder)
+    assert results[0].encode(["a", "b"]).shape == (2, 4)
+
+
+def test_load_failure_is_reported_and_retried(loads):
+    calls, _ = loads
+    registry = ModelRegistry("broken")
+
+    registry.load_in_background()
+    registry._loader.join()
+    assert not registry.is_ready
+    assert registry.error == "model not found"
+
+    registry.model_name = "stub"
+    assert registry.get() is not None
+    assert registry.error is None
+    assert calls == ["broken", "stub"]
+
+
+def test_ready_returns_503_until_the_model_is_loaded(loads, monkeypatch):
+    _, gate = loads
+    gate.clear()
+    registry = ModelRegistry("stub")
+    monkeypatch.setattr(health_router, "model_registry", registry)
+    client = TestClient(create_app())
+
+    res = client.get("/health/ready")
+    assert res.status_code == 503
+    assert res.json()["ready"] is False
+
+    gate.set()
+    registry._loader.join()
+    res = client.get("/health/ready")
+    assert res.status_code == 200
+    assert res.json() == {
+        "ready": True,
+        "model": "stub",
+        "backend": "torch",
+        "error": None,
+        "parity": None,
+    }
+    assert client.get("/health/live").json() == {"status": "ok"}
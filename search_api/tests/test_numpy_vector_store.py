@@ -0,0 +1,209 @@
+"""
+numpy_vector_store (Qdrant 無しのベクトルストア) のテスト
+"""
+
+import numpy as np
+import pytest
+
+from app.domain.models.vector_store import PayloadFilter, VectorPoint
+from app.domain.services.search_service import (
+    compute_cosine_similarities,
+    compute_cosine_similarity,
+    normalize_rows,
+)
+from app.infrastructure.qdrant import qdrant_gateway
+from app.infrastructure.vector_store.numpy_vector_store import NumpyVectorStore
+
+
+def _point(point_id, judgment_id, index, vector):
+    payload = {"judgment_id": judgment_id, "chunk_index": index, "text": point_id}
+    return VectorPoint(id=point_id, vector=vector, payload=payload)
+
+
+def _texts(results):
+    return [r["payload"]["text"] for r in results]
+
+
+def test_cosine_similarities_match_pairwise_version():
+    rows = np.array([[1.0, 0.0], [1.0, 1.0], [0.0, 3.0]])
+    query = [2.0, 1.0]
+
+    batched = compute_cosine_similarities(normalize_rows(rows), np.array([query]))
+
+    expected = [compute_cosine_similarity(list(r), query) for r in rows]
+    assert batched[0] == pytest.approx(expected, rel=1e-6)
+
+
+def test_query_across_blocks_and_reopen(tmp_path):
+    store = NumpyVectorStore(str(tmp_path), block_rows=2)
+    assert store.create_collection(2) is True
+    store.upsert(
+        [
+            _point("a0", "a", 0, [1.0, 0.0]),
+            _point("a1", "a", 1, [0.9, 0.1]),
+            _point("b0", "b", 0, [0.0, 1.0]),
+            _point("b1", "b", 1, [0.7, 0.7]),
+        ]
+    )
+
+    assert _texts(store.query([1.0, 0.0], limit=3)) == ["a0", "a1", "b1"]
+    assert [_texts(r) for r in store.query_batch([[0.0, 1.0], [1.0, 0.1]], 1)] == [
+        ["b0"],
+        ["a1"],
+    ]
+
+    reopened = NumpyVectorStore(str(tmp_path), block_rows=3)
+    assert reopened.create_collection(2) is False
+    assert reopened.list_point_ids("b") == {"b0", "b1"}
+    assert _texts(reopened.query([0.0, 1.0], limit=1)) == ["b0"]
+
+
+def test_groups_delete_and_slot_reuse(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    store.create_collection(2)
+    store.upsert([_point(f"a{i}", "a", i, [1.0, 0.01 * i]) for i in range(4)])
+    store.upsert([_point("b0", "b", 0, [0.8, 0.2])])
+
+    groups = store.query_groups([1.0, 0.0], limit=2, group_size=2)
+    assert [(g["judgment_id"], _texts(g["hits"])) for g in groups] == [
+        ("a", ["a0", "a1"]),
+        ("b", ["b0"]),
+    ]
+
+    store.delete_judgment("a")
+    store.delete_ids(["b0"])
+    assert store.query([1.0, 0.0], limit=5) == []
+
+    store.upsert([_point("c0", "c", 0, [1.0, 0.0])])  # 空きスロットを再利用する
+    assert store._meta("next_slot") == 5
+    assert _texts(store.scroll_judgment("c")) == ["c0"]
+
+
+def test_payload_filter_is_applied_during_search(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    store.create_collection(2)
+    store.upsert(
+        [
+            _point("a0", "a", 0, [1.0, 0.0]),
+            _point("a1", "a", 1, [0.9, 0.1]),
+            _point("b0", "b", 0, [0.8, 0.2]),
+            _point("c0", "c", 0, [0.0, 1.0]),
+        ]
+    )
+    store.set_judgment_payload(
+        "a", {"court": "最高裁判所", "decision_date": "2016-03-01"}
+    )
+    store.set_judgment_payload(
+        "c", {"court": "東京地方裁判所", "decision_date": "2021-05-10"}
+    )
+
+    assert store.scroll_judgment("a")[1]["payload"]["chunk_index"] == 1
+    courts = PayloadFilter(courts=("東京地方裁判所", "大阪地方裁判所"))
+    assert _texts(store.query([1.0, 0.0], limit=3, payload_filter=courts)) == ["c0"]
+    recent = PayloadFilter(decided_from="2016-03-01", decided_to="2020-12-31")
+    groups = store.query_groups([1.0, 0.0], 5, 5, payload_filter=recent)
+    assert [(g["judgment_id"], _texts(g["hits"])) for g in groups] == [
+        ("a", ["a0", "a1"])
+    ]
+    assert _texts(store.query([1.0, 0.0], 2, PayloadFilter())) == ["a0", "a1"]
+
+
+def test_gateway_runs_on_numpy_backend(tmp_path):
+    qdrant_gateway.set_vector_store(NumpyVectorStore(str(tmp_path)))
+    try:
+        qdrant_gateway.create_judgement_collection()
+        vector = [1.0] + [0.0] * (qdrant_gateway.JUDGMENT_VECTOR_SIZE - 1)
+        qdrant_gateway.upsert_judgment_points([_point("x0", "x", 0, vector)])
+
+        assert _texts(qdrant_gateway.query_judgments_by_vector(vector, limit=1)) == [
+            "x0"
+        ]
+        qdrant_gateway.delete_judgment_points("x")
+        assert qdrant_gateway.query_judgments_by_vector(vector, limit=1) == []
+    finally:
+        qdrant_gateway.set_vector_store(None)
+
+
+def test_gateway_batch_query_matches_single_queries(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    qdrant_gateway.set_vector_store(store)
+    try:
+        qdrant_gateway.create_judgement_collection()
+        size = qdrant_gateway.JUDGMENT_VECTOR_SIZE
+        x, y = [1.0] + [0.0] * (size - 1), [0.0, 1.0] + [0.0] * (size - 2)
+        qdrant_gateway.upsert_judgment_points(
+            [_point("x0", "x", 0, x), _point("y0", "y", 0, y)]
+        )
+        cached = qdrant_gateway.query_judgments_by_vector(y, limit=1)
+
+        batch = qdrant_gateway.query_judgments_by_vectors([x, y, x], limit=1)
+
+        assert [_texts(r) for r in batch] == [["x0"], ["y0"], ["x0"]]
+        assert batch[1] == cached
+    finally:
+        qdrant_gateway.set_vector_store(None)
+
+
+def test_judgment_pages_follow_chunk_index_order(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    qdrant_gateway.set_vector_store(store)
+    try:
+        store.create_collection(2)
+        # 登録順(スロット順)と chunk_index 順を逆にする
+        store.upsert([_point(f"a{i}", "a", i, [1.0, 0.0]) for i in (4, 3, 2, 1, 0)])
+        store.upsert([_point("b0", "b", 0, [0.0, 1.0])])
+
+        first = store.scroll_judgment_page("a", None, 2)
+        assert _texts(first) == ["a0", "a1"]
+        assert _texts(store.scroll_judgment_page("a", (1, "a1"), 2)) == ["a2", "a3"]
+
+        pages = list(qdrant_gateway.iter_judgment_pages("a", page_size=2))
+        assert [_texts(p) for p in pages] == [["a0", "a1"], ["a2", "a3"], ["a4"]]
+        assert list(qdrant_gateway.iter_judgment_pages("missing")) == []
+    finally:
+        qdrant_gateway.set_vector_store(None)
+
+
+def test_judgment_pages_keep_points_sharing_a_chunk_index(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    qdrant_gateway.set_vector_store(store)
+    try:
+        store.create_collection(2)
+        # ページ境界をまたいで同じ chunk_index の点が並ぶ
+        store.upsert(
+            [_point(f"a{i}-{n}", "a", i, [1.0, 0.0]) for i in (1, 0) for n in "zyx"]
+        )
+
+        assert _texts(store.scroll_judgment_page("a", (0, "a0-y"), 2)) == [
+            "a0-z",
+            "a1-x",
+        ]
+        pages = list(qdrant_gateway.iter_judgment_pages("a", page_size=2))
+        assert [_texts(p) for p in pages] == [
+            ["a0-x", "a0-y"],
+            ["a0-z", "a1-x"],
+            ["a1-y", "a1-z"],
+        ]
+    finally:
+        qdrant_gateway.set_vector_store(None)
+
+
+def test_metadata_fields_no_longer_extracted_are_cleared(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    qdrant_gateway.set_vector_store(store)
+    try:
+        store.create_collection(2)
+        store.upsert([_point("a0", "a", 0, [1.0, 0.0])])
+        qdrant_gateway.set_judgment_metadata(
+            "a", {"court": "最高裁判所", "case_type": "民事"}
+        )
+        supreme = PayloadFilter(courts=("最高裁判所",))
+        assert _texts(store.query([1.0, 0.0], 1, supreme)) == ["a0"]
+
+        qdrant_gateway.set_judgment_metadata("a", {"case_type": "刑事"})
+
+        assert store.query([1.0, 0.0], 1, supreme) == []
+        payload = store.scroll_judgment("a")[0]["payload"]
+        assert "court" not in payload and payload["case_type"] == "刑事"
+    finally:
+        qdrant_gateway.set_vector_store(None)
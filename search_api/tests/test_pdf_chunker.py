@@ -0,0 +1,125 @@
+"""
+pdf_parser (文境界・トークン数でのチャンク分割) のテスト
+"""
+
+import pytest
+
+from app.domain.services.pdf_parser import (
+    PdfParseError,
+    PdfParseTimeout,
+    iter_page_texts,
+    iter_sentences,
+    iter_token_chunks,
+    parse_pdf_into_chunks,
+)
+
+
+def _make_pdf(pages: list[str]) -> bytes:
+    """
+    Helvetica で1行ずつ書いた最小限のPDFを作る。
+    """
+    objs = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objs.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objs.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792]"
+            f" /Resources << /Font << /F1 3 0 R >> >> /Contents {len(objs)} 0 R >>"
+        )
+        kids.append(f"{len(objs)} 0 R")
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for i, body in enumerate(objs, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += (
+        f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n"
+    ).encode()
+    return out
+
+
+def _chunks(pages, max_tokens, overlap_tokens=0):
+    sentences = iter_sentences(pages)
+    return list(iter_token_chunks(sentences, max_tokens, overlap_tokens, len))
+
+
+def test_sentences_keep_delimiters_and_split_pages():
+    pages = ["甲は乙に払う。乙は「了解。」と言った\n改行", "次頁"]
+
+    assert list(iter_sentences(pages)) == [
+        "甲は乙に払う。",
+        "乙は「了解。」",
+        "と言った\n",
+        "改行\n",
+        "次頁\n",
+    ]
+
+
+def test_chunks_fit_budget_without_breaking_sentences():
+    pages = ["あいうえお。かきくけこ。さしすせそ。たちつてと。"]
+
+    # 特殊トークン2つ分を除いた 12 トークンに2文ずつ収まる
+    assert _chunks(pages, max_tokens=14) == [
+        "あいうえお。かきくけこ。",
+        "さしすせそ。たちつてと。",
+    ]
+
+
+def test_overlap_repeats_trailing_sentence():
+    pages = ["一二。三四。五六。七八。"]
+
+    assert _chunks(pages, max_tokens=8, overlap_tokens=3) == [
+        "一二。三四。",
+        "三四。五六。",
+        "五六。七八。",
+    ]
+
+
+def test_long_sentence_is_split_and_heading_starts_new_chunk():
+    pages = ["前文です。\n第1条 本文", "あ" * 25]
+
+    chunks = _chunks(pages, max_tokens=12)
+
+    assert chunks[0] == "前文です。"
+    assert chunks[1].startswith("第1条")
+    assert all(len(c) <= 10 for c in chunks)
+    assert "".join(chunks).count("あ") == 25
+
+
+@pytest.mark.parametrize("backend", ["pdfium", "pdfplumber"])
+def test_backends_stream_pages(backend):
+    pdf = _make_pdf(["Judgment page one.", "Judgment page two."])
+
+    pages = [p.strip() for p in iter_page_texts(pdf, backend)]
+
+    assert pages == ["Judgment page one.", "Judgment page two."]
+
+
+def test_time_budget_and_unreadable_pdf():
+    pdf = _make_pdf(["page"] * 3)
+
+    with pytest.raises(PdfParseTimeout):
+        list(iter_page_texts(pdf, "pdfium", time_budget=-1))
+    with pytest.raises(PdfParseError):  # pdfium・pdfplumber の両方が失敗する
+        list(iter_page_texts(b"not a pdf"))
+
+
+def test_parse_reports_extract_and_chunk_timings():
+    pdf = _make_pdf(["Judgment page one.", "Judgment page two."])
+    timings: dict[str, float] = {}
+
+    chunks = parse_pdf_into_chunks(pdf, max_tokens=256, timings=timings)
+
+    assert chunks == parse_pdf_into_chunks(pdf, max_tokens=256)
+    assert set(timings) == {"extract", "chunk"}
+    assert all(seconds >= 0 for seconds in timings.values())
@@ -0,0 +1,26 @@
+"""
+point_id のテスト
+"""
+
+from app.domain.services.point_id import diff_chunks, make_point_id
+
+
+def test_point_id_is_deterministic_and_content_addressed():
+    assert make_point_id("j1", 0, "本文") == make_point_id("j1", 0, "本文")
+    assert make_point_id("j1", 0, "本文") != make_point_id("j1", 0, "本文2")
+    assert make_point_id("j1", 0, "本文") != make_point_id("j1", 1, "本文")
+    assert make_point_id("j1", 0, "本文") != make_point_id("j2", 0, "本文")
+
+
+def test_diff_chunks_only_reembeds_changed_chunks():
+    old_chunks = ["第一", "第二", "第三"]
+    existing = {make_point_id("j1", i, t) for i, t in enumerate(old_chunks)}
+
+    diff = diff_chunks("j1", ["第一", "第二(改)"], existing)
+
+    assert diff.unchanged == 1
+    assert diff.added == [(1, "第二(改)", make_point_id("j1", 1, "第二(改)"))]
+    assert set(diff.stale) == {
+        make_point_id("j1", 1, "第二"),
+        make_point_id("j1", 2, "第三"),
+    }
@@ -0,0 +1,70 @@
+"""
+query_vector_cache のテスト
+"""
+
+from app.infrastructure.cache.query_vector_cache import QueryVectorCache
+
+
+def test_cache_normalizes_query_and_counts_hits():
+    cache = QueryVectorCache(max_entries=10, ttl_seconds=60)
+    cache.put("m", "民法 第709条", [1.0, 2.0])
+
+    assert cache.get("m", "  民法　第709条 ") == [1.0, 2.0]
+    assert cache.get("other-model", "民法 第709条") is None
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_cache_evicts_least_recently_used_and_expires():
+    cache = QueryVectorCache(max_entries=2, ttl_seconds=60)
+    cache.put("m", "a", [1.0])
+    cache.put("m", "b", [2.0])
+    cache.get("m", "a")
+    cache.put("m", "c", [3.0])
+
+    assert cache.get("m", "b") is None
+    assert cache.get("m", "a") == [1.0]
+    assert cache.evictions == 1
+
+    expired = QueryVectorCache(max_entries=2, ttl_seconds=-1)
+    expired.put("m", "a", [1.0])
+    assert expired.get("m", "a") is None
+
+
+def test_shared_store_is_visible_to_other_instances(tmp_path):
+    path = str(tmp_path / "vectors.sqlite3")
+    QueryVectorCache(shared_path=path).put("m", "刑法", [0.5, 0.25])
+
+    other = QueryVectorCache(shared_path=path)
+    assert other.get("m", "刑法") == [0.5, 0.25]
+    assert other.hits == 1
+
+
+def test_encode_queries_batches_only_uncached_queries():
+    import numpy as np
+
+    from app.infrastructure.cache.query_vector_cache import query_vector_cache
+    from app.usecase.judgment_query import encode_queries
+
+    class CountingEncoder:
+        def __init__(self):
+            self.calls = []
+
+        def encode(self, sentences, batch_size=32, **kwargs):
+            self.calls.append(list(sentences))
+            return np.array([[float(len(s)), 1.0] for s in sentences])
+
+    query_vector_cache.clear()
+    encoder = CountingEncoder()
+    try:
+        assert encode_queries(["民法", "刑法第1条", "民法"], encoder) == [
+            [2.0, 1.0],
+            [5.0, 1.0],
+            [2.0, 1.0],
+        ]
+        assert encode_queries(["刑法第1条", "憲法"], encoder) == [
+            [5.0, 1.0],
+            [2.0, 1.0],
+        ]
+        assert encoder.calls == [["民法", "刑法第1条"], ["憲法"]]
+    finally:
+        query_vector_cache.clear()
@@ -0,0 +1,63 @@
+"""
+search_result_cache のテスト
+"""
+
+import asyncio
+
+import pytest
+
+from app.infrastructure.cache.search_result_cache import (
+    SearchResultCache,
+    WriteGeneration,
+    write_generation,
+)
+from app.infrastructure.qdrant import qdrant_gateway
+from app.infrastructure.vector_store.numpy_vector_store import NumpyVectorStore
+
+
+def test_results_are_invalidated_by_write_generation():
+    generation = WriteGeneration()
+    cache = SearchResultCache(max_entries=8)
+    results = [{"payload": {"judgment_id": "a"}, "score": 0.9}]
+
+    cache.put("key", generation.current(), results)
+    hit = cache.get("key", generation.current())
+    assert hit == results
+    hit[0]["payload"]["judgment_id"] = "mutated"
+    assert cache.get("key", generation.current()) == results
+
+    generation.bump()
+    assert cache.get("key", generation.current()) is None
+    assert cache.stats() == {"size": 0, "hits": 2, "misses": 1}
+
+
+def test_shared_generation_is_seen_by_other_instances(tmp_path):
+    path = str(tmp_path / "generation.sqlite3")
+    writer, reader = WriteGeneration(path), WriteGeneration(path)
+
+    before = reader.current()
+    writer.bump()
+    assert reader.current() == before + 1
+
+    assert asyncio.run(writer.bump_async()) == before + 2
+    assert asyncio.run(reader.current_async()) == before + 2
+
+
+def test_failed_write_still_bumps_the_generation(tmp_path):
+    class FailingStore(NumpyVectorStore):
+        def delete_ids(self, point_ids):
+            raise RuntimeError("boom")
+
+        async def delete_ids_async(self, point_ids):
+            raise RuntimeError("boom")
+
+    qdrant_gateway.set_vector_store(FailingStore(str(tmp_path)))
+    try:
+        before = write_generation.current()
+        with pytest.raises(RuntimeError):
+            qdrant_gateway.delete_points_by_ids(["p"])
+        with pytest.raises(RuntimeError):
+            asyncio.run(qdrant_gateway.delete_points_by_ids_async(["p"]))
+        assert write_generation.current() == before + 2
+    finally:
+        qdrant_gateway.set_vector_store(None)
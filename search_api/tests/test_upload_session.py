@@ -0,0 +1,118 @@
+"""
+judgment_bulk_upload (分割アップロード) のテスト
+"""
+
+import asyncio
+import hashlib
+
+import pytest
+
+from app.infrastructure.jobs import ingest_job_store, upload_session_store
+from app.usecase import judgment_bulk_jobs, judgment_bulk_upload
+from app.usecase.judgment_bulk_upload import (
+    InvalidUploadPart,
+    UploadSessionConflict,
+    commit_upload_session,
+    create_upload_session,
+    get_upload_session_status,
+    write_upload_part,
+)
+
+
+@pytest.fixture(autouse=True)
+def stores(tmp_path, monkeypatch):
+    db = str(tmp_path / "jobs.sqlite3")
+    monkeypatch.setattr(judgment_bulk_jobs, "BULK_UPLOAD_DIR", str(tmp_path / "up"))
+    upload_session_store.set_upload_session_store(
+        upload_session_store.UploadSessionStore(db)
+    )
+    ingest_job_store.set_ingest_job_store(ingest_job_store.IngestJobStore(db))
+    yield
+    upload_session_store.set_upload_session_store(None)
+    ingest_job_store.set_ingest_job_store(None)
+
+
+def send(session_id: str, number: int, data: bytes, sha256: str | None = None):
+    async def body():
+        for i in range(0, len(data), 3):
+            yield data[i : i + 3]
+
+    digest = sha256 or hashlib.sha256(data).hexdigest()
+    return asyncio.run(write_upload_part(session_id, number, body(), digest))
+
+
+def test_parts_are_written_in_place_out_of_order_and_committed_once():
+    payload = b"0123456789abcdefghijk"
+    session = create_upload_session(len(payload), part_size=8)
+    sid = session["session_id"]
+    assert session["part_count"] == 3
+    assert session["missing_parts"] == [1, 2, 3]
+
+    send(sid, 3, payload[16:])
+    send(sid, 1, payload[:8])
+    with pytest.raises(UploadSessionConflict):
+        commit_upload_session(sid)
+    assert get_upload_session_status(sid)["missing_parts"] == [2]
+
+    send(sid, 2, payload[8:16])
+    task_id, zip_path, created = commit_upload_session(sid)
+    assert (task_id, created) == (sid, True)
+    with open(zip_path, "rb") as f:
+        assert f.read() == payload
+    assert judgment_bulk_jobs.get_bulk_job_status(sid)["status"] == "in_progress"
+
+    assert commit_upload_session(sid)[2] is False
+    with pytest.raises(UploadSessionConflict):
+        send(sid, 1, payload[:8])
+
+
+def test_bad_parts_are_rejected_and_can_be_resent():
+    session = create_upload_session(10, part_size=4)
+    sid = session["session_id"]
+
+    with pytest.raises(InvalidUploadPart):
+        send(sid, 1, b"abcd", sha256="0" * 64)
+    with pytest.raises(InvalidUploadPart):
+        send(sid, 3, b"ijk")  # 最後のパートは 2 バイト
+    with pytest.raises(InvalidUploadPart):
+        send(sid, 4, b"xx")
+    assert get_upload_session_status(sid)["missing_parts"] == [1, 2, 3]
+
+    send(sid, 1, b"abcd")
+    send(sid, 1, b"abcd")
+    assert get_upload_session_status(sid)["missing_parts"] == [2, 3]
+
+
+def test_rejected_resend_leaves_the_part_missing():
+    sid = create_upload_session(8, part_size=4)["session_id"]
+    send(sid, 1, b"AAAA")
+    send(sid, 2, b"BBBB")
+
+    with pytest.raises(InvalidUploadPart):
+        send(sid, 1, b"XXXX", sha256=hashlib.sha256(b"AAAA").hexdigest())
+    assert get_upload_session_status(sid)["missing_parts"] == [1]
+    with pytest.raises(UploadSessionConflict):
+        commit_upload_session(sid)
+
+    send(sid, 1, b"AAAA")
+    _, zip_path, _ = commit_upload_session(sid)
+    with open(zip_path, "rb") as f:
+        assert f.read() == b"AAAABBBB"
+
+
+def test_expired_sessions_are_removed(monkeypatch):
+    sid = create_upload_session(4, part_size=4)["session_id"]
+    monkeypatch.setattr(judgment_bulk_upload, "UPLOAD_SESSION_TTL_SECONDS", 0.0)
+    assert judgment_bulk_upload.expire_upload_sessions(now=1e12) == 1
+    assert get_upload_session_status(sid) is None
+
+
+def test_ttl_counts_from_the_last_part(monkeypatch):
+    sid = create_upload_session(8, part_size=4)["session_id"]
+    created = upload_session_store.get_upload_session_store().get(sid).created_at
+    monkeypatch.setattr(judgment_bulk_upload, "UPLOAD_SESSION_TTL_SECONDS", 100.0)
+    monkeypatch.setattr(upload_session_store.time, "time", lambda: created + 90)
+    send(sid, 1, b"AAAA")
+
+    assert judgment_bulk_upload.expire_upload_sessions(now=created + 150) == 0
+    assert judgment_bulk_upload.expire_upload_sessions(now=created + 200) == 1
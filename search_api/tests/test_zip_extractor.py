@@ -0,0 +1,61 @@
+"""
+zip_extractor のテスト
+"""
+
+import zipfile
+
+from app.domain.services.zip_extractor import count_pdfs_in_zip, iter_pdfs_from_zip
+
+
+def _make_zip(path, members: dict[str, bytes]) -> str:
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as z:
+        for name, data in members.items():
+            z.writestr(name, data)
+    return str(path)
+
+
+def test_iter_pdfs_skips_non_pdf_members(tmp_path):
+    zip_path = _make_zip(
+        tmp_path / "a.zip",
+        {"a.pdf": b"%PDF-a", "sub/B.PDF": b"%PDF-b", "readme.txt": b"hello"},
+    )
+
+    assert count_pdfs_in_zip(zip_path) == 2
+    assert list(iter_pdfs_from_zip(zip_path)) == [
+        ("a.pdf", b"%PDF-a"),
+        ("sub/B.PDF", b"%PDF-b"),
+    ]
+
+
+def test_iter_pdfs_skips_oversized_and_bomb_members(tmp_path):
+    zip_path = _make_zip(
+        tmp_path / "b.zip",
+        {"small.pdf": b"%PDF-small", "bomb.pdf": b"\0" * 1_000_000},
+    )
+
+    names = [name for name, _ in iter_pdfs_from_zip(zip_path, max_ratio=100)]
+    assert names == ["small.pdf"]
+
+    names = [name for name, _ in iter_pdfs_from_zip(zip_path, max_member_size=100)]
+    assert names == ["small.pdf"]
+
+
+def test_unreadable_members_are_reported_and_skipped(tmp_path):
+    path = tmp_path / "c.zip"
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as z:
+        z.writestr("broken.pdf", b"%PDF-broken")
+        z.writestr("big.pdf", b"%PDF-" + b"x" * 30)
+        z.writestr("ok.pdf", b"%PDF-ok")
+    raw = path.read_bytes()
+    path.write_bytes(raw.replace(b"%PDF-broken", b"%PDF-BROKEN", 1))  # CRC 不一致
+    skipped: list[str] = []
+
+    pdfs = list(
+        iter_pdfs_from_zip(
+            str(path), max_member_size=20, on_skip=lambda name, _: skipped.append(name)
+        )
+    )
+
+    assert pdfs == [("ok.pdf", b"%PDF-ok")]
+    assert skipped == ["broken.pdf", "big.pdf"]
+    assert count_pdfs_in_zip(str(path)) == 3